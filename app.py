@@ -7,30 +7,59 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
+import time
+import uuid
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 
-from src.data_fetch import fetch_all_products
-from src.etl import products_to_df, save_processed_data
+from src.config import (
+    BRAND_ALIASES_PATH, COOCCURRENCE_TOP_PAIRS, DATABASE_PATH, NUTRIENT_COLUMNS, PROCESSED_DATA_PATH,
+    PROFILE_ADMIN_TOKEN, PROFILE_DIR, PROFILE_RERUNS, QUARANTINE_PATH, THUMBNAIL_PREFETCH, THUMBNAIL_WAIT
+)
+from src.brands import BrandMap
+from src.cooccurrence import TagIncidence, cooccurrence_matrix, tag_cooccurrence
+from src.dedup import duplicate_report, near_duplicate_clusters
 from src.analysis import (
     get_summary_stats,
     top_brands,
     nutrient_distribution,
-    category_analysis,
+    compare_scoring_profiles,
+    get_grade_agreement,
     get_healthiest_products,
     get_additive_prevalence,
     get_data_quality_metrics
 )
+from src.incremental_stats import IncrementalStats, read_stats
+from src.memo import get_memo
+from src.profiling import Profile, list_profiles
+from src.query import connect
+from src.refresh import last_fetch_failure, refresh_dataset, refresh_due, start_refresh
+from src.search import search_codes, search_products
+from src.similarity import NutrientIndex
+from src.snapshots import group_mean_trend, list_versions
+from src.shared_data import attach_dataset, current_version, session_view
+from src.taxonomy import UNCLASSIFIED, category_sunburst
+from src.thumbnails import get_thumbnail_cache
+from src.validation import read_quarantine, violation_counts
+from src.views import additive_chart, brand_chart, category_chart, filter_mask, hierarchy_chart
 from src.visuals import (
     plot_bar,
     plot_histogram,
     plot_scatter,
     plot_sunburst,
+    plot_heatmap,
+    plot_flame_graph,
     plot_box,
     create_gauge_chart
 )
+from src.warmup import get_access_log, normalize_state, read_warmup_report, start_warmup, state_key
+
+# Per-rerun views of the shared dataset rely on copy-on-write (always on from pandas 3)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
 
 # Page configuration
 st.set_page_config(
@@ -245,24 +274,185 @@ def load_custom_css():
     </style>
     """, unsafe_allow_html=True)
 
-# Data loading with caching
-@st.cache_data(ttl=3600)
-def load_data() -> pd.DataFrame:
-    """Load and cache data with automatic refresh"""
-    data_file = Path("data/processed/openfoodfacts_india.csv")
-    
-    if not data_file.exists() or (
-        datetime.fromtimestamp(data_file.stat().st_mtime) < 
-        datetime.now() - timedelta(days=1)
-    ):
+# Data loading through the shared dataset segment
+def load_data() -> Tuple[pd.DataFrame, str]:
+    """Attach to the shared dataset; refreshing and republishing run once per host, in the background"""
+    if current_version() is None:
+        # Nothing to show until a first dataset is published on this host
         with st.spinner("🔄 Fetching fresh data from OpenFoodFacts..."):
-            raw_data = fetch_all_products(max_pages=50)
-            df = products_to_df(raw_data)
-            save_processed_data(df, data_file)
-    else:
-        df = pd.read_csv(data_file)
+            refresh_dataset(blocking=True)
+    elif refresh_due():
+        start_refresh()
+    
+    failure = last_fetch_failure()
+    if failure is not None and failure['time'] > Path(PROCESSED_DATA_PATH).stat().st_mtime:
+        st.warning(f"⚠️ Data refresh failed, showing the previous dataset: {failure['error']}")
     
-    return df
+    # Every worker maps the same segment; only a pointer read per rerun, and
+    # each rerun gets a copy-on-write handle rather than a copy of the data.
+    # The version is the one attached; per-version caches must use it, not
+    # re-read the pointer, which another process may swap mid-rerun
+    df, version = attach_dataset()
+    return session_view(df), version
+
+@st.cache_resource
+def get_connection(db_mtime: float):
+    """Open a database connection, reopened whenever the database is rebuilt"""
+    return connect(DATABASE_PATH)
+
+@st.cache_resource
+def get_nutrient_index(version: str, _df: pd.DataFrame) -> NutrientIndex:
+    """Build the nutrient similarity index once per dataset version"""
+    return NutrientIndex(_df)
+
+@st.cache_resource
+def get_dataset_stats(version: str, _df: pd.DataFrame) -> IncrementalStats:
+    """Statistics of the whole dataset, from the stored sidecar when it describes the published data"""
+    stats = read_stats(PROCESSED_DATA_PATH)
+    if stats is None or not stats.describes(_df):
+        stats = IncrementalStats.from_frame(_df)
+    return stats
+
+@st.cache_resource
+def get_tag_incidence(version: str, _df: pd.DataFrame) -> TagIncidence:
+    """Build the product x tag incidence matrix once per dataset version"""
+    return TagIncidence.from_frame(_df)
+
+@st.cache_resource
+def get_filter_options(version: str, _df: pd.DataFrame) -> Dict:
+    """Brands, categories and score bounds offered by the sidebar, once per dataset version"""
+    return {
+        'brands': sorted(_df['brands'].dropna().unique()),
+        'categories': sorted(_df['categories'].dropna().unique()),
+        'min_score': float(_df['nutrient_score'].min()),
+        'max_score': float(_df['nutrient_score'].max()),
+    }
+
+@st.cache_resource
+def get_image_urls(version: str, _df: pd.DataFrame) -> pd.Series:
+    """Image URL of every product by barcode, once per dataset version"""
+    return _df.drop_duplicates('code').set_index('code')['image_url']
+
+# Thumbnails are data URIs from the local cache; browsers never hit the image CDN
+THUMBNAIL_COLUMN = {'image': st.column_config.ImageColumn("", width="small")}
+
+def with_thumbnails(table: pd.DataFrame, urls: pd.Series, wait_budget: Dict[str, float]) -> pd.DataFrame:
+    """
+    Put the cached thumbnail of each row's image URL in front of a table, fetching missing ones.
+
+    The tables of a rerun share one wait budget: each waits at most what the earlier ones left.
+    """
+    start = time.monotonic()
+    images = get_thumbnail_cache().thumbnails(urls.tolist(), wait_seconds=wait_budget['seconds'])
+    wait_budget['seconds'] = max(0.0, wait_budget['seconds'] - (time.monotonic() - start))
+    return pd.concat([pd.DataFrame({'image': images}, index=table.index), table], axis=1)
+
+def memoized(func, *args, dataset: str, **kwargs):
+    """Run an analysis through the disk memo shared by all workers, keyed by the attached dataset version"""
+    return get_memo().call(func, *args, dataset=dataset, **kwargs)
+
+def admin_session() -> bool:
+    """Whether this session opened the dashboard with ?admin=<FOOD_DASHBOARD_ADMIN_TOKEN>"""
+    if 'admin' not in st.session_state:
+        st.session_state['admin'] = bool(PROFILE_ADMIN_TOKEN) and st.query_params.get('admin') == PROFILE_ADMIN_TOKEN
+    return st.session_state['admin']
+
+def start_profiling(reruns: int) -> None:
+    """Profile the next reruns of this session into a new profile"""
+    st.session_state['profile_reruns'] = reruns
+    st.session_state['profile'] = Profile()
+    st.session_state['profile_name'] = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+@contextmanager
+def rerun_profiler():
+    """Sample this rerun of main while the session has profiled reruns left"""
+    if 'profile_reruns' not in st.session_state:
+        start_profiling(PROFILE_RERUNS)
+    # ?profile=N (admin sessions only) profiles the next N reruns
+    requested = st.query_params.get('profile')
+    if requested is not None:
+        del st.query_params['profile']
+        if admin_session() and requested.isdigit():
+            start_profiling(int(requested))
+    
+    if st.session_state['profile_reruns'] <= 0:
+        yield
+        return
+    profile = st.session_state['profile']
+    try:
+        with profile.sampling():
+            yield
+    finally:
+        st.session_state['profile_reruns'] -= 1
+        # Saved after every rerun, so a partial profile can be browsed already
+        profile.save(st.session_state['profile_name'])
+
+def create_profiler_panel() -> None:
+    """Hidden admin panel to start profiling and browse the saved profiles"""
+    st.markdown("""
+    <div class="section-header">
+        <span class="section-icon">🛠️</span>
+        <span class="section-title">Profiler</span>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        reruns = st.number_input("Reruns to profile:", min_value=1, max_value=50, value=5)
+        if st.button("▶️ Profile next reruns"):
+            start_profiling(int(reruns))
+        if st.session_state.get('profile_reruns', 0) > 0:
+            st.caption(f"Profiling: {st.session_state['profile_reruns']} reruns left")
+    
+    profiles = list_profiles(PROFILE_DIR)
+    with col2:
+        st.dataframe(profiles, use_container_width=True, hide_index=True, height=200)
+    if profiles.empty:
+        st.info("No profiles yet.")
+        return
+    
+    name = st.selectbox("Profile:", profiles['name'])
+    profile = Profile.load(name, PROFILE_DIR)
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.plotly_chart(plot_bar(profile.attribution(), x='group', y='seconds', title="Time by Source"),
+                        use_container_width=True)
+    with col2:
+        st.dataframe(profile.top_functions(), use_container_width=True, hide_index=True, height=450)
+    st.plotly_chart(plot_flame_graph(profile.flame_frame(), title="Flame Graph (click a frame to zoom)"),
+                    use_container_width=True)
+    st.download_button(
+        "📥 Download collapsed stacks (flamegraph.pl, speedscope)",
+        profile.folded().encode('utf-8'),
+        f"{name}.folded",
+        "text/plain"
+    )
+
+def create_cache_panel() -> None:
+    """Hidden admin panel with the memo hit rates per filter state and the last warm-up"""
+    st.markdown("### Analysis Cache")
+    log = get_access_log()
+    totals = log.totals()
+    report = read_warmup_report()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Logged Views", f"{totals['views']:,}")
+    col2.metric("Memo Hit Rate", f"{totals['hit_rate']:.1%}")
+    col3.metric("Memo Size", f"{get_memo().stats()['bytes'] / 2**20:.1f} MiB")
+    if report:
+        col4.metric("Last Warm-up", f"{report['warmed']} states", f"{report['seconds']:.0f} s", delta_color="off")
+        st.caption(
+            f"Warm-up of dataset {report['version']} finished {report['finished']}: {report['computed']} results "
+            f"computed, {report['cached']} already cached, {report['bytes'] / 2**20:.1f} MiB added"
+            + (f", stopped by the {report['stopped']} budget" if report['stopped'] else "")
+        )
+    st.dataframe(log.hit_rates(), use_container_width=True, hide_index=True, height=300)
+    if st.button("🔥 Warm the cache now"):
+        start_warmup()
+
+@st.cache_data
+def get_category_trend(nutrient: str, latest_version: int) -> pd.DataFrame:
+    """Average of a nutrient per category across snapshot versions"""
+    return group_mean_trend(nutrient, 'categories')
 
 def create_metric_card(title: str, value: str, icon: str, delta: Optional[str] = None) -> None:
     """Create a professional metric card"""
@@ -326,37 +516,43 @@ def create_header() -> None:
     </div>
     """, unsafe_allow_html=True)
 
-def create_sidebar(df: pd.DataFrame) -> Tuple[List[str], List[str], Tuple[float, float]]:
+def create_sidebar(df: pd.DataFrame, version: str) -> Tuple[str, List[str], List[str], Tuple[float, float], bool]:
     """Create sidebar with filters and branding"""
     
     # Sidebar logo
     st.sidebar.markdown('<div class="sidebar-logo">🍽️</div>', unsafe_allow_html=True)
     st.sidebar.markdown("### Filters & Controls")
     
+    options = get_filter_options(version, df)
+    
+    # Full-text search
+    search_text = st.sidebar.text_input(
+        "🔎 Search products",
+        placeholder="e.g. maggi masala, sucre, चीनी",
+        help="Searches product names, brands and ingredients"
+    )
+    
     # Brand filter
     with st.sidebar.expander("🏷️ Brand Selection", expanded=True):
-        brands = sorted(df['brands'].dropna().unique())
         selected_brands = st.multiselect(
             "Choose brands to analyze:",
-            brands,
+            options['brands'],
             default=[],
             help="Select specific brands or leave empty for all brands"
         )
     
     # Category filter
     with st.sidebar.expander("📊 Category Selection", expanded=True):
-        categories = sorted(df['categories'].dropna().unique())
         selected_categories = st.multiselect(
             "Choose categories to analyze:",
-            categories,
+            options['categories'],
             default=[],
             help="Select specific categories or leave empty for all categories"
         )
     
     # Nutrient score filter
     with st.sidebar.expander("🎯 Nutrient Score Range", expanded=True):
-        min_score = float(df['nutrient_score'].min())
-        max_score = float(df['nutrient_score'].max())
+        min_score, max_score = options['min_score'], options['max_score']
         score_range = st.slider(
             "Select nutrient score range:",
             min_score,
@@ -365,6 +561,13 @@ def create_sidebar(df: pd.DataFrame) -> Tuple[List[str], List[str], Tuple[float,
             help="Filter products by their nutrient score"
         )
     
+    # Near-duplicate listings
+    collapse_duplicates = st.sidebar.checkbox(
+        "🧬 Collapse near-duplicates",
+        value=False,
+        help="Keep one product per cluster of near-identical listings under different barcodes"
+    )
+    
     # Reset filters button
     if st.sidebar.button("🔄 Reset All Filters"):
         st.experimental_rerun()
@@ -375,7 +578,7 @@ def create_sidebar(df: pd.DataFrame) -> Tuple[List[str], List[str], Tuple[float,
         st.text_area("Comments & suggestions:", placeholder="Help us improve...")
         st.button("Submit Feedback")
     
-    return selected_brands, selected_categories, score_range
+    return search_text, selected_brands, selected_categories, score_range, collapse_duplicates
 
 def create_tip_banner(df: pd.DataFrame) -> None:
     """Create a tip banner with actionable insights"""
@@ -404,7 +607,7 @@ def main():
     
     # Load data
     try:
-        df = load_data()
+        df, version = load_data()
         if df.empty:
             st.error("❌ No data available. Please check your internet connection and try again.")
             st.stop()
@@ -416,17 +619,35 @@ def main():
     create_header()
     
     # Create sidebar filters
-    selected_brands, selected_categories, score_range = create_sidebar(df)
+    search_text, selected_brands, selected_categories, score_range, collapse_duplicates = create_sidebar(df, version)
+    memo_calls = get_memo().thread_counts()
+    duplicates = memoized(near_duplicate_clusters, df, dataset=version)
+    image_urls = get_image_urls(version, df)
+    # Seconds this rerun may still wait for thumbnails, shared by its tables
+    thumbnail_wait = {'seconds': THUMBNAIL_WAIT}
     
     # Apply filters
-    mask = pd.Series(True, index=df.index)
-    if selected_brands:
-        mask &= df['brands'].isin(selected_brands)
-    if selected_categories:
-        mask &= df['categories'].isin(selected_categories)
-    mask &= df['nutrient_score'].between(*score_range)
+    mask = filter_mask(df, selected_brands, selected_categories, score_range,
+                       duplicates if collapse_duplicates else None)
+    if search_text.strip():
+        conn = get_connection(Path(DATABASE_PATH).stat().st_mtime)
+        # Filter on every match; only the table below is limited to the best ones
+        mask &= df['code'].isin(search_codes(conn, search_text))
+        search_results = search_products(conn, search_text, limit=500)
+        with st.expander(f"🔎 {len(search_results)} best matches for \"{search_text.strip()}\"", expanded=True):
+            images = image_urls.reindex(search_results['code'])
+            st.dataframe(
+                with_thumbnails(search_results.drop(columns=['rank']), images, thumbnail_wait),
+                use_container_width=True,
+                hide_index=True,
+                height=250,
+                column_config=THUMBNAIL_COLUMN
+            )
     
     filtered_df = df[mask]
+    if filtered_df.empty:
+        st.warning("⚠️ No products match the current search and filters.")
+        st.stop()
     
     # Display tip banner
     create_tip_banner(filtered_df)
@@ -435,8 +656,11 @@ def main():
     st.markdown("## 📊 Key Performance Indicators")
     st.markdown("---")
 
+    # Without filters the maintained dataset statistics answer directly
+    dataset_stats = get_dataset_stats(version, df) if len(filtered_df) == len(df) else None
+
     # Calculate stats
-    stats = get_summary_stats(filtered_df)
+    stats = dataset_stats.summary_stats() if dataset_stats else memoized(get_summary_stats, filtered_df, dataset=version)
 
     # Create metrics row
     col1, col2, col3, col4 = st.columns(4)
@@ -520,28 +744,14 @@ def main():
 
     with col1:
         # Get top brands data
-        top_brands_df = top_brands(filtered_df).head(15)
+        top_brands_df = memoized(top_brands, filtered_df, dataset=version).head(15)
         
         # Debug print
         st.write("Debug - DataFrame columns:", top_brands_df.columns.tolist())
         st.write("Debug - DataFrame head:", top_brands_df.head())
         
         # Create bar chart
-        brand_fig = px.bar(
-            data_frame=top_brands_df,
-            x='product_count',
-            y='brand',
-            orientation='h',
-            title="Top 15 Brands by Product Count",
-            color='product_count',
-            color_continuous_scale='viridis'
-        )
-        brand_fig.update_layout(
-            height=500,
-            margin=dict(l=20, r=20, t=40, b=20),
-            yaxis={'categoryorder': 'total ascending'}
-        )
-        st.plotly_chart(brand_fig, use_container_width=True)
+        st.plotly_chart(memoized(brand_chart, filtered_df, dataset=version), use_container_width=True)
     
     with col2:
         st.download_button(
@@ -557,6 +767,13 @@ def main():
         st.metric("Top Brand Share", f"{(top_brands_df.iloc[0]['product_count'] / len(filtered_df) * 100):.1f}%")
         st.metric("Top 5 Brands Share", f"{(top_brands_df.head(5)['product_count'].sum() / len(filtered_df) * 100):.1f}%")
     
+    # Fuzzy brand merges made by the ETL, least certain first
+    brand_review = BrandMap.load(BRAND_ALIASES_PATH).review()
+    if len(brand_review):
+        with st.expander(f"🔀 Merged Brand Spellings ({len(brand_review):,} to review)"):
+            st.caption(f"Edit {BRAND_ALIASES_PATH} and set a row's source to 'manual' to override a match")
+            st.dataframe(brand_review, use_container_width=True, hide_index=True)
+    
     # Nutrient Analysis
     st.markdown("""
     <div class="section-header">
@@ -618,19 +835,52 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    cat_analysis = category_analysis(filtered_df)
+    st.plotly_chart(memoized(category_chart, filtered_df, dataset=version), use_container_width=True)
     
-    scatter_fig = px.scatter(
-        cat_analysis,
-        x='product_count',
-        y='nutrient_score',
-        size='product_count',
-        color='categories',
-        title="Category Analysis: Product Count vs Average Nutrient Score",
-        hover_data=['categories', 'product_count', 'nutrient_score']
-    )
-    scatter_fig.update_layout(height=500)
-    st.plotly_chart(scatter_fig, use_container_width=True)
+    # Category hierarchy from the taxonomy; click a segment to drill down
+    st.markdown("### Category Hierarchy")
+    hierarchy = memoized(category_sunburst, filtered_df, dataset=version)
+    branches = hierarchy[hierarchy['id'].isin(hierarchy['parent'])]
+    labels = dict(zip(hierarchy['id'], hierarchy['label']))
+    col1, col2 = st.columns([1, 3])
+    
+    with col1:
+        root = st.selectbox(
+            "Start from:",
+            [None] + branches['id'].tolist(),
+            format_func=lambda node: "All categories" if node is None else labels[node]
+        )
+        unclassified = hierarchy.loc[hierarchy['id'] == UNCLASSIFIED, 'products'].sum()
+        st.caption(f"{unclassified:,} products have no recognized category")
+    
+    with col2:
+        st.plotly_chart(memoized(hierarchy_chart, filtered_df, root, dataset=version), use_container_width=True)
+    
+    # Nutrient trends across recorded refreshes
+    versions = list_versions()
+    if len(versions) > 1:
+        st.markdown("### Category Trends")
+        col1, col2 = st.columns([1, 3])
+        
+        with col1:
+            nutrient = st.selectbox(
+                "Nutrient:",
+                NUTRIENT_COLUMNS,
+                index=NUTRIENT_COLUMNS.index('sugars_100g')
+            )
+        
+        with col2:
+            trend = get_category_trend(nutrient, int(versions['version'].iloc[-1]))
+            top_categories = filtered_df['categories'].value_counts().head(5).index
+            trend = trend.reindex(columns=top_categories)
+            trend.index = versions.set_index('version').loc[trend.index, 'created']
+            trend_fig = px.line(
+                trend,
+                markers=True,
+                title=f"Average {nutrient} by Category Across Refreshes",
+                labels={'created': 'Refresh', 'value': nutrient, 'categories': 'Category'}
+            )
+            st.plotly_chart(trend_fig, use_container_width=True)
     
     # Healthiest Products
     st.markdown("""
@@ -643,10 +893,15 @@ def main():
     col1, col2 = st.columns([3, 1])
 
     with col1:
-        healthiest = get_healthiest_products(filtered_df)
+        healthiest = memoized(get_healthiest_products, filtered_df, dataset=version)
+        # Queue the images of the next best products too, so narrowing the filters finds them cached
+        get_thumbnail_cache().prefetch(filtered_df['image_url'].loc[
+            filtered_df['nutrient_score'].nlargest(THUMBNAIL_PREFETCH).index
+        ])
         
         # Format the DataFrame without background gradient
-        formatted_df = healthiest.style.format({
+        images = filtered_df['image_url'].reindex(healthiest.index)
+        formatted_df = with_thumbnails(healthiest, images, thumbnail_wait).style.format({
             'nutrient_score': '{:.1f}',
             'sugars_100g': '{:.1f}g',
             'fat_100g': '{:.1f}g',
@@ -658,7 +913,8 @@ def main():
             formatted_df,
             use_container_width=True,
             hide_index=True,
-            height=400
+            height=400,
+            column_config=THUMBNAIL_COLUMN
         )
 
     with col2:
@@ -675,6 +931,69 @@ def main():
         st.metric("Avg Sugar", f"{healthiest['sugars_100g'].mean():.1f}g")
         st.metric("Avg Salt", f"{healthiest['salt_100g'].mean():.1f}g")
     
+    # Scoring Profiles
+    st.markdown("""
+    <div class="section-header">
+        <span class="section-icon">⚖️</span>
+        <span class="section-title">Scoring Profiles</span>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2 = st.columns([3, 2])
+    
+    with col1:
+        st.dataframe(memoized(compare_scoring_profiles, filtered_df, dataset=version), use_container_width=True, hide_index=True)
+    
+    with col2:
+        agreement = memoized(get_grade_agreement, filtered_df, dataset=version)
+        total = agreement.to_numpy().sum()
+        if total:
+            agreement_fig = px.imshow(
+                agreement,
+                text_auto=True,
+                color_continuous_scale='Blues',
+                labels={'x': 'OpenFoodFacts grade', 'y': 'Computed Nutri-Score', 'color': 'Products'},
+                title=f"Nutri-Score agreement: {np.trace(agreement.to_numpy()) / total * 100:.0f}%"
+            )
+            st.plotly_chart(agreement_fig, use_container_width=True)
+        else:
+            st.info("No products with both a computed and an official Nutri-Score.")
+    
+    # Healthier Alternatives
+    st.markdown("""
+    <div class="section-header">
+        <span class="section-icon">🔄</span>
+        <span class="section-title">Healthier Alternatives</span>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2 = st.columns([1, 3])
+    
+    with col1:
+        barcode = st.text_input(
+            "Product barcode:",
+            placeholder="e.g. 3017620425035",
+            help="Find similar products with a better nutrient score"
+        )
+        same_category = st.checkbox("Same category only", value=True)
+    
+    with col2:
+        if barcode.strip():
+            index = get_nutrient_index(version, df)
+            try:
+                alternatives = index.healthier_alternatives(barcode.strip(), k=10, same_category=same_category)
+            except KeyError:
+                st.warning(f"No product with barcode {barcode.strip()} in the dataset.")
+            else:
+                if alternatives.empty:
+                    st.info("No similar product scores higher than this one.")
+                else:
+                    st.dataframe(with_thumbnails(alternatives, image_urls.reindex(alternatives['code']), thumbnail_wait),
+                                 use_container_width=True,
+                                 hide_index=True, height=400, column_config=THUMBNAIL_COLUMN)
+        else:
+            st.info("Enter a barcode to see nutritionally similar products with a higher score.")
+    
     # Additives Analysis
     st.markdown("""
     <div class="section-header">
@@ -684,28 +1003,54 @@ def main():
     """, unsafe_allow_html=True)
     
     try:
-        additives_df = get_additive_prevalence(filtered_df)
+        additives_df = memoized(get_additive_prevalence, filtered_df, dataset=version)
         
         if not additives_df.empty:
-            additive_fig = px.bar(
-                additives_df.head(15),
-                x='percentage',
-                y='additive',
-                orientation='h',
-                title="Most Common Additives (Top 15)",
-                color='percentage',
-                color_continuous_scale='Reds'
-            )
-            additive_fig.update_layout(
-                height=500,
-                yaxis={'categoryorder': 'total ascending'}
-            )
-            st.plotly_chart(additive_fig, use_container_width=True)
+            st.plotly_chart(memoized(additive_chart, filtered_df, dataset=version), use_container_width=True)
         else:
             st.info("No additives data available for the selected filters.")
     except Exception as e:
         st.warning(f"Additives analysis unavailable: {str(e)}")
     
+    st.markdown("### Additive & Allergen Co-occurrence")
+    try:
+        incidence = get_tag_incidence(version, df)
+        measure = st.radio(
+            "Measure:", ['lift', 'count', 'jaccard'], horizontal=True,
+            help="Lift: how many times more often the pair appears than if the tags were independent. "
+                 "Jaccard: share of products carrying either tag that carry both."
+        )
+        additive_pairs = memoized(tag_cooccurrence, filtered_df, 'additive', 'additive', incidence=incidence, dataset=version)
+        allergen_pairs = memoized(tag_cooccurrence, filtered_df, 'additive', 'allergen', incidence=incidence, dataset=version)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if not additive_pairs.empty:
+                st.plotly_chart(plot_heatmap(
+                    cooccurrence_matrix(additive_pairs, COOCCURRENCE_TOP_PAIRS, measure, symmetric=True),
+                    title=f"Additive Pairs (Top {COOCCURRENCE_TOP_PAIRS})",
+                    value=measure
+                ), use_container_width=True)
+            else:
+                st.info("No additive pairs are common enough in the selected products.")
+        with col2:
+            if not allergen_pairs.empty:
+                st.plotly_chart(plot_heatmap(
+                    cooccurrence_matrix(allergen_pairs, COOCCURRENCE_TOP_PAIRS, measure),
+                    title=f"Additives & Allergens (Top {COOCCURRENCE_TOP_PAIRS})",
+                    value=measure
+                ), use_container_width=True)
+            else:
+                st.info("No additive/allergen pairs are common enough in the selected products.")
+        
+        with st.expander("📋 All Pairs"):
+            st.dataframe(
+                pd.concat([additive_pairs, allergen_pairs]).sort_values('count', ascending=False),
+                use_container_width=True, hide_index=True
+            )
+    except Exception as e:
+        st.warning(f"Co-occurrence analysis unavailable: {str(e)}")
+    
     # Data Quality Dashboard
     st.markdown("""
     <div class="section-header">
@@ -714,9 +1059,11 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    quality_metrics = get_data_quality_metrics(filtered_df)
+    quality_metrics = (
+        dataset_stats.data_quality_metrics() if dataset_stats else memoized(get_data_quality_metrics, filtered_df, dataset=version)
+    )
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.metric(
@@ -736,6 +1083,40 @@ def main():
             f"{quality_metrics['duplicate_products']:,}"
         )
     
+    # Near-duplicates listed under different barcodes, among the filtered products
+    shown_duplicates = duplicates[duplicates.index.isin(filtered_df.index)]
+    shown_duplicates = shown_duplicates[shown_duplicates['cluster'].duplicated(keep=False)]
+    with col4:
+        st.metric(
+            "🧬 Near-Duplicate Listings",
+            f"{(~shown_duplicates['representative']).sum():,}",
+            help="Products that look like another product listed under a different barcode"
+        )
+    
+    if not shown_duplicates.empty:
+        with st.expander(f"🧬 {shown_duplicates['cluster'].nunique():,} near-duplicate clusters", expanded=False):
+            st.dataframe(
+                duplicate_report(filtered_df, shown_duplicates),
+                use_container_width=True,
+                hide_index=True,
+                height=300
+            )
+    
+    # Rows the last refresh quarantined for failing validation
+    quarantined = read_quarantine(QUARANTINE_PATH)
+    if not quarantined.empty:
+        with st.expander(f"🚫 {len(quarantined):,} products quarantined by validation", expanded=False):
+            violations = violation_counts(quarantined)
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                st.dataframe(violations, use_container_width=True, hide_index=True)
+            with col2:
+                st.plotly_chart(plot_bar(
+                    violations[violations['violations'] > 0], x='rule', y='violations',
+                    title="Violations by Rule"
+                ), use_container_width=True)
+            st.dataframe(quarantined, use_container_width=True, hide_index=True, height=300)
+    
     # Missing values visualization
     missing_vals = pd.DataFrame([
         {'Field': k, 'Missing_Percentage': v}
@@ -768,7 +1149,8 @@ def main():
     with col1:
         st.download_button(
             "📊 Download Filtered Dataset",
-            filtered_df.to_csv(index=False).encode('utf-8'),
+            # Built on click only; the heavy text columns are read for the export alone
+            lambda: filtered_df.to_csv(index=False).encode('utf-8'),
             "openfoodfacts_filtered.csv",
             "text/csv",
             key='download-main'
@@ -792,6 +1174,21 @@ def main():
             key='download-quality'
         )
     
+    # Anonymous view count of the filter state, which the warm-up job replays after a refresh;
+    # reruns that keep the session's state (widget clicks, downloads) are not new views
+    if not search_text.strip():
+        options = get_filter_options(version, df)
+        state = normalize_state(selected_brands, selected_categories, score_range, collapse_duplicates,
+                                score_bounds=(options['min_score'], options['max_score']))
+        if st.session_state.get('logged_state') != state_key(state):
+            st.session_state['logged_state'] = state_key(state)
+            hits, misses = (now - before for now, before in zip(get_memo().thread_counts(), memo_calls))
+            get_access_log().record(state, hits, misses)
+    
+    if admin_session():
+        create_profiler_panel()
+        create_cache_panel()
+    
     # Footer
     st.markdown("---")
     st.markdown("""
@@ -802,4 +1199,5 @@ def main():
     """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with rerun_profiler():
+        main()
\ No newline at end of file
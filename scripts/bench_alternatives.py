@@ -0,0 +1,50 @@
+"""
+Benchmark healthier-alternative queries: NutrientIndex vs brute force.
+
+Usage:
+    python scripts/bench_alternatives.py --rows 1000000 --queries 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import synthetic_dataset
+from src.similarity import NutrientIndex, brute_force_alternatives
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    df = synthetic_dataset(args.rows)
+    start = time.perf_counter()
+    index = NutrientIndex(df)
+    print(f"rows={len(df):,} index build: {time.perf_counter() - start:.2f}s")
+
+    codes = df['code'].sample(args.queries, random_state=1).tolist()
+    for same_category in (False, True):
+        index_times, brute_times, mismatches = [], [], 0
+        for code in codes:
+            start = time.perf_counter()
+            fast = index.healthier_alternatives(code, args.k, same_category)
+            index_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            slow = brute_force_alternatives(df, code, args.k, same_category)
+            brute_times.append(time.perf_counter() - start)
+
+            mismatches += fast['code'].tolist() != slow['code'].tolist()
+
+        print(
+            f"same_category={same_category!s:5}  "
+            f"index p50={np.median(index_times) * 1000:7.2f}ms p95={np.percentile(index_times, 95) * 1000:7.2f}ms  "
+            f"brute p50={np.median(brute_times) * 1000:7.2f}ms p95={np.percentile(brute_times, 95) * 1000:7.2f}ms  "
+            f"mismatches={mismatches}"
+        )
+
+if __name__ == '__main__':
+    main()
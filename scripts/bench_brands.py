@@ -0,0 +1,81 @@
+"""
+Benchmark brand canonicalization (src/brands.py) as the number of brands grows.
+
+Synthetic brands are built from random syllables, and every brand gets a few
+variants: different case, an accent, a legal suffix, a dropped, doubled or
+swapped letter. For each size the script reports the time to build the alias
+map, the time to apply it, and how many variants reach their own brand
+(recall) or another one (wrong merges).
+
+Usage:
+    python scripts/bench_brands.py --sizes 10000 100000 300000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import synthetic  # noqa: F401  (puts the repository root on sys.path)
+from src.brands import BrandMap, brand_keys
+
+CONSONANTS = list('bcdfghjklmnprstvwyz') + ['sh', 'ch', 'th', 'kr', 'pr', 'gr', 'br']
+VOWELS = ['a', 'e', 'i', 'o', 'u', 'aa', 'ee', 'ai', 'ou']
+SYLLABLES = np.array([c + v for c in CONSONANTS for v in VOWELS])
+
+def _variant(brand: str, rng: np.random.Generator) -> str:
+    """One misspelling or restyling of a brand."""
+    kind = rng.integers(0, 6)
+    if kind == 0:
+        return brand.upper()
+    if kind == 1:
+        return brand.replace('e', 'é', 1)
+    if kind == 2:
+        return f"{brand} Pvt Ltd"
+    position = int(rng.integers(1, len(brand) - 1))
+    if kind == 3:
+        return brand[:position] + brand[position + 1:]
+    if kind == 4:
+        return brand[:position] + brand[position] + brand[position:]
+    return brand[:position - 1] + brand[position] + brand[position - 1] + brand[position + 1:]
+
+def synthetic_brands(n: int, variants: int = 2, seed: int = 0) -> pd.DataFrame:
+    """n distinct brands plus their variants, with the brand each one belongs to."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(3, 6, n * 2)
+    names = pd.unique(pd.Series([
+        ''.join(SYLLABLES[rng.integers(0, len(SYLLABLES), k)]).capitalize() for k in lengths
+    ]))[:n]
+    rows = [(name, name) for name in names]
+    rows += [(_variant(name, rng), name) for name in names for _ in range(variants)]
+    return pd.DataFrame(rows, columns=['brand', 'truth'])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 300000])
+    args = parser.parse_args()
+
+    print(f"{'brands':>8} {'strings':>8} {'build s':>8} {'apply s':>8} {'recall':>7} {'wrong':>7}")
+    for n in args.sizes:
+        data = synthetic_brands(n)
+        brand_map = BrandMap()
+        t = time.perf_counter()
+        brand_map.update(data['brand'])
+        build = time.perf_counter() - t
+        t = time.perf_counter()
+        canonical = brand_map.apply(data['brand'])
+        apply = time.perf_counter() - t
+
+        # A variant is right when it lands on the canonical brand of its true brand
+        truth = brand_map.apply(data['truth'])
+        right = brand_keys(canonical).to_numpy() == brand_keys(truth).to_numpy()
+        variants = data['brand'].to_numpy() != data['truth'].to_numpy()
+        # Wrong merges: distinct true brands sharing one canonical brand
+        merged = pd.DataFrame({'canonical': truth, 'truth': data['truth']}).drop_duplicates()
+        wrong = merged['canonical'].duplicated().sum() / n
+        print(f"{n:>8} {len(data):>8} {build:>8.2f} {apply:>8.2f} "
+              f"{right[variants].mean():>7.3f} {wrong:>7.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark near-duplicate detection (src/dedup.py) as the catalogue grows.
+
+Synthetic products are resampled from the shipped data, and each gets a few
+random words appended to its name, so every resampled row is a near (not
+exact) duplicate of its source. For each size the script reports the time,
+the number of LSH candidate pairs and the clusters found. On a small sample
+it also compares the clusters with an exhaustive all-pairs Jaccard
+comparison of the same token sets.
+
+Usage:
+    python scripts/bench_dedup.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic import synthetic_dataset
+from src.config import DEDUP_COLUMNS, DEDUP_THRESHOLD
+from src.dedup import _connected_components, candidate_pairs, minhash_signatures, near_duplicate_clusters, normalize_text
+
+WORDS = np.array(['classic', 'family', 'pack', 'mini', 'value', 'combo', 'fresh', 'special', 'gold',
+                  'lite', 'extra', 'new', 'party', 'jumbo', 'pouch', 'jar', 'box', 'refill'])
+
+def noisy_dataset(n: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic products whose names carry two random extra words."""
+    rng = np.random.default_rng(seed)
+    df = synthetic_dataset(n, seed)
+    extra = WORDS[rng.integers(0, len(WORDS), n)] + ' ' + WORDS[rng.integers(0, len(WORDS), n)]
+    df['product_name'] = df['product_name'].where(df['product_name'].isna(), df['product_name'] + ' ' + extra)
+    return df
+
+def exact_clusters(df: pd.DataFrame, threshold: float) -> np.ndarray:
+    """All-pairs Jaccard on the same token sets; quadratic, for small samples only."""
+    sets = [set() for _ in range(len(df))]
+    for salt, column in enumerate(DEDUP_COLUMNS):
+        for i, text in enumerate(normalize_text(df[column])):
+            sets[i].update(f"{salt}:{token}" for token in text.split())
+    named = normalize_text(df[DEDUP_COLUMNS[0]]).ne('').to_numpy()
+    pairs = [
+        (i, j) for i in range(len(df)) if named[i] for j in range(i + 1, len(df))
+        if named[j] and len(sets[i] & sets[j]) >= threshold * len(sets[i] | sets[j])
+    ]
+    return _connected_components(len(df), np.array(pairs, dtype=np.int64).reshape(-1, 2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--sample', type=int, default=1500, help="products compared exhaustively")
+    args = parser.parse_args()
+
+    sample = noisy_dataset(args.sample, seed=1)
+    t = time.perf_counter()
+    truth = exact_clusters(sample, DEDUP_THRESHOLD)
+    exhaustive = time.perf_counter() - t
+    t = time.perf_counter()
+    found = near_duplicate_clusters(sample)
+    lsh = time.perf_counter() - t
+    labels = np.arange(len(sample))
+    labels[sample.index.get_indexer(found.index)] = sample.index.get_indexer(found['cluster'])
+    true_pairs = pd.Series(truth).duplicated(keep=False).sum()
+    same = sum(
+        (labels[group] == labels[group[0]]).all()
+        for group in pd.Series(np.arange(len(truth))).groupby(truth).apply(np.array) if len(group) > 1
+    )
+    print(f"Sample of {args.sample}: {same}/{len(set(truth[pd.Series(truth).duplicated(keep=False)]))} exact clusters "
+          f"recovered whole ({true_pairs} products); LSH {lsh * 1000:.0f} ms vs all pairs {exhaustive * 1000:.0f} ms")
+
+    for n in args.sizes:
+        df = noisy_dataset(n)
+        t = time.perf_counter()
+        signatures = minhash_signatures(df)
+        signed = time.perf_counter() - t
+        pairs = candidate_pairs(signatures)
+        banded = time.perf_counter() - t - signed
+        clusters = near_duplicate_clusters(df)
+        total = time.perf_counter() - t
+        print(f"{n:>9,} products: signatures {signed:6.1f}s, LSH {banded:5.1f}s, "
+              f"{len(pairs):>11,} candidate pairs ({len(pairs) / n:.1f} per product), "
+              f"{clusters['cluster'].nunique():,} clusters; total with clustering {total:.1f}s")
+
+if __name__ == '__main__':
+    main()
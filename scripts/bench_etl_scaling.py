@@ -0,0 +1,52 @@
+"""
+Measure ETL scaling of products_to_df across worker counts.
+
+Every run is checked against the run with the fewest workers (the serial
+path when 1 is included).
+
+Usage:
+    python scripts/bench_etl_scaling.py --products 1000000 --workers 1 4 16 32
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from synthetic import synthetic_products
+from src.etl import products_to_df
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16, 32])
+    args = parser.parse_args()
+
+    products = synthetic_products(args.products)
+    print(f"products={len(products):,} cores={os.cpu_count()}")
+
+    baseline, baseline_time = None, None
+    for workers in sorted(args.workers):
+        start = time.perf_counter()
+        df = products_to_df(products, workers=workers, brand_aliases=None, quarantine=None)  # ETL transform only
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline, baseline_time = df, elapsed
+            identical = True
+        else:
+            try:
+                pd.testing.assert_frame_equal(baseline, df)
+                identical = True
+            except AssertionError:
+                identical = False
+
+        print(
+            f"workers={workers:3d}  {elapsed:8.2f}s  "
+            f"{len(products) / elapsed:10,.0f} products/s  "
+            f"speedup={baseline_time / elapsed:5.2f}x  identical={identical}"
+        )
+
+if __name__ == '__main__':
+    main()
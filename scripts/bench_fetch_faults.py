@@ -0,0 +1,77 @@
+"""
+Run a FetchJob against the fault-injecting stub server.
+
+The first run is cut short by allowing a single retry, so it fails part way
+through; the second run resumes from its checkpoint with retries enabled.
+The fetched catalogue is then compared with the one the stub serves, and
+per-page latency and error statistics are printed for both runs.
+
+Usage:
+    python scripts/bench_fetch_faults.py --products 20000 --error-rate 0.1 --throttle-rate 0.1
+"""
+
+import argparse
+import tempfile
+
+from stub_server import StubState, start_stub_server
+from synthetic import synthetic_products
+from src.config import PAGE_SIZE
+from src.data_fetch import AdaptiveRateLimiter, FetchError, FetchJob
+
+def run_job(base_url: str, checkpoint_dir: str, max_pages: int, max_retries: int, rate: float):
+    """Run one job; returns its products (None if it failed) and stats."""
+    job = FetchJob(
+        max_pages=max_pages,
+        checkpoint_dir=checkpoint_dir,
+        base_url=base_url,
+        max_retries=max_retries,
+        limiter=AdaptiveRateLimiter(rate=rate, max_rate=rate * 10, increase=rate / 4),
+        backoff_base=0.05,
+        backoff_cap=1.0,
+        seed=0
+    )
+    try:
+        products = job.run(progress=False)
+    except FetchError as e:
+        print(f"  job failed: {e}")
+        products = None
+    return products, job.stats
+
+def report(name: str, stats) -> None:
+    summary = stats.summary()
+    print(f"{name}:")
+    for key, value in summary.items():
+        if isinstance(value, float):
+            value = f"{value * 1000:.1f} ms"
+        print(f"  {key:<14} {value}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--error-rate', type=float, default=0.1)
+    parser.add_argument('--throttle-rate', type=float, default=0.1)
+    parser.add_argument('--truncate-rate', type=float, default=0.05)
+    parser.add_argument('--rate', type=float, default=20.0, help="initial requests per second")
+    args = parser.parse_args()
+
+    catalogue = synthetic_products(args.products)
+    state = StubState(catalogue, args.error_rate, args.throttle_rate, args.truncate_rate,
+                      retry_after=0.2, seed=1)
+    server = start_stub_server(state)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    max_pages = args.products // PAGE_SIZE + 2
+
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        products, stats = run_job(base_url, checkpoint_dir, max_pages, max_retries=1, rate=args.rate)
+        report("Run with one retry", stats)
+        products, stats = run_job(base_url, checkpoint_dir, max_pages, max_retries=8, rate=args.rate)
+        report("Resumed run", stats)
+
+    server.shutdown()
+    expected = [p['code'] for p in catalogue]
+    fetched = [p['code'] for p in products or []]
+    print(f"Stub responses: {state.counts}")
+    print(f"Catalogue complete and in order: {fetched == expected} ({len(fetched)}/{len(expected)} products)")
+
+if __name__ == '__main__':
+    main()
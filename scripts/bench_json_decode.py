@@ -0,0 +1,93 @@
+"""
+Benchmark decoding of a search response page.
+
+Compares the previous approach (decode the whole body, then keep
+REQUIRED_FIELDS) with the projected decoders in src/json_stream.py, on a
+synthetic page whose products carry hundreds of fields like the real API.
+
+Usage:
+    python scripts/bench_json_decode.py --products 1000 --extra-fields 300
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from synthetic import ROOT  # noqa: F401  (puts the repo root on sys.path)
+from src.config import NUTRIENT_COLUMNS, REQUIRED_FIELDS
+from src.json_stream import decode_products, orjson, project_product
+
+CHUNK_SIZE = 64 * 1024
+
+def synthetic_page(n_products: int, extra_fields: int, seed: int = 0) -> bytes:
+    """Build a search response body with realistic per-product bloat."""
+    rng = random.Random(seed)
+    products = []
+    for i in range(n_products):
+        product = {
+            'code': str(8900000000000 + i),
+            'product_name': f"Product {i}",
+            'brands': rng.choice(['Amul', 'Britannia', 'Parle', 'Nestlé']),
+            'categories': 'Snacks, Biscuits',
+            'additives_tags': ['en:e322', 'en:e330'][: rng.randint(0, 2)],
+            'allergens_tags': ['en:milk'],
+            'ingredients_text': 'Wheat flour, sugar, palm oil, salt, ' * 5,
+            'nutrition_grades': rng.choice('abcde'),
+            'image_url': f"https://images.openfoodfacts.org/images/products/{i}/front_en.400.jpg",
+            'nutriments': {
+                **{key: round(rng.random() * 50, 2) for key in NUTRIENT_COLUMNS},
+                **{f"nutrient_{k}_{suffix}": rng.random() for k in range(40) for suffix in ('100g', 'serving', 'unit')},
+            },
+            'ingredients': [{'id': f"en:ingredient-{k}", 'percent_estimate': rng.random()} for k in range(15)],
+        }
+        for k in range(extra_fields):
+            product[f"field_{k}"] = f"value {k} " * rng.randint(1, 4) if k % 3 else [k, str(k)]
+        products.append(product)
+    return json.dumps({'count': n_products, 'page': 1, 'page_size': n_products,
+                       'products': products, 'skip': 0}).encode('utf-8')
+
+def baseline(body: bytes) -> list:
+    """Decode everything, then project, as fetch_products/fetch_all_products used to."""
+    products = json.loads(body).get('products', [])
+    return [{field: product.get(field, None) for field in REQUIRED_FIELDS} for product in products]
+
+def measure(name: str, decode, body: bytes) -> None:
+    """Print wall time and peak traced allocation of one decoding strategy."""
+    decode(body)  # warm-up
+    start = time.perf_counter()
+    decode(body)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    decode(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:28s} {elapsed * 1000:8.1f} ms   peak {peak / 2**20:8.1f} MiB")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--extra-fields', type=int, default=300)
+    args = parser.parse_args()
+
+    body = synthetic_page(args.products, args.extra_fields)
+    print(f"page body: {len(body) / 2**20:.1f} MiB, {args.products} products")
+
+    def chunks(data: bytes):
+        return (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+
+    measure('json.loads + project', baseline, body)
+    measure('stream + project', lambda b: decode_products(chunks(b), REQUIRED_FIELDS, NUTRIENT_COLUMNS, 'stream'), body)
+    if orjson is not None:
+        measure('orjson + project', lambda b: decode_products(chunks(b), REQUIRED_FIELDS, NUTRIENT_COLUMNS, 'orjson'), body)
+
+    # Server-side projection (the `fields` request parameter) shrinks the body itself
+    projected = json.dumps({'products': [project_product(p, REQUIRED_FIELDS, NUTRIENT_COLUMNS)
+                                         for p in json.loads(body)['products']]}).encode('utf-8')
+    print(f"projected body: {len(projected) / 2**20:.1f} MiB")
+    measure('projected body, stream', lambda b: decode_products(chunks(b), REQUIRED_FIELDS, NUTRIENT_COLUMNS, 'stream'), projected)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark the per-process memory of the default dashboard view with the
+heavy text columns published eagerly or lazily.
+
+A synthetic dataset is published twice: once with every column in the
+mapped segment, once with ``LAZY_COLUMNS`` in compressed sidecars (see
+``src/lazy_columns.py``). For each, a fresh process attaches the segment and
+does what the reruns of a few sessions do with the dataset. It computes the
+stats hashes and the barcode to image URL map once, then for the unfiltered
+view and each of the --filters largest categories it filters the frame,
+computes the summary and data-quality metrics and reads the image URLs of
+the top 50 products, keeping each filtered frame as a session would. It
+then exports one filtered frame to CSV, the one step that needs every value.
+The script reports the resident memory each process added (anonymous and
+file-backed), the time of both steps and the size of the published files.
+
+The synthetic rows are resampled from the shipped data, so their text
+repeats more than real products do and the sidecars compress better than
+they would in production.
+
+Usage:
+    python scripts/bench_lazy_columns.py --rows 1000000 --filters 5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import synthetic_dataset
+from src.analysis import get_data_quality_metrics, get_summary_stats
+from src.config import LAZY_COLUMNS
+from src.incremental_stats import stats_hashes
+from src.shared_data import attach_dataset, publish_dataset, session_view
+from src.views import filter_mask
+
+def rss_mb() -> dict:
+    """Resident, anonymous and file-backed memory of this process, from /proc."""
+    with open('/proc/self/status') as f:
+        fields = dict(line.split(':', 1) for line in f)
+    return {name: int(fields[name].split()[0]) / 1024 for name in ('VmRSS', 'RssAnon', 'RssFile')}
+
+def session_views(root: str, filters: int) -> dict:
+    """Attach the segment and run the reruns, then an export; memory and time of each."""
+    before = rss_mb()
+    start = time.perf_counter()
+    df = session_view(attach_dataset(root)[0])
+    stats_hashes(df)
+    image_urls = df.drop_duplicates('code').set_index('code')['image_url']
+    sessions = []
+    for categories in [None] + [[c] for c in df['categories'].value_counts().index[:filters]]:
+        filtered = df[filter_mask(df, categories=categories)]
+        get_summary_stats(filtered)
+        get_data_quality_metrics(filtered)
+        filtered['image_url'].loc[filtered['nutrient_score'].nlargest(50).index].tolist()
+        image_urls.reindex(filtered['code'].head(10)).tolist()
+        sessions.append(filtered)
+    view_seconds = time.perf_counter() - start
+    after_view = rss_mb()
+
+    start = time.perf_counter()
+    sessions[-1].to_csv(index=False)
+    export_seconds = time.perf_counter() - start
+    after_export = rss_mb()
+    return {
+        'view_seconds': view_seconds,
+        'export_seconds': export_seconds,
+        'view': {k: after_view[k] - before[k] for k in before},
+        'export': {k: after_export[k] - before[k] for k in before},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Synthetic products")
+    parser.add_argument('--filters', type=int, default=5, help="Largest categories viewed after the unfiltered view")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(session_views(args.child, args.filters)))
+        return
+
+    df = synthetic_dataset(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"rows={args.rows:,} filters={args.filters} lazy columns={', '.join(LAZY_COLUMNS)}")
+        print(f"{'publish':<8} {'files MB':>9} {'view s':>7} {'RSS MB':>7} {'anon':>6} {'file':>6}"
+              f" {'export s':>9} {'RSS MB':>7}")
+        for name, lazy in (('eager', ()), ('lazy', LAZY_COLUMNS)):
+            root = Path(tmp) / name
+            publish_dataset(df, str(root), lazy_columns=lazy)
+            size = sum(p.stat().st_size for p in root.iterdir()) / 2**20
+            # A fresh process per layout, so neither run sees pages the other touched
+            output = subprocess.run([sys.executable, __file__, '--child', str(root), '--filters', str(args.filters)],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            view, export = result['view'], result['export']
+            print(f"{name:<8} {size:>9.1f} {result['view_seconds']:>7.2f} {view['VmRSS']:>7.0f}"
+                  f" {view['RssAnon']:>6.0f} {view['RssFile']:>6.0f}"
+                  f" {result['export_seconds']:>9.2f} {export['VmRSS']:>7.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark the batch report renderer (src/reports.py) across worker counts.
+
+A synthetic dataset is published to a temporary shared directory, with its
+brands split into --brands distinct names so the pack has thousands of
+pages, as a full Open Food Facts export would. The brand pack is rendered
+once per worker count and the throughput is reported; each worker attaches
+the mapped segment, so the resident memory per worker stays small whatever
+the dataset size.
+
+Usage:
+    python scripts/bench_reports.py --rows 200000 --brands 2000 --workers 1 2 4
+"""
+
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from synthetic import synthetic_dataset
+from src.reports import generate_reports
+from src.shared_data import publish_dataset
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--brands', type=int, default=2_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--limit', type=int, help="render only the largest brands")
+    args = parser.parse_args()
+
+    df = synthetic_dataset(args.rows)
+    rng = np.random.default_rng(0)
+    splits = -(-args.brands // df['brands'].nunique())
+    df['brands'] = df['brands'] + ' #' + rng.integers(0, splits, len(df)).astype(str)
+    with tempfile.TemporaryDirectory() as root:
+        publish_dataset(df, root)
+        print(f"rows={args.rows:,} brands={df['brands'].nunique():,} cpus={os.cpu_count()}")
+        print(f"{'workers':>7} {'reports':>8} {'seconds':>8} {'reports/s':>10}")
+        for workers in args.workers:
+            result = generate_reports('brand', os.path.join(root, f'pack-{workers}'), workers,
+                                      limit=args.limit, root=root)
+            print(f"{workers:>7} {result['reports']:>8} {result['seconds']:>8.1f} {result['reports_per_second']:>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark the per-rerun load cost and per-session memory of the dataset.
+
+Two ways of handing the dataset to each session are compared on a synthetic
+dataset:
+
+- copy: what ``st.cache_data`` does, a pickled frame deserialized into a
+  fresh copy for every caller;
+- shared: the memory-mapped segment of ``src/shared_data.py``, attached once
+  per process, with a copy-on-write ``session_view`` per rerun.
+
+For each, the script times one rerun's load and then holds the frames of
+--sessions concurrent sessions (each with its own filtered rows, about a tenth
+of the dataset), reporting the resident memory added per session. It also
+times the other per-rerun work on the shared frame: the sidebar option lists
+(recomputed, or cached per version) and the memo fingerprint of the
+unfiltered frame.
+
+Usage:
+    python scripts/bench_session_load.py --rows 1000000 --sessions 8
+"""
+
+import argparse
+import gc
+import pickle
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic import synthetic_dataset
+from src.memo import frame_fingerprint
+from src.shared_data import attach_dataset, publish_dataset, session_view
+
+def rss_mb() -> float:
+    """Resident memory of this process, from /proc."""
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS:')) / 1024
+
+def timed(func, repeat: int = 3) -> float:
+    """Mean milliseconds of func()."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def touch(df: pd.DataFrame) -> None:
+    """Read every column, as a rerun's charts and tables do."""
+    for column in df.columns:
+        if pd.api.types.is_numeric_dtype(df[column]):
+            df[column].sum()
+        else:
+            df[column].str.len().sum()
+
+def session_frames(load, sessions: int) -> float:
+    """Memory added per session holding its loaded frame and a filtered view of it."""
+    # Mapped pages count once they are read; read them before the baseline
+    touch(load())
+    gc.collect()
+    before = rss_mb()
+    held = []
+    for i in range(sessions):
+        df = load()
+        low = i % 10
+        held.append((df, df[df['nutrient_score'].between(low, low + 1)]))
+    added = (rss_mb() - before) / sessions
+    del held
+    gc.collect()
+    return added
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--sessions', type=int, default=8)
+    args = parser.parse_args()
+
+    data = synthetic_dataset(args.rows)
+    blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    with tempfile.TemporaryDirectory() as root:
+        publish_dataset(data, root)
+        del data
+        gc.collect()
+
+        def load_copy():
+            return pickle.loads(blob)
+
+        def load_shared():
+            return session_view(attach_dataset(root)[0])
+
+        print(f"rows={args.rows:,} pickled={len(blob) / 2**20:,.0f} MB sessions={args.sessions}")
+        print(f"{'strategy':<8} {'load ms/rerun':>14} {'MB/session':>11}")
+        for name, load in [('copy', load_copy), ('shared', load_shared)]:
+            load()
+            print(f"{name:<8} {timed(load):>14.1f} {session_frames(load, args.sessions):>11.1f}")
+
+        df = load_shared()
+        options = {}
+        def recompute():
+            return sorted(df['brands'].dropna().unique()), sorted(df['categories'].dropna().unique())
+        def cached():
+            if 'options' not in options:
+                options['options'] = recompute()
+            return options['options']
+        cached()
+        print(f"\nsidebar options: recomputed {timed(recompute):.1f} ms, cached {timed(cached):.3f} ms")
+
+        def hashed_index():
+            # Fingerprint of the index values, as before the RangeIndex shortcut
+            return pd.util.hash_array(df.index.to_numpy()).tobytes()
+        print(f"memo fingerprint of the full frame: hashing the index {timed(hashed_index):.1f} ms, "
+              f"now {timed(lambda: frame_fingerprint(df)):.3f} ms")
+
+if __name__ == '__main__':
+    main()
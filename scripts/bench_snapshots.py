@@ -0,0 +1,97 @@
+"""
+Benchmark versioned snapshots on a simulated history of daily refreshes.
+
+Each day a small share of products is reformulated, added or removed. The
+script records every day as a version and reports the storage used against
+one full Parquet file per day, the time to reconstruct versions, and the
+time of a per-category trend computed incrementally against reloading
+every full snapshot. Reconstructed versions are checked against the
+simulated days.
+
+Usage:
+    python scripts/bench_snapshots.py --rows 200000 --days 60
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from synthetic import synthetic_dataset
+from src.snapshots import _canonical, group_mean_trend, load_version, record_snapshot
+
+def simulate_day(df: pd.DataFrame, rng: np.random.Generator, next_code: int, changed: float,
+                 added: float, removed: float):
+    """Reformulate, add and remove products; returns the new day and next free code."""
+    df = df.copy()
+    n = len(df)
+    reformulated = rng.random(n) < changed
+    df.loc[reformulated, 'sugars_100g'] = (df.loc[reformulated, 'sugars_100g'] * rng.uniform(0.7, 1.0)).round(3)
+    df = df[rng.random(n) >= removed]
+    new_rows = df.sample(int(n * added), random_state=int(rng.integers(1 << 31))).copy()
+    new_rows['code'] = np.arange(next_code, next_code + len(new_rows))
+    return pd.concat([df, new_rows], ignore_index=True), next_code + len(new_rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--changed', type=float, default=0.01, help="share of products reformulated per day")
+    parser.add_argument('--added', type=float, default=0.002)
+    parser.add_argument('--removed', type=float, default=0.001)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    df = synthetic_dataset(args.rows)
+    next_code = int(df['code'].max()) + 1
+    start = datetime(2026, 1, 1)
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as full_root:
+        days = []
+        record_time = 0.0
+        for day in range(args.days):
+            if day:
+                df, next_code = simulate_day(df, rng, next_code, args.changed, args.added, args.removed)
+            days.append(df)
+            t = time.perf_counter()
+            record_snapshot(df, root, created=start + timedelta(days=day))
+            record_time += time.perf_counter() - t
+            _canonical(df).to_parquet(Path(full_root) / f"{day}.parquet", index=False, compression='zstd')
+
+        size = sum(p.stat().st_size for p in Path(root).glob('*.parquet'))
+        full_size = sum(p.stat().st_size for p in Path(full_root).glob('*.parquet'))
+        print(f"Storage: {size / 2**20:.1f} MiB as versions vs {full_size / 2**20:.1f} MiB as full daily files "
+              f"({full_size / size:.1f}x smaller); record {record_time / args.days * 1000:.0f} ms/day")
+
+        for version in (1, args.days // 2, args.days):
+            t = time.perf_counter()
+            restored = load_version(version, root=root)
+            elapsed = time.perf_counter() - t
+            expected = _canonical(days[version - 1])
+            same = restored.set_index('code').sort_index().equals(
+                expected.set_index('code').sort_index()[restored.columns[1:]])
+            print(f"Load version {version:>3}: {elapsed * 1000:7.0f} ms, matches simulated day: {same}")
+
+        t = time.perf_counter()
+        trend = group_mean_trend('sugars_100g', 'categories', root=root)
+        incremental = time.perf_counter() - t
+
+        t = time.perf_counter()
+        naive = {}
+        for day in range(args.days):
+            full = pd.read_parquet(Path(full_root) / f"{day}.parquet")
+            naive[day + 1] = full.groupby('categories')['sugars_100g'].mean()
+        naive = pd.DataFrame(naive).T.round(3)
+        reload_all = time.perf_counter() - t
+
+        top = trend.iloc[-1].dropna().index[:5]
+        close = np.allclose(trend[top].to_numpy(), naive[top].to_numpy(), equal_nan=True, atol=1e-3)
+        print(f"Category sugar trend: {incremental * 1000:.0f} ms incremental vs "
+              f"{reload_all * 1000:.0f} ms reloading every snapshot (results agree: {close})")
+
+if __name__ == '__main__':
+    main()
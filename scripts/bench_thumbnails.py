@@ -0,0 +1,94 @@
+"""
+Benchmark the thumbnail cache (src/thumbnails.py) against the stub image server.
+
+The stub server (scripts/stub_server.py) serves generated full-size product
+photos with --latency seconds of delay, standing in for the image CDN.
+--duplicates is the share of URLs that point at a picture another URL
+already has. For each concurrency, a fresh cache prefetches every URL, and
+the script reports the fetch throughput, the stored bytes against the source
+bytes and how many files the shared pictures used. It then times a
+table-sized lookup from the warm cache and a run with a tight byte budget,
+and it runs once with injected 5xx/429/truncated responses to check that
+failures are recorded and not fetched again.
+
+Usage:
+    python scripts/bench_thumbnails.py --images 500 --latency 0.05 --concurrency 1 8 32
+"""
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import wait
+
+import numpy as np
+import requests
+
+from stub_server import StubState, start_stub_server
+from src.thumbnails import ThumbnailCache
+
+def image_urls(port: int, n: int, duplicates: float, seed: int = 0) -> list:
+    """n image URLs; a share of them show the picture of an earlier URL."""
+    rng = np.random.default_rng(seed)
+    names = np.arange(n)
+    shared = rng.random(n) < duplicates
+    names[shared] = rng.integers(0, n, shared.sum())
+    return [f"http://127.0.0.1:{port}/images/{name}.jpg?v={i}" for i, name in enumerate(names)]
+
+def fill(cache: ThumbnailCache, urls: list) -> float:
+    """Seconds to prefetch every URL and wait for all of them."""
+    start = time.perf_counter()
+    wait(cache.prefetch(urls))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per image response")
+    parser.add_argument('--duplicates', type=float, default=0.2)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    state = StubState([], image_latency=args.latency)
+    server = start_stub_server(state)
+    port = server.server_address[1]
+    urls = image_urls(port, args.images, args.duplicates)
+    source_bytes = len(requests.get(urls[0]).content)
+
+    print(f"images={args.images} latency={args.latency * 1000:.0f} ms source≈{source_bytes / 1024:.0f} KiB")
+    print(f"{'concurrency':>11} {'seconds':>8} {'images/s':>9} {'files':>6} {'stored KiB':>11} {'of source':>10}")
+    for concurrency in args.concurrency:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ThumbnailCache(directory, concurrency=concurrency)
+            seconds = fill(cache, urls)
+            stats = cache.stats()
+            print(f"{concurrency:>11} {seconds:>8.2f} {args.images / seconds:>9.1f} {stats['thumbnails']:>6} "
+                  f"{stats['bytes'] / 1024:>11.0f} {stats['bytes'] / (source_bytes * args.images):>10.2%}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ThumbnailCache(directory, concurrency=max(args.concurrency))
+        fill(cache, urls)
+        start = time.perf_counter()
+        uris = cache.thumbnails(urls[:10])
+        lookup = (time.perf_counter() - start) * 1000
+        print(f"\nwarm lookup of a 10-row table: {lookup:.1f} ms, {sum(u is not None for u in uris)}/10 shown")
+
+        budget = cache.stats()['bytes'] // 4
+        cache.evict(budget)
+        stats = cache.stats()
+        print(f"evicted to a {budget / 1024:.0f} KiB budget: {stats['thumbnails']} files, "
+              f"{stats['bytes'] / 1024:.0f} KiB")
+
+    state.error_rate, state.throttle_rate, state.truncate_rate = 0.05, 0.05, 0.05
+    before = state.counts.copy()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ThumbnailCache(directory, concurrency=max(args.concurrency))
+        fill(cache, urls + [f"http://127.0.0.1:{port}/images/missing/{i}.jpg" for i in range(20)])
+        requested = {fault: count - before[fault] for fault, count in state.counts.items()}
+        again = cache.prefetch(urls)
+        stats = cache.stats()
+        print(f"with faults: {stats['sources'] - stats['failures']} stored, {stats['failures']} failed "
+              f"(responses {requested}); {len(again)} refetched on the next prefetch")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the validation stage (src/validation.py) on synthetic nutrient rows.
+
+Every nutrient column is drawn at random, and a share of the rows is
+corrupted: a negative value, a value above 100 g, sugars above
+carbohydrates, or a number that is not one. With --strings, one column holds
+its numbers as strings, as an API sometimes returns them, so the conversion
+is timed too. The script reports the time to flag the rows and to split off
+the quarantine, and checks that every corrupted row is caught.
+
+Usage:
+    python scripts/bench_validation.py --rows 1000000 10000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config import NUTRIENT_COLUMNS
+from src.validation import split_quarantine, validate, violation_counts
+
+def synthetic_nutrients(n: int, corrupt: float = 0.01, strings: bool = False, seed: int = 0):
+    """n rows of plausible nutrients, with the positions of the corrupted rows."""
+    rng = np.random.default_rng(seed)
+    fat = rng.uniform(0, 30, n)
+    carbohydrates = rng.uniform(0, 60, n)
+    proteins = rng.uniform(0, 10, n)
+    df = pd.DataFrame({
+        'code': np.arange(n).astype(str),
+        'energy_100g': 37 * fat + 17 * carbohydrates + 17 * proteins,
+        'proteins_100g': proteins,
+        'carbohydrates_100g': carbohydrates,
+        'sugars_100g': carbohydrates * rng.uniform(0, 1, n),
+        'fat_100g': fat,
+        'saturated-fat_100g': fat * rng.uniform(0, 1, n),
+        'salt_100g': rng.uniform(0, 3, n),
+        'fiber_100g': rng.uniform(0, 8, n),
+    }, columns=['code'] + NUTRIENT_COLUMNS)
+
+    bad = np.flatnonzero(rng.random(n) < corrupt)
+    kind = rng.integers(0, 4, len(bad))
+    df.loc[bad[kind == 0], 'salt_100g'] = -1.0
+    df.loc[bad[kind == 1], 'fiber_100g'] = 150.0
+    df.loc[bad[kind == 2], 'sugars_100g'] = df.loc[bad[kind == 2], 'carbohydrates_100g'] + 10
+    if strings:
+        salt = df['salt_100g'].astype(str).astype(object)
+        salt.iloc[bad[kind == 3]] = 'n/a'
+        df['salt_100g'] = salt
+    else:
+        df.loc[bad[kind == 3], 'proteins_100g'] = 200.0
+    return df, bad
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--strings', action='store_true', help="store one column as strings")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'validate s':>11} {'split s':>8} {'quarantined':>12} {'caught':>7}")
+    for n in args.rows:
+        df, bad = synthetic_nutrients(n, strings=args.strings)
+        t = time.perf_counter()
+        df, flags = validate(df)
+        checked = time.perf_counter() - t
+        t = time.perf_counter()
+        _, quarantined = split_quarantine(df, flags)
+        split = time.perf_counter() - t
+        caught = np.isin(bad, np.flatnonzero(flags)).mean()
+        print(f"{n:>10} {checked:>11.2f} {split:>8.2f} {len(quarantined):>12} {caught:>7.3f}")
+    print(violation_counts(quarantined).to_string(index=False))
+
+if __name__ == '__main__':
+    main()
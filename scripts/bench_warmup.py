@@ -0,0 +1,113 @@
+"""
+Benchmark access-log-driven cache warming (src/warmup.py).
+
+Filter states are drawn from a Zipf distribution over plausible views of a
+synthetic dataset:
+- no filter and the largest brands and categories;
+- pairs of brands;
+- category and score-range combinations.
+A first batch of views fills an access log. After a simulated dataset
+swap, a second batch (the traffic) is replayed against the memo twice:
+- cold: the memo of the new dataset is empty;
+- warm: the warm-up job has first run from the log within --budget-seconds
+  and --budget-mb.
+The script reports the warm-up cost, the memo hit rate of the traffic and
+the median latency of each state's first view, which is what the first user
+of a view waits for. The latency is split between states the warm-up covered
+and the rest.
+
+Usage:
+    python scripts/bench_warmup.py --rows 200000 --views 400 --top-k 20
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic import synthetic_dataset
+from src.cooccurrence import TagIncidence
+from src.memo import DiskMemo
+from src.warmup import AccessLog, default_states, normalize_state, state_key, warm_cache
+
+def candidate_states(df, n: int, rng) -> list:
+    """Plausible filter states, the common ones first."""
+    brands = df['brands'].value_counts().index[:50].tolist()
+    categories = df['categories'].value_counts().index[:30].tolist()
+    states = default_states(df)
+    while len(states) < n:
+        if rng.random() < 0.5:
+            states.append(normalize_state(brands=rng.choice(brands, 2, replace=False).tolist()))
+        else:
+            low = float(rng.integers(0, 8))
+            states.append(normalize_state(categories=[rng.choice(categories)], score_range=(low, low + 2)))
+    return list({state_key(s): s for s in states}.values())
+
+def replay(df, version, traffic, memo, incidence, popular: set) -> dict:
+    """Serve each view of the traffic; memo hit rate and first-view latency of popular and other states."""
+    first_view = {True: [], False: []}
+    hits = misses = 0
+    seen = set()
+    start_all = time.perf_counter()
+    for state in traffic:
+        start = time.perf_counter()
+        report = warm_cache(df, version, [state], memo, max_seconds=float('inf'), max_bytes=2**62,
+                            incidence=incidence)
+        if state_key(state) not in seen:
+            seen.add(state_key(state))
+            first_view[state_key(state) in popular].append((time.perf_counter() - start) * 1000)
+        hits, misses = hits + report['cached'], misses + report['computed']
+    return {'hit_rate': hits / max(hits + misses, 1),
+            'popular': np.median(first_view[True]) if first_view[True] else float('nan'),
+            'other': np.median(first_view[False]) if first_view[False] else float('nan'),
+            'total': time.perf_counter() - start_all}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--states', type=int, default=200, help="distinct filter states")
+    parser.add_argument('--views', type=int, default=400, help="views logged before the swap, and replayed after")
+    parser.add_argument('--zipf', type=float, default=1.2, help="skew of state popularity")
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--budget-seconds', type=float, default=120)
+    parser.add_argument('--budget-mb', type=float, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    df = synthetic_dataset(args.rows)
+    version = 'bench'
+    incidence = TagIncidence.from_frame(df)
+    states = candidate_states(df, args.states, rng)
+    weights = 1 / np.arange(1, len(states) + 1) ** args.zipf
+    weights /= weights.sum()
+
+    def sample(n):
+        return [states[i] for i in rng.choice(len(states), n, p=weights)]
+
+    with tempfile.TemporaryDirectory() as root:
+        log = AccessLog(os.path.join(root, 'access.db'))
+        for state in sample(args.views):
+            log.record(state)
+        traffic = sample(args.views)
+        print(f"rows={args.rows:,} states={len(states)} views={args.views} "
+              f"distinct in traffic={len({state_key(s) for s in traffic})}")
+
+        warmed = log.popular(args.top_k) + default_states(df)
+        popular = {state_key(s) for s in warmed}
+        cold = replay(df, version, traffic, DiskMemo(os.path.join(root, 'cold.db')), incidence, popular)
+
+        memo = DiskMemo(os.path.join(root, 'warm.db'))
+        report = warm_cache(df, version, warmed, memo, args.budget_seconds, int(args.budget_mb * 2**20), incidence)
+        print(f"warm-up: {report['warmed']} states, {report['computed']} results in {report['seconds']:.1f} s, "
+              f"{report['bytes'] / 2**20:.1f} MiB" + (f", stopped by {report['stopped']}" if report['stopped'] else ""))
+        warm = replay(df, version, traffic, memo, incidence, popular)
+
+        print(f"{'memo':<5} {'hit rate':>9} {'first view ms (warmed states)':>30} {'(others)':>9} {'traffic s':>10}")
+        for name, result in (('cold', cold), ('warm', warm)):
+            print(f"{name:<5} {result['hit_rate']:>9.1%} {result['popular']:>30.0f} {result['other']:>9.0f} "
+                  f"{result['total']:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark filtered reads of the zone-mapped store (src/zonemap.py).
+
+A synthetic dataset is written clustered by category and score. Typical
+sidebar filters are then loaded twice: once through the zone maps, which
+read only the row groups that can match, and once by reading the whole
+file and filtering it in pandas. For each filter the script reports the
+share of row groups and compressed bytes read, the time of both loads, and
+whether they return the same rows. The heavy text columns are left out by
+default so 10M rows fit in memory; --all-columns keeps them.
+
+Usage:
+    python scripts/bench_zonemap.py --rows 10000000
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from synthetic import synthetic_dataset
+from src.config import NUTRIENT_COLUMNS
+from src.zonemap import load_filtered, write_zoned_store
+
+LEAN_COLUMNS = ['code', 'product_name', 'brands', 'categories', 'nutrition_grades'] + NUTRIENT_COLUMNS + [
+    'additives_count', 'allergens_count', 'nutrient_score']
+
+def build(rows: int, all_columns: bool, chunk: int = 1_000_000) -> pd.DataFrame:
+    """Synthetic dataset built in chunks, so only the kept columns are ever held in full."""
+    parts = []
+    for seed, start in enumerate(range(0, rows, chunk)):
+        part = synthetic_dataset(min(chunk, rows - start), seed=seed)
+        parts.append(part if all_columns else part[LEAN_COLUMNS])
+        del part
+        gc.collect()
+    df = pd.concat(parts, ignore_index=True)
+    df['code'] = np.arange(10**12, 10**12 + len(df))
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--all-columns', action='store_true', help="keep the heavy text columns")
+    args = parser.parse_args()
+
+    df = build(args.rows, args.all_columns)
+    counts = df['categories'].value_counts()
+    brand_counts = df['brands'].value_counts()
+    top_decile = (float(df['nutrient_score'].quantile(0.9)), float(df['nutrient_score'].max()))
+    filters = {
+        'one category': dict(categories=[counts.index[len(counts) // 2]]),
+        'largest category': dict(categories=[counts.index[0]]),
+        'category + score 7-10': dict(categories=[counts.index[0]], score_range=(7.0, 10.0)),
+        'three categories': dict(categories=counts.index[10:13].tolist()),
+        'score >= p90': dict(score_range=top_decile),
+        'one brand': dict(brands=[brand_counts.index[len(brand_counts) // 2]]),
+    }
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'products.parquet')
+        t = time.perf_counter()
+        write_zoned_store(df, path)
+        written = time.perf_counter() - t
+        del df
+        gc.collect()
+        print(f"rows={args.rows:,} file={os.path.getsize(path) / 2**20:,.0f} MB "
+              f"row_groups={pq.ParquetFile(path).metadata.num_row_groups} write={written:.1f} s")
+        print(f"{'filter':<22} {'matched':>9} {'groups':>7} {'bytes':>7} {'zoned s':>8} {'full s':>7} {'same':>5}")
+        for name, kwargs in filters.items():
+            t = time.perf_counter()
+            zoned, stats = load_filtered(path, **kwargs)
+            zoned_s = time.perf_counter() - t
+
+            t = time.perf_counter()
+            full = pd.read_parquet(path)
+            mask = np.ones(len(full), dtype=bool)
+            if kwargs.get('brands'):
+                mask &= full['brands'].isin(kwargs['brands']).to_numpy()
+            if kwargs.get('categories'):
+                mask &= full['categories'].isin(kwargs['categories']).to_numpy()
+            if kwargs.get('score_range'):
+                mask &= full['nutrient_score'].between(*kwargs['score_range']).to_numpy()
+            expected = full[mask].reset_index(drop=True)
+            full_s = time.perf_counter() - t
+            del full
+            gc.collect()
+
+            print(f"{name:<22} {len(zoned):>9,} {stats['row_groups_read'] / stats['row_groups']:>7.1%} "
+                  f"{stats['bytes_read'] / stats['bytes']:>7.1%} {zoned_s:>8.2f} {full_s:>7.2f} "
+                  f"{str(zoned.equals(expected)):>5}")
+
+if __name__ == '__main__':
+    main()
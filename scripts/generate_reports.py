@@ -0,0 +1,45 @@
+"""
+Render a static report pack with one page per brand or per category.
+
+Reports are built from the published dataset segment (the one the dashboard
+serves); when nothing is published yet, the processed CSV is published
+first. Open ``index.html`` in the output directory to browse the pack, or
+print pages to PDF from the browser.
+
+Usage:
+    python scripts/generate_reports.py brand --workers 4
+    python scripts/generate_reports.py category --min-products 20 --output /tmp/categories
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import pandas as pd
+
+import synthetic  # noqa: F401  (puts the repository root on sys.path)
+from src.config import PROCESSED_DATA_PATH, REPORT_MIN_PRODUCTS, SHARED_DATA_DIR
+from src.reports import REPORT_KINDS, generate_reports
+from src.shared_data import current_version, publish_dataset
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('kind', choices=list(REPORT_KINDS))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--min-products', type=int, default=REPORT_MIN_PRODUCTS)
+    parser.add_argument('--limit', type=int, help="render only the largest groups")
+    parser.add_argument('--output', help="pack directory (default data/reports/<kind>)")
+    parser.add_argument('--shared-dir', default=SHARED_DATA_DIR)
+    args = parser.parse_args()
+
+    if current_version(args.shared_dir) is None:
+        if not Path(PROCESSED_DATA_PATH).exists():
+            parser.error(f"no published dataset and no {PROCESSED_DATA_PATH}; run the ETL first")
+        publish_dataset(pd.read_csv(PROCESSED_DATA_PATH), args.shared_dir)
+
+    result = generate_reports(args.kind, args.output, args.workers, args.min_products, args.limit, args.shared_dir)
+    print(f"{result['reports']} {args.kind} reports in {result['seconds']:.1f} s "
+          f"({result['reports_per_second']}/s) -> {result['output']}/index.html")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Load test for the HTTP API (src/api.py).
+
+Starts ``uvicorn src.api:create_app --factory`` with the given number of
+workers (or targets a running server with --url), then drives it from many
+keep-alive connections with a mix of analysis queries, product lookups,
+searches and ETag revalidations. Reports throughput, status codes and latency
+percentiles.
+
+The client is a minimal asyncio HTTP/1.1 client, so the load generator
+itself stays cheap and needs no extra dependencies.
+
+Usage:
+    python scripts/load_test_api.py --workers 4 --connections 64 --duration 15
+"""
+
+import argparse
+import asyncio
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import quote, urlparse
+
+import numpy as np
+import pandas as pd
+import requests
+
+from synthetic import ROOT
+from src.config import PROCESSED_DATA_PATH
+
+def build_paths(n: int, seed: int = 0) -> list:
+    """Build a request mix from the real brands, categories and codes."""
+    rng = random.Random(seed)
+    df = pd.read_csv(ROOT / PROCESSED_DATA_PATH, usecols=['code', 'brands', 'categories', 'product_name'])
+    brands = df['brands'].dropna().value_counts().index[:30].tolist()
+    categories = df['categories'].dropna().value_counts().index[:30].tolist()
+    codes = df['code'].astype(str).tolist()
+    words = [w for w in ' '.join(df['product_name'].dropna().head(300)).split() if w.isalpha() and len(w) > 3]
+
+    paths = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.35:
+            endpoint = rng.choice(['summary', 'brands', 'categories', 'healthiest', 'additives', 'quality'])
+            params = []
+            if rng.random() < 0.5:
+                params.append(f"categories={quote(rng.choice(categories))}")
+            if rng.random() < 0.3:
+                params.append(f"brands={quote(rng.choice(brands))}")
+            if rng.random() < 0.3:
+                params.append(f"min_score={rng.choice([3, 5, 7])}")
+            paths.append(f"/{endpoint}" + ('?' + '&'.join(params) if params else ''))
+        elif kind < 0.75:
+            paths.append(f"/products/{rng.choice(codes)}")
+        elif kind < 0.85:
+            paths.append(f"/products/{rng.choice(codes)}/alternatives?k=5")
+        else:
+            paths.append(f"/search?q={quote(rng.choice(words))}&limit=10")
+    return paths
+
+async def request(reader, writer, host: str, path: str, etag: str = None):
+    """Send one keep-alive GET and read the response; returns (status, body size, etag)."""
+    headers = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n"
+    if etag:
+        headers += f"If-None-Match: {etag}\r\n"
+    writer.write((headers + "\r\n").encode('latin-1'))
+    await writer.drain()
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    status = int(lines[0].split()[1])
+    fields = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            fields[name.strip().lower()] = value.strip()
+    length = int(fields.get('content-length', 0))
+    if length:
+        await reader.readexactly(length)
+    return status, length, fields.get('etag')
+
+async def connection_worker(url, paths, deadline, revalidate, results, rng):
+    parsed = urlparse(url)
+    reader, writer = await asyncio.open_connection(parsed.hostname, parsed.port)
+    etags = {}
+    try:
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            etag = etags.get(path) if rng.random() < revalidate else None
+            start = time.perf_counter()
+            status, size, new_etag = await request(reader, writer, parsed.netloc, path, etag)
+            results.append((time.perf_counter() - start, status, size))
+            if new_etag:
+                etags[path] = new_etag
+    finally:
+        writer.close()
+
+async def run_load(url, paths, connections, duration, revalidate):
+    results = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        connection_worker(url, paths, deadline, revalidate, results, random.Random(i))
+        for i in range(connections)
+    ))
+    return results
+
+def wait_for(url: str, timeout: float = 120) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API at {url} did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="target a running server instead of starting one")
+    parser.add_argument('--workers', type=int, default=4, help="uvicorn worker processes")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=15.0, help="seconds")
+    parser.add_argument('--warmup', type=float, default=3.0, help="seconds, not measured")
+    parser.add_argument('--distinct', type=int, default=2000, help="distinct request paths")
+    parser.add_argument('--revalidate', type=float, default=0.2, help="share of requests sent with If-None-Match")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        url = f"http://127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'src.api:create_app', '--factory', '--port', str(args.port),
+             '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log'],
+            cwd=ROOT
+        )
+    try:
+        wait_for(url)
+        paths = build_paths(args.distinct)
+        asyncio.run(run_load(url, paths, args.connections, args.warmup, args.revalidate))
+        start = time.perf_counter()
+        results = asyncio.run(run_load(url, paths, args.connections, args.duration, args.revalidate))
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latency = np.array([r[0] for r in results]) * 1000
+    statuses = pd.Series([r[1] for r in results]).value_counts().sort_index().to_dict()
+    print(f"{len(results)} requests in {elapsed:.1f}s over {args.connections} connections: "
+          f"{len(results) / elapsed:,.0f} req/s")
+    print(f"Status codes: {statuses}")
+    print(f"Latency ms: p50 {np.percentile(latency, 50):.1f}  p90 {np.percentile(latency, 90):.1f}  "
+          f"p99 {np.percentile(latency, 99):.1f}  max {latency.max():.1f}")
+    print(f"Mean body size: {np.mean([r[2] for r in results]):,.0f} bytes")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+"""
+Load test for the Streamlit dashboard (app.py) with concurrent sessions.
+
+Starts ``streamlit run app.py`` in a scratch directory holding a synthetic
+dataset, whose product images are served by the stub server
+(scripts/stub_server.py), or targets a running server with --url. Each
+simulated session then opens the dashboard's websocket, as a browser tab
+does, and runs interaction scripts: filtering brands, categories or the
+score range, picking a nutrient, searching, downloading the filtered data
+and clearing the filters. Widgets are found by label in the rendered elements and changed
+by sending the widget states a browser would send, so every interaction is a
+real rerun of the app.
+
+The latency of an interaction is the time from sending it to the end of the
+rerun (plus the file transfer for downloads). The server's CPU and RSS are
+sampled from /proc while the sessions run, so the resource columns need
+Linux and a server started by this script.
+
+Several session counts run one after the other against the same server. The
+report is saved as JSON under data/loadtest/, named after the commit, and
+--compare prints the difference with an earlier report.
+
+Usage:
+    python scripts/load_test_dashboard.py --sessions 1 4 16 --rows 100000 --duration 60
+    python scripts/load_test_dashboard.py --sessions 1 4 16 --compare data/loadtest/dashboard-abc1234.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import requests
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from stub_server import StubState, start_stub_server
+from synthetic import ROOT, synthetic_dataset
+from src.config import PROCESSED_DATA_PATH
+
+REPORT_DIR = ROOT / 'data' / 'loadtest'
+
+# Widgets driven by the interaction scripts, by label
+BRANDS = "Choose brands to analyze:"
+CATEGORIES = "Choose categories to analyze:"
+SCORE_RANGE = "Select nutrient score range:"
+NUTRIENT = "Select nutrient to analyze:"
+SEARCH = "🔎 Search products"
+DOWNLOAD = "📊 Download Filtered Dataset"
+
+SEARCH_TERMS = ['maggi', 'biscuit', 'masala', 'chocolate', 'atta', 'juice', 'namkeen', 'tea']
+
+class Session:
+    """One simulated browser tab: a websocket and the widget states it has set."""
+
+    def __init__(self, url: str, rng: random.Random):
+        self.url = url
+        self.rng = rng
+        self.websocket = None
+        self.states = {}  # widget id -> WidgetState sent with every rerun
+        self.widgets = {}  # label -> rendered widget element of the last run
+        self.errors = 0
+
+    async def connect(self) -> None:
+        ws_url = self.url.replace('http', 'ws', 1) + '/_stcore/stream'
+        self.websocket = await websockets.connect(ws_url, subprotocols=['streamlit'], max_size=None)
+
+    async def close(self) -> None:
+        await self.websocket.close()
+
+    async def rerun(self, trigger=None) -> None:
+        """Send the widget states (plus a one-shot trigger) and wait for the run to finish."""
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        states = message.rerun_script.widget_states.widgets
+        for state in self.states.values():
+            states.add().CopyFrom(state)
+        if trigger is not None:
+            state = states.add()
+            state.id = trigger
+            state.trigger_value = True
+        await self.websocket.send(message.SerializeToString())
+
+        widgets = {}
+        while True:
+            response = ForwardMsg()
+            response.ParseFromString(await self.websocket.recv())
+            kind = response.WhichOneof('type')
+            if kind == 'delta' and response.delta.WhichOneof('type') == 'new_element':
+                element = response.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    self.errors += 1
+                    continue
+                widget = getattr(element, element_type)
+                if getattr(widget, 'id', '') and getattr(widget, 'label', ''):
+                    widgets[widget.label] = widget
+            elif kind == 'script_finished':
+                break
+        self.widgets = widgets
+
+    def set_state(self, label: str, **value) -> bool:
+        """Set a widget's value the way the browser reports it, e.g. string_value='x'."""
+        widget = self.widgets.get(label)
+        if widget is None:
+            return False
+        state = self.states.setdefault(widget.id, WidgetState(id=widget.id))
+        (field, value), = value.items()
+        if isinstance(value, list):
+            getattr(state, field).data[:] = value
+        else:
+            setattr(state, field, value)
+        return True
+
+    def options(self, label: str) -> list:
+        widget = self.widgets.get(label)
+        return list(widget.options) if widget is not None else []
+
+# Interaction scripts: each changes the session's widgets and reruns the app
+async def filter_brands(session: Session) -> None:
+    options = session.options(BRANDS)
+    session.set_state(BRANDS, string_array_value=session.rng.sample(options, min(len(options), session.rng.randint(1, 3))))
+    await session.rerun()
+
+async def filter_categories(session: Session) -> None:
+    options = session.options(CATEGORIES)
+    session.set_state(CATEGORIES, string_array_value=session.rng.sample(options, min(len(options), session.rng.randint(1, 2))))
+    await session.rerun()
+
+async def score_range(session: Session) -> None:
+    widget = session.widgets.get(SCORE_RANGE)
+    if widget is not None:
+        low = session.rng.uniform(widget.min, (widget.min + widget.max) / 2)
+        session.set_state(SCORE_RANGE, double_array_value=[low, widget.max])
+    await session.rerun()
+
+async def select_nutrient(session: Session) -> None:
+    options = session.options(NUTRIENT)
+    if options:
+        session.set_state(NUTRIENT, string_value=session.rng.choice(options))
+    await session.rerun()
+
+async def search(session: Session) -> None:
+    session.set_state(SEARCH, string_value=session.rng.choice(SEARCH_TERMS))
+    await session.rerun()
+
+async def download(session: Session) -> None:
+    # The browser fetches the file, and the click reruns the app
+    widget = session.widgets.get(DOWNLOAD)
+    if widget is None:
+        return await session.rerun()
+    response = await asyncio.to_thread(requests.get, session.url + widget.url, timeout=120)
+    if response.status_code != 200:
+        session.errors += 1
+    await session.rerun(trigger=widget.id)
+
+async def clear_filters(session: Session) -> None:
+    session.states.clear()
+    await session.rerun()
+
+INTERACTIONS = {
+    'filter_brands': (filter_brands, 0.2),
+    'filter_categories': (filter_categories, 0.2),
+    'score_range': (score_range, 0.15),
+    'select_nutrient': (select_nutrient, 0.15),
+    'search': (search, 0.1),
+    'download': (download, 0.1),
+    'clear_filters': (clear_filters, 0.1),
+}
+
+async def run_session(url: str, deadline: float, think: float, seed: int, results: list) -> int:
+    """Open the dashboard and run random interactions until the deadline; returns the error count."""
+    session = Session(url, random.Random(seed))
+    names = list(INTERACTIONS)
+    weights = [INTERACTIONS[name][1] for name in names]
+    await session.connect()
+    try:
+        start = time.perf_counter()
+        await session.rerun()
+        results.append(('page_load', time.perf_counter() - start))
+        while time.perf_counter() < deadline:
+            # Users pause between interactions; exponential think times
+            await asyncio.sleep(session.rng.expovariate(1 / think) if think > 0 else 0)
+            name = session.rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            await INTERACTIONS[name][0](session)
+            results.append((name, time.perf_counter() - start))
+    finally:
+        await session.close()
+    return session.errors
+
+async def run_level(url: str, sessions: int, duration: float, think: float):
+    results = []
+    deadline = time.perf_counter() + duration
+    errors = await asyncio.gather(*(
+        run_session(url, deadline, think, seed, results) for seed in range(sessions)
+    ))
+    return results, sum(errors)
+
+class ResourceSampler(threading.Thread):
+    """Sample a process's CPU share and resident memory from /proc."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []  # (seconds since start, cpu %, rss MB)
+        self.stopped = threading.Event()
+
+    def _read(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')  # utime + stime
+        with open(f"/proc/{self.pid}/status") as f:
+            rss = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:')) / 1024
+        return cpu, rss
+
+    def run(self):
+        start = time.perf_counter()
+        last_time, (last_cpu, _) = start, self._read()
+        while not self.stopped.wait(self.interval):
+            now = time.perf_counter()
+            cpu, rss = self._read()
+            self.samples.append((round(now - start, 2), round((cpu - last_cpu) / (now - last_time) * 100, 1), round(rss, 1)))
+            last_time, last_cpu = now, cpu
+
+    def stop(self) -> list:
+        self.stopped.set()
+        self.join()
+        return self.samples
+
+def summarize(results: list, errors: int, elapsed: float, sessions: int, samples: list) -> dict:
+    """Latency percentiles per interaction and resource summary of one session count."""
+    by_name = {}
+    for name, seconds in results:
+        by_name.setdefault(name, []).append(seconds * 1000)
+    by_name['all'] = [seconds * 1000 for name, seconds in results if name != 'page_load']
+
+    def percentiles(values):
+        values = np.asarray(values)
+        return {
+            'count': int(len(values)),
+            'p50_ms': round(float(np.percentile(values, 50)), 1),
+            'p90_ms': round(float(np.percentile(values, 90)), 1),
+            'p99_ms': round(float(np.percentile(values, 99)), 1),
+            'max_ms': round(float(values.max()), 1),
+        }
+
+    summary = {
+        'sessions': sessions,
+        'seconds': round(elapsed, 1),
+        'reruns_per_second': round(len(results) / elapsed, 2),
+        'errors': errors,
+        'interactions': {name: percentiles(values) for name, values in sorted(by_name.items()) if values},
+    }
+    if samples:
+        cpu = np.array([s[1] for s in samples])
+        rss = np.array([s[2] for s in samples])
+        summary.update({'cpu_mean_pct': round(float(cpu.mean()), 1), 'cpu_max_pct': round(float(cpu.max()), 1),
+                        'rss_start_mb': float(rss[0]), 'rss_peak_mb': float(rss.max()), 'samples': samples})
+    return summary
+
+def print_level(level: dict) -> None:
+    resources = ''
+    if 'cpu_mean_pct' in level:
+        resources = (f"  cpu {level['cpu_mean_pct']:.0f}% mean / {level['cpu_max_pct']:.0f}% max"
+                     f"  rss {level['rss_start_mb']:.0f} -> {level['rss_peak_mb']:.0f} MB")
+    print(f"\n{level['sessions']} sessions: {level['reruns_per_second']:.2f} reruns/s, "
+          f"{level['errors']} errors{resources}")
+    print(f"  {'interaction':<18} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in level['interactions'].items():
+        print(f"  {name:<18} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p90_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+
+def compare(report: dict, baseline: dict) -> None:
+    """Print p50/p99 changes per interaction against an earlier report, for matching session counts."""
+    print(f"\nCompared with {baseline['commit']} ({baseline['created']}):")
+    previous = {level['sessions']: level for level in baseline['levels']}
+    for level in report['levels']:
+        before = previous.get(level['sessions'])
+        if before is None:
+            continue
+        print(f"  {level['sessions']} sessions: reruns/s {before['reruns_per_second']:.2f} -> {level['reruns_per_second']:.2f}")
+        for name, stats in level['interactions'].items():
+            old = before['interactions'].get(name)
+            if old is None:
+                continue
+            print(f"    {name:<18} p50 {old['p50_ms']:>8.1f} -> {stats['p50_ms']:>8.1f} ms "
+                  f"({(stats['p50_ms'] / old['p50_ms'] - 1) * 100:+5.0f}%)   "
+                  f"p99 {old['p99_ms']:>8.1f} -> {stats['p99_ms']:>8.1f} ms "
+                  f"({(stats['p99_ms'] / old['p99_ms'] - 1) * 100:+5.0f}%)")
+
+def start_server(port: int, rows: int, workdir: Path) -> subprocess.Popen:
+    """
+    Write a synthetic dataset to a scratch directory and start the app there.
+
+    Product images point at a stub image server in this process instead of
+    the OpenFoodFacts CDN, so the thumbnails each rerun fetches and waits for
+    do not depend on the network.
+    """
+    data_path = workdir / PROCESSED_DATA_PATH
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    images = start_stub_server(StubState([]))
+    df = synthetic_dataset(rows)
+    image_root = f"http://127.0.0.1:{images.server_address[1]}/images/"
+    df['image_url'] = (image_root + df['code'].astype(str) + '.jpg').where(df['image_url'].notna())
+    df.to_csv(data_path, index=False)
+    env = dict(os.environ,
+               FOOD_DASHBOARD_TAXONOMY=str(ROOT / 'data' / 'taxonomies' / 'categories.txt'),
+               FOOD_DASHBOARD_MEMO_PATH=str(workdir / 'memo.db'),
+               FOOD_DASHBOARD_SHARED_DIR=str(workdir / 'shared'))
+    return subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', str(ROOT / 'app.py'),
+         '--server.headless', 'true', '--server.port', str(port),
+         '--server.enableXsrfProtection', 'false', '--browser.gatherUsageStats', 'false'],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wait_for(url: str, timeout: float = 120) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/_stcore/health", timeout=1).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Dashboard at {url} did not start")
+
+def git_commit() -> str:
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    commit = git('rev-parse', '--short', 'HEAD') or 'unknown'
+    return commit + ('-dirty' if git('status', '--porcelain', '--untracked-files=no') else '')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="target a running dashboard instead of starting one")
+    parser.add_argument('--port', type=int, default=8599)
+    parser.add_argument('--rows', type=int, default=100_000, help="products in the synthetic dataset")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16], help="concurrent sessions, one run each")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds per session count")
+    parser.add_argument('--think', type=float, default=1.0, help="mean seconds between a session's interactions")
+    parser.add_argument('--output', type=Path, help="report file (default data/loadtest/dashboard-<commit>.json)")
+    parser.add_argument('--compare', type=Path, help="earlier report to compare with")
+    args = parser.parse_args()
+
+    report = {'commit': git_commit(), 'created': datetime.now().isoformat(timespec='seconds'),
+              'rows': None if args.url else args.rows, 'duration': args.duration, 'think': args.think,
+              'cpus': os.cpu_count(), 'levels': []}
+
+    server, sampler = None, None
+    url = args.url
+    with tempfile.TemporaryDirectory() as workdir:
+        if url is None:
+            url = f"http://127.0.0.1:{args.port}"
+            server = start_server(args.port, args.rows, Path(workdir))
+        try:
+            wait_for(url)
+            # The first run loads the data and fills the caches; not measured
+            asyncio.run(run_level(url, 1, 0, 0))
+            for sessions in args.sessions:
+                if server is not None:
+                    sampler = ResourceSampler(server.pid)
+                    sampler.start()
+                start = time.perf_counter()
+                results, errors = asyncio.run(run_level(url, sessions, args.duration, args.think))
+                elapsed = time.perf_counter() - start
+                samples = sampler.stop() if sampler is not None else []
+                level = summarize(results, errors, elapsed, sessions, samples)
+                report['levels'].append(level)
+                print_level(level)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    output = args.output or REPORT_DIR / f"dashboard-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nReport saved to {output}")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Fault-injecting stand-in for the OpenFoodFacts search API.
+
+Serves ``/cgi/search.pl`` pages of synthetic products and, at configurable
+rates, answers with 429 (with ``Retry-After``), 500/503, a truncated body or
+a slow response. Point the dashboard or a FetchJob at it with
+``FOOD_DASHBOARD_API_URL=http://127.0.0.1:<port>``.
+
+``/images/<name>.jpg`` serves a generated full-size product photo (a
+different one per name) under the same faults, after --image-latency
+seconds, as a stand-in for the image CDN; ``/images/missing/...`` is a 404.
+
+Usage:
+    python scripts/stub_server.py --port 8099 --products 20000 --throttle-rate 0.1 --error-rate 0.1
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, ImageDraw
+
+from synthetic import synthetic_products
+
+class StubState:
+    """Catalogue and fault settings shared by the request handlers."""
+
+    def __init__(self, products: list, error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 truncate_rate: float = 0.0, slow_rate: float = 0.0, slow_seconds: float = 2.0,
+                 retry_after: float = 1.0, seed: int = 0, image_size: int = 800, image_latency: float = 0.0):
+        self.products = products
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.truncate_rate = truncate_rate
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.retry_after = retry_after
+        self.image_size = image_size
+        self.image_latency = image_latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'ok': 0, '429': 0, '5xx': 0, 'truncated': 0, 'slow': 0}
+
+    def draw(self) -> str:
+        """Pick the fault for the next request."""
+        with self.lock:
+            x = self.rng.random()
+        for fault, rate in (('429', self.throttle_rate), ('5xx', self.error_rate),
+                            ('truncated', self.truncate_rate), ('slow', self.slow_rate)):
+            if x < rate:
+                return fault
+            x -= rate
+        return 'ok'
+
+    def count(self, outcome: str) -> None:
+        with self.lock:
+            self.counts[outcome] += 1
+
+def make_image(name: str, size: int) -> bytes:
+    """A JPEG photo stand-in whose colours depend on the name."""
+    seed = hashlib.sha1(name.encode('utf-8')).digest()
+    image = Image.new('RGB', (size, size), tuple(seed[:3]))
+    draw = ImageDraw.Draw(image)
+    for i in range(8):
+        x, y = seed[3 + i] * size // 256, seed[11 + i] * size // 256
+        draw.ellipse([x - size // 6, y - size // 6, x + size // 6, y + size // 6], fill=tuple(seed[i:i + 3]))
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=90)
+    return out.getvalue()
+
+def make_handler(state: StubState):
+    """Build a request handler class bound to the stub state."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, headers: dict = None,
+                  content_type: str = 'application/json') -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _image(self, path: str) -> None:
+            if path.startswith('/images/missing/'):
+                self._send(404, b'{}')
+                return
+            fault = state.draw()
+            state.count(fault)
+            if fault == '429':
+                self._send(429, b'{}', {'Retry-After': f"{state.retry_after:g}"})
+                return
+            if fault == '5xx':
+                self._send(state.rng.choice([500, 502, 503]), b'{}')
+                return
+            time.sleep(state.slow_seconds if fault == 'slow' else state.image_latency)
+            body = make_image(path, state.image_size)
+            if fault == 'truncated':
+                body = body[: len(body) // 2]
+            self._send(200, body, content_type='image/jpeg')
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.startswith('/images/'):
+                self._image(url.path)
+                return
+            if url.path != '/cgi/search.pl':
+                self._send(404, b'{}')
+                return
+            query = parse_qs(url.query)
+            page = int(query.get('page', ['1'])[0])
+            page_size = int(query.get('page_size', ['1000'])[0])
+            fields = query.get('fields', [''])[0].split(',')
+
+            fault = state.draw()
+            state.count(fault)
+            if fault == '429':
+                self._send(429, b'{"error": "rate limited"}', {'Retry-After': f"{state.retry_after:g}"})
+                return
+            if fault == '5xx':
+                self._send(state.rng.choice([500, 502, 503]), b'{"error": "server error"}')
+                return
+            if fault == 'slow':
+                time.sleep(state.slow_seconds)
+
+            start = (page - 1) * page_size
+            products = [{f: p.get(f) for f in fields if f in p} for p in state.products[start:start + page_size]]
+            body = json.dumps({'count': len(state.products), 'page': page, 'page_size': page_size,
+                               'products': products, 'skip': start}).encode('utf-8')
+            if fault == 'truncated':
+                # Announce the full length but close the connection half way
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body[: len(body) // 2])
+                self.close_connection = True
+                return
+            self._send(200, body)
+
+    return Handler
+
+def start_stub_server(state: StubState, port: int = 0) -> ThreadingHTTPServer:
+    """Start the stub server in a background thread; returns the server."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of 5xx responses")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help="share of truncated bodies")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="share of slow responses")
+    parser.add_argument('--slow-seconds', type=float, default=2.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--image-size', type=int, default=800, help="side of the served images in pixels")
+    parser.add_argument('--image-latency', type=float, default=0.0, help="seconds before each image response")
+    args = parser.parse_args()
+
+    state = StubState(synthetic_products(args.products, args.seed), args.error_rate, args.throttle_rate,
+                      args.truncate_rate, args.slow_rate, args.slow_seconds, args.retry_after, args.seed,
+                      args.image_size, args.image_latency)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(state))
+    print(f"Serving {args.products} products on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Responses: {state.counts}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Synthetic datasets for the benchmark and load-test scripts.
+
+Rows are resampled from the shipped processed CSV, with fresh barcodes and
+jittered nutrient values, so text columns, missing-value patterns and
+category/brand skew look like the real data at any size.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.config import NUTRIENT_COLUMNS, PROCESSED_DATA_PATH
+
+def synthetic_dataset(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a processed-style DataFrame with n_rows products.
+
+    Args:
+        n_rows (int): Number of products
+        seed (int): Random seed
+
+    Returns:
+        pd.DataFrame: Synthetic processed DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(ROOT / PROCESSED_DATA_PATH)
+    df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+
+    df['code'] = np.arange(10**12, 10**12 + n_rows)
+    for column in NUTRIENT_COLUMNS:
+        noise = rng.normal(1.0, 0.05, n_rows).clip(0.8, 1.2)
+        df[column] = (df[column] * noise).round(3)
+    return df
+
+def synthetic_products(n_products: int, seed: int = 0) -> list:
+    """
+    Build raw API-style product dictionaries, as returned by fetch_all_products.
+
+    About 1% of the products repeat an earlier barcode, so deduplication is
+    exercised.
+
+    Args:
+        n_products (int): Number of products
+        seed (int): Random seed
+
+    Returns:
+        list: Product dictionaries with REQUIRED_FIELDS
+    """
+    rng = np.random.default_rng(seed)
+    df = synthetic_dataset(n_products, seed)
+    codes = df['code'].astype(str).to_numpy()
+    repeats = rng.random(n_products) < 0.01
+    codes[repeats] = codes[rng.integers(0, n_products, repeats.sum())]
+
+    text_columns = ['product_name', 'brands', 'categories', 'ingredients_text', 'nutrition_grades', 'image_url']
+    records = df[text_columns].astype(object).where(df[text_columns].notna(), None).to_dict('records')
+    nutriments = df[NUTRIENT_COLUMNS].to_dict('records')
+    additives = df['additives_tags'].to_numpy()
+    allergens = df['allergens_tags'].to_numpy()
+
+    from src.etl import parse_tags
+    products = []
+    for i, record in enumerate(records):
+        record['code'] = codes[i]
+        record['nutriments'] = {k: v for k, v in nutriments[i].items() if v == v}
+        record['additives_tags'] = parse_tags(additives[i]) if isinstance(additives[i], str) else None
+        record['allergens_tags'] = parse_tags(allergens[i]) if isinstance(allergens[i], str) else None
+        products.append(record)
+    return products
@@ -5,6 +5,8 @@ Module for data analysis and insights generation.
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
+from .config import SCORING_PROFILES
+from .scoring import assign_grades, profile_column
 
 def get_summary_stats(df: pd.DataFrame) -> Dict:
     """
@@ -110,6 +112,56 @@ def get_healthiest_products(df: pd.DataFrame, n: int = 10) -> pd.DataFrame:
               'proteins_100g', 'sugars_100g', 'fat_100g', 'salt_100g']
     return df.nlargest(n, 'nutrient_score')[columns]
 
+def compare_scoring_profiles(df: pd.DataFrame, profiles: Dict[str, Dict] = SCORING_PROFILES) -> pd.DataFrame:
+    """
+    Summarize every scoring profile over the same products.
+    
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        profiles (Dict[str, Dict]): Scoring profiles, by name
+        
+    Returns:
+        pd.DataFrame: Coverage (% of products scored) and score distribution per profile
+    """
+    rows = []
+    for name, profile in profiles.items():
+        column = profile_column(name, profile)
+        if column not in df:
+            continue
+        scores = df[column]
+        rows.append({
+            'profile': name,
+            'description': profile.get('description', ''),
+            'coverage': round(scores.notna().mean() * 100, 1),
+            'mean': round(scores.mean(), 2),
+            'median': scores.median(),
+            'min': scores.min(),
+            'max': scores.max()
+        })
+    return pd.DataFrame(rows, columns=['profile', 'description', 'coverage', 'mean', 'median', 'min', 'max'])
+
+def get_grade_agreement(df: pd.DataFrame, profile_name: str = 'nutriscore',
+                        profiles: Dict[str, Dict] = SCORING_PROFILES) -> pd.DataFrame:
+    """
+    Cross-tabulate a profile's computed grades against the API's nutrition grades.
+    
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        profile_name (str): Profile with a ``grades`` definition
+        profiles (Dict[str, Dict]): Scoring profiles, by name
+        
+    Returns:
+        pd.DataFrame: Product counts, computed grade by API grade
+    """
+    profile = profiles[profile_name]
+    labels = profile['grades']['labels']
+    computed = assign_grades(df[profile_column(profile_name, profile)], profile)
+    graded = computed.notna() & df['nutrition_grades'].isin(labels)
+    return pd.crosstab(
+        computed[graded].rename('computed'),
+        df.loc[graded, 'nutrition_grades'].rename('api')
+    ).reindex(index=labels, columns=labels, fill_value=0)
+
 def get_additive_prevalence(df: pd.DataFrame, n: int = 10) -> pd.DataFrame:
     """
     Analyze most common additives.
@@ -0,0 +1,498 @@
+"""
+HTTP API serving the dashboard's insights as JSON.
+
+An ASGI (Starlette) application exposing the ``src/analysis.py`` functions
+with the dashboard's filters, product lookup by ``code``, product search and
+healthier alternatives. Run it with several worker processes, e.g.::
+
+    uvicorn src.api:create_app --factory --workers 4 --port 8000
+
+Every worker attaches to the shared dataset segment (``src/shared_data.py``)
+instead of loading its own copy, and builds the lookup and nutrient indexes
+once per dataset version. While the SQLite database (``src/query.py``) holds
+the attached version, the filtered endpoints run its SQL ports of the
+analysis functions, which push the filters and aggregations down and read
+only the matching rows (its additive prevalence counts each tag of a product
+separately). Until the database is rebuilt after a refresh, they read the
+matching rows from the zoned store (``src/zonemap.py``) when it holds the
+attached version, and run the analysis on them through the disk memo
+(``src/memo.py``), which the dashboard shares. Responses carry a weak ETag
+derived from the dataset version, so clients revalidate with
+``If-None-Match`` and get a 304 until the next refresh. Encoded (and
+gzipped) responses are kept in an LRU cache per version, so repeated
+queries skip both the analysis and the serialization.
+"""
+
+import asyncio
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+from .analysis import (
+    category_analysis,
+    get_additive_prevalence,
+    get_data_quality_metrics,
+    get_healthiest_products,
+    get_summary_stats,
+    top_brands,
+)
+from .config import (
+    API_CACHE_SIZE,
+    API_GZIP_MIN_SIZE,
+    API_VERSION_CHECK_INTERVAL,
+    DATABASE_PATH,
+    MEMO_PATH,
+    PROCESSED_DATA_PATH,
+    SHARED_DATA_DIR,
+    ZONED_DATA_PATH,
+)
+from .memo import get_memo
+from . import query
+from .query import build_database, connect, count_products, database_is_stale, database_version
+from .search import search_products
+from .shared_data import attach_dataset, current_version, publish_dataset, published_before
+from .similarity import NutrientIndex
+from .zonemap import load_filtered, write_zoned_store, zoned_store_is_stale, zoned_store_version
+
+class ApiError(Exception):
+    """A request the API rejects, with the HTTP status to answer."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+def _jsonable(value):
+    """Convert analysis results (DataFrames, numpy scalars, NaN) to plain JSON values."""
+    if isinstance(value, pd.DataFrame):
+        return [_jsonable(record) for record in value.to_dict('records')]
+    if isinstance(value, pd.Series):
+        return _jsonable(value.to_dict())
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return value
+
+def encode_json(data) -> bytes:
+    """Serialize a response body, with orjson when it is installed."""
+    data = _jsonable(data)
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class Dataset:
+    """
+    The attached dataset and the indexes built over it, per version.
+
+    Args:
+        df (pd.DataFrame): Shared, read-only product DataFrame
+        version (str): Dataset version
+    """
+
+    def __init__(self, df: pd.DataFrame, version: str):
+        self.df = df
+        self.version = version
+        self.etag = f'W/"{version}"'
+        codes = df['code'].astype(str)
+        # Row position by code; the first occurrence wins, like the ETL's deduplication
+        first = ~codes.duplicated().to_numpy()
+        self.positions: pd.Series = pd.Series(np.flatnonzero(first), index=pd.Index(codes.to_numpy()[first]))
+        self._nutrient_index: Optional[NutrientIndex] = None
+        self._lock = threading.Lock()
+
+    @property
+    def nutrient_index(self) -> NutrientIndex:
+        """Nutrient similarity index, built on first use."""
+        with self._lock:
+            if self._nutrient_index is None:
+                self._nutrient_index = NutrientIndex(self.df)
+            return self._nutrient_index
+
+class ResponseCache:
+    """LRU cache of encoded response bodies, keyed by version and request."""
+
+    def __init__(self, max_entries: int = API_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+class ApiState:
+    """Process-wide state: the current dataset, its database and zoned store, the response cache and the disk memo."""
+
+    def __init__(self, shared_dir: str = SHARED_DATA_DIR, db_path: str = DATABASE_PATH,
+                 memo_path: str = MEMO_PATH, zoned_path: str = ZONED_DATA_PATH):
+        self.shared_dir = shared_dir
+        self.db_path = db_path
+        self.zoned_path = zoned_path
+        self._zoned = (None, None)
+        self.dataset: Optional[Dataset] = None
+        self.cache = ResponseCache()
+        self.memo = get_memo(memo_path)
+        self.checked_at = 0.0
+        self._local = threading.local()
+        self._refreshing = threading.Lock()
+
+    def _due(self) -> bool:
+        return self.dataset is None or time.monotonic() - self.checked_at > API_VERSION_CHECK_INTERVAL
+
+    def refresh(self) -> Dataset:
+        """
+        Return the current dataset, re-attaching at most every API_VERSION_CHECK_INTERVAL.
+
+        Blocks on the version check and the attach, so the event loop calls
+        it through current(). While one thread re-attaches, the others keep
+        getting the attached dataset.
+        """
+        if not self._refreshing.acquire(blocking=self.dataset is None):
+            return self.dataset
+        try:
+            if self._due():
+                self.checked_at = time.monotonic()
+                version = current_version(self.shared_dir)
+                if version is None:
+                    raise ApiError("No dataset has been published yet", 503)
+                if self.dataset is None or version != self.dataset.version:
+                    df, version = attach_dataset(self.shared_dir)
+                    self.dataset = Dataset(df, version)
+            return self.dataset
+        finally:
+            self._refreshing.release()
+
+    async def current(self) -> Dataset:
+        """The current dataset, checked and re-attached in the thread pool when due."""
+        if not self._due():
+            return self.dataset
+        return await run_in_threadpool(self.refresh)
+
+    def connection(self):
+        """Read-only database connection of the calling thread, reopened after a rebuild."""
+        mtime = Path(self.db_path).stat().st_mtime
+        if getattr(self._local, 'mtime', None) != mtime:
+            self._local.conn = connect(self.db_path)
+            self._local.mtime = mtime
+            self._local.version = database_version(self._local.conn)
+        return self._local.conn
+
+    def database(self, dataset: Dataset):
+        """The calling thread's database connection if the database holds this dataset version, else None."""
+        try:
+            conn = self.connection()
+        except FileNotFoundError:
+            return None
+        return conn if self._local.version == dataset.version else None
+
+    def zoned_version(self) -> Optional[str]:
+        """Dataset version of the zoned store, read again after the store is rewritten."""
+        try:
+            mtime = Path(self.zoned_path).stat().st_mtime
+        except FileNotFoundError:
+            return None
+        if self._zoned[0] != mtime:
+            self._zoned = (mtime, zoned_store_version(self.zoned_path))
+        return self._zoned[1]
+
+    def filtered(self, dataset: Dataset, brands=(), categories=(), min_score=None, max_score=None) -> pd.DataFrame:
+        """
+        Apply the dashboard filters, reading the matching codes from the zoned store.
+
+        Rows keep their positions in the attached dataset, so results are
+        memoized under the same keys as the dashboard's. Without filters, or
+        while the store holds another version, the attached frame is filtered
+        in memory (filter_products).
+        """
+        filters = {'brands': brands, 'categories': categories, 'min_score': min_score, 'max_score': max_score}
+        scored = min_score is not None or max_score is not None
+        if not (brands or categories or scored) or self.zoned_version() != dataset.version:
+            return filter_products(dataset.df, **filters)
+        score_range = (-np.inf if min_score is None else min_score, np.inf if max_score is None else max_score)
+        matches, _ = load_filtered(self.zoned_path, brands, categories, score_range if scored else None,
+                                   columns=['code'])
+        indexer = dataset.positions.index.get_indexer(matches['code'].astype(str))
+        if (indexer < 0).any():
+            # The store was rewritten for a newer dataset during the read
+            return filter_products(dataset.df, **filters)
+        if len(indexer) == len(dataset.df):
+            return dataset.df
+        return dataset.df.take(np.sort(dataset.positions.to_numpy()[indexer]))
+
+def _database_version(db_path: str) -> Optional[str]:
+    conn = connect(db_path)
+    try:
+        return database_version(conn)
+    finally:
+        conn.close()
+
+def ensure_dataset(data_path: str = PROCESSED_DATA_PATH, shared_dir: str = SHARED_DATA_DIR,
+                   db_path: str = DATABASE_PATH, zoned_path: str = ZONED_DATA_PATH) -> None:
+    """Publish the processed data and build its database and zoned store if the dashboard has not yet."""
+    data_file = Path(data_path)
+    version = current_version(shared_dir)
+    if version is None or published_before(data_file, shared_dir):
+        version = publish_dataset(pd.read_csv(data_file), shared_dir)
+    if database_is_stale(data_file, db_path) or _database_version(db_path) != version:
+        build_database(pd.read_csv(data_file), db_path, version=version)
+    if zoned_store_is_stale(data_file, zoned_path) or zoned_store_version(zoned_path) != version:
+        write_zoned_store(pd.read_csv(data_file), zoned_path, version=version)
+
+# Request parsing
+
+def _list_param(request: Request, name: str) -> Tuple[str, ...]:
+    """Collect a list parameter given repeated and/or comma-separated."""
+    values = []
+    for raw in request.query_params.getlist(name):
+        values.extend(v.strip() for v in raw.split(',') if v.strip())
+    return tuple(sorted(set(values)))
+
+def _number_param(request: Request, name: str, default, cast=float, low=None, high=None):
+    raw = request.query_params.get(name)
+    if raw is None:
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ApiError(f"Parameter '{name}' must be a number")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ApiError(f"Parameter '{name}' must be between {low} and {high}")
+    return value
+
+def _filters(request: Request) -> Dict:
+    """Parse the dashboard filters shared by the analysis endpoints."""
+    return {
+        'brands': _list_param(request, 'brands'),
+        'categories': _list_param(request, 'categories'),
+        'min_score': _number_param(request, 'min_score', None),
+        'max_score': _number_param(request, 'max_score', None),
+    }
+
+def filter_products(df: pd.DataFrame, brands=(), categories=(), min_score=None, max_score=None) -> pd.DataFrame:
+    """
+    Apply the dashboard filters to the product DataFrame.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        brands: Brands to keep (all if empty)
+        categories: Categories to keep (all if empty)
+        min_score (Optional[float]): Lowest nutrient score to keep
+        max_score (Optional[float]): Highest nutrient score to keep
+
+    Returns:
+        pd.DataFrame: Matching products
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if brands:
+        mask &= df['brands'].isin(brands).to_numpy()
+    if categories:
+        mask &= df['categories'].isin(categories).to_numpy()
+    if min_score is not None:
+        mask &= (df['nutrient_score'] >= min_score).to_numpy()
+    if max_score is not None:
+        mask &= (df['nutrient_score'] <= max_score).to_numpy()
+    return df if mask.all() else df[mask]
+
+# Endpoint bodies; each runs in the thread pool on a cache miss
+
+def _sql_filters(brands=(), categories=(), min_score=None, max_score=None) -> Dict:
+    """The API filters in the form the ``src/query.py`` functions take."""
+    filters = {'brands': list(brands), 'categories': list(categories)}
+    if min_score is not None or max_score is not None:
+        filters['score_range'] = (-np.inf if min_score is None else min_score,
+                                  np.inf if max_score is None else max_score)
+    return filters
+
+def _analysis(func: Callable, sql_func: Callable, with_n: bool = False) -> Callable:
+    def compute(state: ApiState, dataset: Dataset, request: Request):
+        filters = _filters(request)
+        args = {}
+        if with_n:
+            args['n'] = _number_param(request, 'n', 10, int, 1, 1000)
+        key = (tuple(filters.values()), tuple(args.values()))
+
+        def run():
+            conn = state.database(dataset)
+            if conn is not None:
+                # Filters and aggregations run in SQLite, reading only the matching rows
+                sql_filters = _sql_filters(**filters)
+                if not count_products(conn, **sql_filters):
+                    raise ApiError("No products match the filters", 404)
+                return sql_func(conn, **args, **sql_filters)
+            subset = state.filtered(dataset, **filters)
+            if subset.empty:
+                raise ApiError("No products match the filters", 404)
+            return state.memo.call(func, subset, dataset=dataset.version, **args)
+        return key, run
+    return compute
+
+def _product(state: ApiState, dataset: Dataset, request: Request):
+    code = request.path_params['code']
+
+    def run():
+        position = dataset.positions.get(code)
+        if position is None:
+            raise ApiError(f"Product '{code}' not found", 404)
+        return dataset.df.iloc[position].to_dict()
+    return (code,), run
+
+def _alternatives(state: ApiState, dataset: Dataset, request: Request):
+    code = request.path_params['code']
+    k = _number_param(request, 'k', 5, int, 1, 100)
+    same_category = request.query_params.get('same_category', 'false').lower() in ('1', 'true', 'yes')
+
+    def run():
+        try:
+            return dataset.nutrient_index.healthier_alternatives(code, k=k, same_category=same_category)
+        except KeyError:
+            raise ApiError(f"Product '{code}' not found", 404)
+    return (code, k, same_category), run
+
+def _search(state: ApiState, dataset: Dataset, request: Request):
+    text = request.query_params.get('q', '').strip()
+    limit = _number_param(request, 'limit', 20, int, 1, 500)
+    if not text:
+        raise ApiError("Parameter 'q' is required")
+
+    def run():
+        return search_products(state.connection(), text, limit=limit)
+    return (text, limit), run
+
+ENDPOINTS = {
+    '/summary': _analysis(get_summary_stats, query.get_summary_stats),
+    '/brands': _analysis(top_brands, query.top_brands, with_n=True),
+    '/categories': _analysis(category_analysis, query.category_analysis),
+    '/healthiest': _analysis(get_healthiest_products, query.get_healthiest_products, with_n=True),
+    '/additives': _analysis(get_additive_prevalence, query.get_additive_prevalence, with_n=True),
+    '/quality': _analysis(get_data_quality_metrics, query.get_data_quality_metrics),
+    '/products/{code}': _product,
+    '/products/{code}/alternatives': _alternatives,
+    '/search': _search,
+}
+
+def _accepts_gzip(request: Request) -> bool:
+    """Whether Accept-Encoding allows gzip, directly or through '*', with a q-value above 0."""
+    qualities = {}
+    for coding in request.headers.get('accept-encoding', '').split(','):
+        name, *params = [part.strip() for part in coding.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    quality = qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0.0)))
+    return quality > 0
+
+def _respond(request: Request, body: bytes, gzipped: Optional[bytes], status: int, etag: str) -> Response:
+    headers = {'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if status == 200:
+        headers['ETag'] = etag
+    if gzipped is not None and _accepts_gzip(request):
+        headers['Content-Encoding'] = 'gzip'
+        body = gzipped
+    return Response(body, status_code=status, media_type='application/json', headers=headers)
+
+def _endpoint(path: str, compute: Callable) -> Callable:
+    async def handle(request: Request) -> Response:
+        state: ApiState = request.app.state.api
+        try:
+            dataset = await state.current()
+            # Invalid arguments get their 400 even from a client holding the current ETag
+            key, run = compute(state, dataset, request)
+            if_none_match = request.headers.get('if-none-match', '')
+            if if_none_match == '*' or dataset.etag in (tag.strip() for tag in if_none_match.split(',')):
+                return Response(status_code=304, headers={'ETag': dataset.etag})
+
+            cache_key = (dataset.version, path, key)
+            entry = state.cache.get(cache_key)
+            if entry is None:
+                try:
+                    body, status = encode_json(await run_in_threadpool(run)), 200
+                except ApiError as e:
+                    # Unknown codes and empty filter results are as cacheable as results
+                    body, status = encode_json({'error': str(e)}), e.status
+                gzipped = gzip.compress(body, 6) if len(body) >= API_GZIP_MIN_SIZE else None
+                entry = (body, gzipped, status)
+                state.cache.put(cache_key, entry)
+            return _respond(request, *entry, dataset.etag)
+        except ApiError as e:
+            return Response(encode_json({'error': str(e)}), status_code=e.status, media_type='application/json')
+    return handle
+
+async def health(request: Request) -> Response:
+    state: ApiState = request.app.state.api
+    dataset = state.dataset
+    return Response(encode_json({
+        'status': 'ok',
+        'version': dataset.version if dataset else None,
+        'products': len(dataset.df) if dataset else 0,
+        'cache': {'entries': len(state.cache.entries), 'hits': state.cache.hits, 'misses': state.cache.misses},
+        'memo': {'hits': state.memo.hits, 'misses': state.memo.misses},
+    }), media_type='application/json')
+
+def create_app(shared_dir: str = SHARED_DATA_DIR, db_path: str = DATABASE_PATH,
+               data_path: Optional[str] = PROCESSED_DATA_PATH) -> Starlette:
+    """
+    Build the API application.
+
+    Args:
+        shared_dir (str): Directory holding the shared dataset segments
+        db_path (str): Dataset database, used by search
+        data_path (Optional[str]): Processed CSV to publish at start-up if
+            nothing is published yet (None to only attach)
+
+    Returns:
+        Starlette: ASGI application
+    """
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        if data_path is not None:
+            await asyncio.to_thread(ensure_dataset, data_path, shared_dir, db_path)
+        app.state.api.refresh()
+        yield
+
+    routes = [Route('/health', health)]
+    routes += [Route(path, _endpoint(path, compute)) for path, compute in ENDPOINTS.items()]
+    app = Starlette(routes=routes, lifespan=lifespan)
+    app.state.api = ApiState(shared_dir, db_path)
+    return app
@@ -0,0 +1,354 @@
+"""
+Module for canonicalizing brand names.
+
+The same brand is written many ways ("Nestlé", "NESTLE India", "nestle").
+Brand strings are first reduced to a key: accents, case and punctuation are
+removed, legal and country suffixes (``BRAND_STOPWORDS``) are dropped and
+the remaining words are joined. Strings with equal keys are the same brand.
+
+Keys are then fuzzy-matched. Comparing every pair of keys would be
+quadratic, so candidates are blocked on two kinds of keys:
+
+- character 3-grams, with prefix filtering: the grams of a key are ordered
+  from rarest to most common, and two keys can only reach a Jaccard
+  similarity of ``threshold`` if they share one of the first
+  ``len - ceil(threshold * len) + 1`` grams;
+- single-character deletions, which keys one typo apart have in common.
+
+Only keys sharing a block are compared, and each key is compared with at
+most ``BRAND_MAX_BLOCK`` others per block, so the work grows linearly with
+the number of distinct brands.
+
+Matches are grouped around the most common key of each group, which becomes
+the canonical brand. It is named after the key's most common spelling
+without stopwords ("Nestle" over "NESTLE India"), or its most common
+spelling if every one has some. The alias map is kept in a CSV file
+(``BRAND_ALIASES_PATH``) that reviewers can read and edit: rows marked
+'manual' are never changed, and a run only matches keys not yet in the map,
+so new products extend it without moving existing brands.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import (
+    BRAND_ALIASES_PATH,
+    BRAND_CHUNK_SIZE,
+    BRAND_MAX_BLOCK,
+    BRAND_MIN_FUZZY_LENGTH,
+    BRAND_MIN_SUBSTITUTION_LENGTH,
+    BRAND_SIMILARITY,
+    BRAND_STOPWORDS,
+)
+from .dedup import normalize_text
+
+ALIAS_COLUMNS = ['alias', 'canonical', 'similarity', 'source']
+
+def brand_keys(brands: pd.Series) -> pd.Series:
+    """
+    Reduce brand strings to matching keys.
+
+    Args:
+        brands (pd.Series): Brand column
+
+    Returns:
+        pd.Series: Key per brand ('' where missing)
+    """
+    codes, uniques = pd.factorize(normalize_text(brands.str.replace("'", '', regex=False)))
+    keys = []
+    for text in uniques:
+        words = text.split()
+        kept = [w for w in words if w not in BRAND_STOPWORDS]
+        keys.append(''.join(kept or words))
+    return pd.Series(np.asarray(keys + [''], dtype=object)[codes], index=brands.index)
+
+def _grams(key: str) -> List[str]:
+    """Padded character 3-grams of a key."""
+    padded = f" {key} "
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+def _block_rows(blocks: np.ndarray, max_block: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pair up the rows sharing a block.
+
+    Each row is paired with the following rows of its block, up to
+    ``max_block`` apart, so an oversized block costs linear rather than
+    quadratic work.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Row positions of the pairs
+    """
+    order = np.argsort(blocks, kind='stable')
+    sorted_blocks = blocks[order]
+    first, second = [], []
+    for offset in range(1, max_block):
+        same = np.flatnonzero(sorted_blocks[offset:] == sorted_blocks[:-offset])
+        if not len(same):
+            break
+        first.append(order[same])
+        second.append(order[same + offset])
+    if not first:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(first), np.concatenate(second)
+
+def _gram_pairs(keys: List[str], threshold: float, max_block: int) -> pd.DataFrame:
+    """Pairs of keys whose 3-gram Jaccard similarity reaches the threshold."""
+    grams = [_grams(key) for key in keys]
+    sizes = np.array([len(g) for g in grams])
+    gram_ids, vocabulary = pd.factorize(pd.Series([g for key_grams in grams for g in key_grams]))
+    owners = np.repeat(np.arange(len(keys)), sizes)
+    frequency = np.bincount(gram_ids, minlength=len(vocabulary))
+
+    # Order each key's grams from rarest to most common and index its prefix
+    order = np.lexsort((gram_ids, frequency[gram_ids], owners))
+    owners, gram_ids = owners[order], gram_ids[order]
+    starts = np.cumsum(sizes) - sizes
+    rank = np.arange(len(owners)) - np.repeat(starts, sizes)
+    prefix = sizes - np.ceil(threshold * sizes).astype(int) + 1
+    fuzzy = np.array([len(key) >= BRAND_MIN_FUZZY_LENGTH for key in keys], dtype=bool)
+    indexed = np.flatnonzero((rank < prefix[owners]) & fuzzy[owners])
+
+    first, second = _block_rows(gram_ids[indexed], max_block)
+    left = np.minimum(owners[indexed][first], owners[indexed][second]).astype(np.int64)
+    right = np.maximum(owners[indexed][first], owners[indexed][second]).astype(np.int64)
+    codes = np.sort(left * len(keys) + right)
+    codes = codes[np.concatenate([[True], codes[1:] != codes[:-1]])] if len(codes) else codes
+    left, right = codes // len(keys), codes % len(keys)
+
+    # Sizes bound the Jaccard similarity; only the rest is computed exactly
+    keep = np.minimum(sizes[left], sizes[right]) >= threshold * np.maximum(sizes[left], sizes[right])
+    left, right = left[keep], right[keep]
+
+    # Shared grams: look up every gram of the left key among the right key's
+    # grams, a chunk of pairs at a time to bound memory
+    memberships = np.sort(owners.astype(np.int64) * len(vocabulary) + gram_ids)
+    shared = np.zeros(len(left), dtype=np.int64)
+    for chunk in range(0, len(left), BRAND_CHUNK_SIZE):
+        chunk_left, chunk_right = left[chunk:chunk + BRAND_CHUNK_SIZE], right[chunk:chunk + BRAND_CHUNK_SIZE]
+        counts = sizes[chunk_left]
+        pair_of = np.repeat(np.arange(len(chunk_left)), counts)
+        within = np.arange(len(pair_of)) - np.repeat(np.cumsum(counts) - counts, counts)
+        wanted = chunk_right[pair_of] * len(vocabulary) + gram_ids[starts[chunk_left][pair_of] + within]
+        # Sorted lookups walk the memberships in order, several times faster than random ones
+        order = np.argsort(wanted)
+        found = np.empty(len(wanted), dtype=bool)
+        found[order] = memberships[np.minimum(np.searchsorted(memberships, wanted[order]), len(memberships) - 1)] == wanted[order]
+        shared[chunk:chunk + BRAND_CHUNK_SIZE] = np.bincount(pair_of[found], minlength=len(chunk_left))
+    similarity = shared / (sizes[left] + sizes[right] - shared)
+    return pd.DataFrame({'left': left, 'right': right, 'similarity': similarity})
+
+def _typo_pairs(keys: List[str], max_block: int) -> pd.DataFrame:
+    """
+    Pairs of keys one typo apart, found through single-character deletions.
+
+    Two keys one insertion, deletion, substitution or transposition apart
+    share a key with one character deleted (or one is such a deletion of the
+    other), so blocking on the deletions finds them without comparing keys.
+    Substitutions in keys shorter than ``BRAND_MIN_SUBSTITUTION_LENGTH`` are
+    left out: they turn one short word into another ("candid", "candia")
+    more often than they are typos.
+    """
+    owners, positions, variants = [], [], []
+    for owner, key in enumerate(keys):
+        if len(key) < BRAND_MIN_FUZZY_LENGTH:
+            continue
+        owners.extend([owner] * (len(key) + 1))
+        positions.extend(range(-1, len(key)))
+        variants.append(key)
+        variants.extend(key[:p] + key[p + 1:] for p in range(len(key)))
+    owners, positions = np.asarray(owners, dtype=np.int64), np.asarray(positions)
+
+    first, second = _block_rows(pd.factorize(pd.Series(variants, dtype=object))[0], max_block)
+    keep = owners[first] != owners[second]
+    first, second = first[keep], second[keep]
+    # The same deletion, or a key equal to a deletion of the other, is one
+    # edit; deletions at adjacent positions are one if the letters swapped
+    one_edit = (positions[first] == -1) | (positions[second] == -1) | (positions[first] == positions[second])
+    adjacent = np.flatnonzero(np.abs(positions[first] - positions[second]) == 1)
+    one_edit[adjacent] = [
+        keys[a][p] == keys[b][q]
+        for a, b, p, q in zip(owners[first][adjacent], owners[second][adjacent],
+                              positions[first][adjacent], positions[second][adjacent])
+    ]
+    lengths = np.array([len(key) for key in keys])
+    substitution = (positions[first] == positions[second]) & (positions[first] >= 0)
+    one_edit &= ~(substitution & (lengths[owners[first]] < BRAND_MIN_SUBSTITUTION_LENGTH))
+    first, second = first[one_edit], second[one_edit]
+    left = np.minimum(owners[first], owners[second])
+    right = np.maximum(owners[first], owners[second])
+    similarity = 1 - 1 / np.maximum(lengths[left], lengths[right])
+    return pd.DataFrame({'left': left, 'right': right, 'similarity': similarity})
+
+def similar_keys(keys: List[str], threshold: float = BRAND_SIMILARITY,
+                 max_block: int = BRAND_MAX_BLOCK) -> pd.DataFrame:
+    """
+    Find pairs of similar brand keys.
+
+    The similarity of two keys is the larger of the Jaccard similarity of
+    their character 3-grams and, for keys one typo (insertion, deletion,
+    substitution or transposition) apart, ``1 - 1 / length``. Keys shorter
+    than ``BRAND_MIN_FUZZY_LENGTH`` are never matched, and keys shorter than
+    ``BRAND_MIN_SUBSTITUTION_LENGTH`` one substitution apart only match on
+    their 3-grams.
+
+    Args:
+        keys (List[str]): Distinct keys
+        threshold (float): Minimum similarity
+        max_block (int): Largest number of keys compared within one block
+
+    Returns:
+        pd.DataFrame: 'left', 'right' (positions in keys, left < right) and 'similarity'
+    """
+    pairs = pd.concat([_gram_pairs(keys, threshold, max_block), _typo_pairs(keys, max_block)])
+    pairs = pairs.groupby(['left', 'right'], as_index=False)['similarity'].max()
+    pairs = pairs[pairs['similarity'] >= threshold].reset_index(drop=True)
+    pairs['similarity'] = pairs['similarity'].round(3)
+    return pairs
+
+class BrandMap:
+    """
+    Persistent map of brand keys to canonical brand names.
+
+    Args:
+        aliases (Optional[pd.DataFrame]): Rows of ALIAS_COLUMNS; 'alias' is a
+            brand key and 'source' one of 'exact', 'fuzzy' or 'manual'
+    """
+
+    def __init__(self, aliases: Optional[pd.DataFrame] = None):
+        if aliases is None:
+            aliases = pd.DataFrame(columns=ALIAS_COLUMNS)
+        self.aliases = aliases[ALIAS_COLUMNS].drop_duplicates('alias', keep='last').reset_index(drop=True)
+
+    @classmethod
+    def load(cls, path: str = BRAND_ALIASES_PATH) -> 'BrandMap':
+        """Read a map, empty if the file does not exist."""
+        if not Path(path).exists():
+            return cls()
+        return cls(pd.read_csv(path, dtype={'alias': str, 'canonical': str, 'source': str},
+                               keep_default_na=False, na_values={'similarity': ['']}))
+
+    def save(self, path: str = BRAND_ALIASES_PATH) -> None:
+        """Write the map, sorted by canonical brand for review."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.aliases.sort_values(['canonical', 'source', 'alias']).to_csv(path, index=False, encoding='utf-8')
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def update(self, brands: pd.Series) -> int:
+        """
+        Add the keys of brands not yet in the map.
+
+        New keys are matched against each other and against the canonical
+        keys already in the map; existing entries never change. Each new key
+        joins the most similar canonical brand among its matches, or, without
+        a match, becomes a canonical brand named after its most common spelling,
+        preferring spellings without stopwords.
+
+        Args:
+            brands (pd.Series): Brand column
+
+        Returns:
+            int: Number of keys added
+        """
+        keys = brand_keys(brands)
+        present = keys.ne('').to_numpy()
+        counts = keys[present].value_counts()
+        new = counts.index[~counts.index.isin(self.aliases['alias'])]
+        if not len(new):
+            return 0
+
+        # Name of each new key: its most common spelling without stopwords,
+        # else its most common spelling
+        spellings = pd.DataFrame({'key': keys[present], 'brand': brands[present]})
+        spelling = spellings.groupby(['key', 'brand']).size().rename('count').reset_index()
+        spelling['stopwords'] = [
+            any(word in BRAND_STOPWORDS for word in text.split())
+            for text in normalize_text(spelling['brand'].str.replace("'", '', regex=False))
+        ]
+        spelling = spelling.sort_values(['stopwords', 'count'], ascending=[True, False], kind='stable')
+        spelling = spelling.drop_duplicates('key').set_index('key')['brand'].to_dict()
+
+        canonical_of = self._canonical_keys()
+        existing = list(canonical_of)
+        candidates = existing + list(new)
+        pairs = similar_keys(candidates)
+
+        # Both directions, most similar first
+        pairs = pd.DataFrame({
+            'key': np.concatenate([pairs['left'], pairs['right']]),
+            'other': np.concatenate([pairs['right'], pairs['left']]),
+            'similarity': np.concatenate([pairs['similarity'], pairs['similarity']]),
+        }).sort_values(['key', 'similarity', 'other'], ascending=[True, False, True])
+        neighbours: Dict[int, List[Tuple[float, int]]] = {}
+        for key, other, similarity in zip(pairs['key'].tolist(), pairs['other'].tolist(), pairs['similarity'].tolist()):
+            neighbours.setdefault(key, []).append((similarity, other))
+
+        # Existing canonical brands are centers; new keys join a center or become one
+        centers = {i: canonical_of[key] for i, key in enumerate(existing)}
+        rows = []
+        for position in range(len(existing), len(candidates)):
+            key = candidates[position]
+            match = next((m for m in neighbours.get(position, ()) if m[1] in centers), None)
+            if match is not None:
+                similarity, center = match
+                rows.append((key, centers[center], similarity, 'fuzzy'))
+            else:
+                centers[position] = spelling[key]
+                rows.append((key, spelling[key], 1.0, 'exact'))
+
+        added = pd.DataFrame(rows, columns=ALIAS_COLUMNS)
+        self.aliases = pd.concat([self.aliases, added], ignore_index=True) if len(self.aliases) else added
+        return len(added)
+
+    def _canonical_keys(self) -> Dict[str, str]:
+        """Key -> name of every canonical brand: the non-fuzzy rows whose name has the row's own key."""
+        rows = self.aliases[self.aliases['source'] != 'fuzzy']
+        own = brand_keys(rows['canonical']).to_numpy() == rows['alias'].to_numpy()
+        return dict(zip(rows['alias'][own], rows['canonical'][own]))
+
+    def apply(self, brands: pd.Series) -> pd.Series:
+        """
+        Replace brands by their canonical name.
+
+        Args:
+            brands (pd.Series): Brand column
+
+        Returns:
+            pd.Series: Canonical brands; brands whose key is not in the map
+            (or missing) are kept as they are
+        """
+        lookup = pd.Series(self.aliases['canonical'].to_numpy(), index=self.aliases['alias'].to_numpy())
+        keys = brand_keys(brands)
+        codes, uniques = pd.factorize(keys)
+        canonical = np.append(lookup.reindex(uniques).to_numpy(dtype=object), None)[codes]
+        return brands.where(pd.isna(canonical) | brands.isna(), pd.Series(canonical, index=brands.index))
+
+    def review(self) -> pd.DataFrame:
+        """
+        List the fuzzy matches for review, least similar first.
+
+        Returns:
+            pd.DataFrame: Alias rows whose source is 'fuzzy'
+        """
+        fuzzy = self.aliases[self.aliases['source'] == 'fuzzy']
+        return fuzzy.sort_values(['similarity', 'canonical']).reset_index(drop=True)
+
+def canonicalize_brands(brands: pd.Series, path: Optional[str] = BRAND_ALIASES_PATH) -> pd.Series:
+    """
+    Canonicalize a brand column, extending the stored alias map with new brands.
+
+    Args:
+        brands (pd.Series): Brand column
+        path (Optional[str]): Alias map file; None builds a throwaway map
+
+    Returns:
+        pd.Series: Canonical brands
+    """
+    brand_map = BrandMap.load(path) if path else BrandMap()
+    if brand_map.update(brands) and path:
+        brand_map.save(path)
+    return brand_map.apply(brands)
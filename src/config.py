@@ -2,10 +2,27 @@
 Configuration settings for the OpenFoodFacts India Dashboard.
 """
 
+import os
+
 # API Configuration
-BASE_URL = "https://world.openfoodfacts.org"
+BASE_URL = os.getenv("FOOD_DASHBOARD_API_URL", "https://world.openfoodfacts.org")  # point at scripts/stub_server.py to test faults
 COUNTRY = "india"
 PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes read per step while decoding a page
+
+# Fetch Job Settings
+FETCH_CHECKPOINT_DIR = "data/raw/checkpoints"
+FETCH_FAILURE_PATH = "data/raw/fetch_failure.json"  # last failed refresh, until a fetch succeeds
+FETCH_RETRY_AFTER = 3600  # seconds before a failed refresh is tried again
+FETCH_TIMEOUT = 60  # seconds per request
+FETCH_MAX_RETRIES = 6  # retries per page before the job fails
+FETCH_BACKOFF_BASE = 1.0  # seconds; doubled on each retry, with full jitter
+FETCH_BACKOFF_CAP = 60.0
+FETCH_INITIAL_RATE = 1.0  # requests per second
+FETCH_MIN_RATE = 0.05
+FETCH_MAX_RATE = 4.0
+FETCH_RATE_INCREASE = 0.1  # added to the rate after each successful page
+FETCH_RATE_DECREASE = 0.5  # rate multiplier after a 429 or 5xx response
 
 # Data Processing Settings
 REQUIRED_FIELDS = [
@@ -21,6 +38,106 @@ REQUIRED_FIELDS = [
     'image_url',
 ]
 
+# Nutrient columns extracted from the API's nutriments (per 100g/ml)
+NUTRIENT_COLUMNS = [
+    'energy_100g',
+    'proteins_100g',
+    'carbohydrates_100g',
+    'sugars_100g',
+    'fat_100g',
+    'saturated-fat_100g',
+    'salt_100g',
+    'fiber_100g',
+]
+
+# Parallel ETL Settings
+ETL_WORKERS = int(os.getenv("FOOD_DASHBOARD_ETL_WORKERS", "1"))
+ETL_PARTITIONS_PER_WORKER = 4
+ETL_MIN_PARTITION_SIZE = 5000  # smaller inputs are not worth the process start-up
+
+# Near-Duplicate Detection Settings
+DEDUP_COLUMNS = ['product_name', 'brands', 'ingredients_text']
+DEDUP_NUM_PERM = 64  # MinHash permutations per product
+DEDUP_BANDS = 16  # LSH bands of DEDUP_NUM_PERM // DEDUP_BANDS rows; candidates above ~(1/bands)^(rows/perm) similarity
+DEDUP_THRESHOLD = 0.7  # estimated Jaccard similarity of the token sets to count as duplicates
+DEDUP_CHUNK_SIZE = 100000  # products tokenized per step, bounding memory
+DEDUP_SEED = 42
+
+# Brand Canonicalization Settings
+BRAND_ALIASES_PATH = "data/processed/brand_aliases.csv"  # reviewed alias -> canonical map; 'manual' rows are kept
+BRAND_STOPWORDS = {'india', 'pvt', 'private', 'ltd', 'limited', 'inc', 'co', 'company', 'corp', 'corporation',
+                   'llp', 'plc', 'gmbh', 'the'}  # dropped from brand keys
+BRAND_SIMILARITY = 0.7  # 3-gram Jaccard or edit similarity to merge two brands
+BRAND_MIN_FUZZY_LENGTH = 5  # shorter keys only match exactly
+BRAND_MIN_SUBSTITUTION_LENGTH = 8  # shorter keys one substitution apart (candid, candia) must also share 3-grams
+BRAND_MAX_BLOCK = 10  # keys each key is compared with per block
+BRAND_CHUNK_SIZE = 500000  # candidate pairs verified per step, bounding memory
+
+# Co-occurrence Settings
+COOCCURRENCE_MIN_COUNT = 5  # products a tag pair must appear in; lift is noise below
+COOCCURRENCE_TOP_PAIRS = 20  # pairs drawn in the dashboard heatmaps
+
+# Validation Settings
+QUARANTINE_PATH = "data/processed/quarantine.csv"  # rows of the last refresh that failed validation, with reasons
+# Rules evaluated by src/validation.py before scoring; a failing row is
+# quarantined instead of loaded. Missing values never fail a rule. See
+# src/validation.py for the rule keys.
+VALIDATION_RULES = {
+    'not_numeric': {
+        'description': "A nutrient value is not a number",
+        'numeric': NUTRIENT_COLUMNS,
+    },
+    'negative': {
+        'description': "A nutrient value is negative",
+        'columns': NUTRIENT_COLUMNS, 'min': 0,
+    },
+    'over_100g': {
+        'description': "More than 100 g of a nutrient per 100 g",
+        'columns': [column for column in NUTRIENT_COLUMNS if column != 'energy_100g'], 'max': 100,
+    },
+    'energy_range': {
+        # Fat is 37 kJ per g, but labels converting 900 kcal print 3766 kJ
+        'description': "Energy above pure fat (3800 kJ per 100 g, with rounding)",
+        'columns': ['energy_100g'], 'max': 3800,
+    },
+    'sugars_over_carbohydrates': {
+        'description': "More sugars than carbohydrates",
+        'column': 'sugars_100g', 'at_most': 'carbohydrates_100g', 'slack': 0.5,
+    },
+    'saturated_over_fat': {
+        'description': "More saturated fat than fat",
+        'column': 'saturated-fat_100g', 'at_most': 'fat_100g', 'slack': 0.5,
+    },
+    'macro_sum': {
+        # Fiber is left out: many labels count it within carbohydrates
+        'description': "Fat, carbohydrates, proteins and salt add up to more than 100 g",
+        'sum': ['fat_100g', 'carbohydrates_100g', 'proteins_100g', 'salt_100g'], 'max': 105,
+    },
+    'energy_mismatch': {
+        # Atwater factors in kJ per g; a kcal figure stored as kJ fails too
+        'description': "Energy contradicts the fat, carbohydrate and protein content",
+        'column': 'energy_100g',
+        'estimate': {'fat_100g': 37, 'carbohydrates_100g': 17, 'proteins_100g': 17},
+        'tolerance': 0.3, 'slack': 170,
+    },
+}
+
+# Profiling Settings
+PROFILE_DIR = "data/profiles"  # collapsed-stack (.folded) profiles and their summaries
+PROFILE_ADMIN_TOKEN = os.getenv("FOOD_DASHBOARD_ADMIN_TOKEN")  # ?admin=<token> opens the profiler panel; unset disables it
+PROFILE_RERUNS = int(os.getenv("FOOD_DASHBOARD_PROFILE_RERUNS", "0"))  # reruns of every new session profiled on start
+PROFILE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_KEPT = 50  # saved profiles before the oldest are removed
+
+# Report Settings
+REPORT_DIR = "data/reports"  # static report packs, one directory per kind
+REPORT_MIN_PRODUCTS = 5  # brands/categories with fewer products get no report
+REPORT_GROUPS_PER_TASK = 25  # reports per process-pool task; amortizes task overhead
+
+# Category Taxonomy Settings
+TAXONOMY_PATH = os.getenv("FOOD_DASHBOARD_TAXONOMY", "data/taxonomies/categories.txt")  # Open Food Facts format; the full file works too
+TAXONOMY_SUNBURST_DEPTH = 3  # rings shown at once; click a segment to drill down
+
 # Nutrient Thresholds (per 100g/ml)
 NUTRIENT_THRESHOLDS = {
     'sugars_100g': {'low': 5, 'high': 22.5},
@@ -29,6 +146,140 @@ NUTRIENT_THRESHOLDS = {
     'proteins_100g': {'low': 8, 'high': 20},
 }
 
+# Scoring Profiles
+# Each profile is evaluated by src/scoring.py into its own column. A component
+# awards points[i] where i is the number of thresholds the (scaled) value
+# exceeds; a missing value awards points[0]. See src/scoring.py for the
+# 'required', 'drop', 'clamp' and 'grades' keys.
+SCORING_PROFILES = {
+    'default': {
+        'description': "Dashboard heuristic (0-10, higher is healthier)",
+        'column': 'nutrient_score',
+        'base': 5.0,
+        'components': [
+            {'name': 'proteins', 'column': 'proteins_100g',
+             'thresholds': [NUTRIENT_THRESHOLDS['proteins_100g']['low'], NUTRIENT_THRESHOLDS['proteins_100g']['high']],
+             'points': [0, 1, 2]},
+            {'name': 'fiber', 'column': 'fiber_100g', 'thresholds': [3.5], 'points': [0, 1]},
+            {'name': 'sugars', 'column': 'sugars_100g',
+             'thresholds': [NUTRIENT_THRESHOLDS['sugars_100g']['low'], NUTRIENT_THRESHOLDS['sugars_100g']['high']],
+             'points': [0, -1, -2]},
+            {'name': 'salt', 'column': 'salt_100g',
+             'thresholds': [NUTRIENT_THRESHOLDS['salt_100g']['low'], NUTRIENT_THRESHOLDS['salt_100g']['high']],
+             'points': [0, -1, -2]},
+            {'name': 'saturated_fat', 'column': 'saturated-fat_100g', 'thresholds': [5], 'points': [0, -1]},
+        ],
+        'clamp': [0, 10],
+        'higher_is_better': True,
+    },
+    'nutriscore': {
+        # Solid-food points table; the fruit/vegetable share is not in the
+        # dataset, so it never scores and never lifts the protein cap
+        'description': "Official Nutri-Score points (-15 to 40, lower is healthier)",
+        'base': 0.0,
+        'components': [
+            {'name': 'energy', 'column': 'energy_100g',
+             'thresholds': [335, 670, 1005, 1340, 1675, 2010, 2345, 2680, 3015, 3350],
+             'points': list(range(0, 11))},
+            {'name': 'sugars', 'column': 'sugars_100g',
+             'thresholds': [4.5, 9, 13.5, 18, 22.5, 27, 31, 36, 40, 45],
+             'points': list(range(0, 11))},
+            {'name': 'saturated_fat', 'column': 'saturated-fat_100g',
+             'thresholds': [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
+             'points': list(range(0, 11))},
+            {'name': 'sodium', 'column': 'salt_100g', 'scale': 400,  # salt g -> sodium mg
+             'thresholds': [90, 180, 270, 360, 450, 540, 630, 720, 810, 900],
+             'points': list(range(0, 11))},
+            {'name': 'fiber', 'column': 'fiber_100g',
+             'thresholds': [0.9, 1.9, 2.8, 3.7, 4.7],
+             'points': list(range(0, -6, -1))},
+            {'name': 'proteins', 'column': 'proteins_100g',
+             'thresholds': [1.6, 3.2, 4.8, 6.4, 8.0],
+             'points': list(range(0, -6, -1))},
+        ],
+        'required': ['energy_100g', 'sugars_100g', 'saturated-fat_100g', 'salt_100g'],
+        # Protein does not count once the negative points reach 11
+        'drop': [{'components': ['proteins'], 'when': ['energy', 'sugars', 'saturated_fat', 'sodium'], 'at_least': 11}],
+        'higher_is_better': False,
+        'grades': {'bounds': [-1, 2, 10, 18], 'labels': ['a', 'b', 'c', 'd', 'e']},
+    },
+    'diabetic_friendly': {
+        'description': "Sugar and carbohydrate load (0-10, higher is better)",
+        'base': 10.0,
+        'components': [
+            {'name': 'sugars', 'column': 'sugars_100g',
+             'thresholds': [2.5, 5, 10, 15, 22.5], 'points': [0, -1, -2, -4, -6, -8]},
+            {'name': 'carbohydrates', 'column': 'carbohydrates_100g',
+             'thresholds': [15, 30, 45, 60], 'points': [0, 0, -1, -2, -3]},
+            {'name': 'fiber', 'column': 'fiber_100g', 'thresholds': [3, 6], 'points': [0, 1, 2]},
+            {'name': 'saturated_fat', 'column': 'saturated-fat_100g', 'thresholds': [1.5, 5], 'points': [0, -1, -2]},
+        ],
+        'required': ['sugars_100g'],
+        'clamp': [0, 10],
+        'higher_is_better': True,
+    },
+    'low_sodium': {
+        'description': "Salt content (0-10, higher is better)",
+        'base': 10.0,
+        'components': [
+            {'name': 'salt', 'column': 'salt_100g',
+             'thresholds': [0.1, 0.3, 0.6, 1.5, 2.5], 'points': [0, -1, -3, -5, -7, -9]},
+        ],
+        'required': ['salt_100g'],
+        'clamp': [0, 10],
+        'higher_is_better': True,
+    },
+}
+
 # Cache Settings
 CACHE_EXPIRY = 3600  # 1 hour in seconds
-DATA_REFRESH_INTERVAL = 86400  # 24 hours in seconds 
\ No newline at end of file
+DATA_REFRESH_INTERVAL = 86400  # 24 hours in seconds 
+REFRESH_LOCK_PATH = "data/processed/.refresh.lock"  # held by the one process per host refreshing the data
+
+# Storage Settings
+PROCESSED_DATA_PATH = "data/processed/openfoodfacts_india.csv"
+DATABASE_PATH = "data/processed/openfoodfacts_india.db"
+ZONED_DATA_PATH = "data/processed/openfoodfacts_india.parquet"  # sorted by category and score, with zone maps
+ZONE_ROWS_PER_GROUP = 65536  # rows per Parquet row group, the unit a filtered read skips
+ZONE_SET_LIMIT = 4096  # distinct brands/categories kept per zone map; beyond, the group matches any value
+SHARED_DATA_DIR = os.getenv("FOOD_DASHBOARD_SHARED_DIR", "data/shared")  # point at /dev/shm for RAM-backed segments
+SHARED_SEGMENTS_KEPT = 2  # previous segments kept so attached workers can finish their rerun
+LAZY_COLUMNS = ['ingredients_text', 'image_url']  # published compressed beside the segment, read on first use
+LAZY_COMPRESSION = 'zstd'
+LAZY_BATCH_ROWS = 16384  # rows per compressed batch, the unit a partial read decompresses
+
+# API Settings
+API_CACHE_SIZE = 4096  # encoded responses kept per worker
+API_GZIP_MIN_SIZE = 1024  # bytes; smaller bodies are sent uncompressed
+API_VERSION_CHECK_INTERVAL = 2.0  # seconds between checks for a newly published dataset
+
+# Snapshot Settings
+SNAPSHOT_DIR = "data/snapshots"
+SNAPSHOT_BASE_EVERY = 30  # versions between full base snapshots
+SNAPSHOT_MAX_DELTA_SHARE = 0.5  # above this share of changed rows a base is cheaper than a delta
+
+# Memoization Settings
+MEMO_PATH = os.getenv("FOOD_DASHBOARD_MEMO_PATH", "data/cache/memo.db")  # one store shared by every process on the host
+MEMO_MAX_BYTES = 256 * 2**20  # compressed results kept before least-recently-used entries are evicted
+MEMO_COMPRESSION_LEVEL = 6  # zlib level of stored results
+MEMO_SCHEMA_VERSION = 1  # bump to drop stored results when something outside src/ changes them (e.g. a library upgrade)
+
+# Thumbnail Settings
+THUMBNAIL_DIR = os.getenv("FOOD_DASHBOARD_THUMBNAIL_DIR", "data/cache/thumbnails")  # content-addressed files and their index
+THUMBNAIL_SIZE = 96  # longest side in pixels
+THUMBNAIL_QUALITY = 80  # JPEG quality
+THUMBNAIL_MAX_BYTES = 64 * 2**20  # stored thumbnails before least-recently-used ones are evicted
+THUMBNAIL_MAX_SOURCE_BYTES = 10 * 2**20  # larger source images are skipped
+THUMBNAIL_CONCURRENCY = 8  # images fetched at once per process
+THUMBNAIL_TIMEOUT = 10  # seconds per image request
+THUMBNAIL_RETRY_AFTER = 6 * 3600  # seconds before a failed image is tried again
+THUMBNAIL_WAIT = 0.5  # seconds a rerun waits in total for the thumbnails of the rows its tables show
+THUMBNAIL_PREFETCH = 50  # top products of the current filters fetched ahead of the table
+
+# Cache Warm-up Settings
+ACCESS_LOG_PATH = os.getenv("FOOD_DASHBOARD_ACCESS_LOG", "data/cache/access_log.db")  # anonymous view counts per filter state
+ACCESS_LOG_WINDOW = 30 * 86400  # seconds of views that count towards popularity
+WARMUP_TOP_K = 20  # most viewed filter states warmed after each dataset swap
+WARMUP_MAX_SECONDS = 120  # time budget of a warm-up
+WARMUP_MAX_BYTES = 64 * 2**20  # compressed result bytes a warm-up may write to the memo store (not process memory)
+WARMUP_REPORT_PATH = "data/cache/warmup.json"  # report of the last warm-up
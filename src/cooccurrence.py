@@ -0,0 +1,199 @@
+"""
+Module for additive and allergen co-occurrence analysis.
+
+Products and their tags form a sparse 0/1 incidence matrix X (products x
+tags), assembled from ``additives_tags`` and ``allergens_tags``. The tag
+co-occurrence counts are then the sparse matrix product ``X.T @ X``, and the
+counts of additive/allergen pairs ``X_additives.T @ X_allergens``, so the
+cost depends on the number of tags present rather than on the number of
+pairs of products.
+
+For a pair of tags (a, b) seen in ``count`` products out of ``n``:
+
+- lift = count * n / (count_a * count_b), how much more often the tags
+  travel together than if they were independent (1 = independent);
+- jaccard = count / (count_a + count_b - count), the share of products
+  carrying either tag that carry both.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from scipy import sparse
+
+from .config import COOCCURRENCE_MIN_COUNT
+
+# Tag columns and the kind their tags are labelled with
+TAG_COLUMNS = {'additives_tags': 'additive', 'allergens_tags': 'allergen'}
+
+def _tag_lists(values: pd.Series) -> pa.ListArray:
+    """Tag lists of a column holding lists or their CSV repr ("['en:e322', 'en:e330']")."""
+    present = values.notna().to_numpy()
+    sample = values[present].iloc[0] if present.any() else None
+    if sample is None or isinstance(sample, str):
+        text = pa.array(values.astype(object).where(values.notna(), None), type=pa.large_string())
+        text = pc.replace_substring_regex(text, r"[\[\]']", '')
+        return pc.split_pattern(text, ', ')
+    return pa.array([list(v) if isinstance(v, (list, tuple, np.ndarray)) else None for v in values],
+                    type=pa.list_(pa.large_string()))
+
+class TagIncidence:
+    """
+    Sparse product x tag incidence matrix.
+
+    Args:
+        matrix (sparse.csr_matrix): 0/1 matrix of products x tags
+        tags (pd.DataFrame): One row per matrix column, with 'tag' and 'kind'
+        index (pd.Index): Product index labels of the matrix rows
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, tags: pd.DataFrame, index: pd.Index):
+        self.matrix = matrix
+        self.tags = tags
+        self.index = index
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Sequence[str] = tuple(TAG_COLUMNS)) -> 'TagIncidence':
+        """
+        Build the incidence matrix of a product DataFrame.
+
+        Args:
+            df (pd.DataFrame): Product DataFrame
+            columns (Sequence[str]): Tag columns (see TAG_COLUMNS)
+
+        Returns:
+            TagIncidence: Matrix with one row per product
+        """
+        rows, cols, tags, kinds = [], [], [], []
+        for column in columns:
+            if column not in df:
+                continue
+            lists = _tag_lists(df[column])
+            flat = pc.list_flatten(lists)
+            parents = pc.list_parent_indices(lists)
+            keep = pc.not_equal(flat, '')
+            flat, parents = flat.filter(keep), parents.filter(keep)
+            encoded = pc.dictionary_encode(flat)
+            # Columns in tag order, so pairs come out the same way for any subset
+            vocabulary = np.asarray(encoded.dictionary.to_pylist(), dtype=object)
+            order = np.argsort(vocabulary)
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            rows.append(parents.to_numpy().astype(np.int64))
+            cols.append(rank[encoded.indices.to_numpy()] + len(tags))
+            vocabulary = vocabulary[order].tolist()
+            tags.extend(vocabulary)
+            kinds.extend([TAG_COLUMNS.get(column, column)] * len(vocabulary))
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(df), len(tags))
+        )
+        # A tag repeated within a product counts once
+        matrix.sum_duplicates()
+        matrix.data[:] = 1
+        return cls(matrix, pd.DataFrame({'tag': tags, 'kind': kinds}), df.index)
+
+    def __repr__(self) -> str:
+        # Stable across processes, so calls taking a matrix can be memoized
+        return f"TagIncidence({self.matrix.shape[0]} products, {self.matrix.shape[1]} tags, {self.matrix.nnz} links)"
+
+    def select(self, index: pd.Index) -> 'TagIncidence':
+        """
+        Restrict the matrix to a subset of products.
+
+        Args:
+            index (pd.Index): Index labels of the products kept (e.g. a filtered view)
+
+        Returns:
+            TagIncidence: Matrix of those products
+        """
+        positions = self.index.get_indexer(index)
+        if (positions < 0).any():
+            raise KeyError("Products missing from the incidence matrix")
+        return TagIncidence(self.matrix[positions], self.tags, index)
+
+    def cooccurrence(self, left: str = 'additive', right: str = 'additive',
+                     min_count: int = COOCCURRENCE_MIN_COUNT) -> pd.DataFrame:
+        """
+        Count the products carrying each pair of tags.
+
+        Args:
+            left (str): Kind of the first tag ('additive' or 'allergen')
+            right (str): Kind of the second tag
+            min_count (int): Pairs seen in fewer products are dropped; lift
+                is noisy on a handful of products
+
+        Returns:
+            pd.DataFrame: 'tag_a', 'tag_b', 'count', 'count_a', 'count_b',
+            'lift' and 'jaccard', most frequent pairs first
+        """
+        a_columns = np.flatnonzero(self.tags['kind'].to_numpy() == left)
+        b_columns = np.flatnonzero(self.tags['kind'].to_numpy() == right)
+        a, b = self.matrix[:, a_columns], self.matrix[:, b_columns]
+        counts = (a.T @ b).tocoo()
+        i, j, count = counts.row, counts.col, counts.data
+        if left == right:
+            # The product is symmetric; keep each unordered pair once
+            keep = i < j
+            i, j, count = i[keep], j[keep], count[keep]
+        keep = count >= min_count
+        i, j, count = i[keep], j[keep], count[keep].astype(np.int64)
+
+        count_a = np.asarray(a.sum(axis=0)).ravel()[i].astype(np.int64)
+        count_b = np.asarray(b.sum(axis=0)).ravel()[j].astype(np.int64)
+        n = self.matrix.shape[0]
+        result = pd.DataFrame({
+            'tag_a': self.tags['tag'].to_numpy()[a_columns[i]],
+            'tag_b': self.tags['tag'].to_numpy()[b_columns[j]],
+            'count': count,
+            'count_a': count_a,
+            'count_b': count_b,
+            'lift': (count * n / (count_a * count_b)).round(2) if n else np.zeros(len(count)),
+            'jaccard': (count / (count_a + count_b - count)).round(3),
+        })
+        return result.sort_values(['count', 'lift', 'tag_a', 'tag_b'],
+                                  ascending=[False, False, True, True]).reset_index(drop=True)
+
+def tag_cooccurrence(df: pd.DataFrame, left: str = 'additive', right: str = 'additive',
+                     min_count: int = COOCCURRENCE_MIN_COUNT,
+                     incidence: Optional[TagIncidence] = None) -> pd.DataFrame:
+    """
+    Co-occurrence of tag pairs among a set of products.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame (any filtered subset)
+        left (str): Kind of the first tag ('additive' or 'allergen')
+        right (str): Kind of the second tag
+        min_count (int): Minimum number of products carrying a pair
+        incidence (Optional[TagIncidence]): Matrix of the full dataset to
+            select df's rows from, instead of parsing df's tags again
+
+    Returns:
+        pd.DataFrame: See TagIncidence.cooccurrence
+    """
+    matrix = incidence.select(df.index) if incidence is not None else TagIncidence.from_frame(df)
+    return matrix.cooccurrence(left, right, min_count)
+
+def cooccurrence_matrix(pairs: pd.DataFrame, n: int = 15, value: str = 'lift',
+                        symmetric: bool = False) -> pd.DataFrame:
+    """
+    Arrange the top pairs as a tag x tag matrix for a heatmap.
+
+    Args:
+        pairs (pd.DataFrame): Output of tag_cooccurrence
+        n (int): Pairs kept, most frequent first
+        value (str): Pair column shown ('count', 'lift' or 'jaccard')
+        symmetric (bool): Mirror the pairs (for pairs of tags of one kind)
+
+    Returns:
+        pd.DataFrame: tag_a x tag_b matrix, NaN where a pair is not among the top
+    """
+    top = pairs.head(n)
+    if symmetric:
+        top = pd.concat([top, top.rename(columns={'tag_a': 'tag_b', 'tag_b': 'tag_a'})])
+    return top.pivot(index='tag_a', columns='tag_b', values=value)
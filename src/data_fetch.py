@@ -1,23 +1,80 @@
 """
 Module for fetching data from the OpenFoodFacts API.
+
+A full refresh is a run of ``FetchJob``: every completed page is written to a
+checkpoint directory, so an interrupted run resumes from the first missing
+page. Failed requests are retried with jittered exponential backoff, and the
+request rate is adapted to the server (additive increase after each page,
+multiplicative decrease on 429/5xx, honoring ``Retry-After``). A page that
+still fails after all retries fails the job instead of ending it early.
 """
 
+import json
+import os
+import random
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
 import requests
 from tqdm import tqdm
-from typing import List, Dict, Optional
-from .config import BASE_URL, COUNTRY, PAGE_SIZE, REQUIRED_FIELDS
 
-def fetch_products(page: int = 1) -> List[Dict]:
+from .config import (
+    BASE_URL,
+    COUNTRY,
+    DATA_REFRESH_INTERVAL,
+    FETCH_BACKOFF_BASE,
+    FETCH_BACKOFF_CAP,
+    FETCH_CHECKPOINT_DIR,
+    FETCH_INITIAL_RATE,
+    FETCH_MAX_RATE,
+    FETCH_MAX_RETRIES,
+    FETCH_MIN_RATE,
+    FETCH_RATE_DECREASE,
+    FETCH_RATE_INCREASE,
+    FETCH_TIMEOUT,
+    NUTRIENT_COLUMNS,
+    PAGE_SIZE,
+    REQUIRED_FIELDS,
+    STREAM_CHUNK_SIZE,
+)
+from .json_stream import decode_products
+
+STATE_FILE = "state.json"
+
+class FetchError(Exception):
+    """A page could not be fetched, even after retrying."""
+
+def fetch_products(
+    page: int = 1,
+    session: Optional[requests.Session] = None,
+    base_url: str = BASE_URL,
+    timeout: float = FETCH_TIMEOUT
+) -> List[Dict]:
     """
     Fetch a single page of products from OpenFoodFacts API.
     
+    Only REQUIRED_FIELDS are requested, and the response body is decoded as
+    it streams in, keeping just those fields and the nutriments the ETL uses.
+    
     Args:
         page (int): Page number to fetch
+        session (Optional[requests.Session]): Session to reuse connections
+        base_url (str): API root URL
+        timeout (float): Connect and read timeout in seconds
         
     Returns:
-        List[Dict]: List of product dictionaries
+        List[Dict]: List of product dictionaries (empty past the last page)
+        
+    Raises:
+        requests.exceptions.RequestException: If the request fails
+        ValueError: If the response body is not a complete search response
     """
-    url = f"{BASE_URL}/cgi/search.pl"
+    url = f"{base_url}/cgi/search.pl"
     params = {
         'action': 'process',
         'tagtype_0': 'countries',
@@ -25,48 +82,351 @@ def fetch_products(page: int = 1) -> List[Dict]:
         'tag_0': COUNTRY,
         'page_size': PAGE_SIZE,
         'page': page,
+        'fields': ','.join(REQUIRED_FIELDS),
         'json': 1
     }
     
-    try:
-        response = requests.get(url, params=params)
+    http = session or requests
+    with http.get(url, params=params, stream=True, timeout=timeout) as response:
         response.raise_for_status()
-        data = response.json()
-        return data.get('products', [])
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching page {page}: {str(e)}")
-        return []
+        return decode_products(
+            response.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+            REQUIRED_FIELDS,
+            NUTRIENT_COLUMNS
+        )
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a ``Retry-After`` header, given either in seconds or as an HTTP date.
+
+    Args:
+        value (Optional[str]): Header value
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if absent or unparseable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, rng: random.Random,
+                  base: float = FETCH_BACKOFF_BASE, cap: float = FETCH_BACKOFF_CAP) -> float:
+    """
+    Delay before a retry: exponential backoff with full jitter.
+
+    Drawing the whole delay at random keeps clients that failed together
+    from retrying together.
+
+    Args:
+        attempt (int): Number of failed attempts so far (1 for the first retry)
+        rng (random.Random): Source of jitter
+        base (float): Delay scale in seconds
+        cap (float): Upper bound of the delay in seconds
+
+    Returns:
+        float: Seconds to wait
+    """
+    return rng.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+class AdaptiveRateLimiter:
+    """
+    Space requests out at an adaptive rate (AIMD).
+
+    The rate grows by a fixed step after each success and is cut by a factor
+    when the server signals overload; a ``Retry-After`` also holds back the
+    next request until it has passed.
+
+    Args:
+        rate (float): Initial requests per second
+        min_rate (float): Lower bound of the rate
+        max_rate (float): Upper bound of the rate
+        increase (float): Additive increase per success
+        decrease (float): Multiplicative decrease per overload signal
+        clock (Callable[[], float]): Monotonic clock
+        sleep (Callable[[float], None]): Sleep function
+    """
+
+    def __init__(
+        self,
+        rate: float = FETCH_INITIAL_RATE,
+        min_rate: float = FETCH_MIN_RATE,
+        max_rate: float = FETCH_MAX_RATE,
+        increase: float = FETCH_RATE_INCREASE,
+        decrease: float = FETCH_RATE_DECREASE,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.clock = clock
+        self.sleep = sleep
+        self.next_slot = clock()
+
+    def acquire(self) -> float:
+        """Wait for the next request slot and return the time waited."""
+        now = self.clock()
+        wait = self.next_slot - now
+        if wait > 0:
+            self.sleep(wait)
+        self.next_slot = max(now, self.next_slot) + 1.0 / self.rate
+        return max(wait, 0.0)
 
-def fetch_all_products(max_pages: int = 100) -> List[Dict]:
+    def on_success(self) -> None:
+        """Raise the rate after a successful request."""
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_overload(self, retry_after: Optional[float] = None) -> None:
+        """Cut the rate after a 429/5xx, and hold off until Retry-After has passed."""
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        if retry_after:
+            self.next_slot = max(self.next_slot, self.clock() + retry_after)
+
+class FetchStats:
+    """Per-request outcomes of a fetch job, with latency and error summaries."""
+
+    def __init__(self):
+        self.requests: List[Dict] = []
+        self.resumed_pages = 0
+
+    def record(self, page: int, attempt: int, latency: float, outcome: str,
+               status: Optional[int] = None, products: int = 0) -> None:
+        """Record one request; outcome is 'ok' or an error kind."""
+        self.requests.append({
+            'page': page,
+            'attempt': attempt,
+            'latency': latency,
+            'outcome': outcome,
+            'status': status,
+            'products': products
+        })
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return one row per request."""
+        return pd.DataFrame(self.requests, columns=['page', 'attempt', 'latency', 'outcome', 'status', 'products'])
+
+    def summary(self) -> Dict:
+        """
+        Summarize the job's requests.
+
+        Returns:
+            Dict: Page and request counts, errors by kind and latency
+            percentiles (seconds) of successful page requests
+        """
+        requests_df = self.to_frame()
+        ok = requests_df[requests_df['outcome'] == 'ok']
+        latency = ok['latency'].to_numpy()
+        return {
+            'pages_fetched': len(ok),
+            'pages_resumed': self.resumed_pages,
+            'requests': len(requests_df),
+            'retries': int((requests_df['attempt'] > 1).sum()),
+            'errors': requests_df.loc[requests_df['outcome'] != 'ok', 'outcome'].value_counts().to_dict(),
+            'latency_p50': float(np.percentile(latency, 50)) if len(latency) else None,
+            'latency_p95': float(np.percentile(latency, 95)) if len(latency) else None,
+            'latency_max': float(latency.max()) if len(latency) else None,
+        }
+
+class FetchJob:
+    """
+    Resumable fetch of all product pages.
+
+    Args:
+        max_pages (int): Maximum number of pages to fetch
+        checkpoint_dir (str): Directory holding the completed pages
+        base_url (str): API root URL
+        max_retries (int): Retries per page before the job fails
+        limiter (Optional[AdaptiveRateLimiter]): Request pacing
+        session (Optional[requests.Session]): HTTP session
+        max_checkpoint_age (float): Checkpoints older than this many seconds
+            are discarded rather than resumed
+        backoff_base (float): Retry delay scale in seconds
+        backoff_cap (float): Upper bound of a retry delay in seconds
+        sleep (Callable[[float], None]): Sleep function used for backoff
+        seed (Optional[int]): Seed of the backoff jitter
+    """
+
+    def __init__(
+        self,
+        max_pages: int = 100,
+        checkpoint_dir: str = FETCH_CHECKPOINT_DIR,
+        base_url: str = BASE_URL,
+        max_retries: int = FETCH_MAX_RETRIES,
+        limiter: Optional[AdaptiveRateLimiter] = None,
+        session: Optional[requests.Session] = None,
+        max_checkpoint_age: float = DATA_REFRESH_INTERVAL,
+        backoff_base: float = FETCH_BACKOFF_BASE,
+        backoff_cap: float = FETCH_BACKOFF_CAP,
+        sleep: Callable[[float], None] = time.sleep,
+        seed: Optional[int] = None
+    ):
+        self.max_pages = max_pages
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.limiter = limiter or AdaptiveRateLimiter(sleep=sleep)
+        self.session = session or requests.Session()
+        self.max_checkpoint_age = max_checkpoint_age
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+        self.rng = random.Random(seed)
+        self.stats = FetchStats()
+
+    def _signature(self) -> Dict:
+        """Request parameters a checkpoint is only valid for."""
+        return {'base_url': self.base_url, 'country': COUNTRY, 'page_size': PAGE_SIZE, 'fields': REQUIRED_FIELDS}
+
+    def _page_path(self, page: int) -> Path:
+        return self.checkpoint_dir / f"page_{page:05d}.json"
+
+    def _write_json(self, path: Path, data) -> None:
+        """Write a file atomically so a crash never leaves a partial page."""
+        fd, tmp_name = tempfile.mkstemp(dir=self.checkpoint_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_name, path)
+
+    def _prepare_checkpoint(self) -> None:
+        """Keep a resumable checkpoint, or start a fresh one."""
+        state_path = self.checkpoint_dir / STATE_FILE
+        try:
+            state = json.loads(state_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            state = None
+
+        if state is not None and (
+            state.get('signature') != self._signature() or
+            time.time() - state.get('created', 0) > self.max_checkpoint_age
+        ):
+            self.clear()
+            state = None
+
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        if state is None:
+            self._write_json(state_path, {'signature': self._signature(), 'created': time.time()})
+
+    def _load_page(self, page: int) -> Optional[List[Dict]]:
+        """Return a checkpointed page, or None if it has not been fetched."""
+        try:
+            return json.loads(self._page_path(page).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return None
+
+    def _fetch_page(self, page: int) -> List[Dict]:
+        """Fetch one page, retrying transient failures."""
+        for attempt in range(1, self.max_retries + 2):
+            self.limiter.acquire()
+            start = time.perf_counter()
+            retry_after = None
+            status = None
+            try:
+                products = fetch_products(page, self.session, self.base_url)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code
+                outcome = f"http_{status}"
+                if status != 429 and status < 500:
+                    self.stats.record(page, attempt, time.perf_counter() - start, outcome, status)
+                    raise FetchError(f"Page {page} failed with HTTP {status}") from e
+                retry_after = parse_retry_after(e.response.headers.get('Retry-After'))
+                self.limiter.on_overload(retry_after)
+                error = e
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                outcome = 'network'
+                error = e
+            except ValueError as e:
+                # Truncated or malformed body
+                outcome = 'decode'
+                error = e
+            else:
+                self.stats.record(page, attempt, time.perf_counter() - start, 'ok', 200, len(products))
+                self.limiter.on_success()
+                return products
+
+            self.stats.record(page, attempt, time.perf_counter() - start, outcome, status)
+            if attempt > self.max_retries:
+                raise FetchError(f"Page {page} failed after {attempt} attempts: {error}") from error
+            print(f"Error fetching page {page} (attempt {attempt}): {str(error)}")
+            # The limiter already holds back until Retry-After; back off on top of it
+            self.sleep(backoff_delay(attempt, self.rng, self.backoff_base, self.backoff_cap))
+
+    def run(self, progress: bool = True) -> List[Dict]:
+        """
+        Fetch every page, resuming from the checkpoint.
+
+        Args:
+            progress (bool): Show a progress bar
+
+        Returns:
+            List[Dict]: Combined list of all products
+
+        Raises:
+            FetchError: If a page fails after all retries; completed pages
+            stay checkpointed for the next run
+        """
+        self._prepare_checkpoint()
+        all_products = []
+
+        with tqdm(total=self.max_pages, desc="Fetching products", disable=not progress) as pbar:
+            for page in range(1, self.max_pages + 1):
+                products = self._load_page(page)
+                if products is None:
+                    products = self._fetch_page(page)
+                    self._write_json(self._page_path(page), products)
+                else:
+                    self.stats.resumed_pages += 1
+
+                # Only a successful empty page marks the end of the data
+                if not products:
+                    break
+
+                all_products.extend(products)
+                pbar.update(1)
+
+        return all_products
+
+    def clear(self) -> None:
+        """Delete the checkpoint."""
+        if self.checkpoint_dir.exists():
+            for path in self.checkpoint_dir.iterdir():
+                path.unlink()
+
+def fetch_all_products(max_pages: int = 100, checkpoint_dir: str = FETCH_CHECKPOINT_DIR) -> List[Dict]:
     """
     Fetch all products from OpenFoodFacts API up to max_pages.
     
+    Runs a resumable ``FetchJob`` and deletes its checkpoint once every page
+    has been fetched.
+    
     Args:
         max_pages (int): Maximum number of pages to fetch
+        checkpoint_dir (str): Directory holding the completed pages
         
     Returns:
         List[Dict]: Combined list of all products
+        
+    Raises:
+        FetchError: If a page fails after all retries
     """
-    all_products = []
+    job = FetchJob(max_pages=max_pages, checkpoint_dir=checkpoint_dir)
+    all_products = job.run()
+    job.clear()
     
-    with tqdm(total=max_pages, desc="Fetching products") as pbar:
-        for page in range(1, max_pages + 1):
-            products = fetch_products(page)
-            if not products:
-                break
-            
-            # Filter products to include only required fields
-            filtered_products = []
-            for product in products:
-                filtered_product = {
-                    field: product.get(field, None) 
-                    for field in REQUIRED_FIELDS
-                }
-                filtered_products.append(filtered_product)
-            
-            all_products.extend(filtered_products)
-            pbar.update(1)
-            
+    summary = job.stats.summary()
+    print(
+        f"Fetched {summary['pages_fetched']} pages ({summary['pages_resumed']} resumed) "
+        f"in {summary['requests']} requests; errors: {summary['errors'] or 'none'}"
+    )
     return all_products
 
 def fetch_product_by_code(barcode: str) -> Optional[Dict]:
@@ -82,11 +442,11 @@ def fetch_product_by_code(barcode: str) -> Optional[Dict]:
     url = f"{BASE_URL}/api/v0/product/{barcode}.json"
     
     try:
-        response = requests.get(url)
+        response = requests.get(url, timeout=FETCH_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         if data.get('status') == 1:
             return data.get('product')
         return None
     except requests.exceptions.RequestException:
-        return None 
\ No newline at end of file
+        return None
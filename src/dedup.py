@@ -0,0 +1,277 @@
+"""
+Module for detecting near-duplicate products with MinHash and LSH.
+
+The same product is often listed under several barcodes, with small
+differences in its name or ingredient list, so deduplicating by ``code``
+misses it. Each product is reduced to the set of normalized tokens of its
+``DEDUP_COLUMNS`` (tagged by column), and the set to a MinHash signature
+whose agreement estimates the Jaccard similarity of two sets.
+
+Signatures are split into LSH bands: products sharing all values of any band
+land in the same bucket. Each bucket member is only compared with the first
+and the previous member of its bucket, so the number of candidate pairs
+grows linearly with the number of products rather than quadratically.
+Candidates whose signatures agree on at least ``DEDUP_THRESHOLD`` of the
+values are linked, and linked products form a duplicate cluster.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .config import (
+    DEDUP_BANDS,
+    DEDUP_CHUNK_SIZE,
+    DEDUP_COLUMNS,
+    DEDUP_NUM_PERM,
+    DEDUP_SEED,
+    DEDUP_THRESHOLD,
+)
+
+# Signature value of products without tokens; never bucketed
+EMPTY = np.iinfo(np.uint32).max
+
+def _normalize(values: pd.Series) -> pa.Array:
+    """Arrow kernels of normalize_text; missing values stay null."""
+    text = pa.array(values.astype(object).where(values.notna(), None), type=pa.large_string())
+    text = pc.replace_substring_regex(pc.utf8_normalize(text, 'NFKD'), r'\p{Mn}', '')
+    text = pc.replace_substring_regex(pc.utf8_lower(text), '[^a-z0-9]+', ' ')
+    return pc.utf8_trim_whitespace(text)
+
+def normalize_text(values: pd.Series) -> pd.Series:
+    """
+    Lowercase text, strip accents and replace everything but letters and digits with spaces.
+
+    Args:
+        values (pd.Series): Text column
+
+    Returns:
+        pd.Series: Normalized text ('' where missing)
+    """
+    return pd.Series(pc.fill_null(_normalize(values), '').to_numpy(zero_copy_only=False), index=values.index)
+
+def _permutations(num_perm: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Coefficients of the multiply-shift hash functions ((a * x + b) mod 2**64) >> 32."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2**64, num_perm, dtype=np.uint64, endpoint=False) | np.uint64(1)
+    b = rng.integers(0, 2**64, num_perm, dtype=np.uint64, endpoint=False)
+    return a, b
+
+def _tokens(df: pd.DataFrame, columns) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Tokenize products.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Row position and vocabulary
+        id of every token, sorted by row position, and the 64-bit hash of
+        every vocabulary entry
+    """
+    positions, ids, vocabularies = [], [], []
+    size = 0
+    for salt, column in enumerate(columns):
+        if column not in df:
+            continue
+        tokens = pc.utf8_split_whitespace(_normalize(df[column]))
+        parents = pc.list_parent_indices(tokens)
+        flat = pc.list_flatten(tokens)
+        keep = pc.not_equal(flat, '')
+        flat, parents = flat.filter(keep), parents.filter(keep)
+        if not len(flat):
+            continue
+        # Hash each distinct token once; the column tag keeps a brand token
+        # from matching the same word in a name
+        encoded = pc.dictionary_encode(flat)
+        vocabulary = np.asarray(encoded.dictionary.to_pylist(), dtype=object)
+        vocabularies.append(pd.util.hash_array(vocabulary) ^ np.uint64(0x9E3779B97F4A7C15 * (salt + 1) % 2**64))
+        positions.append(parents.to_numpy())
+        ids.append(encoded.indices.to_numpy().astype(np.int64) + size)
+        size += len(vocabulary)
+    if not positions:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64)
+    positions = np.concatenate(positions)
+    ids = np.concatenate(ids)
+    order = np.argsort(positions, kind='stable')
+    return positions[order], ids[order], np.concatenate(vocabularies)
+
+def minhash_signatures(df: pd.DataFrame, columns=DEDUP_COLUMNS, num_perm: int = DEDUP_NUM_PERM,
+                       seed: int = DEDUP_SEED, chunk_size: int = DEDUP_CHUNK_SIZE) -> np.ndarray:
+    """
+    Compute the MinHash signature of every product.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        columns: Text columns whose tokens make up a product's set
+        num_perm (int): Signature length
+        seed (int): Seed of the hash functions; equal seeds give comparable signatures
+        chunk_size (int): Products tokenized per step
+
+    Returns:
+        np.ndarray: uint32 array of shape (len(df), num_perm); products
+        without any token get EMPTY in every position
+    """
+    a, b = _permutations(num_perm, seed)
+    signatures = np.full((len(df), num_perm), EMPTY, dtype=np.uint32)
+    for start in range(0, len(df), chunk_size):
+        positions, ids, vocabulary = _tokens(df.iloc[start:start + chunk_size], columns)
+        if not len(positions):
+            continue
+        rows, starts = np.unique(positions, return_index=True)
+        for i in range(num_perm):
+            # Permute the vocabulary, then take each product's minimum over its tokens
+            permuted = ((a[i] * vocabulary + b[i]) >> np.uint64(32)).astype(np.uint32)
+            signatures[start + rows, i] = np.minimum.reduceat(permuted[ids], starts)
+    return signatures
+
+def _band_keys(signatures: np.ndarray, band: int, rows_per_band: int) -> np.ndarray:
+    """Combine the values of one band into a single uint64 bucket key."""
+    key = np.zeros(len(signatures), dtype=np.uint64)
+    for column in range(band * rows_per_band, (band + 1) * rows_per_band):
+        key = key * np.uint64(1000003) + signatures[:, column].astype(np.uint64)
+    return key
+
+def candidate_pairs(signatures: np.ndarray, bands: int = DEDUP_BANDS) -> np.ndarray:
+    """
+    Find candidate pairs of products sharing an LSH bucket.
+
+    Args:
+        signatures (np.ndarray): MinHash signatures
+        bands (int): Number of bands; must divide the signature length
+
+    Returns:
+        np.ndarray: Unique (i, j) row position pairs with i < j
+    """
+    n, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError(f"{bands} bands do not divide {num_perm} permutations")
+    rows_per_band = num_perm // bands
+    valid = np.flatnonzero(signatures[:, 0] != EMPTY)
+
+    pairs = []
+    for band in range(bands):
+        keys = _band_keys(signatures[valid], band, rows_per_band)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        same = np.flatnonzero(sorted_keys[1:] == sorted_keys[:-1]) + 1
+        if not len(same):
+            continue
+        # First member of each bucket, carried forward over the bucket
+        is_start = np.ones(len(order), dtype=bool)
+        is_start[same] = False
+        first = np.maximum.accumulate(np.where(is_start, np.arange(len(order)), 0))
+        members = valid[order]
+        pairs.append(np.column_stack([members[first[same]], members[same]]))
+        pairs.append(np.column_stack([members[same - 1], members[same]]))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]].astype(np.int64)
+    # Deduplicate as sorted single int64 keys; much faster than a row-wise unique
+    keys = np.sort(pairs[:, 0] * n + pairs[:, 1])
+    keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+    return np.column_stack([keys // n, keys % n])
+
+def _connected_components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Label every node with the smallest node of its component."""
+    labels = np.arange(n)
+    if not len(pairs):
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        smallest = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, smallest)
+        np.minimum.at(updated, right, smallest)
+        # Pointer jumping: follow labels to their own labels until settled
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+def near_duplicate_clusters(df: pd.DataFrame, threshold: float = DEDUP_THRESHOLD,
+                            columns=DEDUP_COLUMNS, num_perm: int = DEDUP_NUM_PERM,
+                            bands: int = DEDUP_BANDS) -> pd.DataFrame:
+    """
+    Group near-duplicate products into clusters.
+
+    Only products with a value in the first of ``columns`` (the name) are
+    matched; a brand alone says nothing about the product. The
+    representative of a cluster is its most complete row (most filled-in
+    columns), the first one on ties.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        threshold (float): Estimated Jaccard similarity to link two products
+        columns: Text columns compared
+        num_perm (int): Signature length
+        bands (int): LSH bands
+
+    Returns:
+        pd.DataFrame: One row per product in a cluster of two or more, indexed
+        like df, with 'cluster' (index label of the representative), 'size',
+        'similarity' (estimated, to the representative) and 'representative'
+    """
+    signatures = minhash_signatures(df, columns, num_perm)
+    signatures[normalize_text(df[columns[0]]).eq('').to_numpy()] = EMPTY
+    pairs = candidate_pairs(signatures, bands)
+    if len(pairs):
+        agreement = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[agreement >= threshold]
+    labels = _connected_components(len(df), pairs)
+
+    sizes = np.bincount(labels, minlength=len(df))[labels]
+    clustered = np.flatnonzero(sizes > 1)
+    result = pd.DataFrame({
+        'label': labels[clustered],
+        'completeness': df.iloc[clustered].notna().sum(axis=1).to_numpy(),
+    }, index=clustered)
+    best = result.sort_values(['label', 'completeness'], ascending=[True, False], kind='stable')
+    representative = best.groupby('label').head(1)
+    representative_of = pd.Series(representative.index.to_numpy(), index=representative['label'].to_numpy())
+    rep_positions = representative_of.loc[result['label']].to_numpy()
+
+    return pd.DataFrame({
+        'cluster': df.index[rep_positions],
+        'size': sizes[clustered],
+        'similarity': (signatures[clustered] == signatures[rep_positions]).mean(axis=1).round(2),
+        'representative': clustered == rep_positions,
+    }, index=df.index[clustered])
+
+def duplicate_report(df: pd.DataFrame, clusters: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    List near-duplicate clusters for review, largest first.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        clusters (Optional[pd.DataFrame]): Output of near_duplicate_clusters,
+            computed if not given
+
+    Returns:
+        pd.DataFrame: Clustered products with code, name and brand
+    """
+    if clusters is None:
+        clusters = near_duplicate_clusters(df)
+    report = clusters.join(df[['code', 'product_name', 'brands', 'categories']])
+    return report.sort_values(['size', 'cluster', 'representative'], ascending=[False, True, False]).reset_index(drop=True)
+
+def collapse_near_duplicates(df: pd.DataFrame, clusters: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Keep only the representative of each near-duplicate cluster.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        clusters (Optional[pd.DataFrame]): Output of near_duplicate_clusters,
+            computed if not given
+
+    Returns:
+        pd.DataFrame: df without the non-representative duplicates
+    """
+    if clusters is None:
+        clusters = near_duplicate_clusters(df)
+    return df.drop(index=clusters.index[~clusters['representative']])
@@ -2,10 +2,30 @@
 Module for data extraction, transformation, and loading operations.
 """
 
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 import pandas as pd
 import numpy as np
-from typing import List, Dict
-from .config import NUTRIENT_THRESHOLDS
+from typing import List, Dict, Optional, Tuple
+from .brands import canonicalize_brands
+from .config import (
+    BRAND_ALIASES_PATH,
+    ETL_MIN_PARTITION_SIZE,
+    ETL_PARTITIONS_PER_WORKER,
+    NUTRIENT_COLUMNS,
+    QUARANTINE_PATH,
+    SCORING_PROFILES,
+)
+from .incremental_stats import read_stats, update_stats, write_stats
+from .taxonomy import load_taxonomy
+from .scoring import apply_profiles, profile_fingerprints, read_fingerprints, rescore, write_fingerprints
+from .validation import FLAGS_COLUMN, rule_columns, split_quarantine, validate, write_quarantine
+
+# Tag lists come back from CSV as their Python repr, e.g. "['en:e322', 'en:e330']"
+TAG_PATTERN = re.compile(r"'([^']*)'")
 
 def extract_nutriments(product: Dict) -> Dict:
     """
@@ -19,86 +39,74 @@ def extract_nutriments(product: Dict) -> Dict:
     """
     nutriments = product.get('nutriments', {})
     return {
-        'energy_100g': nutriments.get('energy_100g', np.nan),
-        'proteins_100g': nutriments.get('proteins_100g', np.nan),
-        'carbohydrates_100g': nutriments.get('carbohydrates_100g', np.nan),
-        'sugars_100g': nutriments.get('sugars_100g', np.nan),
-        'fat_100g': nutriments.get('fat_100g', np.nan),
-        'saturated-fat_100g': nutriments.get('saturated-fat_100g', np.nan),
-        'salt_100g': nutriments.get('salt_100g', np.nan),
-        'fiber_100g': nutriments.get('fiber_100g', np.nan)
+        column: nutriments.get(column, np.nan)
+        for column in NUTRIENT_COLUMNS
     }
 
-def compute_nutrient_score(row: pd.Series) -> float:
+def parse_tags(value) -> List[str]:
     """
-    Compute a simple nutrient score (0-10) based on nutrient values.
-    Higher score = healthier product.
+    Normalize a tags field to a list of tags.
     
     Args:
-        row (pd.Series): Row of product data
+        value: Tag list from the API, its string form from the CSV, or a missing value
         
     Returns:
-        float: Nutrient score
+        List[str]: Tags, empty if the field is missing
     """
-    score = 5.0  # Start with neutral score
-    
-    # Add points for healthy nutrients
-    if row['proteins_100g'] > NUTRIENT_THRESHOLDS['proteins_100g']['high']:
-        score += 2
-    elif row['proteins_100g'] > NUTRIENT_THRESHOLDS['proteins_100g']['low']:
-        score += 1
-        
-    if row['fiber_100g'] > 3.5:
-        score += 1
-        
-    # Subtract points for unhealthy nutrients
-    if row['sugars_100g'] > NUTRIENT_THRESHOLDS['sugars_100g']['high']:
-        score -= 2
-    elif row['sugars_100g'] > NUTRIENT_THRESHOLDS['sugars_100g']['low']:
-        score -= 1
-        
-    if row['salt_100g'] > NUTRIENT_THRESHOLDS['salt_100g']['high']:
-        score -= 2
-    elif row['salt_100g'] > NUTRIENT_THRESHOLDS['salt_100g']['low']:
-        score -= 1
-        
-    if row['saturated-fat_100g'] > 5:
-        score -= 1
-        
-    return max(0, min(10, score))  # Clamp between 0 and 10
+    if isinstance(value, str):
+        return TAG_PATTERN.findall(value)
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [str(tag) for tag in value]
 
-def products_to_df(products: List[Dict]) -> pd.DataFrame:
+def transform_products(products: List[Dict], offset: int = 0) -> pd.DataFrame:
     """
-    Convert list of product dictionaries to a pandas DataFrame with transformations.
+    Extract, clean and score a batch of product dictionaries.
     
     Args:
         products (List[Dict]): List of product dictionaries
+        offset (int): Position of the first product in the full product list,
+            used as the start of the row index
         
     Returns:
-        pd.DataFrame: Processed DataFrame
+        pd.DataFrame: Processed DataFrame, deduplicated by code within the batch,
+            with the validation flags of each row in FLAGS_COLUMN
     """
-    if not products:
-        return pd.DataFrame()
+    index = pd.RangeIndex(offset, offset + len(products))
     
     # Create base DataFrame
-    df = pd.DataFrame(products)
+    df = pd.DataFrame(products, index=index)
     
     # Extract nutriments into separate columns
     nutriments_df = pd.DataFrame([
         extract_nutriments(product) for product in products
-    ])
+    ], index=index)
     
     # Combine DataFrames
     df = pd.concat([df, nutriments_df], axis=1)
     
     # Clean and transform data
     df['brands'] = df['brands'].str.split(',').str[0]  # Take first brand only
+    # Resolve the full category list to its most specific taxonomy node
+    # before keeping only the first category
+    df['category_node'] = load_taxonomy().resolve(df['categories'])
     df['categories'] = df['categories'].str.split(',').str[0]  # Take first category
+    
+    # An all-missing batch keeps None here where a mixed one has NaN; use NaN
+    # so the result does not depend on how the products were partitioned
+    for column in ['brands', 'categories', 'category_node']:
+        df[column] = df[column].where(df[column].notna(), np.nan)
+    
     df['additives_count'] = df['additives_tags'].str.len()
     df['allergens_count'] = df['allergens_tags'].str.len()
     
-    # Compute nutrient score
-    df['nutrient_score'] = df.apply(compute_nutrient_score, axis=1)
+    # Convert the nutrients to numbers and flag rows breaking the validation
+    # rules; products_to_df quarantines them
+    df, flags = validate(df)
+    df[FLAGS_COLUMN] = flags
+    
+    # Compute nutrient_score and the other scoring profiles
+    df = apply_profiles(df)
     
     # Drop unnecessary columns and duplicates
     df = df.drop(['nutriments'], axis=1, errors='ignore')
@@ -106,12 +114,173 @@ def products_to_df(products: List[Dict]) -> pd.DataFrame:
     
     return df
 
-def save_processed_data(df: pd.DataFrame, filepath: str) -> None:
+def _transform_partition(partition: Tuple[List[Dict], int]) -> pd.DataFrame:
+    """Process-pool entry point for transform_products."""
+    products, offset = partition
+    return transform_products(products, offset)
+
+def products_to_df(products: List[Dict], workers: int = 1,
+                   brand_aliases: Optional[str] = BRAND_ALIASES_PATH,
+                   quarantine: Optional[str] = QUARANTINE_PATH) -> pd.DataFrame:
+    """
+    Convert list of product dictionaries to a pandas DataFrame with transformations.
+    
+    With more than one worker, the products are split into contiguous
+    partitions that are transformed in a process pool and merged in order,
+    keeping the first occurrence of each code. The result is identical to
+    the serial path.
+    
+    Rows failing the validation rules (see ``src/validation.py``) are left
+    out and written to the quarantine table with their reasons.
+    
+    Brands are then replaced by their canonical name (see ``src/brands.py``);
+    brands not yet in the alias map are matched and added to it.
+    
+    Args:
+        products (List[Dict]): List of product dictionaries
+        workers (int): Number of worker processes (1 runs in-process)
+        brand_aliases (Optional[str]): Brand alias map file; None keeps brands as they are
+        quarantine (Optional[str]): File receiving the rows that failed
+            validation; None drops them without writing them
+        
+    Returns:
+        pd.DataFrame: Processed DataFrame
+    """
+    if not products:
+        return pd.DataFrame()
+    
+    if workers <= 1 or len(products) < ETL_MIN_PARTITION_SIZE * 2:
+        df = transform_products(products)
+    else:
+        # Several partitions per worker keep the pool busy when partitions differ in cost
+        n_partitions = min(workers * ETL_PARTITIONS_PER_WORKER, len(products) // ETL_MIN_PARTITION_SIZE)
+        bounds = np.linspace(0, len(products), n_partitions + 1).astype(int)
+        partitions = [(products[start:end], start) for start, end in zip(bounds[:-1], bounds[1:])]
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_transform_partition, partitions))
+        
+        df = pd.concat(parts)
+        
+        # A partition where a column is entirely missing infers a different dtype
+        # than the full column would; re-infer those columns from their values
+        for column in df.columns:
+            if len({str(part[column].dtype) for part in parts if column in part}) > 1:
+                df[column] = pd.Series(df[column].tolist(), index=df.index)
+        
+        df = df.drop_duplicates(subset=['code'])
+    
+    df, quarantined = split_quarantine(df, df.pop(FLAGS_COLUMN).to_numpy())
+    if quarantine is not None:
+        write_quarantine(quarantined, quarantine)
+    
+    if brand_aliases is not None:
+        df['brands'] = canonicalize_brands(df['brands'], brand_aliases)
+    return df
+
+def save_processed_data(df: pd.DataFrame, filepath: str, profiles: Dict[str, Dict] = SCORING_PROFILES,
+                        previous: Optional[pd.DataFrame] = None) -> None:
     """
     Save processed DataFrame to CSV with proper encoding.
     
+    The fingerprints of the scoring profiles are saved alongside, so
+    ``rescore_processed_data`` knows which score columns are current, and so
+    are the dataset statistics (see ``src/incremental_stats.py``).
+    
     Args:
         df (pd.DataFrame): Processed DataFrame
         filepath (str): Path to save the CSV file
+        profiles (Dict[str, Dict]): Scoring profiles the score columns were computed with
+        previous (Optional[pd.DataFrame]): Dataset being replaced; if the stored
+            statistics describe it, they are updated with the changed rows only
+    """
+    # Written aside and moved into place, so readers never see a half-written file
+    target = Path(filepath)
+    fd, tmp_path = tempfile.mkstemp(suffix='.csv', dir=target.parent)
+    os.close(fd)
+    try:
+        df.to_csv(tmp_path, index=False, encoding='utf-8')
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, target)
+    write_fingerprints(filepath, list(df.columns), profiles)
+    write_stats(filepath, update_stats(read_stats(filepath), previous, df))
+
+def rescore_processed_data(filepath: str, profiles: Dict[str, Dict] = SCORING_PROFILES) -> List[str]:
+    """
+    Bring the score columns of a saved dataset up to date with the profiles.
+    
+    Only profiles whose definition changed since the data was saved are
+    evaluated again; nothing is fetched or transformed. If every profile is
+    current only the CSV header is read.
+    
+    Args:
+        filepath (str): Path of the processed CSV file
+        profiles (Dict[str, Dict]): Current scoring profiles
+        
+    Returns:
+        List[str]: Names of the rescored profiles
+    """
+    fingerprints = read_fingerprints(filepath)
+    # The header guards against a sidecar left over from another copy of the data
+    columns = pd.read_csv(filepath, nrows=0).columns
+    if fingerprints == profile_fingerprints(profiles) and set(fingerprints) <= set(columns):
+        return []
+    
+    previous = pd.read_csv(filepath)
+    df, rescored = rescore(previous, fingerprints, profiles)
+    save_processed_data(df, filepath, profiles, previous=previous)
+    return rescored 
+
+def revalidate_processed_data(filepath: str, quarantine: Optional[str] = QUARANTINE_PATH) -> int:
+    """
+    Quarantine the rows of a saved dataset that fail the current validation rules.
+    
+    Data saved before a rule was added or tightened still holds rows the
+    rule rejects. Only the columns the rules read are loaded unless some
+    row fails. Call it after ``rescore_processed_data``, since saving marks
+    the score columns current.
+    
+    Args:
+        filepath (str): Path of the processed CSV file
+        quarantine (Optional[str]): Quarantine table the failing rows are
+            added to; None drops them without writing them
+        
+    Returns:
+        int: Number of rows quarantined
+    """
+    header = pd.read_csv(filepath, nrows=0).columns
+    _, flags = validate(pd.read_csv(filepath, usecols=[c for c in rule_columns() if c in header]))
+    failed = int(np.count_nonzero(flags))
+    if failed:
+        previous = pd.read_csv(filepath)
+        df, quarantined = split_quarantine(previous, flags)
+        if quarantine is not None:
+            write_quarantine(quarantined, quarantine, append=True)
+        save_processed_data(df, filepath, previous=previous)
+    return failed
+
+def canonicalize_processed_data(filepath: str, brand_aliases: str = BRAND_ALIASES_PATH) -> int:
+    """
+    Bring the brands of a saved dataset up to date with the alias map.
+    
+    Data saved before brands were canonicalized, or before the map learned
+    some of its brands, keeps several spellings of one brand. Only the brand
+    column is read unless some brand changes. Call it after
+    ``rescore_processed_data``, since saving marks the score columns current.
+    
+    Args:
+        filepath (str): Path of the processed CSV file
+        brand_aliases (str): Brand alias map file, extended with new brands
+        
+    Returns:
+        int: Number of rows whose brand changed
     """
-    df.to_csv(filepath, index=False, encoding='utf-8') 
\ No newline at end of file
+    brands = pd.read_csv(filepath, usecols=['brands'])['brands']
+    canonical = canonicalize_brands(brands, brand_aliases)
+    changed = int((canonical != brands).where(brands.notna(), False).sum())
+    if changed:
+        previous = pd.read_csv(filepath)
+        save_processed_data(previous.assign(brands=canonical.to_numpy()), filepath, previous=previous)
+    return changed
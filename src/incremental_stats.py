@@ -0,0 +1,314 @@
+"""
+Module for statistics maintained incrementally as products change.
+
+``IncrementalStats`` holds the aggregates behind ``get_summary_stats`` and
+``get_data_quality_metrics``: row and non-null counts, sums and sums of
+squares of the numeric columns, and brand and category counts. Upserting or
+deleting products by ``code`` only touches the changed rows, and the stats
+answer both functions on the whole dataset without scanning it.
+
+Sums are kept as Neumaier-compensated pairs, and every batch is added as an
+exact ``math.fsum``, so removing rows does not accumulate rounding error
+over many refreshes. Counts, shares and completeness are exact integer
+arithmetic, so they match the analysis functions. Means are correctly
+rounded, while pandas sums in its own order, so the average nutrient score
+can differ from ``get_summary_stats`` when its last bit decides a rounding
+tie. Means per category hit such ties (one category of 400 in the shipped
+data), so ``category_analysis`` is always computed from the rows. The stats
+are saved next to the processed CSV as a JSON sidecar, together with an
+order-independent checksum of the row hashes that tells whether they
+describe a given DataFrame.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .snapshots import diff_by_code
+
+STATS_SUFFIX = ".stats.json"
+STATS_FORMAT = 2
+# Columns counted as "products with ..." by get_summary_stats
+POSITIVE_COLUMNS = ['allergens_count', 'additives_count']
+
+def _neumaier(total: float, compensation: float, value: float):
+    """Add value to a compensated sum; returns the new (total, compensation)."""
+    result = total + value
+    if abs(total) >= abs(value):
+        compensation += (total - result) + value
+    else:
+        compensation += (value - result) + total
+    return result, compensation
+
+def _accumulate(acc: List, values: np.ndarray, sign: int) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) values from an accumulator in place.
+
+    An accumulator is ``[count, sum, compensation]``, optionally followed by
+    ``[sum of squares, compensation]``.
+    """
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return
+    acc[0] += sign * len(values)
+    if acc[0] == 0:
+        # Back to empty: drop whatever rounding is left
+        for i in range(1, len(acc)):
+            acc[i] = 0.0
+        return
+    acc[1], acc[2] = _neumaier(acc[1], acc[2], sign * math.fsum(values))
+    if len(acc) == 5:
+        acc[3], acc[4] = _neumaier(acc[3], acc[4], sign * math.fsum(values * values))
+
+def _total(acc: List) -> float:
+    return acc[1] + acc[2]
+
+def _mean(acc: List) -> float:
+    return _total(acc) / acc[0] if acc[0] else np.nan
+
+def _numeric(rows: pd.DataFrame, column: str) -> np.ndarray:
+    return pd.to_numeric(rows[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+def stats_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash the part of every row the stats depend on.
+
+    That is the code, brand, category and numeric values, and whether the
+    other columns are filled in; long text such as ingredients is never
+    hashed, and numbers hash the same whether read as int or float.
+
+    Args:
+        df (pd.DataFrame): Processed DataFrame
+
+    Returns:
+        np.ndarray: uint64 hash per row, in row order
+    """
+    df = df.reset_index(drop=True)
+    # Arrow casts int codes (as read from CSV) to the strings fetched ones are
+    codes = df['code'].astype(str) if df['code'].dtype == object else df['code']
+    codes = pd.Series(pc.cast(pa.array(codes), pa.string()), dtype=pd.ArrowDtype(pa.string()))
+    parts = {'code': codes, 'brands': df['brands'], 'categories': df['categories']}
+    for column in df.columns:
+        if column in parts:
+            continue
+        if pd.api.types.is_numeric_dtype(df[column].dtype):
+            parts[column] = pd.Series(_numeric(df, column))
+        else:
+            parts[column] = df[column].notna()
+    return pd.util.hash_pandas_object(pd.DataFrame(parts), index=False).to_numpy()
+
+class IncrementalStats:
+    """
+    Aggregates of the processed dataset, updated as products change.
+
+    Build one with ``from_frame``; keep it current with ``upsert`` and
+    ``delete``, which take the previous rows of the affected codes so only
+    the changed rows are visited.
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        self.numeric_columns: List[str] = []
+        self.rows = 0
+        self.nonnull: Dict[str, int] = {column: 0 for column in self.columns}
+        self.distinct_codes = 0
+        self.positive: Dict[str, int] = {column: 0 for column in POSITIVE_COLUMNS}
+        self.brands: Dict[str, int] = {}
+        self.categories: Dict[str, int] = {}
+        self.moments: Dict[str, List] = {}
+        self.checksum = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'IncrementalStats':
+        """
+        Compute the stats of a DataFrame in one pass.
+
+        Args:
+            df (pd.DataFrame): Processed DataFrame
+
+        Returns:
+            IncrementalStats: Stats describing df
+        """
+        stats = cls(df.columns)
+        stats.numeric_columns = [
+            c for c in df.columns if c != 'code' and pd.api.types.is_numeric_dtype(df[c].dtype)
+        ]
+        stats.moments = {c: [0, 0.0, 0.0, 0.0, 0.0] for c in stats.numeric_columns}
+        stats._apply(df, 1)
+        return stats
+
+    def _apply(self, rows: pd.DataFrame, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) a batch of rows."""
+        if rows.empty:
+            return
+        rows = rows.reindex(columns=self.columns)
+        self.rows += sign * len(rows)
+        for column, count in rows.count().items():
+            self.nonnull[column] += sign * int(count)
+        # Upserts replace every row of a code, so codes come and go as a whole
+        self.distinct_codes += sign * rows['code'].nunique()
+        for column in POSITIVE_COLUMNS:
+            if column in rows:
+                self.positive[column] += sign * int((_numeric(rows, column) > 0).sum())
+        for column, counts in (('brands', self.brands), ('categories', self.categories)):
+            for value, count in rows[column].dropna().astype(str).value_counts().items():
+                remaining = counts.get(value, 0) + sign * int(count)
+                if remaining:
+                    counts[value] = remaining
+                else:
+                    counts.pop(value, None)
+        for column in self.numeric_columns:
+            _accumulate(self.moments[column], _numeric(rows, column), sign)
+        hashes = stats_hashes(rows)
+        self.checksum = (self.checksum + sign * int(hashes.sum(dtype='uint64'))) % (1 << 64)
+
+    def upsert(self, rows: pd.DataFrame, previous: Optional[pd.DataFrame] = None) -> None:
+        """
+        Insert or update products.
+
+        Args:
+            rows (pd.DataFrame): New rows of the products
+            previous (Optional[pd.DataFrame]): Current rows of the same codes,
+                if any exist
+        """
+        if previous is not None:
+            self._apply(previous, -1)
+        self._apply(rows, 1)
+
+    def delete(self, previous: pd.DataFrame) -> None:
+        """
+        Delete products.
+
+        Args:
+            previous (pd.DataFrame): Current rows of the deleted codes
+        """
+        self._apply(previous, -1)
+
+    def describes(self, df: pd.DataFrame, hashes: Optional[np.ndarray] = None) -> bool:
+        """Check that the stats were computed from exactly this DataFrame's rows."""
+        if list(df.columns) != self.columns or len(df) != self.rows:
+            return False
+        hashes = stats_hashes(df) if hashes is None else hashes
+        return int(hashes.sum(dtype='uint64')) == self.checksum
+
+    def mean(self, column: str) -> float:
+        """Mean of a numeric column, skipping missing values."""
+        return _mean(self.moments[column])
+
+    def std(self, column: str) -> float:
+        """Sample standard deviation of a numeric column, skipping missing values."""
+        count, total = self.moments[column][0], _total(self.moments[column])
+        if count < 2:
+            return np.nan
+        squares = self.moments[column][3] + self.moments[column][4]
+        return math.sqrt(max(squares - total * total / count, 0.0) / (count - 1))
+
+    def _completeness(self) -> float:
+        return round(pd.Series(self.nonnull, dtype='int64').mean() / self.rows * 100, 1)
+
+    def summary_stats(self) -> Dict:
+        """Same output as ``get_summary_stats`` on the whole dataset."""
+        return {
+            'total_products': self.rows,
+            'unique_brands': len(self.brands),
+            'unique_categories': len(self.categories),
+            'avg_nutrient_score': round(np.float64(self.mean('nutrient_score')), 2),
+            'data_completeness': self._completeness(),
+            'products_with_allergens': round(np.float64(self.positive['allergens_count'] / self.rows) * 100, 1),
+            'products_with_additives': round(np.float64(self.positive['additives_count'] / self.rows) * 100, 1)
+        }
+
+    def data_quality_metrics(self) -> Dict:
+        """Same output as ``get_data_quality_metrics`` on the whole dataset."""
+        nulls = pd.Series({column: self.rows - self.nonnull[column] for column in self.columns}, dtype='int64')
+        return {
+            'missing_values': (nulls / self.rows).round(3).to_dict(),
+            'completeness_score': self._completeness(),
+            'duplicate_products': self.rows - self.distinct_codes,
+            'products_with_images': round(np.float64(self.nonnull['image_url'] / self.rows) * 100, 1)
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'format': STATS_FORMAT,
+            'columns': self.columns,
+            'numeric_columns': self.numeric_columns,
+            'rows': self.rows,
+            'nonnull': self.nonnull,
+            'distinct_codes': self.distinct_codes,
+            'positive': self.positive,
+            'brands': self.brands,
+            'categories': self.categories,
+            'moments': self.moments,
+            'checksum': str(self.checksum),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'IncrementalStats':
+        if data.get('format') != STATS_FORMAT:
+            raise ValueError(f"Unsupported stats format: {data.get('format')}")
+        stats = cls(data['columns'])
+        for name in ('numeric_columns', 'rows', 'nonnull', 'distinct_codes', 'positive',
+                     'brands', 'categories', 'moments'):
+            setattr(stats, name, data[name])
+        stats.checksum = int(data['checksum'])
+        return stats
+
+def stats_path(data_path) -> Path:
+    """Return the stats sidecar of a processed data file."""
+    data_path = Path(data_path)
+    return data_path.with_name(data_path.stem + STATS_SUFFIX)
+
+def read_stats(data_path) -> Optional[IncrementalStats]:
+    """
+    Read the stats stored next to a processed data file.
+
+    Args:
+        data_path: Processed data file
+
+    Returns:
+        Optional[IncrementalStats]: Stored stats, or None if there are none
+    """
+    try:
+        return IncrementalStats.from_dict(json.loads(stats_path(data_path).read_text(encoding='utf-8')))
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+def write_stats(data_path, stats: IncrementalStats) -> None:
+    """Store stats next to a processed data file."""
+    stats_path(data_path).write_text(json.dumps(stats.to_dict()), encoding='utf-8')
+
+def update_stats(stats: Optional[IncrementalStats], previous: Optional[pd.DataFrame],
+                 current: pd.DataFrame) -> IncrementalStats:
+    """
+    Bring stats from one version of the dataset to the next.
+
+    Only the rows that changed between the versions are visited. Stats that
+    do not describe ``previous`` (or a change of columns) are rebuilt from
+    ``current``.
+
+    Args:
+        stats (Optional[IncrementalStats]): Stats of the previous version
+        previous (Optional[pd.DataFrame]): Previous version
+        current (pd.DataFrame): New version
+
+    Returns:
+        IncrementalStats: Stats of the new version
+    """
+    if stats is None or previous is None or list(current.columns) != stats.columns:
+        return IncrementalStats.from_frame(current)
+    hashes = stats_hashes(previous)
+    if not stats.describes(previous, hashes):
+        return IncrementalStats.from_frame(current)
+    try:
+        old_rows, new_rows = diff_by_code(previous, current, hashes, stats_hashes(current))
+    except ValueError:
+        return IncrementalStats.from_frame(current)
+    stats.upsert(current.iloc[new_rows], previous.iloc[old_rows])
+    return stats
@@ -0,0 +1,169 @@
+"""
+Module for decoding OpenFoodFacts search responses field by field.
+
+A search page holds up to 1000 products with hundreds of fields each, but
+the ETL only keeps ``REQUIRED_FIELDS`` and a handful of nutriments. Instead
+of decoding the whole body and then discarding most of it, the decoder here
+walks the response stream, decodes one product at a time and keeps only the
+projected fields, so at most one full product is alive at any moment.
+"""
+
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+WHITESPACE = ' \t\n\r'
+
+def project_product(product: Dict, fields: List[str], nutriment_keys: List[str]) -> Dict:
+    """
+    Keep only the required fields of a product and the needed nutriments.
+
+    Args:
+        product (Dict): Full product dictionary
+        fields (List[str]): Fields to keep
+        nutriment_keys (List[str]): Keys to keep inside ``nutriments``
+
+    Returns:
+        Dict: Projected product
+    """
+    projected = {field: product.get(field, None) for field in fields}
+    nutriments = projected.get('nutriments')
+    if isinstance(nutriments, dict):
+        projected['nutriments'] = {k: nutriments[k] for k in nutriment_keys if k in nutriments}
+    return projected
+
+class _StreamReader:
+    """Text buffer over a byte-chunk iterator, refilled on demand."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self) -> bool:
+        """Append the next chunk to the buffer; False once the stream is done."""
+        if self.exhausted:
+            return False
+        # Drop consumed text so the buffer never holds more than one partial value
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        for chunk in self.chunks:
+            if chunk:
+                self.buffer += self.text_decoder.decode(chunk)
+                return True
+        self.buffer += self.text_decoder.decode(b'', final=True)
+        self.exhausted = True
+        return False
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def expect(self, char: str) -> None:
+        """Consume the given structural character."""
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, got '{self.buffer[self.pos]}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """
+        Decode the next JSON value, reading more of the stream as needed.
+
+        A value ending exactly at the end of the buffer is re-read once more
+        data arrives, since a number such as ``12`` may continue as ``123``.
+        """
+        self.peek()
+        while True:
+            try:
+                result, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return result
+
+def iter_products(chunks: Iterable[bytes], key: str = 'products') -> Iterator[Dict]:
+    """
+    Yield the items of a top-level array one by one from a JSON byte stream.
+
+    Other top-level values are decoded and discarded as they stream past.
+
+    Args:
+        chunks (Iterable[bytes]): Response body chunks
+        key (str): Top-level key of the array
+
+    Returns:
+        Iterator[Dict]: Array items in order
+    """
+    reader = _StreamReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() != ']':
+                while True:
+                    yield reader.value()
+                    if reader.peek() == ',':
+                        reader.expect(',')
+                        continue
+                    break
+            reader.expect(']')
+        else:
+            reader.value()
+        if reader.peek() == ',':
+            reader.expect(',')
+            continue
+        reader.expect('}')
+        return
+
+def decode_products(
+    chunks: Iterable[bytes],
+    fields: List[str],
+    nutriment_keys: List[str],
+    backend: str = 'stream'
+) -> List[Dict]:
+    """
+    Decode the products of a search response, keeping only projected fields.
+
+    Args:
+        chunks (Iterable[bytes]): Response body chunks
+        fields (List[str]): Product fields to keep
+        nutriment_keys (List[str]): Keys to keep inside ``nutriments``
+        backend (str): ``'stream'`` for the incremental decoder, or
+            ``'orjson'`` to decode the whole body at once with orjson (faster
+            on some builds, but holds the full page in memory)
+
+    Returns:
+        List[Dict]: Projected products
+    """
+    if backend == 'orjson':
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        products = orjson.loads(b''.join(chunks)).get('products', [])
+    elif backend == 'stream':
+        products = iter_products(chunks)
+    else:
+        raise ValueError(f"Unknown JSON backend '{backend}'")
+
+    return [project_product(product, fields, nutriment_keys) for product in products]
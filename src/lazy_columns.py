@@ -0,0 +1,224 @@
+"""
+Module for heavy text columns kept compressed out of line until first read.
+
+``ingredients_text`` and ``image_url`` are the largest columns of the
+dataset, yet the default dashboard view only asks whether they are filled
+in. ``publish_dataset`` therefore writes each column of ``LAZY_COLUMNS`` to
+its own zstd-compressed Arrow IPC file beside the segment, in batches of
+``LAZY_BATCH_ROWS`` rows. The segment keeps only a presence flag per row in
+their place.
+
+When a worker attaches the segment, those columns become ``LazyArrowArray``
+columns with the usual ``ArrowDtype`` string dtype. Null checks (``isna``,
+``count``, the stats hashes and the data-quality metrics) are answered from
+the presence flags. Filtering, reindexing and row selection only compose row
+positions. The values are decompressed the first time something reads them,
+and only from the batches holding the selected rows, so showing the
+thumbnails of ten products reads ten batches of one column at most.
+"""
+
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.indexers import check_array_indexer
+from pandas.arrays import ArrowExtensionArray
+from pandas.core.indexers import validate_indices
+
+from .config import LAZY_BATCH_ROWS, LAZY_COMPRESSION
+
+BATCH_ROWS_KEY = b'batch_rows'
+# Field metadata marking a segment column whose values live in a sidecar file
+LAZY_FIELD_KEY = b'lazy'
+
+def write_lazy_column(values: pa.Array, path: Path, batch_rows: int = LAZY_BATCH_ROWS) -> None:
+    """
+    Write one column as a compressed Arrow IPC file of fixed-size batches.
+
+    Args:
+        values (pa.Array): Column values
+        path (Path): Target file
+        batch_rows (int): Rows per compressed batch
+    """
+    schema = pa.schema([pa.field('values', values.type)], metadata={BATCH_ROWS_KEY: str(batch_rows).encode()})
+    table = pa.Table.from_arrays([values], schema=schema)
+    options = pa.ipc.IpcWriteOptions(compression=LAZY_COMPRESSION)
+    with pa.OSFile(str(path), 'wb') as sink:
+        with pa.ipc.new_file(sink, schema, options=options) as writer:
+            writer.write_table(table, max_chunksize=batch_rows)
+
+class LazyColumn:
+    """
+    One sidecar column of a segment, with the presence flag of each row.
+
+    Args:
+        path (Path): Sidecar file written by write_lazy_column
+        present (np.ndarray): Boolean flag per row, False where the value is null
+    """
+
+    def __init__(self, path: Path, present: np.ndarray):
+        self.path = Path(path)
+        self.present = present
+        self._reader = pa.ipc.open_file(pa.memory_map(str(self.path), 'r'))
+        self.type = self._reader.schema.field(0).type
+        self.batch_rows = int(self._reader.schema.metadata[BATCH_ROWS_KEY])
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.present)
+
+    def _batches(self, batches: np.ndarray) -> pa.Array:
+        """Decompress some batches and concatenate them."""
+        with self._lock:
+            chunks = [self._reader.get_batch(int(b)).column(0) for b in batches]
+        return pa.concat_arrays(chunks) if chunks else pa.array([], type=self.type)
+
+    def read(self, positions: Optional[np.ndarray] = None) -> pa.ChunkedArray:
+        """
+        Values at some rows, decompressing only the batches that hold them.
+
+        Args:
+            positions (Optional[np.ndarray]): Row positions, -1 for a missing
+                row (None for the whole column)
+
+        Returns:
+            pa.ChunkedArray: Values in positions order
+        """
+        if positions is None:
+            with self._lock:
+                return self._reader.read_all().column(0)
+
+        # Rows known to be null need no batch at all
+        wanted = positions >= 0
+        wanted[wanted] = self.present[positions[wanted]]
+        batches = np.unique(positions[wanted] // self.batch_rows)
+        values = self._batches(batches)
+
+        # Position of each wanted row within the concatenated batches
+        starts = np.zeros(len(batches), dtype=np.int64)
+        if len(batches) > 1:
+            sizes = np.minimum(self.batch_rows, len(self) - batches[:-1] * self.batch_rows)
+            starts[1:] = np.cumsum(sizes)
+        local = np.zeros(len(positions), dtype=np.int64)
+        rows = positions[wanted]
+        local[wanted] = starts[np.searchsorted(batches, rows // self.batch_rows)] + rows % self.batch_rows
+        return pa.chunked_array([values.take(pa.array(local, mask=~wanted))], type=self.type)
+
+class LazyArrowArray(ArrowExtensionArray):
+    """
+    Arrow string array of a lazy column, read from its sidecar on first use.
+
+    Until then the array holds only row positions into the column (None for
+    all of it). ``take`` and boolean or positional selection return a new
+    lazy array, and ``isna`` reads the presence flags. Any other operation
+    reads the values once through the inherited ``ArrowExtensionArray``
+    code, and results of operations are plain Arrow arrays.
+    """
+
+    _column: Optional[LazyColumn] = None
+    _positions: Optional[np.ndarray] = None
+
+    def _position_dtype(self) -> type:
+        return np.int32 if len(self._column) < 2**31 else np.int64
+
+    @classmethod
+    def from_column(cls, column: LazyColumn, positions: Optional[np.ndarray] = None) -> 'LazyArrowArray':
+        """Lazy array of some rows of a column (all of them by default)."""
+        array = cls.__new__(cls)
+        array._column = column
+        array._positions = positions
+        array._dtype = pd.ArrowDtype(column.type)
+        return array
+
+    @property
+    def _pa_array(self) -> pa.ChunkedArray:
+        values = self.__dict__.get('_values')
+        if values is None:
+            values = self.__dict__['_values'] = self._column.read(self._positions)
+        return values
+
+    @_pa_array.setter
+    def _pa_array(self, values: pa.ChunkedArray) -> None:
+        self.__dict__['_values'] = values
+
+    @property
+    def materialized(self) -> bool:
+        """Whether the values have been read."""
+        return '_values' in self.__dict__
+
+    def _from_pyarrow_array(self, pa_array):
+        return ArrowExtensionArray(pa_array)
+
+    def __reduce__(self):
+        # Pickled results (e.g. in the memo store) carry the values themselves
+        return ArrowExtensionArray, (self._pa_array.combine_chunks(),)
+
+    def __len__(self) -> int:
+        if self.materialized:
+            return len(self._pa_array)
+        return len(self._column) if self._positions is None else len(self._positions)
+
+    def _present(self) -> np.ndarray:
+        if self._positions is None:
+            return self._column.present
+        present = self._positions >= 0
+        present[present] = self._column.present[self._positions[present]]
+        return present
+
+    @property
+    def _hasna(self) -> bool:
+        return super()._hasna if self.materialized else not self._present().all()
+
+    def isna(self) -> np.ndarray:
+        return super().isna() if self.materialized else ~self._present()
+
+    @property
+    def nbytes(self) -> int:
+        if self.materialized:
+            return super().nbytes
+        return 0 if self._positions is None else self._positions.nbytes
+
+    def copy(self) -> 'LazyArrowArray':
+        if self.materialized:
+            return super().copy()
+        return self.from_column(self._column, self._positions)
+
+    def take(self, indices, allow_fill: bool = False, fill_value=None):
+        if self.materialized or (allow_fill and not pd.isna(fill_value)):
+            return super().take(indices, allow_fill=allow_fill, fill_value=fill_value)
+        indices = np.asarray(indices, dtype=np.intp)
+        n = len(self)
+        if not allow_fill and len(indices) == n and n and indices[0] == 0 and (np.diff(indices) == 1).all():
+            # Every row in order, as an all-True filter gives
+            return self.copy()
+        if indices.size and (n == 0 or indices.max() >= n):
+            raise IndexError("out of bounds value in 'indices'.")
+        if allow_fill:
+            validate_indices(indices, n)
+            missing = indices < 0
+        else:
+            if indices.size and indices.min() < -n:
+                raise IndexError("out of bounds value in 'indices'.")
+            indices = np.where(indices < 0, indices + n, indices)
+            missing = np.zeros(len(indices), dtype=bool)
+        positions = indices.astype(self._position_dtype()) if self._positions is None else self._positions[indices]
+        positions[missing] = -1
+        return self.from_column(self._column, positions)
+
+    def __getitem__(self, item):
+        if self.materialized:
+            return super().__getitem__(item)
+        if isinstance(item, slice):
+            return self.take(np.arange(len(self))[item])
+        if pd.api.types.is_integer(item):
+            # Read the one row's batch, not the whole column
+            return ArrowExtensionArray.__getitem__(self.take([item]), 0)
+        item = check_array_indexer(self, item)
+        if isinstance(item, np.ndarray) and item.dtype.kind == 'b':
+            return self.copy() if item.all() else self.take(np.flatnonzero(item))
+        if isinstance(item, np.ndarray) and item.dtype.kind in 'iu':
+            return self.take(item)
+        return super().__getitem__(item)
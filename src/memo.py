@@ -0,0 +1,328 @@
+"""
+Module for memoizing analysis results on local disk.
+
+Results are keyed by (dataset hash, code fingerprint, function, normalized
+arguments) and kept
+as zlib-compressed pickles in a SQLite file, so every process on the host
+(dashboard workers, API workers, scripts) shares one store. The dataset hash
+is the version of the shared segment (see ``src/shared_data.py``), which is a
+digest of the data itself: once a new dataset is published, older entries
+can no longer match and are dropped by the first process that switches over.
+The code fingerprint hashes the sources of the ``src`` package (the analyses
+and ``config.py``), the taxonomy file and ``MEMO_SCHEMA_VERSION``, so results
+computed by an older deploy are never served by a newer one.
+
+DataFrame arguments are normalized to a hash of their index and columns, so
+a filtered view of the dataset maps to the same key in every process. Such
+frames must be row subsets of the dataset named by the key; a frame with
+modified values would need its own dataset hash.
+
+The store keeps under a byte budget by evicting the least recently used
+entries after each write.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import MEMO_COMPRESSION_LEVEL, MEMO_MAX_BYTES, MEMO_PATH, MEMO_SCHEMA_VERSION, TAXONOMY_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    function TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS entries_dataset ON entries (dataset);
+"""
+
+@lru_cache(maxsize=1)
+def code_fingerprint() -> str:
+    """
+    Hash the code and configuration that memoized results depend on.
+
+    Returns:
+        str: Short hex digest of MEMO_SCHEMA_VERSION, the sources of the src
+            package and the taxonomy file
+    """
+    digest = hashlib.sha1(f"schema:{MEMO_SCHEMA_VERSION}".encode('utf-8'))
+    for path in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(path.name.encode('utf-8'))
+        digest.update(path.read_bytes())
+    taxonomy = Path(TAXONOMY_PATH)
+    if taxonomy.exists():
+        digest.update(taxonomy.read_bytes())
+    return digest.hexdigest()[:16]
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Hash the rows and columns a DataFrame selects.
+
+    Args:
+        df (pd.DataFrame): DataFrame (usually a filtered view of the dataset)
+
+    Returns:
+        str: Short hex digest of the index labels and column names
+    """
+    digest = hashlib.sha1()
+    if isinstance(df.index, pd.RangeIndex):
+        # The whole dataset: its bounds name the rows without hashing them
+        digest.update(f"range:{df.index.start}:{df.index.stop}:{df.index.step}".encode('utf-8'))
+    else:
+        digest.update(np.ascontiguousarray(pd.util.hash_array(df.index.to_numpy())).tobytes())
+    digest.update(json.dumps([str(c) for c in df.columns]).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def _normalize(value):
+    """Turn an argument into a JSON-able value that is equal for equal arguments."""
+    if isinstance(value, pd.DataFrame):
+        return {'frame': frame_fingerprint(value), 'rows': len(value)}
+    if isinstance(value, pd.Series):
+        return {'series': frame_fingerprint(value.to_frame()), 'rows': len(value)}
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(v) for v in value), key=repr)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+def function_name(func: Callable) -> str:
+    """Return the qualified name a function is stored under."""
+    return f"{func.__module__}.{func.__qualname__}"
+
+def memo_key(dataset: str, func: Callable, args: tuple = (), kwargs: Optional[Dict] = None) -> str:
+    """
+    Build the key of a call.
+
+    Defaults are filled in first, so ``f(df)`` and ``f(df, n=10)`` share a key
+    when 10 is the default of ``n``. The code fingerprint is part of the key,
+    so editing an analysis or the configuration misses older results.
+
+    Args:
+        dataset (str): Dataset hash
+        func (Callable): Function called
+        args (tuple): Positional arguments
+        kwargs (Optional[Dict]): Keyword arguments
+
+    Returns:
+        str: Hex digest of the normalized call
+    """
+    kwargs = kwargs or {}
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+    except (TypeError, ValueError):
+        arguments = {'args': list(args), 'kwargs': kwargs}
+    payload = json.dumps(
+        [dataset, code_fingerprint(), function_name(func), _normalize(arguments)], sort_keys=True, default=repr
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class DiskMemo:
+    """
+    SQLite-backed memo of function results shared by the processes of a host.
+
+    Args:
+        path (str): SQLite file of the store
+        max_bytes (int): Budget of compressed results; least recently used
+            entries are evicted above it
+        level (int): zlib compression level
+    """
+
+    def __init__(self, path: str = MEMO_PATH, max_bytes: int = MEMO_MAX_BYTES,
+                 level: int = MEMO_COMPRESSION_LEVEL):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._dataset = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _switch_dataset(self, dataset: str) -> None:
+        """Drop the entries of the dataset this process used before, once it moves on."""
+        with self._lock:
+            previous, self._dataset = self._dataset, dataset
+        if previous is not None and previous != dataset:
+            self._connection().execute("DELETE FROM entries WHERE dataset = ?", (previous,))
+
+    def get(self, key: str):
+        """
+        Look up a stored result.
+
+        Returns:
+            Tuple[bool, object]: (found, value)
+        """
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        try:
+            value = pickle.loads(zlib.decompress(row[0]))
+        except Exception:
+            # Unreadable entry (e.g. written by an incompatible version); recompute it
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return False, None
+        conn.execute(
+            "UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+        )
+        return True, value
+
+    def put(self, key: str, dataset: str, function: str, value) -> bool:
+        """
+        Store a result and evict down to the budget.
+
+        Returns:
+            bool: False if the value cannot be pickled or exceeds the budget
+        """
+        try:
+            blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.level)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+        if len(blob) > self.max_bytes:
+            return False
+
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, dataset, function, value, size, created, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, dataset, function, blob, len(blob), now, now)
+        )
+        self._local.written = getattr(self._local, 'written', 0) + len(blob)
+        self.evict()
+        return True
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Evict least recently used entries until the store fits the budget.
+
+        Args:
+            max_bytes (Optional[int]): Budget, defaults to the store's
+
+        Returns:
+            int: Number of entries evicted
+        """
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        cursor = self._connection().execute(
+            "DELETE FROM entries WHERE key IN ("
+            " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_access DESC, key) AS kept FROM entries)"
+            " WHERE kept > ?)",
+            (budget,)
+        )
+        return cursor.rowcount
+
+    def call(self, func: Callable, *args, dataset: str, **kwargs):
+        """
+        Return ``func(*args, **kwargs)``, computing it only on a miss.
+
+        Args:
+            func (Callable): Function to call
+            dataset (str): Hash of the dataset the arguments come from
+            *args, **kwargs: Arguments of func
+
+        Returns:
+            The (possibly stored) result
+        """
+        if dataset != self._dataset:
+            self._switch_dataset(dataset)
+
+        key = memo_key(dataset, func, args, kwargs)
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            self._local.hits = getattr(self._local, 'hits', 0) + 1
+            return value
+
+        self.misses += 1
+        self._local.misses = getattr(self._local, 'misses', 0) + 1
+        value = func(*args, **kwargs)
+        self.put(key, dataset, function_name(func), value)
+        return value
+
+    def thread_counts(self) -> Tuple[int, int]:
+        """Hits and misses of the calls made from this thread (e.g. one dashboard rerun)."""
+        return getattr(self._local, 'hits', 0), getattr(self._local, 'misses', 0)
+
+    def thread_bytes_written(self) -> int:
+        """Compressed bytes of the results this thread has stored."""
+        return getattr(self._local, 'written', 0)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._connection().execute("DELETE FROM entries")
+
+    def stats(self) -> Dict:
+        """
+        Summarize the store and this process's hit rate.
+
+        Returns:
+            Dict: Entries, stored bytes, budget, hits, misses, hit rate and
+            stored hits per function
+        """
+        conn = self._connection()
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        functions = pd.read_sql_query(
+            "SELECT function, COUNT(*) AS entries, SUM(size) AS bytes, SUM(hits) AS hits "
+            "FROM entries GROUP BY function ORDER BY hits DESC",
+            conn
+        )
+        calls = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / calls, 4) if calls else 0.0,
+            'functions': functions,
+        }
+
+# One store per path and process
+_memos: Dict[str, DiskMemo] = {}
+
+def get_memo(path: str = MEMO_PATH) -> DiskMemo:
+    """Return this process's store for a path, opening it on first use."""
+    memo = _memos.get(str(path))
+    if memo is None:
+        memo = _memos[str(path)] = DiskMemo(path)
+    return memo
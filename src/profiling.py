@@ -0,0 +1,262 @@
+"""
+Module for sampling profiles of dashboard reruns.
+
+A background thread reads the stack of the profiled thread every
+``PROFILE_INTERVAL`` seconds through ``sys._current_frames()`` and counts
+each distinct stack. Nothing is hooked into the profiled code, so the
+overhead is one stack walk per sample whatever the code does. Samples are
+taken when the profiler thread gets the GIL, so long calls into C code that
+hold it are seen at their end rather than throughout.
+
+Each sample is attributed to the innermost frame that is either a file of
+this repository (``app.py``, ``src/etl.py``, ``src/analysis.py``, ...) or
+Streamlit itself. Time spent in pandas, numpy, plotly and other libraries
+thus counts towards the code that called them.
+
+Profiles are saved as collapsed stacks (``*.folded``, one ``root;...;leaf
+count`` line per stack), the input format of flamegraph.pl, speedscope and
+inferno, next to a JSON summary.
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from .config import PROFILE_DIR, PROFILE_INTERVAL, PROFILE_KEPT
+
+ROOT = Path(__file__).resolve().parent.parent
+
+STREAMLIT = 'streamlit'
+OTHER = 'other'
+
+def _describe(path: str) -> Tuple[str, Optional[str]]:
+    """Short display path of a source file and the group it is attributed to."""
+    file = Path(path)
+    if not file.is_absolute():
+        # Frozen modules and code compiled from strings
+        return path, None
+    try:
+        relative = file.resolve().relative_to(ROOT).as_posix()
+        return relative, relative
+    except (ValueError, OSError):
+        pass
+    parts = file.parts
+    for marker in ('site-packages', 'dist-packages', 'lib'):
+        if marker in parts:
+            short = '/'.join(parts[len(parts) - parts[::-1].index(marker):])
+            break
+    else:
+        short = file.name
+    return short, STREAMLIT if short.split('/')[0] == STREAMLIT else None
+
+class Profile:
+    """
+    Stacks sampled over one or more profiled runs.
+
+    Args:
+        interval (float): Seconds between samples
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()  # root-first tuple of frame labels -> samples
+        self.groups: Dict[str, Optional[str]] = {}  # frame label -> attribution group
+        self.runs = 0
+        self.seconds = 0.0
+        self._labels = {}  # code object -> frame label
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path, group = _describe(code.co_filename)
+            # ';' separates frames in the folded format
+            label = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(';', ':')
+            self._labels[code] = label
+            self.groups[label] = group
+        return label
+
+    @contextmanager
+    def sampling(self):
+        """Sample the calling thread for the duration of the block."""
+        target = threading.get_ident()
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.interval):
+                frame = sys._current_frames().get(target)
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[tuple(reversed(stack))] += 1
+
+        sampler = threading.Thread(target=sample, name='sampling-profiler', daemon=True)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            sampler.join()
+            self.seconds += time.perf_counter() - start
+            self.runs += 1
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def _owner(self, stack: tuple) -> str:
+        for label in reversed(stack):
+            group = self.groups.get(label)
+            if group is not None:
+                return group
+        return OTHER
+
+    def attribution(self) -> pd.DataFrame:
+        """
+        Share of the samples spent in each repository file and in Streamlit.
+
+        Returns:
+            pd.DataFrame: 'group', 'samples', 'seconds' and 'share', largest first
+        """
+        owners = Counter()
+        for stack, count in self.stacks.items():
+            owners[self._owner(stack)] += count
+        result = pd.DataFrame(owners.most_common(), columns=['group', 'samples'])
+        result['seconds'] = (result['samples'] * self.interval).round(3)
+        result['share'] = (result['samples'] / max(self.samples, 1)).round(3)
+        return result
+
+    def top_functions(self, n: int = 25) -> pd.DataFrame:
+        """
+        Functions by samples spent in them (self) and under them (total).
+
+        Args:
+            n (int): Functions kept, by total samples
+
+        Returns:
+            pd.DataFrame: 'function', 'self', 'total' and 'total_share'
+        """
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        result = pd.DataFrame({'function': list(total), 'total': list(total.values())})
+        result['self'] = result['function'].map(own).fillna(0).astype('int64')
+        result['total_share'] = (result['total'] / max(self.samples, 1)).round(3)
+        return result.sort_values('total', ascending=False).head(n)[['function', 'self', 'total', 'total_share']]
+
+    def folded(self) -> str:
+        """Collapsed stacks, one 'root;...;leaf count' line per distinct stack."""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def flame_frame(self, min_share: float = 0.005) -> pd.DataFrame:
+        """
+        Call tree of the samples for an icicle/flame chart.
+
+        Args:
+            min_share (float): Frames with a smaller share of the samples are left out
+
+        Returns:
+            pd.DataFrame: 'id', 'parent', 'label', 'samples' and 'group', one
+            row per call path
+        """
+        nodes = Counter()
+        for stack, count in self.stacks.items():
+            for depth in range(1, len(stack) + 1):
+                nodes[stack[:depth]] += count
+        floor = min_share * self.samples
+        rows = [
+            (';'.join(path), ';'.join(path[:-1]), path[-1], count, self.groups.get(path[-1]) or OTHER)
+            for path, count in nodes.items() if count >= floor
+        ]
+        return pd.DataFrame(rows, columns=['id', 'parent', 'label', 'samples', 'group'])
+
+    def save(self, name: str, directory: str = PROFILE_DIR, **meta) -> Path:
+        """
+        Write the collapsed stacks and a JSON summary.
+
+        Args:
+            name (str): File stem; an existing profile of that name is replaced
+            directory (str): Profile directory
+            **meta: Extra summary fields (e.g. the session)
+
+        Returns:
+            Path: Path of the .folded file
+        """
+        root = Path(directory)
+        root.mkdir(parents=True, exist_ok=True)
+        (root / f"{name}.folded").write_text(self.folded(), encoding='utf-8')
+        attribution = self.attribution()
+        summary = {
+            'name': name,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'runs': self.runs,
+            'seconds': round(self.seconds, 3),
+            'samples': self.samples,
+            'interval': self.interval,
+            'attribution': dict(zip(attribution['group'], attribution['samples'].tolist())),
+            'groups': {label: group for label, group in self.groups.items() if group is not None},
+            **meta,
+        }
+        (root / f"{name}.json").write_text(json.dumps(summary, indent=2), encoding='utf-8')
+        _prune_profiles(root)
+        return root / f"{name}.folded"
+
+    @classmethod
+    def load(cls, name: str, directory: str = PROFILE_DIR) -> 'Profile':
+        """Read a saved profile back."""
+        root = Path(directory)
+        summary = json.loads((root / f"{name}.json").read_text(encoding='utf-8'))
+        profile = cls(summary['interval'])
+        profile.runs, profile.seconds = summary['runs'], summary['seconds']
+        for line in (root / f"{name}.folded").read_text(encoding='utf-8').splitlines():
+            stack, count = line.rsplit(' ', 1)
+            stack = tuple(stack.split(';'))
+            profile.stacks[stack] += int(count)
+            for label in stack:
+                profile.groups[label] = summary['groups'].get(label)
+        return profile
+
+def _prune_profiles(root: Path) -> None:
+    """Remove the oldest profiles beyond PROFILE_KEPT."""
+    summaries = sorted(root.glob('*.json'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in summaries[PROFILE_KEPT:]:
+        stale.with_suffix('.folded').unlink(missing_ok=True)
+        stale.unlink(missing_ok=True)
+
+def list_profiles(directory: str = PROFILE_DIR) -> pd.DataFrame:
+    """
+    Summaries of the saved profiles, newest first.
+
+    Args:
+        directory (str): Profile directory
+
+    Returns:
+        pd.DataFrame: 'name', 'created', 'runs', 'seconds', 'samples' and the
+        top attribution group of each profile
+    """
+    rows = []
+    for path in Path(directory).glob('*.json'):
+        summary = json.loads(path.read_text(encoding='utf-8'))
+        attribution = summary.get('attribution') or {OTHER: 0}
+        rows.append({
+            'name': summary['name'],
+            'created': summary['created'],
+            'runs': summary['runs'],
+            'seconds': summary['seconds'],
+            'samples': summary['samples'],
+            'top_group': max(attribution, key=attribution.get),
+        })
+    columns = ['name', 'created', 'runs', 'seconds', 'samples', 'top_group']
+    return pd.DataFrame(rows, columns=columns).sort_values('created', ascending=False).reset_index(drop=True)
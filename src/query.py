@@ -0,0 +1,404 @@
+"""
+Module for querying the processed dataset through an embedded SQLite database.
+
+The analysis functions here mirror ``src/analysis.py`` but push the sidebar
+filters and the aggregations down into SQL, so only the columns and rows a
+question needs are read instead of the whole table being loaded into pandas.
+"""
+
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import DATABASE_PATH
+from .etl import parse_tags
+from .search import SEARCH_COLUMNS, create_search_index, search_index_is_current
+
+PRODUCTS_TABLE = 'products'
+ADDITIVES_TABLE = 'product_additives'
+META_TABLE = 'dataset_meta'
+VERSION_KEY = 'dataset_version'
+
+# Columns the dashboard filters, sorts or groups on
+INDEXED_COLUMNS = [
+    ('brands',),
+    ('categories', 'nutrient_score'),
+    ('nutrient_score',),
+    ('nutrition_grades',),
+    ('code',),
+]
+
+def _quote(column: str) -> str:
+    """Quote a column name such as ``saturated-fat_100g`` for SQL."""
+    return '"' + column.replace('"', '""') + '"'
+
+def build_database(df: pd.DataFrame, db_path: str = DATABASE_PATH, version: Optional[str] = None) -> None:
+    """
+    Build the SQLite database for a processed DataFrame.
+
+    The database is written to a temporary file and moved into place, so
+    readers never see a half-built file.
+
+    Args:
+        df (pd.DataFrame): Processed DataFrame
+        db_path (str): Path of the database file
+        version (Optional[str]): Published dataset version the DataFrame
+            belongs to, recorded for database_version
+    """
+    target = Path(db_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.db', dir=target.parent)
+    os.close(fd)
+
+    table = df.reset_index(drop=True)
+    for column in table.columns:
+        if table[column].dtype == object:
+            table[column] = table[column].map(lambda v: str(list(v)) if isinstance(v, (list, np.ndarray)) else v)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # Implicit rowids follow the DataFrame order so ties sort like pandas does
+        table.to_sql(PRODUCTS_TABLE, conn, index=False, chunksize=10000)
+        table.index = pd.RangeIndex(1, len(table) + 1)
+
+        # One row per (product, additive) so additive questions use an index
+        conn.execute(f"CREATE TABLE {ADDITIVES_TABLE} (product_id INTEGER, additive TEXT)")
+        if 'additives_tags' in table.columns:
+            conn.executemany(
+                f"INSERT INTO {ADDITIVES_TABLE} VALUES (?, ?)",
+                (
+                    (product_id, tag)
+                    for product_id, tags in zip(table.index, table['additives_tags'])
+                    for tag in parse_tags(tags)
+                )
+            )
+
+        for columns in INDEXED_COLUMNS:
+            if all(c in table.columns for c in columns):
+                name = 'idx_' + '_'.join(c.replace('-', '_') for c in columns)
+                conn.execute(
+                    f"CREATE INDEX {name} ON {PRODUCTS_TABLE} ({', '.join(_quote(c) for c in columns)})"
+                )
+        conn.execute(f"CREATE INDEX idx_additive ON {ADDITIVES_TABLE} (additive, product_id)")
+        conn.execute(f"CREATE INDEX idx_additive_product ON {ADDITIVES_TABLE} (product_id)")
+        if all(c in table.columns for c in SEARCH_COLUMNS):
+            create_search_index(conn, PRODUCTS_TABLE)
+        conn.execute(f"CREATE TABLE {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+        if version is not None:
+            conn.execute(f"INSERT INTO {META_TABLE} VALUES (?, ?)", (VERSION_KEY, version))
+        conn.execute("ANALYZE")
+        conn.commit()
+    except Exception:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+
+    os.replace(tmp_path, target)
+
+def database_is_stale(source: Path, db_path: str = DATABASE_PATH) -> bool:
+    """
+    Check whether the database is missing, older than its source data file
+    or indexed for search with another tokenizer.
+
+    Args:
+        source (Path): Processed data file the database is built from
+        db_path (str): Path of the database file
+
+    Returns:
+        bool: True if the database needs rebuilding
+    """
+    target = Path(db_path)
+    if not target.exists() or Path(source).stat().st_mtime > target.stat().st_mtime:
+        return True
+    conn = connect(db_path)
+    try:
+        return not search_index_is_current(conn)
+    finally:
+        conn.close()
+
+def connect(db_path: str = DATABASE_PATH) -> sqlite3.Connection:
+    """
+    Open a read-only connection to the database.
+
+    Args:
+        db_path (str): Path of the database file
+
+    Returns:
+        sqlite3.Connection: Read-only connection
+    """
+    uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+def database_version(conn: sqlite3.Connection) -> Optional[str]:
+    """Dataset version the connected database was built from; None if unknown."""
+    try:
+        row = conn.execute(f"SELECT value FROM {META_TABLE} WHERE key = ?", (VERSION_KEY,)).fetchone()
+    except sqlite3.OperationalError:
+        # Built before versions were recorded
+        return None
+    return row[0] if row else None
+
+def run_query(conn: sqlite3.Connection, sql: str, params: Sequence = ()) -> pd.DataFrame:
+    """
+    Run an ad-hoc SQL query against the ``products`` and ``product_additives`` tables.
+
+    Example:
+        Average salt by brand for grade d/e products with more than 3 additives::
+
+            run_query(conn, '''
+                SELECT brands, AVG(salt_100g) AS avg_salt, COUNT(*) AS products
+                FROM products
+                WHERE nutrition_grades IN ('d', 'e') AND additives_count > 3
+                GROUP BY brands ORDER BY avg_salt DESC
+            ''')
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        sql (str): SQL query, using ``?`` placeholders for parameters
+        params (Sequence): Query parameters
+
+    Returns:
+        pd.DataFrame: Query result
+    """
+    return pd.read_sql_query(sql, conn, params=list(params))
+
+def _where(
+    brands: Optional[List[str]] = None,
+    categories: Optional[List[str]] = None,
+    score_range: Optional[Tuple[float, float]] = None,
+    extra: Optional[str] = None
+) -> Tuple[str, List]:
+    """
+    Build a WHERE clause for the dashboard filters.
+
+    Returns:
+        Tuple[str, List]: SQL clause (possibly empty) and its parameters
+    """
+    clauses, params = [], []
+    if brands:
+        clauses.append(f"brands IN ({', '.join('?' * len(brands))})")
+        params.extend(brands)
+    if categories:
+        clauses.append(f"categories IN ({', '.join('?' * len(categories))})")
+        params.extend(categories)
+    if score_range is not None:
+        clauses.append("nutrient_score BETWEEN ? AND ?")
+        params.extend(score_range)
+    if extra:
+        clauses.append(extra)
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+def _columns(conn: sqlite3.Connection) -> List[str]:
+    """List the columns of the products table."""
+    rows = conn.execute(f"PRAGMA table_info({PRODUCTS_TABLE})").fetchall()
+    return [row[1] for row in rows]
+
+def count_products(conn: sqlite3.Connection, **filters) -> int:
+    """
+    Count the products matching the filters.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        **filters: ``brands``, ``categories`` and ``score_range`` filters
+
+    Returns:
+        int: Number of matching products
+    """
+    where, params = _where(**filters)
+    return conn.execute(f"SELECT COUNT(*) FROM {PRODUCTS_TABLE}{where}", params).fetchone()[0]
+
+def get_summary_stats(conn: sqlite3.Connection, **filters) -> Dict:
+    """
+    Calculate summary statistics for the filtered products.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        **filters: ``brands``, ``categories`` and ``score_range`` filters
+
+    Returns:
+        Dict: Summary statistics, as in ``analysis.get_summary_stats``
+    """
+    where, params = _where(**filters)
+    columns = _columns(conn)
+    non_null = ' + '.join(f"COUNT({_quote(c)})" for c in columns)
+    row = conn.execute(f"""
+        SELECT COUNT(*),
+               COUNT(DISTINCT brands),
+               COUNT(DISTINCT categories),
+               AVG(nutrient_score),
+               {non_null},
+               AVG(COALESCE(allergens_count, 0) > 0),
+               AVG(COALESCE(additives_count, 0) > 0)
+        FROM {PRODUCTS_TABLE}{where}
+    """, params).fetchone()
+    total, brands, categories, avg_score, non_null_cells, allergens, additives = row
+
+    return {
+        'total_products': total,
+        'unique_brands': brands,
+        'unique_categories': categories,
+        'avg_nutrient_score': round(avg_score, 2) if avg_score is not None else np.nan,
+        'data_completeness': round(non_null_cells / len(columns) / total * 100, 1) if total else np.nan,
+        'products_with_allergens': round(allergens * 100, 1) if allergens is not None else np.nan,
+        'products_with_additives': round(additives * 100, 1) if additives is not None else np.nan
+    }
+
+def top_brands(conn: sqlite3.Connection, n: int = 10, **filters) -> pd.DataFrame:
+    """
+    Get top brands by product count.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        n (int): Number of top brands to return
+        **filters: ``brands``, ``categories`` and ``score_range`` filters
+
+    Returns:
+        pd.DataFrame: Top brands with counts
+    """
+    where, params = _where(**filters, extra='brands IS NOT NULL')
+    return run_query(conn, f"""
+        SELECT brands AS brand, COUNT(*) AS product_count
+        FROM {PRODUCTS_TABLE}{where}
+        GROUP BY brands
+        ORDER BY product_count DESC, MIN(rowid)
+        LIMIT ?
+    """, params + [n])
+
+def nutrient_distribution(conn: sqlite3.Connection, nutrient: str, **filters) -> Dict:
+    """
+    Calculate distribution statistics for a nutrient.
+
+    Only the requested column of the matching rows is read; quantiles are
+    computed on that column since SQLite has no percentile aggregate.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        nutrient (str): Name of nutrient column
+        **filters: ``brands``, ``categories`` and ``score_range`` filters
+
+    Returns:
+        Dict: Distribution statistics
+    """
+    if nutrient not in _columns(conn):
+        raise ValueError(f"Column '{nutrient}' not found. Available columns: {_columns(conn)}")
+    where, params = _where(**filters, extra=f"{_quote(nutrient)} IS NOT NULL")
+    values = np.array(
+        [row[0] for row in conn.execute(f"SELECT {_quote(nutrient)} FROM {PRODUCTS_TABLE}{where}", params)],
+        dtype=float
+    )
+    series = pd.Series(values)
+    return {
+        'mean': round(series.mean(), 2),
+        'median': round(series.median(), 2),
+        'std': round(series.std(), 2),
+        'min': round(series.min(), 2),
+        'max': round(series.max(), 2),
+        'q25': round(series.quantile(0.25), 2),
+        'q75': round(series.quantile(0.75), 2)
+    }
+
+def category_analysis(conn: sqlite3.Connection, **filters) -> pd.DataFrame:
+    """
+    Analyze nutrient profiles by category.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        **filters: ``brands``, ``categories`` and ``score_range`` filters
+
+    Returns:
+        pd.DataFrame: Category-level statistics
+    """
+    where, params = _where(**filters, extra='categories IS NOT NULL')
+    return run_query(conn, f"""
+        SELECT categories,
+               AVG(nutrient_score) AS nutrient_score,
+               AVG(sugars_100g) AS sugars_100g,
+               AVG(fat_100g) AS fat_100g,
+               AVG(salt_100g) AS salt_100g,
+               AVG(proteins_100g) AS proteins_100g,
+               COUNT(code) AS product_count
+        FROM {PRODUCTS_TABLE}{where}
+        GROUP BY categories
+        ORDER BY categories
+    """, params).round(2)
+
+def get_healthiest_products(conn: sqlite3.Connection, n: int = 10, **filters) -> pd.DataFrame:
+    """
+    Get top n healthiest products based on nutrient score.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        n (int): Number of products to return
+        **filters: ``brands``, ``categories`` and ``score_range`` filters
+
+    Returns:
+        pd.DataFrame: Top n healthiest products
+    """
+    where, params = _where(**filters, extra='nutrient_score IS NOT NULL')
+    return run_query(conn, f"""
+        SELECT product_name, brands, categories, nutrient_score,
+               proteins_100g, sugars_100g, fat_100g, salt_100g
+        FROM {PRODUCTS_TABLE}{where}
+        ORDER BY nutrient_score DESC, rowid
+        LIMIT ?
+    """, params + [n])
+
+def get_additive_prevalence(conn: sqlite3.Connection, n: int = 10, **filters) -> pd.DataFrame:
+    """
+    Analyze most common additives, counting each tag of a product separately.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        n (int): Number of top additives to return
+        **filters: ``brands``, ``categories`` and ``score_range`` filters
+
+    Returns:
+        pd.DataFrame: Top n most common additives
+    """
+    where, params = _where(**filters)
+    total = conn.execute(f"SELECT COUNT(*) FROM {PRODUCTS_TABLE}{where}", params).fetchone()[0]
+    result = run_query(conn, f"""
+        SELECT a.additive, COUNT(*) AS occurrence_count
+        FROM {ADDITIVES_TABLE} a
+        JOIN (SELECT rowid FROM {PRODUCTS_TABLE}{where}) p ON p.rowid = a.product_id
+        GROUP BY a.additive
+        ORDER BY occurrence_count DESC, a.additive
+        LIMIT ?
+    """, params + [n])
+    result['percentage'] = round(result['occurrence_count'] / total * 100, 1) if total else 0.0
+    return result
+
+def get_data_quality_metrics(conn: sqlite3.Connection, **filters) -> Dict:
+    """
+    Calculate data quality metrics.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        **filters: ``brands``, ``categories`` and ``score_range`` filters
+
+    Returns:
+        Dict: Data quality metrics
+    """
+    where, params = _where(**filters)
+    columns = _columns(conn)
+    counts = ', '.join(f"COUNT({_quote(c)})" for c in columns)
+    row = conn.execute(
+        f"SELECT COUNT(*), COUNT(DISTINCT code), {counts} FROM {PRODUCTS_TABLE}{where}", params
+    ).fetchone()
+    total, unique_codes, non_null = row[0], row[1], dict(zip(columns, row[2:]))
+    if not total:
+        return {'missing_values': {}, 'completeness_score': np.nan,
+                'duplicate_products': 0, 'products_with_images': np.nan}
+
+    return {
+        'missing_values': {c: float(np.round((total - non_null[c]) / total, 3)) for c in columns},
+        'completeness_score': round(sum(non_null.values()) / len(columns) / total * 100, 1),
+        'duplicate_products': total - unique_codes,
+        'products_with_images': round(non_null.get('image_url', 0) / total * 100, 1)
+    }
@@ -0,0 +1,188 @@
+"""
+Module for refreshing and republishing the dataset, once per host.
+
+A dashboard rerun only reads the ``CURRENT`` pointer and attaches the
+segment it names. The work that rebuilds the data runs here: fetching and
+transforming fresh products, rescoring after a profile change,
+quarantining rows and canonicalizing brands of data saved under older
+validation rules or alias maps, and publishing the segment, the SQLite database and the zoned store. It holds an
+exclusive lock on ``REFRESH_LOCK_PATH``, so of all the processes on a host,
+one does the work while the others keep serving the published dataset.
+Reruns start it in a background thread (``start_refresh``), except on a
+host where nothing is published yet.
+
+A failed fetch is recorded in ``FETCH_FAILURE_PATH``. The next attempt waits
+``FETCH_RETRY_AFTER`` seconds instead of restarting the fetch job, with its
+retries and backoff, on every rerun.
+"""
+
+import fcntl
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import pandas as pd
+
+from .config import (
+    DATA_REFRESH_INTERVAL,
+    ETL_WORKERS,
+    FETCH_FAILURE_PATH,
+    FETCH_RETRY_AFTER,
+    PROCESSED_DATA_PATH,
+    REFRESH_LOCK_PATH,
+)
+from .data_fetch import FetchError, fetch_all_products
+from .etl import (
+    canonicalize_processed_data,
+    products_to_df,
+    rescore_processed_data,
+    revalidate_processed_data,
+    save_processed_data,
+)
+from .query import build_database, database_is_stale
+from .shared_data import attach_dataset, current_version, publish_dataset, published_before
+from .snapshots import record_snapshot
+from .warmup import start_warmup
+from .zonemap import write_zoned_store, zoned_store_is_stale
+
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def refresh_lock(blocking: bool = False, path: str = REFRESH_LOCK_PATH) -> Iterator[bool]:
+    """
+    Hold the host-wide refresh lock.
+
+    Args:
+        blocking (bool): Wait for another process's refresh to finish
+        path (str): Lock file
+
+    Yields:
+        bool: Whether the lock is held; False if another process holds it
+            and blocking is False
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def last_fetch_failure(path: str = FETCH_FAILURE_PATH) -> Optional[Dict]:
+    """The last failed fetch ('time' and 'error'), or None once a fetch has succeeded."""
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _record_fetch_failure(error: Exception, path: str = FETCH_FAILURE_PATH) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps({'time': time.time(), 'error': str(error)}), encoding='utf-8')
+
+def fetch_due(data_file: str = PROCESSED_DATA_PATH) -> bool:
+    """
+    Whether the processed data is missing or older than DATA_REFRESH_INTERVAL,
+    and no fetch failed within the last FETCH_RETRY_AFTER seconds.
+    """
+    failure = last_fetch_failure()
+    if failure is not None and time.time() - failure['time'] < FETCH_RETRY_AFTER:
+        return False
+    try:
+        return time.time() - Path(data_file).stat().st_mtime > DATA_REFRESH_INTERVAL
+    except FileNotFoundError:
+        return True
+
+# Whether this process has compared the published data with its own code and config
+_checked = threading.Event()
+
+def refresh_due(data_file: str = PROCESSED_DATA_PATH) -> bool:
+    """
+    Cheap per-rerun check of whether a refresh should be started.
+
+    Profiles, the database and the zoned store are compared once per process
+    (they change with a deploy); after that, only file times are checked.
+    """
+    return not _checked.is_set() or fetch_due(data_file) or published_before(Path(data_file))
+
+def refresh_dataset(data_file: str = PROCESSED_DATA_PATH, blocking: bool = False) -> bool:
+    """
+    Fetch fresh products if the data is due, then republish what is stale.
+
+    Args:
+        data_file (str): Processed data file
+        blocking (bool): Wait for a refresh running in another process
+            instead of leaving the work to it
+
+    Returns:
+        bool: False if another process held the refresh lock
+
+    Raises:
+        FetchError: If the fetch failed and there is no previous data to keep
+    """
+    with refresh_lock(blocking) as locked:
+        if not locked:
+            return False
+        data_path = Path(data_file)
+        # Another process may have refreshed while this one waited for the lock
+        if fetch_due(data_file):
+            try:
+                raw_data = fetch_all_products(max_pages=50)
+                df = products_to_df(raw_data, workers=ETL_WORKERS)
+                # Stored statistics of the previous dataset are updated with the changed rows only
+                previous, _ = attach_dataset()
+                save_processed_data(df, data_file, previous=previous)
+                record_snapshot(df)
+                Path(FETCH_FAILURE_PATH).unlink(missing_ok=True)
+            except FetchError as e:
+                # Completed pages stay checkpointed; the next refresh resumes from them
+                _record_fetch_failure(e)
+                if not data_path.exists():
+                    raise
+                logger.warning("Data refresh failed, keeping the previous dataset: %s", e)
+
+        # Edited scoring profiles only rescore their own columns
+        rescore_processed_data(data_file)
+        # Data saved before a rule changed keeps rows the rules now reject
+        revalidate_processed_data(data_file)
+        # Data saved before the alias map knew its brands keeps their other spellings
+        canonicalize_processed_data(data_file)
+        if (current_version() is None or published_before(data_path) or database_is_stale(data_path)
+                or zoned_store_is_stale(data_path)):
+            df = pd.read_csv(data_path)
+            version = publish_dataset(df)
+            build_database(df, version=version)
+            write_zoned_store(df, version=version)
+            # Precompute the popular views of the new dataset before users ask for them
+            start_warmup()
+        _checked.set()
+        return True
+
+_refreshing = threading.Lock()
+
+def _refresh_in_background(data_file: str) -> None:
+    try:
+        refresh_dataset(data_file)
+    except Exception:
+        logger.exception("Background data refresh failed")
+    finally:
+        _refreshing.release()
+
+def start_refresh(data_file: str = PROCESSED_DATA_PATH) -> bool:
+    """
+    Run refresh_dataset in a background thread, unless this process already is.
+
+    Returns:
+        bool: Whether a refresh thread was started
+    """
+    if not _refreshing.acquire(blocking=False):
+        return False
+    threading.Thread(target=_refresh_in_background, args=(data_file,), name='data-refresh', daemon=True).start()
+    return True
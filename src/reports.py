@@ -0,0 +1,215 @@
+"""
+Module for rendering static per-brand and per-category report packs.
+
+Each report is one HTML page with the dashboard's summary metrics and
+charts for the products of one brand (or category), built with the same
+``src/analysis.py`` functions and ``src/visuals.py`` builders as the
+dashboard. Pages load a single ``plotly.min.js`` written next to them, so
+a pack opens offline and prints to PDF from any browser.
+
+Rendering fans out over a process pool. The parent groups the row
+positions of each brand once and sends each worker a batch of groups; the
+workers attach the published dataset segment (``src/shared_data.py``)
+instead of receiving a pickled copy, so the data is mapped once per host
+whatever the number of workers. Tasks name the version the parent attached,
+so a dataset published during a run cannot mix into its pack.
+"""
+
+import contextlib
+import hashlib
+import html
+import io
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+from .analysis import (
+    category_analysis, get_additive_prevalence, get_healthiest_products, get_summary_stats, top_brands
+)
+from .config import REPORT_DIR, REPORT_GROUPS_PER_TASK, REPORT_MIN_PRODUCTS, SHARED_DATA_DIR
+from .shared_data import attach_dataset
+from .visuals import plot_bar, plot_histogram
+
+# Report kinds: the column a pack is split on
+REPORT_KINDS = {
+    'brand': 'brands',
+    'category': 'categories',
+}
+
+PLOTLY_JS = 'plotly.min.js'
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2rem auto; max-width: 1100px; color: #2c3e50; }}
+h1 {{ border-bottom: 3px solid #667eea; padding-bottom: .5rem; }}
+table {{ border-collapse: collapse; margin: 1rem 0; font-size: .9rem; }}
+th, td {{ border: 1px solid #ddd; padding: .35rem .7rem; text-align: left; }}
+th {{ background: #f5f6fa; }}
+.meta {{ color: #7f8c8d; font-size: .85rem; }}
+.charts {{ display: grid; grid-template-columns: 1fr 1fr; gap: 1rem; }}
+@media print {{ .charts {{ grid-template-columns: 1fr; }} }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+def report_filename(kind: str, name: str) -> str:
+    """File name of a report; the digest keeps names that slug alike apart."""
+    slug = re.sub(r'[\W_]+', '-', name.strip().lower()).strip('-')[:60] or kind
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]
+    return f"{kind}-{slug}-{digest}.html"
+
+def report_groups(df: pd.DataFrame, column: str, min_products: int = REPORT_MIN_PRODUCTS,
+                  limit: Optional[int] = None) -> List[Tuple[str, np.ndarray]]:
+    """
+    Row positions of every group with enough products.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        column (str): Column the reports are split on
+        min_products (int): Smaller groups get no report
+        limit (Optional[int]): Keep only the largest groups
+
+    Returns:
+        List[Tuple[str, np.ndarray]]: (name, row positions), largest first
+    """
+    codes, names = pd.factorize(df[column])
+    present = codes >= 0
+    order = np.flatnonzero(present)[np.argsort(codes[present], kind='stable')]
+    counts = np.bincount(codes[present], minlength=len(names))
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    largest = np.argsort(-counts, kind='stable')
+    largest = largest[counts[largest] >= min_products][:limit]
+    return [(str(names[g]), order[bounds[g]:bounds[g + 1]]) for g in largest]
+
+def render_report(df: pd.DataFrame, kind: str, name: str, dataset: str = '') -> str:
+    """
+    Render the report page of one group of products.
+
+    Args:
+        df (pd.DataFrame): Products of the group
+        kind (str): Report kind (see REPORT_KINDS)
+        name (str): Brand or category name
+        dataset (str): Dataset version shown on the page
+
+    Returns:
+        str: HTML page
+    """
+    # The analysis helpers print debug output; keep it out of batch runs
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = get_summary_stats(df)
+        additives = get_additive_prevalence(df)
+        brands = top_brands(df)
+    healthiest = get_healthiest_products(df)
+
+    figures = [plot_histogram(df, 'nutrient_score', title="Nutrient Score Distribution")]
+    if kind == 'brand':
+        categories = category_analysis(df).nlargest(15, 'product_count')
+        figures.append(plot_bar(categories, x='categories', y='nutrient_score',
+                                title="Average Score by Category (Top 15)"))
+    else:
+        figures.append(plot_bar(brands, x='brand', y='product_count', title="Top 10 Brands by Product Count"))
+    if not additives.empty:
+        figures.append(plot_bar(additives, x='additive', y='percentage', title="Most Common Additives (%)"))
+    charts = ''.join(
+        fig.update_layout(height=360).to_html(full_html=False, include_plotlyjs=False) for fig in figures
+    )
+
+    metrics = pd.DataFrame({'metric': [k.replace('_', ' ').title() for k in stats], 'value': list(stats.values())})
+    body = f"""
+<h1>{html.escape(name)}</h1>
+<p class="meta">{kind.title()} report &middot; {len(df):,} products &middot; dataset {html.escape(dataset)}
+&middot; generated {datetime.now():%Y-%m-%d %H:%M}</p>
+{metrics.to_html(index=False, header=False)}
+<div class="charts">{charts}</div>
+<h2>Healthiest Products</h2>
+{healthiest.to_html(index=False, na_rep='', float_format='{:.2f}'.format)}
+"""
+    return PAGE.format(title=html.escape(name), plotly=PLOTLY_JS, body=body)
+
+def _render_batch(task: Tuple[str, str, str, str, List[Tuple[str, np.ndarray]]]) -> List[Dict]:
+    """Process-pool entry point: render a batch of groups from one version of the shared dataset."""
+    kind, output_dir, root, version, groups = task
+    # Positions index the version the parent grouped, not whatever is active now
+    df, _ = attach_dataset(root, version)
+    rows = []
+    for name, positions in groups:
+        subset = df.take(positions)
+        filename = report_filename(kind, name)
+        (Path(output_dir) / filename).write_text(render_report(subset, kind, name, version), encoding='utf-8')
+        rows.append({'name': name, 'products': len(subset),
+                     'avg_score': round(subset['nutrient_score'].mean(), 2), 'file': filename})
+    return rows
+
+def _write_index(kind: str, output_dir: Path, rows: List[Dict], version: str) -> None:
+    """Write the pack's index page, linking every report."""
+    index = pd.DataFrame(rows).sort_values('products', ascending=False)
+    links = [f'<a href="{f}">{html.escape(n)}</a>' for n, f in zip(index['name'], index['file'])]
+    table = index.assign(name=links).drop(columns='file').to_html(index=False, escape=False)
+    body = (f"<h1>{kind.title()} Reports</h1>\n<p class=\"meta\">{len(index):,} reports &middot; "
+            f"dataset {html.escape(version or '')}</p>\n{table}")
+    (output_dir / 'index.html').write_text(
+        PAGE.format(title=f"{kind.title()} Reports", plotly=PLOTLY_JS, body=body), encoding='utf-8'
+    )
+
+def generate_reports(kind: str, output_dir: Optional[str] = None, workers: int = 1,
+                     min_products: int = REPORT_MIN_PRODUCTS, limit: Optional[int] = None,
+                     root: str = SHARED_DATA_DIR) -> Dict:
+    """
+    Render one report per brand or category of the published dataset.
+
+    Args:
+        kind (str): 'brand' or 'category'
+        output_dir (Optional[str]): Pack directory (default REPORT_DIR/<kind>)
+        workers (int): Worker processes (1 renders in-process)
+        min_products (int): Smaller groups get no report
+        limit (Optional[int]): Render only the largest groups
+        root (str): Directory of the shared dataset segments
+
+    Returns:
+        Dict: 'reports', 'seconds', 'reports_per_second' and 'output'
+    """
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"Unknown report kind '{kind}'; expected one of {list(REPORT_KINDS)}")
+    df, version = attach_dataset(root)
+    if df is None:
+        raise RuntimeError("No dataset is published; run the dashboard or publish_dataset first")
+
+    output = Path(output_dir or Path(REPORT_DIR) / kind)
+    output.mkdir(parents=True, exist_ok=True)
+    (output / PLOTLY_JS).write_text(get_plotlyjs(), encoding='utf-8')
+
+    start = time.perf_counter()
+    groups = report_groups(df, REPORT_KINDS[kind], min_products, limit)
+    # Deal the groups out largest first so every batch gets a similar mix of sizes
+    n_batches = max(1, -(-len(groups) // REPORT_GROUPS_PER_TASK))
+    tasks = [(kind, str(output), root, version, groups[i::n_batches])
+             for i in range(n_batches) if groups[i::n_batches]]
+
+    if workers <= 1:
+        parts = [_render_batch(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_render_batch, tasks))
+    rows = [row for part in parts for row in part]
+    if rows:
+        _write_index(kind, output, rows, version)
+
+    seconds = time.perf_counter() - start
+    return {'reports': len(rows), 'seconds': round(seconds, 2),
+            'reports_per_second': round(len(rows) / seconds, 1) if seconds else 0.0, 'output': str(output)}
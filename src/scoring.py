@@ -0,0 +1,236 @@
+"""
+Module for scoring products with declarative nutrient profiles.
+
+A profile (see ``SCORING_PROFILES`` in config) is a base score plus a list
+of threshold components. Each component bins one nutrient column by its
+thresholds and awards the points of that bin, so all profiles are evaluated
+together as a few ``np.searchsorted`` calls over the nutrient matrix.
+
+Optional profile keys:
+
+- ``column``: output column (default ``score_<name>``)
+- ``required``: columns that must all be present, or the score is NaN
+- ``drop``: rules that zero some components while the points of others
+  reach a limit, e.g. the Nutri-Score protein cap
+- ``clamp``: ``[low, high]`` bounds of the score
+- ``grades``: ``bounds`` and ``labels`` mapping scores to letter grades
+
+Each profile also has a fingerprint. The processed CSV keeps the fingerprints
+of its score columns in a sidecar file, so editing one profile rescores only
+that column, without fetching or transforming the data again.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import SCORING_PROFILES
+
+# Bump when the evaluation itself changes, so every column is rescored
+SCORING_ENGINE_VERSION = 1
+
+SIDECAR_SUFFIX = ".scores.json"
+
+def profile_column(name: str, profile: Dict) -> str:
+    """Return the column a profile is stored in."""
+    return profile.get('column', f"score_{name}")
+
+def profile_fingerprint(profile: Dict) -> str:
+    """
+    Hash a profile definition.
+
+    Args:
+        profile (Dict): Profile definition
+
+    Returns:
+        str: Short hex digest, changing whenever the profile does
+    """
+    payload = json.dumps({'engine': SCORING_ENGINE_VERSION, 'profile': profile}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def profile_fingerprints(profiles: Dict[str, Dict] = SCORING_PROFILES) -> Dict[str, str]:
+    """Return the fingerprint of every profile, by score column."""
+    return {profile_column(name, profile): profile_fingerprint(profile) for name, profile in profiles.items()}
+
+def _component_points(values: np.ndarray, component: Dict) -> np.ndarray:
+    """Points of one component for a column of nutrient values."""
+    thresholds = np.asarray(component['thresholds'], dtype='float64')
+    points = np.asarray(component['points'], dtype='float64')
+    if len(points) != len(thresholds) + 1:
+        raise ValueError(f"Component '{component['name']}' needs one more points value than thresholds")
+
+    # side='left' counts the thresholds strictly below the value, i.e. exceeded
+    bins = np.searchsorted(thresholds, values, side='left')
+    bins[np.isnan(values)] = 0
+    return points[bins]
+
+def score_profiles(df: pd.DataFrame, profiles: Dict[str, Dict] = SCORING_PROFILES) -> pd.DataFrame:
+    """
+    Evaluate scoring profiles over a product DataFrame.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame with the nutrient columns
+        profiles (Dict[str, Dict]): Profiles to evaluate, by name
+
+    Returns:
+        pd.DataFrame: One score column per profile, aligned with df
+    """
+    # Each (column, scale) input is converted once, however many profiles use it
+    inputs: Dict[Tuple[str, float], np.ndarray] = {}
+    for profile in profiles.values():
+        for component in profile['components']:
+            key = (component['column'], float(component.get('scale', 1)))
+            if key not in inputs:
+                column = df[key[0]] if key[0] in df else pd.Series(np.nan, index=df.index)
+                inputs[key] = pd.to_numeric(column, errors='coerce').to_numpy(dtype='float64') * key[1]
+
+    scores = {}
+    for name, profile in profiles.items():
+        points = {
+            component['name']: _component_points(
+                inputs[(component['column'], float(component.get('scale', 1)))], component
+            )
+            for component in profile['components']
+        }
+
+        for rule in profile.get('drop', []):
+            triggered = sum(points[c] for c in rule['when']) >= rule['at_least']
+            for component in rule['components']:
+                points[component] = np.where(triggered, 0.0, points[component])
+
+        score = profile.get('base', 0.0) + sum(points.values())
+        if 'clamp' in profile:
+            score = np.clip(score, *profile['clamp'])
+        for column in profile.get('required', []):
+            score = np.where(df[column].notna().to_numpy() if column in df else False, score, np.nan)
+
+        scores[profile_column(name, profile)] = np.asarray(score, dtype='float64')
+
+    return pd.DataFrame(scores, index=df.index)
+
+def apply_profiles(df: pd.DataFrame, profiles: Dict[str, Dict] = SCORING_PROFILES) -> pd.DataFrame:
+    """
+    Add (or overwrite) the score column of every profile.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame with the nutrient columns
+        profiles (Dict[str, Dict]): Profiles to evaluate, by name
+
+    Returns:
+        pd.DataFrame: The same DataFrame with the score columns
+    """
+    for column, values in score_profiles(df, profiles).items():
+        df[column] = values
+    return df
+
+def assign_grades(scores: pd.Series, profile: Dict) -> pd.Series:
+    """
+    Map scores to the letter grades of a profile.
+
+    A score equal to a bound gets the better of the two grades.
+
+    Args:
+        scores (pd.Series): Scores of the profile
+        profile (Dict): Profile definition with a ``grades`` key
+
+    Returns:
+        pd.Series: Grade labels (None where the score is missing)
+    """
+    grades = profile['grades']
+    values = scores.to_numpy(dtype='float64', na_value=np.nan)
+    labels = np.asarray(grades['labels'], dtype=object)[np.searchsorted(grades['bounds'], values, side='left')]
+    labels[np.isnan(values)] = None
+    return pd.Series(labels, index=scores.index, name=scores.name)
+
+def sidecar_path(data_path) -> Path:
+    """Return the fingerprint sidecar of a processed data file."""
+    data_path = Path(data_path)
+    return data_path.with_name(data_path.stem + SIDECAR_SUFFIX)
+
+def read_fingerprints(data_path) -> Dict[str, str]:
+    """
+    Read the profile fingerprints stored next to a processed data file.
+
+    Args:
+        data_path: Processed data file
+
+    Returns:
+        Dict[str, str]: Fingerprint by score column, empty if none are stored
+    """
+    try:
+        return json.loads(sidecar_path(data_path).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def write_fingerprints(data_path, columns: List[str], profiles: Dict[str, Dict] = SCORING_PROFILES) -> None:
+    """
+    Store the fingerprints of the profiles whose columns a data file holds.
+
+    Args:
+        data_path: Processed data file
+        columns (List[str]): Columns of the saved DataFrame
+        profiles (Dict[str, Dict]): Profiles the columns were scored with
+    """
+    fingerprints = {
+        column: fingerprint
+        for column, fingerprint in profile_fingerprints(profiles).items()
+        if column in columns
+    }
+    sidecar_path(data_path).write_text(json.dumps(fingerprints, indent=2, sort_keys=True), encoding='utf-8')
+
+def stale_profiles(
+    fingerprints: Dict[str, str],
+    profiles: Dict[str, Dict] = SCORING_PROFILES,
+    columns: Optional[List[str]] = None
+) -> List[str]:
+    """
+    List the profiles whose stored column is missing or out of date.
+
+    Args:
+        fingerprints (Dict[str, str]): Stored fingerprints by score column
+        profiles (Dict[str, Dict]): Current profiles
+        columns (Optional[List[str]]): Columns actually present, if known
+
+    Returns:
+        List[str]: Names of the profiles to rescore
+    """
+    stale = []
+    for name, profile in profiles.items():
+        column = profile_column(name, profile)
+        if fingerprints.get(column) != profile_fingerprint(profile) or (
+            columns is not None and column not in columns
+        ):
+            stale.append(name)
+    return stale
+
+def rescore(
+    df: pd.DataFrame,
+    fingerprints: Dict[str, str],
+    profiles: Dict[str, Dict] = SCORING_PROFILES
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Rescore only the profiles that changed since the stored fingerprints.
+
+    ``score_*`` columns of profiles that no longer exist are dropped.
+
+    Args:
+        df (pd.DataFrame): Processed DataFrame
+        fingerprints (Dict[str, str]): Stored fingerprints by score column
+        profiles (Dict[str, Dict]): Current profiles
+
+    Returns:
+        Tuple[pd.DataFrame, List[str]]: DataFrame with up-to-date score
+        columns, and the names of the profiles that were rescored
+    """
+    stale = stale_profiles(fingerprints, profiles, list(df.columns))
+    current = {profile_column(name, profile) for name, profile in profiles.items()}
+    removed = [c for c in fingerprints if c not in current and c.startswith('score_') and c in df]
+
+    df = df.drop(columns=removed)
+    if stale:
+        df = apply_profiles(df, {name: profiles[name] for name in stale})
+    return df, stale
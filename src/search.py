@@ -0,0 +1,159 @@
+"""
+Module for full-text search over product names, brands and ingredients.
+
+The indexes are SQLite FTS5 tables stored in the dataset database and built
+alongside it. Text is accent-folded by the ``unicode61`` tokenizer, which
+also splits French, Hindi and English text on Unicode word boundaries. Its
+token characters include the combining marks (``M*``), since Devanagari
+vowel signs are marks and would otherwise split a word such as "चीनी" into
+its consonants. Short prefix indexes keep search-as-you-type queries off
+full scans.
+
+Names and brands also get an index of their own. Ingredient words such as
+"sugar" or "salt" appear in a large share of products, so the small name
+index answers most queries on its own and the full index is only consulted
+to fill up the remaining results. Filtering by a search uses every match
+(``search_codes``), not only the best ranked ones.
+"""
+
+import sqlite3
+from typing import List
+
+import pandas as pd
+
+# Index tables, their columns and the BM25 weight of each column
+SEARCH_TIERS = {
+    'name_search': {'product_name': 2.0, 'brands': 1.0},
+    'product_search': {'product_name': 10.0, 'brands': 5.0, 'ingredients_text': 1.0},
+}
+SEARCH_COLUMNS = ['product_name', 'brands', 'ingredients_text']
+# Token characters: letters, numbers, private use and combining marks
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+
+RESULT_COLUMNS = ['code', 'product_name', 'brands', 'categories', 'rank']
+
+def create_search_index(conn: sqlite3.Connection, products_table: str = 'products') -> None:
+    """
+    Create and populate the full-text indexes for a products table.
+
+    The indexes use the products table as external content, so the text is
+    stored once and the indexes only hold the token lists.
+
+    Args:
+        conn (sqlite3.Connection): Writable connection to the dataset database
+        products_table (str): Name of the table holding the products
+    """
+    for table, columns in SEARCH_TIERS.items():
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE {table} USING fts5(
+                {', '.join(columns)},
+                content='{products_table}',
+                content_rowid='rowid',
+                tokenize="{SEARCH_TOKENIZER}",
+                prefix='2 3'
+            )
+        """)
+        conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+        conn.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+
+def search_index_is_current(conn: sqlite3.Connection) -> bool:
+    """Whether every search index in the database was built with SEARCH_TOKENIZER."""
+    placeholders = ', '.join('?' * len(SEARCH_TIERS))
+    rows = conn.execute(f"SELECT sql FROM sqlite_master WHERE name IN ({placeholders})", list(SEARCH_TIERS))
+    return all(SEARCH_TOKENIZER in sql for sql, in rows)
+
+def build_match_expression(text: str) -> str:
+    """
+    Turn free text from the search box into an FTS5 match expression.
+
+    Every word must match, and the last word also matches as a prefix so
+    results update while the user is still typing.
+
+    Args:
+        text (str): Raw search text
+
+    Returns:
+        str: FTS5 match expression, empty if the text has no words
+    """
+    terms: List[str] = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    if terms:
+        terms[-1] += ' *'
+    return ' AND '.join(terms)
+
+def search_products(conn: sqlite3.Connection, text: str, limit: int = 50) -> pd.DataFrame:
+    """
+    Search products by name, brand and ingredients, best matches first.
+
+    Products matching on name and brand alone rank ahead of those that also
+    need their ingredients to match. Within a tier, all matches are ranked
+    by BM25.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        text (str): Search text
+        limit (int): Maximum number of results
+
+    Returns:
+        pd.DataFrame: Matching products with their relevance rank
+        (lower is better)
+    """
+    expression = build_match_expression(text)
+    if not expression:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    results = []
+    found = set()
+    for tier, (table, columns) in enumerate(SEARCH_TIERS.items()):
+        weights = ', '.join(str(w) for w in columns.values())
+        rows = conn.execute(f"""
+            SELECT rowid, bm25({table}, {weights}) AS rank
+            FROM {table}
+            WHERE {table} MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """, (expression, limit + len(found))).fetchall()
+        for rowid, rank in rows:
+            if rowid not in found and len(found) < limit:
+                found.add(rowid)
+                results.append((rowid, tier, rank))
+        if len(found) >= limit:
+            break
+
+    if not results:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    ranked = pd.DataFrame(results, columns=['rowid', 'tier', 'rank'])
+    products = pd.read_sql_query(f"""
+        SELECT rowid, code, product_name, brands, categories
+        FROM products
+        WHERE rowid IN ({', '.join('?' * len(ranked))})
+    """, conn, params=ranked['rowid'].tolist())
+
+    # Tier goes into the rank so it sorts as one number (BM25 scores are negative)
+    ranked['rank'] = ranked['tier'] * 1000.0 + ranked['rank']
+    return ranked.merge(products, on='rowid')[RESULT_COLUMNS]
+
+def search_codes(conn: sqlite3.Connection, text: str) -> List[str]:
+    """
+    Codes of every product matching a search, unranked.
+
+    The full index covers names and brands as well, so it alone holds every
+    match of both tiers.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        text (str): Search text
+
+    Returns:
+        List[str]: Codes of the matching products
+    """
+    expression = build_match_expression(text)
+    if not expression:
+        return []
+    rows = conn.execute("""
+        SELECT products.code
+        FROM product_search
+        JOIN products ON products.rowid = product_search.rowid
+        WHERE product_search MATCH ?
+    """, (expression,)).fetchall()
+    return [code for code, in rows]
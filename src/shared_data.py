@@ -0,0 +1,255 @@
+"""
+Module for sharing the processed dataset across dashboard worker processes.
+
+The processed DataFrame is published once as an uncompressed Arrow IPC file
+(a "segment") and every worker memory-maps it. Numeric columns come back as
+numpy views and text columns as ``pd.ArrowDtype`` arrays, so pandas reads the
+mapped buffers directly instead of copying them onto each worker's heap.
+A small ``CURRENT`` pointer file names the active segment; refreshing the
+data writes a new segment and swaps the pointer with an atomic rename.
+
+Within a worker, every session shares the one attached frame. The mapped
+buffers are read-only, so a stray in-place write fails instead of leaking
+into other sessions, and each rerun works on a shallow copy-on-write handle
+(``session_view``) whose own column changes copy only the touched column.
+
+The heavy text columns of ``LAZY_COLUMNS`` are published as compressed
+sidecar files next to the segment and read only when needed (see
+``src/lazy_columns.py``).
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from .config import LAZY_COLUMNS, SHARED_DATA_DIR, SHARED_SEGMENTS_KEPT
+from .lazy_columns import LAZY_FIELD_KEY, LazyArrowArray, LazyColumn, write_lazy_column
+
+POINTER_FILE = "CURRENT"
+SEGMENT_SUFFIX = ".arrow"
+LAZY_SUFFIX = ".lazy"
+
+# Segment currently attached by this process
+_attached: Dict[str, object] = {'version': None, 'df': None}
+
+def _segment_path(root: Path, version: str) -> Path:
+    """Return the file path of a segment version."""
+    return root / f"{version}{SEGMENT_SUFFIX}"
+
+def _lazy_path(root: Path, version: str, column: str) -> Path:
+    """Return the file path of a lazy column of a segment version."""
+    return root / f"{version}.{column}{LAZY_SUFFIX}"
+
+def _file_digest(*paths: Path) -> str:
+    """Hash files in chunks and return a short hex digest."""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def _to_table(df: pd.DataFrame, lazy_columns: Sequence[str] = ()) -> Tuple[pa.Table, Dict[str, pa.Array]]:
+    """
+    Convert a DataFrame to an Arrow table that maps back without copies.
+
+    Float columns keep NaN as a value rather than an Arrow null, so workers
+    get plain numpy columns with the usual NaN semantics straight from the
+    mapped buffers. Lazy columns are returned apart; the table holds their
+    presence flags instead, marked in the field metadata.
+    """
+    fields, arrays, lazy = [], [], {}
+    for column in df.columns:
+        values = df[column]
+        if column in lazy_columns:
+            lazy[str(column)] = pa.Array.from_pandas(values)
+            fields.append(pa.field(str(column), pa.bool_(), metadata={LAZY_FIELD_KEY: b'1'}))
+            arrays.append(pa.array(values.notna().to_numpy()))
+            continue
+        if pd.api.types.is_float_dtype(values.dtype):
+            arrays.append(pa.array(values.to_numpy(dtype='float64'), from_pandas=False))
+        else:
+            arrays.append(pa.Array.from_pandas(values))
+        fields.append(pa.field(str(column), arrays[-1].type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields)), lazy
+
+def _arrow_backed(arrow_type: pa.DataType) -> Optional[pd.ArrowDtype]:
+    """Keep strings and nested types in Arrow memory; numerics map to numpy."""
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_boolean(arrow_type):
+        return None
+    return pd.ArrowDtype(arrow_type)
+
+def current_version(root: str = SHARED_DATA_DIR) -> Optional[str]:
+    """
+    Read the version of the active segment.
+
+    Args:
+        root (str): Directory holding the shared segments
+
+    Returns:
+        Optional[str]: Active segment version, or None if nothing is published
+    """
+    try:
+        return (Path(root) / POINTER_FILE).read_text(encoding='utf-8').strip() or None
+    except FileNotFoundError:
+        return None
+
+def published_before(source: Path, root: str = SHARED_DATA_DIR) -> bool:
+    """
+    Check whether the active segment predates a source data file.
+
+    Args:
+        source (Path): Processed data file the segment was built from
+        root (str): Directory holding the shared segments
+
+    Returns:
+        bool: True if the source file changed after the last publish
+    """
+    try:
+        pointer_mtime = (Path(root) / POINTER_FILE).stat().st_mtime
+    except FileNotFoundError:
+        return True
+    return Path(source).stat().st_mtime > pointer_mtime
+
+def publish_dataset(df: pd.DataFrame, root: str = SHARED_DATA_DIR,
+                    lazy_columns: Sequence[str] = LAZY_COLUMNS) -> str:
+    """
+    Publish a DataFrame as a new shared segment and make it the active one.
+
+    The segment name is derived from its content, so publishing an unchanged
+    dataset is a no-op for attached workers.
+
+    Args:
+        df (pd.DataFrame): Processed DataFrame
+        root (str): Directory holding the shared segments
+        lazy_columns (Sequence[str]): Columns published compressed beside the
+            segment and read on first use
+
+    Returns:
+        str: Version of the published segment
+    """
+    root_path = Path(root)
+    root_path.mkdir(parents=True, exist_ok=True)
+
+    # Write uncompressed IPC so readers can map the buffers as-is
+    table, lazy = _to_table(df, lazy_columns)
+    fd, tmp_name = tempfile.mkstemp(suffix=SEGMENT_SUFFIX, dir=root_path)
+    os.close(fd)
+    with pa.OSFile(tmp_name, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    tmp_lazy: List[Tuple[str, str]] = []
+    for column, values in lazy.items():
+        fd, tmp_column = tempfile.mkstemp(suffix=LAZY_SUFFIX, dir=root_path)
+        os.close(fd)
+        write_lazy_column(values, Path(tmp_column))
+        tmp_lazy.append((column, tmp_column))
+
+    version = _file_digest(Path(tmp_name), *(Path(path) for _, path in tmp_lazy))
+    segment = _segment_path(root_path, version)
+    # Sidecars go first, so a segment in place always has its lazy columns
+    for column, tmp_column in tmp_lazy:
+        target = _lazy_path(root_path, version, column)
+        if target.exists():
+            os.remove(tmp_column)
+        else:
+            os.replace(tmp_column, target)
+    if segment.exists():
+        os.remove(tmp_name)
+    else:
+        os.replace(tmp_name, segment)
+
+    # Swap the pointer atomically so workers never see a partial segment
+    fd, tmp_pointer = tempfile.mkstemp(dir=root_path)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp_pointer, root_path / POINTER_FILE)
+
+    _prune_segments(root_path, keep=version)
+    return version
+
+def _prune_segments(root: Path, keep: str) -> None:
+    """
+    Remove old segments beyond SHARED_SEGMENTS_KEPT.
+
+    Unlinking a mapped file is safe on POSIX: workers still attached to it
+    keep their mapping until they repoint on their next load.
+    """
+    segments = sorted(
+        (p for p in root.glob(f"*{SEGMENT_SUFFIX}") if p.stem != keep),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True
+    )
+    for stale in segments[SHARED_SEGMENTS_KEPT:]:
+        for path in [stale, *root.glob(f"{stale.stem}.*{LAZY_SUFFIX}")]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+def attach_dataset(root: str = SHARED_DATA_DIR,
+                   version: Optional[str] = None) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    Attach to the active segment without copying its data.
+
+    The mapping is reused until the pointer names a different version, so
+    calling this on every rerun only costs a read of the pointer file.
+
+    Args:
+        root (str): Directory holding the shared segments
+        version (Optional[str]): Attach this version instead of the active
+            one, e.g. the one a parent process attached; it must not have
+            been pruned yet
+
+    Returns:
+        Tuple[Optional[pd.DataFrame], Optional[str]]: Read-only DataFrame backed
+        by the mapped segment and its version, or (None, None) if nothing is
+        published yet
+    """
+    if version is None:
+        version = current_version(root)
+    if version is None:
+        return None, None
+    if version == _attached['version']:
+        return _attached['df'], version
+
+    source = pa.memory_map(str(_segment_path(Path(root), version)), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    df = table.to_pandas(types_mapper=_arrow_backed, split_blocks=True)
+    # Lazy columns are stored as presence flags; swap in arrays over their sidecars
+    for field in table.schema:
+        if field.metadata and LAZY_FIELD_KEY in field.metadata:
+            column = LazyColumn(_lazy_path(Path(root), version, field.name), df[field.name].to_numpy())
+            df[field.name] = LazyArrowArray.from_column(column)
+
+    _attached['version'] = version
+    _attached['df'] = df
+    return df, version
+
+def session_view(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give one rerun its own handle on the attached dataset.
+
+    The handle shares every buffer with the mapped segment, so it costs no
+    copy. With copy-on-write, adding or replacing a column in it copies that
+    column only, and other sessions keep seeing the published data. Lazy
+    columns get arrays of their own, so values a rerun reads are freed with
+    the rerun instead of staying with the attached frame.
+
+    Args:
+        df (pd.DataFrame): Frame returned by attach_dataset
+
+    Returns:
+        pd.DataFrame: Shallow copy-on-write view of df
+    """
+    view = df.copy(deep=False)
+    for column in df.columns:
+        values = df[column].array
+        if isinstance(values, LazyArrowArray) and not values.materialized:
+            view[column] = values.copy()
+    return view
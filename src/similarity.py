@@ -0,0 +1,172 @@
+"""
+Module for finding healthier alternatives to a product by nutrient similarity.
+
+Products are compared on their standardized ``*_100g`` nutrient vectors.
+The index keeps the vectors sorted by ``nutrient_score`` (descending), both
+globally and within each category, so the candidates that score higher than
+the query product are always a contiguous prefix. A query is then a single
+vectorized distance computation over that prefix.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .config import NUTRIENT_COLUMNS
+
+RESULT_COLUMNS = ['code', 'product_name', 'brands', 'categories', 'nutrient_score']
+
+class NutrientIndex:
+    """
+    Precomputed nutrient vectors for nearest-neighbour queries.
+
+    Missing nutrients are imputed with the column mean (0 after
+    standardization), so they neither pull products together nor apart.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        columns (List[str]): Nutrient columns spanning the vector space
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: List[str] = NUTRIENT_COLUMNS):
+        self.df = df
+        self.columns = columns
+
+        values = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+        std[~(std > 0)] = 1.0
+        vectors = np.nan_to_num((values - np.nan_to_num(mean)) / std).astype('float32')
+
+        scores = df['nutrient_score'].to_numpy(dtype='float64', na_value=np.nan)
+        scores = np.nan_to_num(scores, nan=-np.inf)
+
+        # Global order: best score first, ties in DataFrame order
+        self.order = np.argsort(-scores, kind='stable')
+        self.vectors = vectors[self.order]
+        self.neg_scores = -scores[self.order]
+
+        # Category order: grouped by category, best score first within each group
+        categories = pd.Categorical(df['categories'])
+        self.category_codes = categories.codes
+        self.category_lookup: Dict[str, int] = {c: i for i, c in enumerate(categories.categories)}
+        by_category = np.lexsort((-scores, categories.codes))
+        self.category_order = by_category
+        self.category_vectors = vectors[by_category]
+        self.category_neg_scores = -scores[by_category]
+        sorted_codes = categories.codes[by_category]
+        n_categories = len(categories.categories)
+        self.category_start = np.searchsorted(sorted_codes, np.arange(n_categories), side='left')
+        self.category_end = np.searchsorted(sorted_codes, np.arange(n_categories), side='right')
+
+        self._vectors_by_row = vectors
+        self._scores_by_row = scores
+        self._position = pd.Series(np.arange(len(df)), index=df['code'].astype(str).to_numpy())
+
+    def _row(self, code) -> int:
+        """Return the position of a product code, raising KeyError if unknown."""
+        position = self._position.get(str(code))
+        if position is None:
+            raise KeyError(f"Product '{code}' not found")
+        if isinstance(position, pd.Series):
+            position = position.iloc[0]
+        return int(position)
+
+    def healthier_alternatives(
+        self,
+        code,
+        k: int = 5,
+        same_category: bool = False
+    ) -> pd.DataFrame:
+        """
+        Find the k most similar products with a higher nutrient score.
+
+        Args:
+            code: Barcode of the product to replace
+            k (int): Number of alternatives to return
+            same_category (bool): Only consider products of the same category
+
+        Returns:
+            pd.DataFrame: Alternatives, closest first, with their ``distance``
+        """
+        row = self._row(code)
+        query = self._vectors_by_row[row]
+        neg_score = -self._scores_by_row[row]
+
+        if same_category:
+            category = self.category_codes[row]
+            if category < 0:
+                return self._result(np.array([], dtype=int), np.array([]))
+            start = self.category_start[category]
+            end = self.category_end[category]
+            cut = start + np.searchsorted(self.category_neg_scores[start:end], neg_score, side='left')
+            vectors = self.category_vectors[start:cut]
+            positions = self.category_order[start:cut]
+        else:
+            cut = np.searchsorted(self.neg_scores, neg_score, side='left')
+            vectors = self.vectors[:cut]
+            positions = self.order[:cut]
+
+        if len(positions) == 0:
+            return self._result(positions, np.array([]))
+
+        diff = vectors - query
+        distances = np.einsum('ij,ij->i', diff, diff)
+        k = min(k, len(distances))
+        # Keep every product tied with the k-th distance so ties break by row order
+        kth = np.partition(distances, k - 1)[k - 1]
+        nearest = np.flatnonzero(distances <= kth)
+        nearest = nearest[np.lexsort((positions[nearest], distances[nearest]))][:k]
+        return self._result(positions[nearest], np.sqrt(distances[nearest]))
+
+    def _result(self, positions: np.ndarray, distances: np.ndarray) -> pd.DataFrame:
+        """Build the result frame for row positions and their distances."""
+        result = self.df.iloc[positions][RESULT_COLUMNS + self.columns].reset_index(drop=True)
+        result.insert(len(RESULT_COLUMNS), 'distance', np.round(distances.astype('float64'), 3))
+        return result
+
+def brute_force_alternatives(
+    df: pd.DataFrame,
+    code,
+    k: int = 5,
+    same_category: bool = False,
+    columns: List[str] = NUTRIENT_COLUMNS
+) -> pd.DataFrame:
+    """
+    Reference implementation of ``NutrientIndex.healthier_alternatives``.
+
+    Standardizes and scans the whole DataFrame on every call; used to check
+    and benchmark the index.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        code: Barcode of the product to replace
+        k (int): Number of alternatives to return
+        same_category (bool): Only consider products of the same category
+        columns (List[str]): Nutrient columns spanning the vector space
+
+    Returns:
+        pd.DataFrame: Alternatives, closest first, with their ``distance``
+    """
+    values = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = 1.0
+    vectors = np.nan_to_num((values - np.nan_to_num(mean)) / std).astype('float32')
+    scores = np.nan_to_num(df['nutrient_score'].to_numpy(dtype='float64', na_value=np.nan), nan=-np.inf)
+
+    row = int(np.flatnonzero(df['code'].astype(str).to_numpy() == str(code))[0])
+    candidates = scores > scores[row]
+    if same_category:
+        categories = df['categories'].to_numpy()
+        candidates &= pd.notna(categories) & (categories == categories[row])
+
+    positions = np.flatnonzero(candidates)
+    diff = vectors[positions] - vectors[row]
+    distances = np.einsum('ij,ij->i', diff, diff)
+    nearest = np.lexsort((positions, distances))[:k]
+
+    result = df.iloc[positions[nearest]][RESULT_COLUMNS + columns].reset_index(drop=True)
+    result.insert(len(RESULT_COLUMNS), 'distance', np.round(np.sqrt(distances[nearest]).astype('float64'), 3))
+    return result
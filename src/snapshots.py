@@ -0,0 +1,467 @@
+"""
+Module for versioned snapshots of the processed dataset.
+
+Every refresh records a version. Most versions are stored as a delta:
+a Parquet file with only the rows whose content changed since the previous
+version, keyed by ``code``, plus tombstones for removed products. Every
+``SNAPSHOT_BASE_EVERY`` versions, or when the columns change, a full base
+snapshot is written instead, which bounds how many deltas a read replays.
+A JSON manifest lists the versions in order.
+
+Reads replay the deltas over a single in-memory state, loading only the
+requested columns, so time travel and trends never build one full copy of
+the data per version.
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import NUTRIENT_COLUMNS, SNAPSHOT_BASE_EVERY, SNAPSHOT_DIR, SNAPSHOT_MAX_DELTA_SHARE
+
+MANIFEST_FILE = "manifest.json"
+HEAD_FILE = "head_hashes.parquet"
+DELETED_COLUMN = "_deleted"
+
+def _normalized(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of df with string codes and tag lists in their string form."""
+    df = df.reset_index(drop=True)
+    df['code'] = df['code'].astype(str)
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].map(lambda v: str(list(v)) if isinstance(v, (list, np.ndarray)) else v)
+    return df
+
+def _canonical(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize a processed DataFrame to the form it has once saved as CSV.
+
+    Codes become strings and tag lists their string form, so a freshly
+    fetched DataFrame and one read back from disk hash the same.
+    """
+    return _normalized(df.drop_duplicates(subset=['code']))
+
+def _row_hashes(df: pd.DataFrame) -> pd.Series:
+    """Hash every row's content, indexed by code."""
+    return pd.Series(pd.util.hash_pandas_object(df, index=False).to_numpy(), index=df['code'].to_numpy())
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash the content of every row of a processed DataFrame.
+
+    Equal rows hash the same whether they were just fetched, read back from
+    CSV or attached from the shared segment.
+
+    Args:
+        df (pd.DataFrame): Processed DataFrame
+
+    Returns:
+        np.ndarray: uint64 hash per row, in row order
+    """
+    return pd.util.hash_pandas_object(_normalized(df), index=False).to_numpy()
+
+def diff_by_code(previous: pd.DataFrame, current: pd.DataFrame,
+                 previous_hashes: Optional[np.ndarray] = None,
+                 current_hashes: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the rows that differ between two versions of the dataset.
+
+    Rows are compared by ``row_hashes`` unless other per-row hashes are
+    given, e.g. of only the columns a caller depends on.
+
+    Args:
+        previous (pd.DataFrame): Older version, with unique codes
+        current (pd.DataFrame): Newer version, with unique codes
+        previous_hashes (Optional[np.ndarray]): Hash per row of previous
+        current_hashes (Optional[np.ndarray]): Hash per row of current
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Positions in previous of the rows
+        changed or removed, and positions in current of the rows changed
+        or added
+    """
+    previous_codes = pd.Index(previous['code'].astype(str))
+    current_codes = pd.Index(current['code'].astype(str))
+    if not (previous_codes.is_unique and current_codes.is_unique):
+        raise ValueError("Diffing by code needs unique codes")
+
+    if previous_hashes is None:
+        previous_hashes = row_hashes(previous)
+    if current_hashes is None:
+        current_hashes = row_hashes(current)
+    positions = previous_codes.get_indexer(current_codes)
+    matched = np.append(previous_hashes, 0)[positions]  # -1 picks the padding
+    new_rows = np.flatnonzero((positions < 0) | (matched != current_hashes))
+
+    unchanged = positions[(positions >= 0) & (matched == current_hashes)]
+    old_rows = np.setdiff1d(np.arange(len(previous)), unchanged)
+    return old_rows, new_rows
+
+def _write_atomic(path: Path, write: Callable[[str], None]) -> None:
+    """Write a file through a temporary name so readers never see it partial."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+
+def read_manifest(root: str = SNAPSHOT_DIR) -> List[Dict]:
+    """
+    Read the list of recorded versions, oldest first.
+
+    Args:
+        root (str): Snapshot directory
+
+    Returns:
+        List[Dict]: One entry per version (version, created, kind, file,
+        rows, changed, deleted)
+    """
+    try:
+        return json.loads((Path(root) / MANIFEST_FILE).read_text(encoding='utf-8'))['versions']
+    except FileNotFoundError:
+        return []
+
+def list_versions(root: str = SNAPSHOT_DIR) -> pd.DataFrame:
+    """
+    List the recorded versions.
+
+    Args:
+        root (str): Snapshot directory
+
+    Returns:
+        pd.DataFrame: Manifest entries, oldest first
+    """
+    versions = pd.DataFrame(read_manifest(root))
+    if not versions.empty:
+        versions['created'] = pd.to_datetime(versions['created'])
+    return versions
+
+def record_snapshot(df: pd.DataFrame, root: str = SNAPSHOT_DIR, created: Optional[datetime] = None) -> Optional[int]:
+    """
+    Record a processed DataFrame as the next version.
+
+    Only rows whose content differs from the previous version are written,
+    so an unchanged refresh costs nothing.
+
+    Args:
+        df (pd.DataFrame): Processed DataFrame
+        root (str): Snapshot directory
+        created (Optional[datetime]): Version timestamp (defaults to now)
+
+    Returns:
+        Optional[int]: New version number, or None if nothing changed
+    """
+    root_path = Path(root)
+    root_path.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(root)
+    df = _canonical(df)
+    hashes = _row_hashes(df)
+
+    previous = manifest[-1] if manifest else None
+    if previous is not None and previous['columns'] == list(df.columns):
+        head = pd.read_parquet(root_path / HEAD_FILE)
+        head_index = pd.Index(head['code'])
+        positions = head_index.get_indexer(hashes.index)
+        # New codes, and codes whose row hash differs from the previous version
+        previous_hashes = np.append(head['hash'].to_numpy(), 0)[positions]  # -1 picks the padding
+        changed_mask = (positions < 0) | (previous_hashes != hashes.to_numpy())
+        changed = df[changed_mask]
+        deleted = head_index[hashes.index.get_indexer(head_index) < 0]
+        if changed.empty and len(deleted) == 0:
+            return None
+        since_base = len(manifest) - max(i for i, v in enumerate(manifest) if v['kind'] == 'base')
+        kind = 'delta' if (
+            since_base < SNAPSHOT_BASE_EVERY and
+            len(changed) + len(deleted) <= SNAPSHOT_MAX_DELTA_SHARE * len(df)
+        ) else 'base'
+    else:
+        kind = 'base'
+        changed = df
+        deleted = pd.Index([])
+
+    version = previous['version'] + 1 if previous else 1
+    file_name = f"{version:06d}-{kind}.parquet"
+    if kind == 'base':
+        frame = df
+    else:
+        tombstones = pd.DataFrame({'code': deleted.astype(str)})
+        frame = pd.concat([changed.assign(**{DELETED_COLUMN: False}),
+                           tombstones.assign(**{DELETED_COLUMN: True})], ignore_index=True)
+    _write_atomic(root_path / file_name, lambda path: frame.to_parquet(path, index=False, compression='zstd'))
+    _write_atomic(
+        root_path / HEAD_FILE,
+        lambda path: pd.DataFrame({'code': hashes.index, 'hash': hashes.to_numpy()}).to_parquet(path, index=False)
+    )
+
+    manifest.append({
+        'version': version,
+        'created': (created or datetime.now()).isoformat(timespec='seconds'),
+        'kind': kind,
+        'file': file_name,
+        'rows': len(df),
+        'changed': len(changed),
+        'deleted': len(deleted),
+        'columns': list(df.columns),
+    })
+    # The manifest goes last: a crash before this point leaves the previous version current
+    _write_atomic(
+        root_path / MANIFEST_FILE,
+        lambda path: Path(path).write_text(json.dumps({'versions': manifest}, indent=1), encoding='utf-8')
+    )
+    return version
+
+def version_as_of(when, root: str = SNAPSHOT_DIR) -> Optional[int]:
+    """
+    Find the version that was current at a point in time.
+
+    Args:
+        when: Timestamp (datetime or anything pandas can parse)
+        root (str): Snapshot directory
+
+    Returns:
+        Optional[int]: Latest version recorded at or before ``when``
+    """
+    when = pd.Timestamp(when)
+    versions = [v['version'] for v in read_manifest(root) if pd.Timestamp(v['created']) <= when]
+    return versions[-1] if versions else None
+
+def _read_file(root: Path, entry: Dict, columns: Optional[List[str]]) -> pd.DataFrame:
+    """Read a version file, projecting to the requested columns."""
+    if columns is None:
+        read_columns = None
+    else:
+        read_columns = ['code'] + [c for c in columns if c != 'code' and c in entry['columns']]
+        if entry['kind'] == 'delta':
+            read_columns.append(DELETED_COLUMN)
+    return pd.read_parquet(root / entry['file'], columns=read_columns)
+
+def _apply_delta(state: pd.DataFrame, delta: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Apply a delta to a state indexed by code.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: New state, the
+        previous rows of every changed or deleted product, and the new rows
+    """
+    delta = delta.set_index('code')
+    deleted = delta[DELETED_COLUMN].to_numpy()
+    upserts = delta.loc[~deleted, state.columns]
+    touched = delta.index.get_indexer(state.index) >= 0
+    old = state[touched]
+
+    # Changed and removed rows are dropped, then the new versions appended
+    state = pd.concat([state[~touched], upserts]) if len(upserts) else state[~touched]
+    return state, old, upserts
+
+def _replay(
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+    root: str = SNAPSHOT_DIR
+) -> Iterator[Tuple[Dict, pd.DataFrame, Optional[pd.DataFrame], Optional[pd.DataFrame]]]:
+    """
+    Replay versions first..last over one rolling state.
+
+    Yields (entry, state, old rows, new rows) per version from ``first``;
+    old and new rows are None when the state was reloaded from a base.
+    The state is indexed by code and shared between steps, so callers must
+    copy it to keep it.
+    """
+    manifest = read_manifest(root)
+    if not manifest:
+        raise FileNotFoundError(f"No snapshots recorded in {root}")
+    last = last or manifest[-1]['version']
+    first = first or last
+    entries = [v for v in manifest if v['version'] <= last]
+    if not entries or entries[-1]['version'] != last or first > last:
+        raise KeyError(f"Unknown version range {first}..{last}")
+
+    # Start from the newest base at or before the first requested version
+    start = max(i for i, v in enumerate(entries) if v['kind'] == 'base' and v['version'] <= first)
+    state = None
+    for entry in entries[start:]:
+        frame = _read_file(Path(root), entry, columns)
+        if entry['kind'] == 'base':
+            state = frame.set_index('code')
+            old = new = None
+        else:
+            state, old, new = _apply_delta(state, frame)
+        if entry['version'] >= first:
+            yield entry, state, old, new
+
+def load_version(version: Optional[int] = None, columns: Optional[List[str]] = None,
+                 root: str = SNAPSHOT_DIR) -> pd.DataFrame:
+    """
+    Reconstruct the dataset as it was at a version.
+
+    The deltas since the nearest base are merged first, keeping the latest
+    change of each product, so the base is filtered only once however many
+    deltas follow it. Unchanged products keep their order; changed and new
+    ones come after them.
+
+    Args:
+        version (Optional[int]): Version number (latest if None)
+        columns (Optional[List[str]]): Columns to load (all if None)
+        root (str): Snapshot directory
+
+    Returns:
+        pd.DataFrame: Dataset at that version
+    """
+    manifest = read_manifest(root)
+    if not manifest:
+        raise FileNotFoundError(f"No snapshots recorded in {root}")
+    version = version or manifest[-1]['version']
+    entries = [v for v in manifest if v['version'] <= version]
+    if not entries or entries[-1]['version'] != version:
+        raise KeyError(f"Unknown version {version}")
+
+    start = max(i for i, v in enumerate(entries) if v['kind'] == 'base')
+    state = _read_file(Path(root), entries[start], columns)
+    deltas = [_read_file(Path(root), entry, columns) for entry in entries[start + 1:]]
+    if not deltas:
+        return state
+
+    changes = pd.concat(deltas, ignore_index=True).drop_duplicates(subset=['code'], keep='last')
+    unchanged = pd.Index(changes['code']).get_indexer(state['code']) < 0
+    upserts = changes.loc[~changes[DELETED_COLUMN].to_numpy(), state.columns]
+    return pd.concat([state[unchanged], upserts], ignore_index=True)
+
+def metric_trend(
+    func: Callable[[pd.DataFrame], Dict],
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+    root: str = SNAPSHOT_DIR,
+    **kwargs
+) -> pd.DataFrame:
+    """
+    Evaluate a dict-returning analysis function at every version in a range.
+
+    Works with ``get_summary_stats`` and the other ``src/analysis.py``
+    functions returning a Dict. Pass ``columns`` to load only what the
+    function reads.
+
+    Args:
+        func (Callable[[pd.DataFrame], Dict]): Analysis function
+        first (Optional[int]): First version (oldest recorded if None)
+        last (Optional[int]): Last version (latest if None)
+        columns (Optional[List[str]]): Columns the function needs (all if None)
+        root (str): Snapshot directory
+        **kwargs: Extra arguments for func
+
+    Returns:
+        pd.DataFrame: One row per version, indexed by version
+    """
+    manifest = read_manifest(root)
+    first = first or (manifest[0]['version'] if manifest else None)
+    rows = []
+    for entry, state, _, _ in _replay(first, last, columns, root):
+        result = func(state.reset_index(), **kwargs)
+        rows.append({'version': entry['version'], 'created': entry['created'], **result})
+    return pd.DataFrame(rows).set_index('version')
+
+def group_mean_trend(
+    value: str,
+    by: str = 'categories',
+    groups: Optional[List[str]] = None,
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+    root: str = SNAPSHOT_DIR
+) -> pd.DataFrame:
+    """
+    Track the mean of a column per group across versions, e.g. average sugar
+    per category.
+
+    Group sums and counts are updated from each delta's old and new rows
+    rather than recomputed over the whole dataset.
+
+    Args:
+        value (str): Numeric column to average
+        by (str): Column to group by
+        groups (Optional[List[str]]): Groups to report (all if None)
+        first (Optional[int]): First version (oldest recorded if None)
+        last (Optional[int]): Last version (latest if None)
+        root (str): Snapshot directory
+
+    Returns:
+        pd.DataFrame: Mean per group (columns) and version (rows)
+    """
+    manifest = read_manifest(root)
+    first = first or (manifest[0]['version'] if manifest else None)
+
+    def totals(frame: pd.DataFrame) -> pd.DataFrame:
+        return frame.groupby(by)[value].agg(['sum', 'count'])
+
+    means = {}
+    sums = None
+    for entry, state, old, new in _replay(first, last, [by, value], root):
+        if sums is None or old is None:
+            # The first version reported, or a base reloaded in between
+            sums = totals(state)
+        else:
+            sums = sums.sub(totals(old), fill_value=0).add(totals(new), fill_value=0)
+        counts = sums['count'].where(sums['count'] > 0)
+        means[entry['version']] = sums['sum'] / counts
+
+    result = pd.DataFrame(means).T.rename_axis('version')
+    if groups is not None:
+        result = result.reindex(columns=groups)
+    return result.round(3)
+
+def changed_products(
+    from_version: int,
+    to_version: Optional[int] = None,
+    columns: List[str] = NUTRIENT_COLUMNS,
+    root: str = SNAPSHOT_DIR
+) -> pd.DataFrame:
+    """
+    List products whose values changed between two versions, e.g.
+    reformulations when given the nutrient columns.
+
+    Only products touched by the deltas in between are compared.
+
+    Args:
+        from_version (int): Earlier version
+        to_version (Optional[int]): Later version (latest if None)
+        columns (List[str]): Columns to compare
+        root (str): Snapshot directory
+
+    Returns:
+        pd.DataFrame: One row per changed value (code, product_name,
+        column, before, after)
+    """
+    before = None
+    touched = set()
+    for entry, state, old, new in _replay(from_version, to_version, ['product_name'] + columns, root):
+        if before is None:
+            before = state.copy()
+        elif old is None:
+            touched.update(state.index)  # a base in between: compare everything
+        else:
+            touched.update(old.index)
+            touched.update(new.index)
+
+    codes = before.index.intersection(pd.Index(list(touched))).intersection(state.index)
+    old_values = before.loc[codes, columns]
+    new_values = state.loc[codes, columns]
+    differs = ~((old_values == new_values) | (old_values.isna() & new_values.isna()))
+
+    changes = differs.stack()
+    changes = changes[changes].index
+    if len(changes) == 0:
+        return pd.DataFrame(columns=['code', 'product_name', 'column', 'before', 'after'])
+    return pd.DataFrame({
+        'code': changes.get_level_values(0),
+        'product_name': state.loc[changes.get_level_values(0), 'product_name'].to_numpy(),
+        'column': changes.get_level_values(1),
+        'before': [old_values.at[c, col] for c, col in changes],
+        'after': [new_values.at[c, col] for c, col in changes],
+    })
@@ -0,0 +1,368 @@
+"""
+Module for the category taxonomy and hierarchical rollups.
+
+The taxonomy is read from a file in the Open Food Facts taxonomy format (see
+``data/taxonomies/categories.txt``): one block per category listing its
+parents and its names in several languages. Every name, in any language,
+becomes a synonym of the category, so "Boissons", "en:beverages" and
+"Getränke" all resolve to the same node.
+
+Categories form a DAG: a node may have several parents. The closure table
+lists every (descendant, ancestor) pair, the node itself included, so the
+rollup of any aggregate to all ancestors is a single join of per-node
+aggregates with the closure followed by a group-by on the ancestor. The
+first parent of a node is its primary parent; following primary parents
+gives the tree the sunburst is drawn from, where every product counts once
+per ring.
+"""
+
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .config import TAXONOMY_PATH
+
+# 'en:Name, synonym' lines; properties ('wikidata:en:Q123') have a longer prefix
+NAMES_LINE = re.compile(r'^([a-z]{2,3}(?:_[a-z]{2})?):(.+)$')
+# Language prefix of a tag value, e.g. 'en:potato-crisps'
+LANGUAGE_PREFIX = re.compile(r'^[a-z]{2,3}(?:[_-][a-z]{2})?:', re.IGNORECASE)
+
+# Aggregates whose per-node partial results roll up to ancestors
+DECOMPOSABLE = {'count', 'size', 'sum', 'mean', 'min', 'max'}
+
+# Sunburst node of the products no category resolves to
+UNCLASSIFIED = 'unclassified'
+
+def _stem(word: str) -> str:
+    """Crude singular of a word, so 'biscuits' and 'biscuit' match."""
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+def name_key(name: str) -> str:
+    """
+    Normalize a category name for matching.
+
+    Accents, case, punctuation, hyphens, plurals and a leading language
+    prefix ('en:') are ignored.
+
+    Args:
+        name (str): Category name or tag
+
+    Returns:
+        str: Matching key ('' for an empty name)
+    """
+    text = LANGUAGE_PREFIX.sub('', name.strip())
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    return ' '.join(_stem(word) for word in re.split(r'[\W_]+', text) if word)
+
+def _slug(name: str) -> str:
+    """Id part of a name, the way Open Food Facts builds tags."""
+    return re.sub(r'[\W_]+', '-', name.strip().lower()).strip('-')
+
+def _split_names(text: str) -> List[str]:
+    """Split a names line on unescaped commas."""
+    return [n.replace('\\,', ',').strip() for n in re.split(r'(?<!\\),', text) if n.strip()]
+
+def parse_taxonomy(lines: Iterable[str]) -> List[Dict]:
+    """
+    Parse an Open Food Facts taxonomy file.
+
+    Args:
+        lines (Iterable[str]): Lines of the file
+
+    Returns:
+        List[Dict]: One entry per category with 'parents' (list of
+        (language, name)) and 'names' (language -> list of names)
+    """
+    entries, block = [], {'parents': [], 'names': {}}
+
+    def close():
+        if block['names']:
+            entries.append(block)
+
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            close()
+            block = {'parents': [], 'names': {}}
+            continue
+        if line.startswith('#') or line.startswith(('synonyms:', 'stopwords:')):
+            continue
+        if line.startswith('<'):
+            match = NAMES_LINE.match(line[1:].strip())
+            if match:
+                block['parents'].append((match.group(1), match.group(2).strip()))
+            continue
+        match = NAMES_LINE.match(line)
+        if match and not NAMES_LINE.match(match.group(2).strip()):
+            block['names'].setdefault(match.group(1), []).extend(_split_names(match.group(2)))
+    close()
+    return entries
+
+class Taxonomy:
+    """
+    Category hierarchy with a precomputed closure table.
+
+    Args:
+        entries (List[Dict]): Output of parse_taxonomy
+    """
+
+    def __init__(self, entries: List[Dict]):
+        ids, labels, synonyms, by_language = [], [], {}, {}
+        for entry in entries:
+            language, names = next(iter(entry['names'].items()))
+            node = f"{language}:{_slug(names[0])}"
+            ids.append(node)
+            labels.append(entry['names'].get('en', names)[0])
+            for lang, lang_names in entry['names'].items():
+                for name in lang_names:
+                    by_language.setdefault((lang, name_key(name)), node)
+                    synonyms.setdefault(name_key(name), node)
+
+        self.index = pd.Index(ids)
+        self.labels = pd.Series(labels, index=self.index)
+        self._synonyms = synonyms
+
+        # Parents are written as names; unknown parents are ignored
+        self.parents: Dict[str, List[str]] = {}
+        for node, entry in zip(ids, entries):
+            resolved = [by_language.get((lang, name_key(name))) for lang, name in entry['parents']]
+            self.parents[node] = [p for p in dict.fromkeys(resolved) if p is not None and p != node]
+
+        self.closure = self._closure(primary=False)
+        self.tree = self._closure(primary=True)
+        primary = self.tree[self.tree['distance'] == 1]
+        self.primary_parent = pd.Series(-1, index=np.arange(len(ids)))
+        self.primary_parent[primary['descendant'].to_numpy()] = primary['ancestor'].to_numpy()
+        self.depth = self.tree.groupby('descendant')['distance'].max().reindex(range(len(ids))).to_numpy()
+
+    @classmethod
+    def load(cls, path: str = TAXONOMY_PATH) -> 'Taxonomy':
+        """Read a taxonomy file."""
+        with open(path, encoding='utf-8') as f:
+            return cls(parse_taxonomy(f))
+
+    def _closure(self, primary: bool) -> pd.DataFrame:
+        """
+        Build the closure table by walking up from every node.
+
+        Returns:
+            pd.DataFrame: Node positions 'descendant' and 'ancestor' with the
+            shortest 'distance' between them, self pairs included
+        """
+        position = {node: i for i, node in enumerate(self.index)}
+        descendants, ancestors, distances = [], [], []
+        for node, start in position.items():
+            seen = {start: 0}
+            queue = deque([node])
+            while queue:
+                current = queue.popleft()
+                parents = self.parents[current][:1] if primary else self.parents[current]
+                for parent in parents:
+                    if position[parent] not in seen:
+                        seen[position[parent]] = seen[position[current]] + 1
+                        queue.append(parent)
+            descendants.extend([start] * len(seen))
+            ancestors.extend(seen.keys())
+            distances.extend(seen.values())
+        closure = pd.DataFrame({'descendant': descendants, 'ancestor': ancestors, 'distance': distances})
+        return closure.sort_values(['descendant', 'distance'], kind='stable').reset_index(drop=True)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        Resolve one category name or comma-separated list of names.
+
+        Of several recognized names, the deepest node wins (the first one on ties).
+
+        Returns:
+            Optional[str]: Node id, None if no name is recognized
+        """
+        best, best_depth = None, -1
+        for part in name.split(','):
+            node = self._synonyms.get(name_key(part))
+            if node is not None:
+                depth = self.depth[self.index.get_loc(node)]
+                if depth > best_depth:
+                    best, best_depth = node, depth
+        return best
+
+    def resolve(self, values: pd.Series) -> pd.Series:
+        """
+        Map category values to node ids.
+
+        Each distinct value is resolved once, so the cost depends on the
+        number of distinct categories rather than on the number of products.
+
+        Args:
+            values (pd.Series): Category names, tags or comma-separated lists
+
+        Returns:
+            pd.Series: Node id per value, NaN where nothing is recognized
+        """
+        codes, uniques = pd.factorize(values)
+        resolved = np.array([self.lookup(str(u)) for u in uniques] + [None], dtype=object)
+        return pd.Series(resolved[codes], index=values.index, dtype=object).where(lambda s: s.notna(), np.nan)
+
+    def positions(self, nodes: pd.Series) -> np.ndarray:
+        """Position of each node id in the taxonomy, -1 where missing or unknown."""
+        codes, uniques = pd.factorize(nodes)
+        lookup = np.append(self.index.get_indexer(uniques), -1)
+        return lookup[codes]
+
+    def ancestors(self, node: str, primary: bool = False) -> List[str]:
+        """Ids of a node and its ancestors, nearest first."""
+        closure = self.tree if primary else self.closure
+        rows = closure[closure['descendant'] == self.index.get_loc(node)]
+        return self.index[rows['ancestor'].to_numpy()].tolist()
+
+    def descendants(self, node: str, primary: bool = False) -> List[str]:
+        """Ids of a node and all nodes below it."""
+        closure = self.tree if primary else self.closure
+        rows = closure[closure['ancestor'] == self.index.get_loc(node)]
+        return self.index[rows['descendant'].to_numpy()].tolist()
+
+    def rollup(self, nodes: pd.Series, values: Optional[pd.DataFrame] = None,
+               agg: Optional[Dict[str, str]] = None, primary: bool = False) -> pd.DataFrame:
+        """
+        Aggregate products into every ancestor of their category.
+
+        Decomposable aggregates (count, sum, mean, min, max) are computed per
+        node first and then joined with the closure, so the join has one row
+        per (node, ancestor) pair whatever the number of products. Other
+        aggregates (median, std, ...) join the products themselves with the
+        closure.
+
+        Args:
+            nodes (pd.Series): Node id per product
+            values (Optional[pd.DataFrame]): Columns to aggregate, aligned with nodes
+            agg (Optional[Dict[str, str]]): Column -> aggregate name
+            primary (bool): Roll up along primary parents only (a tree)
+
+        Returns:
+            pd.DataFrame: Indexed by node id, with 'label', 'depth', 'products'
+            (products at or below the node) and one column per aggregate;
+            only nodes with products
+        """
+        agg = agg or {}
+        closure = self.tree if primary else self.closure
+        positions = self.positions(nodes)
+        mapped = positions >= 0
+        frame = pd.DataFrame({'node': positions[mapped]})
+        for column in agg:
+            frame[column] = values[column].to_numpy()[mapped]
+
+        if set(agg.values()) <= DECOMPOSABLE:
+            parts = {'products': ('node', 'size')}
+            for column, func in agg.items():
+                if func == 'mean':
+                    parts[f'{column}__sum'] = (column, 'sum')
+                    parts[f'{column}__count'] = (column, 'count')
+                else:
+                    parts[column] = (column, 'size' if func == 'size' else func)
+            per_node = frame.groupby('node').agg(**parts)
+            joined = closure.merge(per_node, left_on='descendant', right_index=True)
+            combine = {name: ('min' if parts[name][1] == 'min' else 'max' if parts[name][1] == 'max' else 'sum')
+                       for name in parts}
+            result = joined.groupby('ancestor').agg(combine)
+            for column, func in agg.items():
+                if func == 'mean':
+                    result[column] = result.pop(f'{column}__sum') / result.pop(f'{column}__count').replace(0, np.nan)
+        else:
+            # Expand every product into its ancestors: the closure is sorted by
+            # descendant, so each node's ancestors are one contiguous slice
+            starts = np.searchsorted(closure['descendant'].to_numpy(), np.arange(len(self)), side='left')
+            counts = np.bincount(closure['descendant'].to_numpy(), minlength=len(self))
+            repeat = counts[frame['node'].to_numpy()]
+            rows = np.repeat(np.arange(len(frame)), repeat)
+            offsets = np.arange(len(rows)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+            expanded = frame.iloc[rows].reset_index(drop=True)
+            expanded['ancestor'] = closure['ancestor'].to_numpy()[np.repeat(starts[frame['node'].to_numpy()], repeat) + offsets]
+            result = expanded.groupby('ancestor').agg(products=('node', 'size'), **{c: (c, f) for c, f in agg.items()})
+
+        result.index = self.index[result.index.to_numpy()]
+        positions = self.index.get_indexer(result.index)
+        result.insert(0, 'label', self.labels.to_numpy()[positions])
+        result.insert(1, 'depth', self.depth[positions])
+        result.index.name = 'node'
+        return result
+
+    def sunburst_frame(self, nodes: pd.Series, values: Optional[pd.Series] = None,
+                       root: Optional[str] = None) -> pd.DataFrame:
+        """
+        Build the ids/parents/values of a sunburst along primary parents.
+
+        Args:
+            nodes (pd.Series): Node id per product
+            values (Optional[pd.Series]): Per-product value averaged per node
+                (e.g. nutrient_score), aligned with nodes
+            root (Optional[str]): Only draw this node and its subtree
+
+        Returns:
+            pd.DataFrame: 'id', 'parent' ('' at the top), 'label', 'products'
+            and, with values, 'value' (mean over the subtree); products
+            without a known category form an 'unclassified' top-level node
+        """
+        frame = pd.DataFrame({'value': values.to_numpy() if values is not None else np.full(len(nodes), np.nan)})
+        rolled = self.rollup(nodes, frame, {'value': 'mean'}, primary=True)
+        parents = self.primary_parent.to_numpy()[self.index.get_indexer(rolled.index)]
+        rolled['parent'] = np.where(parents >= 0, self.index[np.maximum(parents, 0)], '')
+
+        if root is not None:
+            rolled = rolled[rolled.index.isin(self.descendants(root, primary=True))]
+            rolled.loc[rolled.index == root, 'parent'] = ''
+        else:
+            unmapped = self.positions(nodes) < 0
+            if unmapped.any():
+                rolled.loc[UNCLASSIFIED] = {
+                    'label': 'Unclassified', 'depth': 0, 'products': int(unmapped.sum()),
+                    'value': frame['value'][unmapped].mean(), 'parent': '',
+                }
+        result = rolled.reset_index().rename(columns={'node': 'id'})
+        columns = ['id', 'parent', 'label', 'products'] + (['value'] if values is not None else [])
+        return result[columns].sort_values(['parent', 'products'], ascending=[True, False]).reset_index(drop=True)
+
+@lru_cache(maxsize=4)
+def load_taxonomy(path: str = TAXONOMY_PATH) -> Taxonomy:
+    """Return the taxonomy of a file, parsing it once per process."""
+    return Taxonomy.load(path)
+
+def category_nodes(df: pd.DataFrame, taxonomy: Optional[Taxonomy] = None) -> pd.Series:
+    """
+    Return the taxonomy node of every product.
+
+    Uses the 'category_node' column written by the ETL, resolving the
+    'categories' column for data processed before it existed.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        taxonomy (Optional[Taxonomy]): Taxonomy, the configured one by default
+
+    Returns:
+        pd.Series: Node id per product, NaN where unknown
+    """
+    if 'category_node' in df:
+        return df['category_node']
+    return (taxonomy or load_taxonomy()).resolve(df['categories'])
+
+def category_sunburst(df: pd.DataFrame, root: Optional[str] = None) -> pd.DataFrame:
+    """
+    Sunburst frame of a product DataFrame, colored by average nutrient score.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        root (Optional[str]): Only draw this node and its subtree
+
+    Returns:
+        pd.DataFrame: See Taxonomy.sunburst_frame
+    """
+    return load_taxonomy().sunburst_frame(category_nodes(df), df['nutrient_score'], root)
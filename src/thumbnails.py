@@ -0,0 +1,356 @@
+"""
+Module for a local cache of product thumbnails.
+
+Product tables show small thumbnails of ``image_url`` instead of letting
+every browser load the full-size images from the OpenFoodFacts CDN. The
+images are fetched in the background by a bounded pool of workers, shrunk
+to ``THUMBNAIL_SIZE`` pixels and re-encoded as JPEG. They are then stored
+under the digest of their bytes (``<dir>/ab/abcd....jpg``), so products
+that share a picture share one file. A SQLite index next to the files maps
+each source URL to its digest and keeps the access times. All processes on
+the host share it, as with the memo store (``src/memo.py``).
+
+The files are kept under a byte budget by evicting the least recently used
+thumbnails after each write. URLs that fail (4xx, 5xx, timeouts, images
+that cannot be decoded) are remembered for ``THUMBNAIL_RETRY_AFTER``
+seconds, so a missing image is not fetched again on every rerun.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from PIL import Image, UnidentifiedImageError
+
+from .config import (
+    THUMBNAIL_CONCURRENCY,
+    THUMBNAIL_DIR,
+    THUMBNAIL_MAX_BYTES,
+    THUMBNAIL_MAX_SOURCE_BYTES,
+    THUMBNAIL_QUALITY,
+    THUMBNAIL_RETRY_AFTER,
+    THUMBNAIL_SIZE,
+    THUMBNAIL_TIMEOUT,
+)
+
+INDEX_FILE = "index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    url TEXT PRIMARY KEY,
+    digest TEXT,
+    status INTEGER NOT NULL,
+    fetched REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sources_digest ON sources (digest);
+CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access);
+"""
+
+class ThumbnailError(Exception):
+    """An image could not be fetched or decoded."""
+
+    def __init__(self, message: str, status: int = 0):
+        super().__init__(message)
+        self.status = status
+
+def make_thumbnail(data: bytes, size: int = THUMBNAIL_SIZE, quality: int = THUMBNAIL_QUALITY) -> bytes:
+    """
+    Shrink an encoded image to fit a size x size box.
+
+    Args:
+        data (bytes): Encoded source image (JPEG, PNG, WebP, ...)
+        size (int): Longest side of the thumbnail in pixels
+        quality (int): JPEG quality of the thumbnail
+
+    Returns:
+        bytes: JPEG-encoded thumbnail
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # Let the JPEG decoder skip detail the thumbnail drops anyway
+            image.draft('RGB', (size, size))
+            image = image.convert('RGB')
+            image.thumbnail((size, size))
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ThumbnailError(f"Undecodable image: {e}") from e
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=quality, optimize=True)
+    return out.getvalue()
+
+class ThumbnailCache:
+    """
+    Content-addressed thumbnail store with a background fetch pool.
+
+    Args:
+        directory (str): Directory of the thumbnail files and their index
+        max_bytes (int): Budget of stored thumbnails; least recently used
+            ones are evicted above it
+        concurrency (int): Images fetched at once
+        size (int): Longest side of the thumbnails in pixels
+        timeout (float): Seconds per image request
+    """
+
+    def __init__(self, directory: str = THUMBNAIL_DIR, max_bytes: int = THUMBNAIL_MAX_BYTES,
+                 concurrency: int = THUMBNAIL_CONCURRENCY, size: int = THUMBNAIL_SIZE,
+                 timeout: float = THUMBNAIL_TIMEOUT):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.size = size
+        self.timeout = timeout
+        self.fetched = 0
+        self.failed = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='thumbnails')
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's index connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(str(self.directory / INDEX_FILE), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _session(self) -> requests.Session:
+        """Return this thread's HTTP session, so connections to the CDN are reused."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.jpg"
+
+    def get(self, url: str) -> Optional[bytes]:
+        """
+        Look up the thumbnail of a URL.
+
+        Returns:
+            Optional[bytes]: JPEG thumbnail, or None if it is not cached
+        """
+        conn = self._connection()
+        row = conn.execute("SELECT digest FROM sources WHERE url = ? AND digest IS NOT NULL", (url,)).fetchone()
+        if row is None:
+            return None
+        try:
+            data = self._path(row[0]).read_bytes()
+        except FileNotFoundError:
+            # Evicted by another process since the lookup
+            conn.execute("DELETE FROM sources WHERE url = ?", (url,))
+            return None
+        conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), row[0]))
+        return data
+
+    def data_uri(self, url: str) -> Optional[str]:
+        """Cached thumbnail of a URL as a data: URI, which tables can show without another request."""
+        data = self.get(url)
+        return None if data is None else 'data:image/jpeg;base64,' + base64.b64encode(data).decode('ascii')
+
+    def _download(self, url: str) -> bytes:
+        """Fetch an image, refusing bodies over THUMBNAIL_MAX_SOURCE_BYTES."""
+        try:
+            with self._session().get(url, timeout=self.timeout, stream=True) as response:
+                if response.status_code != 200:
+                    raise ThumbnailError(f"HTTP {response.status_code}", response.status_code)
+                chunks, total = [], 0
+                for chunk in response.iter_content(1 << 16):
+                    total += len(chunk)
+                    if total > THUMBNAIL_MAX_SOURCE_BYTES:
+                        raise ThumbnailError(f"Image over {THUMBNAIL_MAX_SOURCE_BYTES} bytes")
+                    chunks.append(chunk)
+                return b''.join(chunks)
+        except requests.RequestException as e:
+            raise ThumbnailError(f"Request failed: {e}") from e
+
+    def store(self, url: str, thumbnail: bytes) -> str:
+        """
+        Store a thumbnail under its digest and point the URL at it.
+
+        Returns:
+            str: Digest of the thumbnail
+        """
+        digest = hashlib.sha256(thumbnail).hexdigest()[:32]
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix='.jpg', dir=path.parent)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(thumbnail)
+            os.replace(tmp_path, path)
+        now = time.time()
+        conn = self._connection()
+        conn.execute("INSERT OR REPLACE INTO blobs (digest, size, last_access) VALUES (?, ?, ?)",
+                     (digest, len(thumbnail), now))
+        conn.execute("INSERT OR REPLACE INTO sources (url, digest, status, fetched) VALUES (?, ?, 200, ?)",
+                     (url, digest, now))
+        self.evict()
+        return digest
+
+    def fetch(self, url: str) -> bool:
+        """
+        Fetch, shrink and store the image of a URL, now.
+
+        Returns:
+            bool: True if the thumbnail was stored
+        """
+        try:
+            self.store(url, make_thumbnail(self._download(url), self.size))
+        except Exception as e:
+            # Any failure (HTTP, decoding, encoding, a full disk, a locked
+            # index) is remembered, so the URL waits THUMBNAIL_RETRY_AFTER
+            # instead of being fetched again by every rerun
+            status = e.status if isinstance(e, ThumbnailError) else 0
+            try:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO sources (url, digest, status, fetched) VALUES (?, NULL, ?, ?)",
+                    (url, status, time.time())
+                )
+            except sqlite3.Error:
+                pass  # Unrecorded; a later rerun tries again
+            self.failed += 1
+            return False
+        self.fetched += 1
+        return True
+
+    def _wanted(self, urls: Iterable[str]) -> List[str]:
+        """URLs neither cached, failed recently, nor being fetched."""
+        urls = [u for u in dict.fromkeys(urls) if isinstance(u, str) and u.startswith(('http://', 'https://'))]
+        if not urls:
+            return []
+        known = set()
+        conn = self._connection()
+        retry_before = time.time() - THUMBNAIL_RETRY_AFTER
+        for start in range(0, len(urls), 500):
+            batch = urls[start:start + 500]
+            known.update(row[0] for row in conn.execute(
+                f"SELECT url FROM sources WHERE url IN ({', '.join('?' * len(batch))}) "
+                "AND (digest IS NOT NULL OR fetched > ?)",
+                (*batch, retry_before)
+            ))
+        with self._lock:
+            return [u for u in urls if u not in known and u not in self._pending]
+
+    def prefetch(self, urls: Iterable[str]) -> List[Future]:
+        """
+        Queue the missing thumbnails of some URLs without waiting for them.
+
+        Args:
+            urls (Iterable[str]): Image URLs (missing values are skipped)
+
+        Returns:
+            List[Future]: The fetches of these URLs still in flight, new or
+            queued earlier
+        """
+        urls = [u for u in urls if isinstance(u, str)]
+        for url in self._wanted(urls):
+            with self._lock:
+                if url in self._pending:
+                    continue
+                future = self._pending[url] = self._executor.submit(self.fetch, url)
+            future.add_done_callback(lambda _, url=url: self._done(url))
+        with self._lock:
+            return [self._pending[u] for u in dict.fromkeys(urls) if u in self._pending]
+
+    def _done(self, url: str) -> None:
+        with self._lock:
+            self._pending.pop(url, None)
+
+    def thumbnails(self, urls: Iterable[str], wait_seconds: float = 0.0) -> List[Optional[str]]:
+        """
+        Data URIs of the thumbnails of some URLs, fetching the missing ones.
+
+        Args:
+            urls (Iterable[str]): Image URLs, one per table row
+            wait_seconds (float): How long to wait for missing thumbnails
+                before returning without them
+
+        Returns:
+            List[Optional[str]]: Data URI per URL; None while not (yet) cached
+        """
+        urls = list(urls)
+        in_flight = self.prefetch(urls)
+        if in_flight and wait_seconds > 0:
+            wait(in_flight, timeout=wait_seconds)
+        return [self.data_uri(u) if isinstance(u, str) else None for u in urls]
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Evict least recently used thumbnails until the store fits the budget.
+
+        Args:
+            max_bytes (Optional[int]): Budget, defaults to the store's
+
+        Returns:
+            int: Number of thumbnails evicted
+        """
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        conn = self._connection()
+        stale = [row[0] for row in conn.execute(
+            "SELECT digest FROM (SELECT digest, SUM(size) OVER (ORDER BY last_access DESC, digest) AS kept FROM blobs)"
+            " WHERE kept > ?",
+            (budget,)
+        )]
+        for start in range(0, len(stale), 500):
+            batch = stale[start:start + 500]
+            marks = ', '.join('?' * len(batch))
+            conn.execute(f"DELETE FROM sources WHERE digest IN ({marks})", batch)
+            conn.execute(f"DELETE FROM blobs WHERE digest IN ({marks})", batch)
+        for digest in stale:
+            self._path(digest).unlink(missing_ok=True)
+        return len(stale)
+
+    def stats(self) -> Dict:
+        """
+        Summarize the store and this process's fetches.
+
+        Returns:
+            Dict: Thumbnails, source URLs, failed URLs, stored bytes, budget,
+            fetches in flight, and this process's fetched and failed counts
+        """
+        conn = self._connection()
+        thumbnails, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        sources, failures = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(digest IS NULL), 0) FROM sources"
+        ).fetchone()
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'thumbnails': thumbnails,
+            'sources': sources,
+            'failures': failures,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'pending': pending,
+            'fetched': self.fetched,
+            'failed': self.failed,
+        }
+
+# One cache per directory and process
+_caches: Dict[str, ThumbnailCache] = {}
+
+def get_thumbnail_cache(directory: str = THUMBNAIL_DIR) -> ThumbnailCache:
+    """Return this process's cache for a directory, opening it on first use."""
+    cache = _caches.get(str(directory))
+    if cache is None:
+        cache = _caches[str(directory)] = ThumbnailCache(directory)
+    return cache
@@ -0,0 +1,226 @@
+"""
+Module for validating product rows before they are scored and loaded.
+
+Rules are declared in ``VALIDATION_RULES`` (config) and evaluated as
+vectorized column expressions over the whole frame, so one pass flags every
+row. Each rule owns one bit of a per-row flag word; a row with any bit set is
+quarantined, with the codes of the rules it fails as its reasons.
+
+Rule keys (a missing value never fails a rule):
+
+- ``numeric``: columns that must hold numbers. Numbers stored as strings
+  ("12.5") are converted; other values fail the rule and become missing.
+- ``columns`` with ``min`` and/or ``max``: bounds every listed column must
+  respect
+- ``column`` with ``at_most``: the column may not exceed another column by
+  more than ``slack``
+- ``sum`` with ``max``: bound on the sum of the listed columns
+- ``column`` with ``estimate``: the column must stay within ``tolerance``
+  (relative) plus ``slack`` of a weighted sum of other columns; rows missing
+  any of them are not checked
+"""
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import NUTRIENT_COLUMNS, VALIDATION_RULES
+
+# Column carrying the flag word of each row between transform and quarantine
+FLAGS_COLUMN = 'validation_flags'
+
+# Columns kept in the quarantine table besides the reasons
+QUARANTINE_COLUMNS = ['code', 'product_name', 'brands', 'categories'] + NUTRIENT_COLUMNS
+
+def _to_numeric(values: pd.Series) -> Tuple[pd.Series, np.ndarray]:
+    """Convert a column to float, with a mask of the values that are not numbers."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype('float64'), np.zeros(len(values), dtype=bool)
+    numbers = pd.to_numeric(values, errors='coerce').astype('float64')
+    return numbers, (values.notna() & numbers.isna()).to_numpy()
+
+def _rule_failures(rule: Dict, column) -> np.ndarray:
+    """Rows failing one (non-numeric) rule; column(name) returns float values or None."""
+    if 'sum' in rule:
+        values = [column(name) for name in rule['sum']]
+        values = [v for v in values if v is not None]
+        if not values:
+            return None
+        total = np.zeros_like(values[0])
+        for v in values:
+            total += np.nan_to_num(v)
+        return total > rule['max']
+
+    if 'columns' in rule:
+        failed = None
+        for name in rule['columns']:
+            values = column(name)
+            if values is None:
+                continue
+            out = np.zeros(len(values), dtype=bool)
+            if 'min' in rule:
+                out |= values < rule['min']
+            if 'max' in rule:
+                out |= values > rule['max']
+            failed = out if failed is None else failed | out
+        return failed
+
+    values = column(rule['column'])
+    if values is None:
+        return None
+    if 'at_most' in rule:
+        limit = column(rule['at_most'])
+        return None if limit is None else values > limit + rule.get('slack', 0)
+    if 'estimate' in rule:
+        weighted = [(column(name), factor) for name, factor in rule['estimate'].items()]
+        if any(v is None for v, _ in weighted):
+            return None
+        # NaN propagates, so rows missing a term compare False
+        estimate = sum(v * factor for v, factor in weighted)
+        return np.abs(values - estimate) > estimate * rule.get('tolerance', 0) + rule.get('slack', 0)
+    raise ValueError(f"Unknown validation rule: {rule}")
+
+def validate(df: pd.DataFrame, rules: Dict[str, Dict] = VALIDATION_RULES) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Evaluate the validation rules over a product DataFrame.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        rules (Dict[str, Dict]): Rules by reason code
+
+    Returns:
+        Tuple[pd.DataFrame, np.ndarray]: df with the ``numeric`` columns
+        converted to float, and the flag word of each row (bit i set when the
+        row fails the i-th rule)
+    """
+    if len(rules) > 64:
+        raise ValueError("At most 64 validation rules are supported")
+    flags = np.zeros(len(df), dtype=np.uint64)
+    bits = {code: np.uint64(1) << np.uint64(bit) for bit, code in enumerate(rules)}
+
+    # Conversions first, so every other rule sees numbers
+    converted = {}
+    for code, rule in rules.items():
+        for name in rule.get('numeric', []):
+            if name in df:
+                converted[name], failed = _to_numeric(df[name])
+                flags[failed] |= bits[code]
+    if converted:
+        df = df.assign(**converted)
+
+    cache = {}
+    def column(name: str):
+        if name not in df:
+            return None
+        if name not in cache:
+            cache[name] = _to_numeric(df[name])[0].to_numpy()
+        return cache[name]
+
+    for code, rule in rules.items():
+        if 'numeric' in rule:
+            continue
+        failed = _rule_failures(rule, column)
+        if failed is not None:
+            flags[failed] |= bits[code]
+    return df, flags
+
+def rule_columns(rules: Dict[str, Dict] = VALIDATION_RULES) -> List[str]:
+    """
+    List the columns the rules read.
+
+    Args:
+        rules (Dict[str, Dict]): Rules by reason code
+
+    Returns:
+        List[str]: Column names, in rule order without repeats
+    """
+    columns = []
+    for rule in rules.values():
+        columns.extend(rule.get('numeric', []))
+        columns.extend(rule.get('columns', []))
+        columns.extend(rule.get('sum', []))
+        columns.extend(name for name in (rule.get('column'), rule.get('at_most')) if name)
+        columns.extend(rule.get('estimate', {}))
+    return list(dict.fromkeys(columns))
+
+def reason_codes(flags: np.ndarray, rules: Dict[str, Dict] = VALIDATION_RULES) -> np.ndarray:
+    """
+    Spell out flag words as reason codes.
+
+    Args:
+        flags (np.ndarray): Flag words from validate
+        rules (Dict[str, Dict]): Rules the flags were computed with
+
+    Returns:
+        np.ndarray: ';'-separated codes of the failed rules, per row
+    """
+    codes = list(rules)
+    # Few distinct combinations occur, so each is spelled out once
+    words, inverse = np.unique(flags, return_inverse=True)
+    spelled = np.array([
+        ';'.join(code for bit, code in enumerate(codes) if int(word) >> bit & 1) for word in words
+    ], dtype=object)
+    return spelled[inverse]
+
+def split_quarantine(df: pd.DataFrame, flags: np.ndarray,
+                     rules: Dict[str, Dict] = VALIDATION_RULES) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Separate the rows failing validation.
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        flags (np.ndarray): Flag word of each row, from validate
+        rules (Dict[str, Dict]): Rules the flags were computed with
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Valid rows, and the quarantined
+        rows with a leading 'reasons' column
+    """
+    failed = flags != 0
+    quarantined = df.loc[failed, [c for c in QUARANTINE_COLUMNS if c in df]]
+    quarantined.insert(0, 'reasons', reason_codes(flags[failed], rules))
+    return df[~failed], quarantined
+
+def violation_counts(quarantined: pd.DataFrame, rules: Dict[str, Dict] = VALIDATION_RULES) -> pd.DataFrame:
+    """
+    Count the quarantined rows failing each rule.
+
+    Args:
+        quarantined (pd.DataFrame): Quarantine table from split_quarantine
+        rules (Dict[str, Dict]): Validation rules
+
+    Returns:
+        pd.DataFrame: 'rule', 'description' and 'violations', one row per
+        rule, most violated first; a row failing several rules counts for each
+    """
+    counts = quarantined['reasons'].str.split(';').explode().value_counts()
+    result = pd.DataFrame({
+        'rule': list(rules),
+        'description': [rule['description'] for rule in rules.values()],
+    })
+    result['violations'] = result['rule'].map(counts).fillna(0).astype('int64')
+    return result.sort_values('violations', ascending=False, kind='stable').reset_index(drop=True)
+
+def write_quarantine(quarantined: pd.DataFrame, filepath: str, append: bool = False) -> None:
+    """
+    Replace the quarantine table with the rows of the latest refresh.
+
+    Args:
+        quarantined (pd.DataFrame): Quarantine table from split_quarantine
+        filepath (str): Quarantine file
+        append (bool): Add the rows to the table instead, replacing earlier
+            rows of the same products
+    """
+    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+    if append:
+        quarantined = pd.concat([read_quarantine(filepath), quarantined.astype({'code': str})], ignore_index=True)
+        quarantined = quarantined.drop_duplicates('code', keep='last')
+    quarantined.to_csv(filepath, index=False, encoding='utf-8')
+
+def read_quarantine(filepath: str) -> pd.DataFrame:
+    """Load the quarantine table; empty if no refresh has written one."""
+    if not Path(filepath).exists():
+        return pd.DataFrame(columns=['reasons'] + QUARANTINE_COLUMNS)
+    return pd.read_csv(filepath, dtype={'code': str})
@@ -0,0 +1,162 @@
+"""
+Module for the dashboard views that depend only on the filtered products.
+
+The sidebar filters and the charts built from the filtered products live
+here, as functions of the product DataFrame, instead of inline in
+``app.main``. Each chart can then go through the disk memo like the analysis
+results. A worker that has never drawn a view, or the warm-up job
+(``src/warmup.py``), reaches the same memo key for the same filter state.
+``view_calls`` lists the memoized calls one dashboard rerun makes, and must
+be kept in step with ``app.main``.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from .analysis import (
+    category_analysis,
+    compare_scoring_profiles,
+    get_additive_prevalence,
+    get_data_quality_metrics,
+    get_grade_agreement,
+    get_healthiest_products,
+    get_summary_stats,
+    top_brands,
+)
+from .config import TAXONOMY_SUNBURST_DEPTH
+from .cooccurrence import TagIncidence, tag_cooccurrence
+from .taxonomy import category_sunburst
+from .visuals import plot_hierarchy_sunburst
+
+def filter_mask(
+    df: pd.DataFrame,
+    brands: Optional[Sequence[str]] = None,
+    categories: Optional[Sequence[str]] = None,
+    score_range: Optional[Tuple[float, float]] = None,
+    duplicates: Optional[pd.DataFrame] = None
+) -> pd.Series:
+    """
+    Rows kept by the sidebar filters (the search box aside).
+
+    Args:
+        df (pd.DataFrame): Product DataFrame
+        brands (Optional[Sequence[str]]): Selected brands (None or empty for all)
+        categories (Optional[Sequence[str]]): Selected categories (None or empty for all)
+        score_range (Optional[Tuple[float, float]]): Inclusive nutrient score range
+        duplicates (Optional[pd.DataFrame]): Near-duplicate clusters; when given,
+            only the representative of each cluster is kept
+
+    Returns:
+        pd.Series: Boolean mask aligned with df
+    """
+    mask = pd.Series(True, index=df.index)
+    if brands:
+        mask &= df['brands'].isin(brands)
+    if categories:
+        mask &= df['categories'].isin(categories)
+    if score_range is not None:
+        mask &= df['nutrient_score'].between(*score_range)
+    if duplicates is not None:
+        mask &= ~df.index.isin(duplicates.index[~duplicates['representative']])
+    return mask
+
+def brand_chart(df: pd.DataFrame) -> go.Figure:
+    """Bar chart of the 15 brands with the most products."""
+    fig = px.bar(
+        data_frame=top_brands(df).head(15),
+        x='product_count',
+        y='brand',
+        orientation='h',
+        title="Top 15 Brands by Product Count",
+        color='product_count',
+        color_continuous_scale='viridis'
+    )
+    fig.update_layout(
+        height=500,
+        margin=dict(l=20, r=20, t=40, b=20),
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    return fig
+
+def category_chart(df: pd.DataFrame) -> go.Figure:
+    """Scatter of product count against average nutrient score per category."""
+    fig = px.scatter(
+        category_analysis(df),
+        x='product_count',
+        y='nutrient_score',
+        size='product_count',
+        color='categories',
+        title="Category Analysis: Product Count vs Average Nutrient Score",
+        hover_data=['categories', 'product_count', 'nutrient_score']
+    )
+    fig.update_layout(height=500)
+    return fig
+
+def hierarchy_chart(df: pd.DataFrame, root: Optional[str] = None) -> go.Figure:
+    """Sunburst of the category hierarchy below root."""
+    fig = plot_hierarchy_sunburst(
+        category_sunburst(df, root),
+        title="Products and Average Nutrient Score by Category",
+        maxdepth=TAXONOMY_SUNBURST_DEPTH
+    )
+    fig.update_layout(height=550)
+    return fig
+
+def additive_chart(df: pd.DataFrame) -> Optional[go.Figure]:
+    """Bar chart of the 15 most common additives; None without additives."""
+    additives = get_additive_prevalence(df)
+    if additives.empty:
+        return None
+    fig = px.bar(
+        additives.head(15),
+        x='percentage',
+        y='additive',
+        orientation='h',
+        title="Most Common Additives (Top 15)",
+        color='percentage',
+        color_continuous_scale='Reds'
+    )
+    fig.update_layout(
+        height=500,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    return fig
+
+def view_calls(filtered: pd.DataFrame, unfiltered: bool,
+               incidence: TagIncidence) -> List[Tuple[Callable, tuple, Dict]]:
+    """
+    Memoized calls a dashboard rerun makes for one filter state, in page order.
+
+    Args:
+        filtered (pd.DataFrame): Filtered products
+        unfiltered (bool): True when the filters keep every product; the
+            stored dataset statistics then answer the summary and quality
+            questions
+        incidence (TagIncidence): Tag incidence of the whole dataset
+
+    Returns:
+        List[Tuple[Callable, tuple, Dict]]: (function, args, kwargs) per call
+    """
+    calls = [
+        (get_summary_stats, (filtered,), {}),
+        (top_brands, (filtered,), {}),
+        (brand_chart, (filtered,), {}),
+        (category_chart, (filtered,), {}),
+        (category_sunburst, (filtered,), {}),
+        (hierarchy_chart, (filtered, None), {}),
+        (get_healthiest_products, (filtered,), {}),
+        (compare_scoring_profiles, (filtered,), {}),
+        (get_grade_agreement, (filtered,), {}),
+        (get_additive_prevalence, (filtered,), {}),
+        (additive_chart, (filtered,), {}),
+        (tag_cooccurrence, (filtered, 'additive', 'additive'), {'incidence': incidence}),
+        (tag_cooccurrence, (filtered, 'additive', 'allergen'), {'incidence': incidence}),
+        (get_data_quality_metrics, (filtered,), {}),
+    ]
+    if unfiltered:
+        served = {get_summary_stats, get_data_quality_metrics}
+        calls = [call for call in calls if call[0] not in served]
+    return calls
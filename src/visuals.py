@@ -138,6 +138,105 @@ def plot_sunburst(df: pd.DataFrame, path: List[str], title: str = None) -> go.Fi
     
     return fig
 
+def plot_hierarchy_sunburst(frame: pd.DataFrame, title: str = None, maxdepth: int = None) -> go.Figure:
+    """
+    Create a sunburst chart of a precomputed hierarchy.
+    
+    Args:
+        frame (pd.DataFrame): 'id', 'parent', 'label', 'products' and
+            'value' columns, as built by Taxonomy.sunburst_frame
+        title (str, optional): Chart title
+        maxdepth (int, optional): Rings shown at once; clicking a segment drills down
+        
+    Returns:
+        go.Figure: Plotly figure object
+    """
+    fig = go.Figure(go.Sunburst(
+        ids=frame['id'],
+        parents=frame['parent'],
+        labels=frame['label'],
+        values=frame['products'],
+        branchvalues='total',
+        maxdepth=maxdepth,
+        marker=dict(
+            colors=frame['value'],
+            colorscale='RdYlGn',
+            colorbar=dict(title='Avg Score')
+        ),
+        hovertemplate='<b>%{label}</b><br>Products: %{value}<br>Avg score: %{color:.2f}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=title,
+        template='plotly_white',
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    
+    return fig
+
+def plot_heatmap(matrix: pd.DataFrame, title: str = None, value: str = 'value') -> go.Figure:
+    """
+    Create a heatmap of a row x column matrix.
+    
+    Args:
+        matrix (pd.DataFrame): Values to plot; NaN cells are left blank
+        title (str, optional): Chart title
+        value (str): Name of the values, shown on the color bar and on hover
+        
+    Returns:
+        go.Figure: Plotly figure object
+    """
+    fig = px.imshow(
+        matrix,
+        title=title,
+        color_continuous_scale='Reds',
+        labels=dict(color=value),
+        aspect='auto'
+    )
+    
+    fig.update_layout(
+        template='plotly_white',
+        xaxis_title=None,
+        yaxis_title=None,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    
+    return fig
+
+def plot_flame_graph(frame: pd.DataFrame, title: str = None) -> go.Figure:
+    """
+    Create an icicle (flame graph) chart of a sampled call tree.
+    
+    Args:
+        frame (pd.DataFrame): 'id', 'parent', 'label', 'samples' and 'group'
+            columns, as built by Profile.flame_frame
+        title (str, optional): Chart title
+        
+    Returns:
+        go.Figure: Plotly figure object
+    """
+    groups = {group: COLORS[i % len(COLORS)] for i, group in enumerate(sorted(frame['group'].unique()))}
+    fig = go.Figure(go.Icicle(
+        ids=frame['id'],
+        parents=frame['parent'],
+        labels=frame['label'],
+        values=frame['samples'],
+        branchvalues='total',
+        marker=dict(colors=frame['group'].map(groups)),
+        customdata=frame['group'],
+        tiling=dict(orientation='v'),
+        hovertemplate='<b>%{label}</b><br>Samples: %{value}<br>%{customdata}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=title,
+        template='plotly_white',
+        height=600,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    
+    return fig
+
 def plot_box(df: pd.DataFrame, x: str, y: str, title: str = None) -> go.Figure:
     """
     Create a box plot using Plotly.
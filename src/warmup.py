@@ -0,0 +1,344 @@
+"""
+Module for warming the analysis memo with the most requested filter states.
+
+Every dashboard rerun without a search adds one view to an access log under
+its normalized filter state, along with the memo hits and misses of that
+rerun. A normalized state holds the sorted brands and categories, the score
+range (None when it spans the whole dataset) and the duplicate toggle. The
+log keeps counts per state only, with no session, user, time of request or
+search text, so it records which views are popular and nothing about who
+asked for them.
+
+After each dataset swap, the process that published the new dataset runs
+``warm_cache`` in the background. It replays the memoized calls of
+``src/views.py`` for the K most viewed states of the last
+``ACCESS_LOG_WINDOW`` seconds, followed by the views new users hit first
+(no filter, the largest brands, the largest categories), until a time or
+byte budget runs out. The first users after a refresh then find those
+results and figures in the memo store instead of computing them.
+
+The analysis helpers print debug output. The warm-up thread drops what it
+prints (``quiet_thread``) while dashboard threads keep printing.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .config import (
+    ACCESS_LOG_PATH,
+    ACCESS_LOG_WINDOW,
+    SHARED_DATA_DIR,
+    WARMUP_MAX_BYTES,
+    WARMUP_MAX_SECONDS,
+    WARMUP_REPORT_PATH,
+    WARMUP_TOP_K,
+)
+from .cooccurrence import TagIncidence
+from .dedup import near_duplicate_clusters
+from .memo import DiskMemo, get_memo
+from .shared_data import attach_dataset, session_view
+from .views import filter_mask, view_calls
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS views (
+    state TEXT PRIMARY KEY,
+    views INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    misses INTEGER NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS views_last_seen ON views (last_seen);
+"""
+
+# Whether the current thread's prints are dropped
+_quiet = threading.local()
+_install_lock = threading.Lock()
+
+class _ThreadFilteredStream:
+    """Stand-in for sys.stdout that drops the writes of threads inside quiet_thread."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text: str) -> int:
+        if getattr(_quiet, 'active', False):
+            return len(text)
+        return self.stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+@contextmanager
+def quiet_thread() -> Iterator[None]:
+    """
+    Drop what the calling thread prints, leaving other threads' output alone.
+
+    ``contextlib.redirect_stdout`` swaps ``sys.stdout`` for every thread of
+    the process, so a background job using it would also swallow the prints
+    of concurrent reruns. Instead, stdout is wrapped once by a stream that
+    checks a thread-local flag before writing.
+    """
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadFilteredStream):
+            sys.stdout = _ThreadFilteredStream(sys.stdout)
+    previous = getattr(_quiet, 'active', False)
+    _quiet.active = True
+    try:
+        yield
+    finally:
+        _quiet.active = previous
+
+def normalize_state(
+    brands: Optional[Sequence[str]] = None,
+    categories: Optional[Sequence[str]] = None,
+    score_range: Optional[Tuple[float, float]] = None,
+    collapse_duplicates: bool = False,
+    score_bounds: Optional[Tuple[float, float]] = None
+) -> Dict:
+    """
+    Canonical form of a sidebar filter state.
+
+    Args:
+        brands (Optional[Sequence[str]]): Selected brands
+        categories (Optional[Sequence[str]]): Selected categories
+        score_range (Optional[Tuple[float, float]]): Selected score range
+        collapse_duplicates (bool): Whether near-duplicates are collapsed
+        score_bounds (Optional[Tuple[float, float]]): Score range of the whole
+            dataset; a selection spanning it is stored as None, so the state
+            still matches after a refresh moves the bounds
+
+    Returns:
+        Dict: 'brands', 'categories', 'score_range' and 'collapse_duplicates'
+    """
+    if score_range is not None:
+        score_range = [float(score_range[0]), float(score_range[1])]
+        if score_bounds is not None and score_range == [float(score_bounds[0]), float(score_bounds[1])]:
+            score_range = None
+    return {
+        'brands': sorted(brands or []),
+        'categories': sorted(categories or []),
+        'score_range': score_range,
+        'collapse_duplicates': bool(collapse_duplicates),
+    }
+
+def state_key(state: Dict) -> str:
+    """Stable text form of a normalized state, the access log's key."""
+    return json.dumps(state, sort_keys=True, separators=(',', ':'))
+
+class AccessLog:
+    """
+    Anonymous view counts per normalized filter state, shared by the processes of a host.
+
+    Args:
+        path (str): SQLite file of the log
+    """
+
+    def __init__(self, path: str = ACCESS_LOG_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, state: Dict, hits: int = 0, misses: int = 0) -> None:
+        """
+        Count one view of a filter state.
+
+        Args:
+            state (Dict): Normalized filter state
+            hits (int): Memo hits of the view's rerun
+            misses (int): Memo misses of the view's rerun
+        """
+        self._connection().execute(
+            "INSERT INTO views (state, views, hits, misses, last_seen) VALUES (?, 1, ?, ?, ?) "
+            "ON CONFLICT (state) DO UPDATE SET views = views + 1, hits = hits + excluded.hits, "
+            "misses = misses + excluded.misses, last_seen = excluded.last_seen",
+            (state_key(state), hits, misses, time.time())
+        )
+
+    def popular(self, k: int = WARMUP_TOP_K, window: float = ACCESS_LOG_WINDOW) -> List[Dict]:
+        """The k most viewed states seen within the last window seconds."""
+        rows = self._connection().execute(
+            "SELECT state FROM views WHERE last_seen > ? ORDER BY views DESC, state LIMIT ?",
+            (time.time() - window, k)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def hit_rates(self) -> pd.DataFrame:
+        """
+        Memo hit rate of the views of each state, most viewed first.
+
+        Returns:
+            pd.DataFrame: 'state', 'views', 'hits', 'misses' and 'hit_rate'
+        """
+        result = pd.read_sql_query(
+            "SELECT state, views, hits, misses FROM views ORDER BY views DESC, state", self._connection()
+        )
+        calls = result['hits'] + result['misses']
+        result['hit_rate'] = (result['hits'] / calls.where(calls > 0)).round(3)
+        return result
+
+    def totals(self) -> Dict:
+        """Views, memo hits, misses and hit rate over the whole log."""
+        views, hits, misses = self._connection().execute(
+            "SELECT COALESCE(SUM(views), 0), COALESCE(SUM(hits), 0), COALESCE(SUM(misses), 0) FROM views"
+        ).fetchone()
+        return {'views': views, 'hits': hits, 'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0}
+
+def default_states(df: pd.DataFrame, brands: int = 10, categories: int = 5) -> List[Dict]:
+    """States new users see first: no filter, then each of the largest brands and categories."""
+    return (
+        [normalize_state()]
+        + [normalize_state(brands=[b]) for b in df['brands'].value_counts().index[:brands]]
+        + [normalize_state(categories=[c]) for c in df['categories'].value_counts().index[:categories]]
+    )
+
+def warm_cache(
+    df: pd.DataFrame,
+    version: str,
+    states: List[Dict],
+    memo: Optional[DiskMemo] = None,
+    max_seconds: float = WARMUP_MAX_SECONDS,
+    max_bytes: int = WARMUP_MAX_BYTES,
+    incidence: Optional[TagIncidence] = None
+) -> Dict:
+    """
+    Precompute the memoized views of some filter states, within a budget.
+
+    States are warmed in order. Both budgets are checked before every
+    memoized call, so the job stops within one call once max_seconds have
+    passed or it has stored max_bytes of results; the call in progress
+    (e.g. the near-duplicate clusters of a large dataset) is not
+    interrupted, and a state stopped midway does not count as warmed.
+
+    Args:
+        df (pd.DataFrame): The dataset named by version
+        version (str): Dataset version the memo keys are tied to
+        states (List[Dict]): Normalized filter states, most important first
+        memo (Optional[DiskMemo]): Memo store (default: this process's)
+        max_seconds (float): Time budget
+        max_bytes (int): Budget of compressed result bytes written to the
+            memo store (not process memory)
+        incidence (Optional[TagIncidence]): Tag incidence of df, built if missing
+
+    Returns:
+        Dict: 'version', 'states', 'warmed', 'computed', 'cached', 'seconds',
+        'bytes' (written to the memo store) and 'stopped' ('time', 'bytes' or None)
+    """
+    memo = memo or get_memo()
+    start = time.perf_counter()
+    start_bytes = memo.thread_bytes_written()
+    hits, misses = memo.thread_counts()
+    report = {'version': version, 'states': len(states), 'warmed': 0, 'stopped': None}
+
+    def exhausted() -> Optional[str]:
+        if time.perf_counter() - start > max_seconds:
+            return 'time'
+        if memo.thread_bytes_written() - start_bytes > max_bytes:
+            return 'bytes'
+        return None
+
+    with quiet_thread():
+        incidence = incidence or TagIncidence.from_frame(df)
+        duplicates = memo.call(near_duplicate_clusters, df, dataset=version)
+        bounds = (float(df['nutrient_score'].min()), float(df['nutrient_score'].max()))
+        seen = set()
+        for state in states:
+            if state_key(state) in seen:
+                continue
+            seen.add(state_key(state))
+            mask = filter_mask(df, state['brands'], state['categories'], state['score_range'] or bounds,
+                               duplicates if state['collapse_duplicates'] else None)
+            filtered = df[mask]
+            if filtered.empty:
+                continue
+            for func, args, kwargs in view_calls(filtered, len(filtered) == len(df), incidence):
+                report['stopped'] = exhausted()
+                if report['stopped']:
+                    break
+                memo.call(func, *args, dataset=version, **kwargs)
+            if report['stopped']:
+                break
+            report['warmed'] += 1
+
+    after_hits, after_misses = memo.thread_counts()
+    report.update({
+        'computed': after_misses - misses,
+        'cached': after_hits - hits,
+        'seconds': round(time.perf_counter() - start, 2),
+        'bytes': memo.thread_bytes_written() - start_bytes,
+    })
+    return report
+
+def read_warmup_report(path: str = WARMUP_REPORT_PATH) -> Optional[Dict]:
+    """Report of the last warm-up on this host, or None."""
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+_warming = threading.Lock()
+
+def run_warmup(root: str = SHARED_DATA_DIR, log: Optional[AccessLog] = None,
+               report_path: str = WARMUP_REPORT_PATH) -> Optional[Dict]:
+    """
+    Warm the memo for the published dataset from the access log.
+
+    Returns:
+        Optional[Dict]: The warm-up report (also written to report_path), or
+        None when nothing is published or a warm-up is already running here
+    """
+    if not _warming.acquire(blocking=False):
+        return None
+    try:
+        df, version = attach_dataset(root)
+        if df is None:
+            return None
+        log = log or get_access_log()
+        states = log.popular() + default_states(df)
+        # A view of its own, so the text the warm-up reads is not kept with the attached frame
+        report = warm_cache(session_view(df), version, states)
+        report['finished'] = datetime.now().isoformat(timespec='seconds')
+        report['hit_rate'] = log.totals()['hit_rate']
+        Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(report_path).write_text(json.dumps(report, indent=2), encoding='utf-8')
+        return report
+    finally:
+        _warming.release()
+
+def start_warmup(root: str = SHARED_DATA_DIR) -> threading.Thread:
+    """Run run_warmup in a background thread, so the swap that triggered it is not delayed."""
+    thread = threading.Thread(target=run_warmup, args=(root,), name='cache-warmup', daemon=True)
+    thread.start()
+    return thread
+
+# One log per path and process
+_logs: Dict[str, AccessLog] = {}
+
+def get_access_log(path: str = ACCESS_LOG_PATH) -> AccessLog:
+    """Return this process's access log for a path, opening it on first use."""
+    log = _logs.get(str(path))
+    if log is None:
+        log = _logs[str(path)] = AccessLog(path)
+    return log
@@ -0,0 +1,263 @@
+"""
+Module for a clustered, zone-mapped copy of the processed dataset on disk.
+
+The dataset is stored as a Parquet file sorted by category and then by
+``nutrient_score``, split into row groups of ``ZONE_ROWS_PER_GROUP`` rows.
+For every row group a zone map records the ``nutrient_score`` min, max and
+null count and the dictionary codes of the categories and brands it holds.
+The category and brand dictionaries and the zone maps are kept in the file's
+footer metadata, so the file and its zone maps are always replaced together.
+
+The footer also names the dataset version the store was written from, so
+readers holding an attached segment (the API) use the store only while it
+matches that segment.
+
+A filtered read first checks the zone maps and reads only the row groups
+that can hold a matching row. It then applies the exact filter to those rows.
+Because of the sort, the rows of a category sit in a few adjacent row
+groups, and a score range narrows those further, so a narrow sidebar filter
+reads a small fraction of the file instead of scanning all of it.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .config import ZONE_ROWS_PER_GROUP, ZONE_SET_LIMIT, ZONED_DATA_PATH
+
+ZONE_MAP_KEY = b'zone_map'
+ZONE_VERSION_KEY = b'dataset_version'
+CLUSTER_COLUMNS = ['categories', 'nutrient_score']
+SCORE_COLUMN = 'nutrient_score'
+
+def _group_sets(codes: np.ndarray, group_ids: np.ndarray, n_groups: int) -> List[Optional[List[int]]]:
+    """Sorted distinct codes of each row group; None where there are more than ZONE_SET_LIMIT."""
+    present = codes >= 0
+    pairs = np.unique(group_ids[present].astype(np.int64) << 32 | codes[present])
+    groups, values = pairs >> 32, (pairs & 0xFFFFFFFF).astype(np.int64)
+    bounds = np.searchsorted(groups, np.arange(n_groups + 1))
+    sets = []
+    for g in range(n_groups):
+        members = values[bounds[g]:bounds[g + 1]]
+        sets.append(members.tolist() if len(members) <= ZONE_SET_LIMIT else None)
+    return sets
+
+def build_zone_map(df: pd.DataFrame, rows_per_group: int = ZONE_ROWS_PER_GROUP) -> Dict:
+    """
+    Zone maps of a DataFrame already in clustered order.
+
+    Args:
+        df (pd.DataFrame): Clustered product DataFrame
+        rows_per_group (int): Rows per row group
+
+    Returns:
+        Dict: 'rows_per_group', the 'categories' and 'brands' dictionaries and
+        one 'groups' entry per row group with its 'rows', 'score_min',
+        'score_max', 'score_nulls', 'categories' and 'brands' (codes, or None
+        for any)
+    """
+    n = len(df)
+    starts = np.arange(0, n, rows_per_group)
+    group_ids = np.arange(n) // rows_per_group
+
+    score = df[SCORE_COLUMN].to_numpy(dtype='float64', na_value=np.nan)
+    nulls = np.isnan(score)
+    with np.errstate(invalid='ignore'):
+        score_min = np.fmin.reduceat(score, starts) if n else np.array([])
+        score_max = np.fmax.reduceat(score, starts) if n else np.array([])
+    score_nulls = np.add.reduceat(nulls, starts) if n else np.array([], dtype=int)
+
+    zone_map = {'rows_per_group': rows_per_group}
+    sets = {}
+    for column in ('categories', 'brands'):
+        codes, names = pd.factorize(df[column], sort=True)
+        zone_map[column] = [str(name) for name in names]
+        sets[column] = _group_sets(codes, group_ids, len(starts))
+
+    zone_map['groups'] = [
+        {
+            'rows': int(min(rows_per_group, n - start)),
+            # An all-null group has no range; it never matches a score filter
+            'score_min': None if np.isnan(low) else float(low),
+            'score_max': None if np.isnan(high) else float(high),
+            'score_nulls': int(null_count),
+            'categories': sets['categories'][g],
+            'brands': sets['brands'][g],
+        }
+        for g, (start, low, high, null_count) in enumerate(zip(starts, score_min, score_max, score_nulls))
+    ]
+    return zone_map
+
+def write_zoned_store(df: pd.DataFrame, path: str = ZONED_DATA_PATH,
+                      rows_per_group: int = ZONE_ROWS_PER_GROUP, version: Optional[str] = None) -> None:
+    """
+    Write the dataset clustered by category and score, with its zone maps.
+
+    The file is written to a temporary path and moved into place, so readers
+    never see a half-written file.
+
+    Args:
+        df (pd.DataFrame): Processed DataFrame
+        path (str): Path of the Parquet file
+        rows_per_group (int): Rows per row group
+        version (Optional[str]): Version of the published segment holding
+            the same data, recorded in the footer
+    """
+    clustered = df.sort_values(CLUSTER_COLUMNS, kind='stable', na_position='last', ignore_index=True)
+    zone_map = build_zone_map(clustered, rows_per_group)
+    table = pa.Table.from_pandas(clustered, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        ZONE_MAP_KEY: json.dumps(zone_map, separators=(',', ':')).encode('utf-8'),
+        **({ZONE_VERSION_KEY: version.encode('utf-8')} if version else {}),
+    })
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.parquet', dir=target.parent)
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path, row_group_size=rows_per_group, write_statistics=CLUSTER_COLUMNS)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, target)
+
+def zoned_store_is_stale(source: Path, path: str = ZONED_DATA_PATH) -> bool:
+    """
+    Check whether the zoned store is missing or older than its source data file.
+
+    Args:
+        source (Path): Processed data file the store is written from
+        path (str): Path of the Parquet file
+
+    Returns:
+        bool: True if the store needs rewriting
+    """
+    target = Path(path)
+    return not target.exists() or Path(source).stat().st_mtime > target.stat().st_mtime
+
+def zoned_store_version(path: str = ZONED_DATA_PATH) -> Optional[str]:
+    """Dataset version the store was written from; None if unknown or there is no store."""
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except FileNotFoundError:
+        return None
+    version = metadata.get(ZONE_VERSION_KEY)
+    return version.decode('utf-8') if version else None
+
+def read_zone_map(path: str = ZONED_DATA_PATH) -> Dict:
+    """Read the zone maps from the file footer, without reading any rows."""
+    metadata = pq.read_schema(path).metadata or {}
+    if ZONE_MAP_KEY not in metadata:
+        raise ValueError(f"{path} has no zone map; write it with write_zoned_store")
+    return json.loads(metadata[ZONE_MAP_KEY])
+
+def _codes(dictionary: List[str], values: Optional[Sequence[str]]) -> Optional[set]:
+    """Dictionary codes of the filter values; None when the filter is unset."""
+    if not values:
+        return None
+    index = {name: code for code, name in enumerate(dictionary)}
+    return {index[v] for v in values if v in index}
+
+def matching_row_groups(
+    zone_map: Dict,
+    brands: Optional[Sequence[str]] = None,
+    categories: Optional[Sequence[str]] = None,
+    score_range: Optional[Tuple[float, float]] = None
+) -> List[int]:
+    """
+    Row groups that can hold rows matching the dashboard filters.
+
+    Args:
+        zone_map (Dict): Zone maps from read_zone_map
+        brands (Optional[Sequence[str]]): Selected brands (None or empty for all)
+        categories (Optional[Sequence[str]]): Selected categories (None or empty for all)
+        score_range (Optional[Tuple[float, float]]): Inclusive nutrient score range
+
+    Returns:
+        List[int]: Indices of the row groups to read
+    """
+    wanted = {'brands': _codes(zone_map['brands'], brands),
+              'categories': _codes(zone_map['categories'], categories)}
+    selected = []
+    for g, zone in enumerate(zone_map['groups']):
+        if score_range is not None:
+            if zone['score_min'] is None or zone['score_max'] < score_range[0] or zone['score_min'] > score_range[1]:
+                continue
+        if any(codes is not None and zone[column] is not None and codes.isdisjoint(zone[column])
+               for column, codes in wanted.items()):
+            continue
+        selected.append(g)
+    return selected
+
+def load_filtered(
+    path: str = ZONED_DATA_PATH,
+    brands: Optional[Sequence[str]] = None,
+    categories: Optional[Sequence[str]] = None,
+    score_range: Optional[Tuple[float, float]] = None,
+    columns: Optional[List[str]] = None
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Load the products matching the dashboard filters, reading only the row
+    groups whose zone maps allow a match.
+
+    Args:
+        path (str): Path of the Parquet file
+        brands (Optional[Sequence[str]]): Selected brands (None or empty for all)
+        categories (Optional[Sequence[str]]): Selected categories (None or empty for all)
+        score_range (Optional[Tuple[float, float]]): Inclusive nutrient score range
+        columns (Optional[List[str]]): Columns to read (default all)
+
+    Returns:
+        Tuple[pd.DataFrame, Dict]: Matching products (in clustered order) and
+        the scan statistics: 'row_groups_read', 'row_groups', 'rows_read',
+        'rows' and the compressed 'bytes_read' and 'bytes'
+    """
+    parquet = pq.ParquetFile(path)
+    zone_map = json.loads(parquet.schema_arrow.metadata[ZONE_MAP_KEY])
+    selected = matching_row_groups(zone_map, brands, categories, score_range)
+
+    filter_columns = [c for c, v in (('brands', brands), ('categories', categories)) if v]
+    if score_range is not None:
+        filter_columns.append(SCORE_COLUMN)
+    read_columns = None if columns is None else list(dict.fromkeys(columns + filter_columns))
+    df = parquet.read_row_groups(selected, columns=read_columns).to_pandas()
+
+    mask = np.ones(len(df), dtype=bool)
+    if brands:
+        mask &= df['brands'].isin(brands).to_numpy()
+    if categories:
+        mask &= df['categories'].isin(categories).to_numpy()
+    if score_range is not None:
+        mask &= df[SCORE_COLUMN].between(*score_range).to_numpy()
+    result = df[mask].reset_index(drop=True)
+    if columns is not None:
+        result = result[columns]
+
+    metadata = parquet.metadata
+    names = set(read_columns or parquet.schema_arrow.names)
+
+    def compressed(groups) -> int:
+        return sum(
+            metadata.row_group(g).column(c).total_compressed_size
+            for g in groups for c in range(metadata.num_columns)
+            if metadata.row_group(g).column(c).path_in_schema in names
+        )
+
+    stats = {
+        'row_groups_read': len(selected),
+        'row_groups': metadata.num_row_groups,
+        'rows_read': len(df),
+        'rows': metadata.num_rows,
+        'bytes_read': compressed(selected),
+        'bytes': compressed(range(metadata.num_row_groups)),
+    }
+    return result, stats
@@ -0,0 +1,67 @@
+"""
+Tests for the HTTP API's request handling around the attached dataset.
+"""
+
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+from starlette.requests import Request
+
+from src import api
+from src.api import ApiState, Dataset
+
+@pytest.fixture
+def products() -> pd.DataFrame:
+    return pd.DataFrame({'code': ['300', '100', '200', '100', '400'], 'product_name': list('abcde')})
+
+def test_positions_keep_first_occurrence(products):
+    dataset = Dataset(products, 'v1')
+    assert dataset.positions.to_dict() == {'300': 0, '100': 1, '200': 2, '400': 4}
+    assert dataset.positions.get('999') is None
+
+def test_reattach_runs_off_the_event_loop(products, tmp_path, monkeypatch):
+    state = ApiState(str(tmp_path / 'shared'), str(tmp_path / 'products.db'), str(tmp_path / 'memo.db'))
+    threads = []
+
+    def attach(shared_dir):
+        threads.append(threading.current_thread())
+        return products, 'v2'
+
+    monkeypatch.setattr(api, 'current_version', lambda shared_dir: 'v2')
+    monkeypatch.setattr(api, 'attach_dataset', attach)
+
+    async def requests():
+        loop_thread = threading.current_thread()
+        first = await state.current()
+        # Within API_VERSION_CHECK_INTERVAL the attached dataset is returned as is
+        second = await state.current()
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(requests())
+    assert first is second and first.version == 'v2'
+    assert threads and loop_thread not in threads
+    assert len(threads) == 1
+
+def test_refresh_serves_the_attached_dataset_during_a_swap(products, tmp_path):
+    state = ApiState(str(tmp_path / 'shared'), str(tmp_path / 'products.db'), str(tmp_path / 'memo.db'))
+    state.dataset = Dataset(products, 'v1')
+    with state._refreshing:
+        assert state.refresh() is state.dataset
+
+@pytest.mark.parametrize('header, accepted', [
+    ('gzip', True),
+    ('gzip, deflate, br', True),
+    ('br;q=1.0, gzip;q=0.8', True),
+    ('GZIP; Q=0.5', True),
+    ('*', True),
+    ('gzip;q=0', False),
+    ('gzip;q=0.000, *;q=1', False),
+    ('identity, *;q=0', False),
+    ('deflate', False),
+    ('', False),
+])
+def test_accepts_gzip(header, accepted):
+    request = Request({'type': 'http', 'headers': [(b'accept-encoding', header.encode())]})
+    assert api._accepts_gzip(request) is accepted
@@ -0,0 +1,41 @@
+"""
+Tests for brand canonicalization: spelling variants merge, distinct brands
+with similar names do not.
+"""
+
+import pandas as pd
+import pytest
+
+from src.brands import BrandMap, brand_keys, similar_keys
+
+# Merges seen in the shipped data
+VARIANTS = [('maggi', 'maggie'), ('unbic', 'unibic'), ('pepisco', 'pepsico'), ('britania', 'britannia'),
+            ('haldiram', 'haldirams'), ('epigamia', 'epigamua'), ('hindustanunilever', 'hindustanuniliver')]
+# Distinct brands the shipped data once merged
+DISTINCT = [('candia', 'candid'), ('pepsicola', 'pepsicolays'), ('kisaan', 'kissan')]
+
+def matched(a: str, b: str) -> bool:
+    return not similar_keys([a, b]).empty
+
+@pytest.mark.parametrize('a, b', VARIANTS)
+def test_variants_match(a, b):
+    assert matched(a, b)
+
+@pytest.mark.parametrize('a, b', DISTINCT)
+def test_distinct_brands_do_not_match(a, b):
+    assert not matched(a, b)
+
+def test_brand_map():
+    brands = pd.Series(['Candia', 'Candid', 'Candia', 'Pepsi Cola', 'Pepsicolays', 'Britannia',
+                        'BRITANNIA India Pvt Ltd', 'Britania', None, 'Maggi', 'Maggie', 'Maggi'],
+                       index=range(100, 112))
+    brand_map = BrandMap()
+    brand_map.update(brands)
+    result = brand_map.apply(brands)
+    assert result.index.equals(brands.index)
+    assert result.fillna('').tolist() == ['Candia', 'Candid', 'Candia', 'Pepsi Cola', 'Pepsicolays', 'Britannia',
+                                          'Britannia', 'Britannia', '', 'Maggi', 'Maggi', 'Maggi']
+
+def test_brand_keys():
+    brands = pd.Series(['Nestlé India', "Haldiram's", None, 'The Good Co'], index=[5, 2, 9, 7])
+    assert brand_keys(brands).tolist() == ['nestle', 'haldirams', '', 'good']
@@ -0,0 +1,19 @@
+"""
+Tests for the text normalization shared by near-duplicate detection and
+brand canonicalization.
+"""
+
+import pandas as pd
+
+from src.dedup import normalize_text
+
+def test_normalize_text():
+    values = pd.Series(['Nestlé  India', "Haldiram's", None, 'MAGGI-2 Minute'])
+    assert normalize_text(values).tolist() == ['nestle india', 'haldiram s', '', 'maggi 2 minute']
+
+def test_normalize_text_keeps_rows_with_their_labels():
+    # As after deduplication or a filter: the index has gaps and another order
+    values = pd.Series(['Candia', 'Nestlé', None, 'Maggi'], index=[40, 3, 17, 0])
+    result = normalize_text(values)
+    assert result.index.tolist() == [40, 3, 17, 0]
+    assert result.tolist() == ['candia', 'nestle', '', 'maggi']
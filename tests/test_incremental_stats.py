@@ -0,0 +1,55 @@
+"""
+Tests for the incremental dataset statistics: after any sequence of updates
+they must answer like the analysis functions on the current rows.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis import get_data_quality_metrics, get_summary_stats
+from src.incremental_stats import IncrementalStats, update_stats
+
+@pytest.fixture
+def products() -> pd.DataFrame:
+    n = 40
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'code': [str(8900000 + i) for i in range(n)],
+        'brands': rng.choice(['Amul', 'Parle', 'Britannia', None], n),
+        'categories': rng.choice(['Dairy', 'Biscuits', 'Snacks', None], n),
+        'nutrient_score': np.where(rng.random(n) < 0.1, np.nan, rng.uniform(0, 10, n).round(2)),
+        'fat_100g': rng.uniform(0, 40, n).round(2),
+        'allergens_count': rng.integers(0, 3, n),
+        'additives_count': rng.integers(0, 4, n),
+        'image_url': np.where(rng.random(n) < 0.3, None, 'https://img/x.jpg'),
+    })
+
+def assert_describes(stats: IncrementalStats, df: pd.DataFrame) -> None:
+    assert stats.describes(df)
+    assert stats.summary_stats() == get_summary_stats(df)
+    assert stats.data_quality_metrics() == get_data_quality_metrics(df)
+
+def test_from_frame(products):
+    assert_describes(IncrementalStats.from_frame(products), products)
+
+def test_updates_match_a_rebuild(products):
+    stats = IncrementalStats.from_frame(products)
+    current = products.drop(index=[3, 17]).copy()
+    current.loc[5, ['categories', 'fat_100g']] = ['Tea', 12.5]
+    current.loc[9, 'brands'] = None
+    current = pd.concat([current, products.iloc[:2].assign(code=['9900001', '9900002'], categories='Tea')])
+    stats = update_stats(stats, products, current)
+    assert_describes(stats, current)
+    assert stats.categories['Tea'] == 3
+
+def test_removing_the_last_product_of_a_category(products):
+    stats = IncrementalStats.from_frame(products)
+    current = products[products['categories'] != 'Snacks']
+    stats = update_stats(stats, products, current)
+    assert 'Snacks' not in stats.categories
+    assert_describes(stats, current)
+
+def test_round_trip(products):
+    stats = IncrementalStats.from_frame(products)
+    assert_describes(IncrementalStats.from_dict(stats.to_dict()), products)
@@ -0,0 +1,104 @@
+"""
+Tests for lazy sidecar columns: every operation the dashboard applies to a
+``LazyArrowArray`` must give the same result as the eager Arrow column.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.lazy_columns import LazyArrowArray, LazyColumn, write_lazy_column
+from src.shared_data import attach_dataset, publish_dataset
+
+# Small batches so selections span several of them
+BATCH_ROWS = 4
+
+VALUES = ['sugar, salt', None, 'wheat flour', 'milk', None, 'rice', 'palm oil', 'cocoa',
+          None, 'jaggery', 'ghee', 'spices', 'tea', None]
+
+@pytest.fixture
+def column(tmp_path) -> LazyColumn:
+    values = pa.array(VALUES, type=pa.large_string())
+    path = tmp_path / 'ingredients.lazy'
+    write_lazy_column(values, path, batch_rows=BATCH_ROWS)
+    return LazyColumn(path, np.array([v is not None for v in VALUES]))
+
+@pytest.fixture
+def lazy(column) -> pd.Series:
+    return pd.Series(LazyArrowArray.from_column(column), index=np.arange(100, 100 + len(VALUES)))
+
+@pytest.fixture
+def eager() -> pd.Series:
+    return pd.Series(VALUES, dtype=pd.ArrowDtype(pa.large_string()), index=np.arange(100, 100 + len(VALUES)))
+
+def test_isna_reads_presence_flags(lazy, eager):
+    np.testing.assert_array_equal(lazy.isna().to_numpy(), eager.isna().to_numpy())
+    assert lazy.count() == eager.count()
+    assert not lazy.array.materialized
+
+def test_dtype_matches(lazy, eager):
+    assert lazy.dtype == eager.dtype
+
+@pytest.mark.parametrize('indices', [[0, 5, 13], [13, 0, 2, 2], [-1, -14], [], list(range(len(VALUES)))])
+def test_take(lazy, eager, indices):
+    indices = np.array(indices, dtype=np.intp)
+    result = lazy.array.take(indices)
+    assert isinstance(result, LazyArrowArray)
+    assert result.tolist() == eager.array.take(indices).tolist()
+
+def test_take_with_fill(lazy, eager):
+    result = lazy.array.take([3, -1, 9], allow_fill=True)
+    assert result.tolist() == eager.array.take([3, -1, 9], allow_fill=True).tolist()
+    assert result.isna().tolist() == [False, True, False]
+
+def test_take_out_of_bounds(lazy):
+    with pytest.raises(IndexError):
+        lazy.array.take([len(VALUES)])
+    with pytest.raises(IndexError):
+        lazy.array.take([-len(VALUES) - 1])
+
+def test_boolean_filter_stays_lazy(lazy, eager):
+    mask = np.arange(len(VALUES)) % 3 == 0
+    filtered = lazy[mask]
+    assert not filtered.array.materialized
+    pd.testing.assert_series_equal(filtered, eager[mask])
+    # Chained filters compose positions into the column
+    pd.testing.assert_series_equal(filtered[filtered.notna().to_numpy()], eager[mask][eager[mask].notna()])
+
+def test_all_true_filter(lazy, eager):
+    filtered = lazy[np.ones(len(VALUES), dtype=bool)]
+    pd.testing.assert_series_equal(filtered, eager)
+
+def test_slice_and_scalar(lazy, eager):
+    pd.testing.assert_series_equal(lazy.iloc[2:11:3], eager.iloc[2:11:3])
+    assert lazy.iloc[9] == eager.iloc[9]
+    assert pd.isna(lazy.iloc[8])
+
+def test_reindex(lazy, eager):
+    labels = [113, 100, 999, 105, 108]
+    pd.testing.assert_series_equal(lazy.reindex(labels), eager.reindex(labels))
+
+def test_operations_read_values(lazy, eager):
+    pd.testing.assert_series_equal(lazy.str.len(), eager.str.len())
+    assert lazy.value_counts().sort_index().tolist() == eager.value_counts().sort_index().tolist()
+
+def test_to_csv(lazy, eager):
+    mask = np.arange(len(VALUES)) % 2 == 1
+    lazy_frame = pd.DataFrame({'code': np.arange(len(VALUES)), 'ingredients_text': lazy})
+    eager_frame = pd.DataFrame({'code': np.arange(len(VALUES)), 'ingredients_text': eager})
+    assert lazy_frame.to_csv() == eager_frame.to_csv()
+    assert lazy_frame[mask].to_csv(index=False) == eager_frame[mask].to_csv(index=False)
+
+def test_publish_and_attach(tmp_path):
+    df = pd.DataFrame({
+        'code': np.arange(len(VALUES)),
+        'ingredients_text': VALUES,
+        'nutrient_score': np.linspace(0, 100, len(VALUES)),
+    })
+    version = publish_dataset(df, str(tmp_path), lazy_columns=['ingredients_text'])
+    attached, attached_version = attach_dataset(str(tmp_path), version)
+    assert attached_version == version
+    assert isinstance(attached['ingredients_text'].array, LazyArrowArray)
+    assert attached['ingredients_text'].isna().tolist() == df['ingredients_text'].isna().tolist()
+    assert [None if pd.isna(v) else v for v in attached['ingredients_text']] == VALUES
@@ -0,0 +1,110 @@
+"""
+Tests for the SQL ports of the analysis functions: with the filters pushed
+down, they must answer like ``src/analysis.py`` on the filtered frame, and
+the API must use them while the database holds its dataset version.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from starlette.requests import Request
+
+from src import analysis, query
+from src.api import ENDPOINTS, ApiError, ApiState, Dataset, filter_products
+
+BRANDS = ['Amul', 'Britannia', 'Parle', 'Amul', None, 'Haldiram', 'Parle', 'Amul', 'Britannia', 'Parle']
+CATEGORIES = ['Dairy', 'Biscuits', 'Biscuits', 'Dairy', 'Snacks', 'Snacks', None, 'Dairy', 'Biscuits', 'Snacks']
+SCORES = [7.5, 3.0, 4.25, np.nan, 6.0, 2.5, 8.0, 7.5, 5.0, 1.0]
+
+@pytest.fixture
+def products() -> pd.DataFrame:
+    n = len(BRANDS)
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'code': [f'{890000 + i}' for i in range(n - 1)] + ['890000'],
+        'product_name': [f'Product {i}' for i in range(n)],
+        'brands': BRANDS,
+        'categories': CATEGORIES,
+        'nutrient_score': SCORES,
+        'sugars_100g': rng.uniform(0, 50, n).round(2),
+        'fat_100g': rng.uniform(0, 30, n).round(2),
+        'salt_100g': np.where(np.arange(n) % 4 == 0, np.nan, rng.uniform(0, 3, n).round(3)),
+        'proteins_100g': rng.uniform(0, 20, n).round(2),
+        'allergens_count': [0, 1, 2, 0, 0, 1, 0, 3, 0, 1],
+        'additives_count': [1, 0, 2, 1, 0, 0, 2, 1, 0, 1],
+        'additives_tags': ["['en:e330']", '[]', "['en:e322', 'en:e330']", "['en:e471']", '[]', '[]',
+                           "['en:e471', 'en:e330']", "['en:e330']", '[]', "['en:e322']"],
+        'image_url': [None if i % 3 == 0 else f'https://img/{i}.jpg' for i in range(n)],
+    })
+
+@pytest.fixture
+def conn(products, tmp_path):
+    db_path = tmp_path / 'products.db'
+    query.build_database(products, str(db_path), version='v1')
+    conn = query.connect(str(db_path))
+    yield conn
+    conn.close()
+
+FILTERS = [
+    {},
+    {'categories': ['Biscuits']},
+    {'brands': ['Amul', 'Parle']},
+    {'min_score': 4},
+    {'categories': ['Dairy', 'Snacks'], 'max_score': 7.5},
+    {'brands': ['Parle'], 'categories': ['Biscuits', 'Snacks'], 'min_score': 1, 'max_score': 4.25},
+]
+
+def sql_filters(brands=(), categories=(), min_score=None, max_score=None) -> dict:
+    filters = {'brands': brands, 'categories': categories}
+    if min_score is not None or max_score is not None:
+        filters['score_range'] = (-np.inf if min_score is None else min_score,
+                                  np.inf if max_score is None else max_score)
+    return filters
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_ports_match_analysis(products, conn, filters):
+    subset = filter_products(products, **filters)
+    pushed = sql_filters(**filters)
+    assert query.count_products(conn, **pushed) == len(subset)
+    assert query.get_summary_stats(conn, **pushed) == analysis.get_summary_stats(subset)
+    assert query.get_data_quality_metrics(conn, **pushed) == analysis.get_data_quality_metrics(subset)
+    for name, args in (('top_brands', {'n': 2}), ('category_analysis', {}), ('get_healthiest_products', {'n': 3})):
+        expected = getattr(analysis, name)(subset, **args).reset_index(drop=True)
+        pd.testing.assert_frame_equal(getattr(query, name)(conn, **args, **pushed), expected, check_dtype=False)
+
+def test_additive_prevalence_counts_each_tag(conn):
+    result = query.get_additive_prevalence(conn, n=2, categories=['Dairy', 'Biscuits'])
+    assert result['additive'].tolist() == ['en:e330', 'en:e322']
+    assert result['occurrence_count'].tolist() == [3, 1]
+    assert result['percentage'].tolist() == [50.0, 16.7]
+
+def test_database_version(products, conn, tmp_path):
+    assert query.database_version(conn) == 'v1'
+    query.build_database(products, str(tmp_path / 'unversioned.db'))
+    assert query.database_version(query.connect(str(tmp_path / 'unversioned.db'))) is None
+
+def request(path: str, query_string: str = '') -> Request:
+    return Request({'type': 'http', 'method': 'GET', 'path': path, 'headers': [],
+                    'query_string': query_string.encode(), 'path_params': {}})
+
+def api_state(tmp_path) -> ApiState:
+    return ApiState(str(tmp_path / 'shared'), str(tmp_path / 'products.db'), str(tmp_path / 'memo.db'),
+                    str(tmp_path / 'zoned.parquet'))
+
+@pytest.mark.parametrize('version', ['v1', 'v2'])
+def test_api_uses_database_of_its_version(products, conn, tmp_path, version):
+    state = api_state(tmp_path)
+    dataset = Dataset(products, version)
+    assert (state.database(dataset) is not None) == (version == 'v1')
+
+    _, run = ENDPOINTS['/categories'](state, dataset, request('/categories', 'categories=Biscuits&min_score=4'))
+    expected = analysis.category_analysis(filter_products(products, categories=('Biscuits',), min_score=4))
+    pd.testing.assert_frame_equal(run().reset_index(drop=True), expected, check_dtype=False)
+    # Only the in-memory fallback goes through the memo
+    assert state.memo.misses == (0 if version == 'v1' else 1)
+
+def test_api_empty_filters_are_not_found(products, conn, tmp_path):
+    _, run = ENDPOINTS['/summary'](api_state(tmp_path), Dataset(products, 'v1'), request('/summary', 'brands=Nestle'))
+    with pytest.raises(ApiError) as error:
+        run()
+    assert error.value.status == 404
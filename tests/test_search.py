@@ -0,0 +1,61 @@
+"""
+Tests for the full-text product search, in the languages of the dataset.
+"""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.query import build_database, database_is_stale
+from src.search import create_search_index, search_codes, search_index_is_current, search_products
+
+NAMES = ['पानी', 'पिन', 'पान', 'चीनी', 'चीनी मिट्टी', 'Crème fraîche', 'Sucre de canne', 'Maggi masala noodles']
+
+@pytest.fixture
+def conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(':memory:')
+    pd.DataFrame({
+        'code': [str(i) for i in range(len(NAMES))],
+        'product_name': NAMES,
+        'brands': 'Brand',
+        'categories': 'Category',
+        'ingredients_text': 'water',
+    }).to_sql('products', conn, index=False)
+    create_search_index(conn)
+    return conn
+
+def names(conn, text: str):
+    return sorted(search_products(conn, text)['product_name'])
+
+def test_devanagari_vowel_signs_stay_in_words(conn):
+    # Vowel signs are combining marks; as separators 'पानी' would match 'पिन' and 'पान'
+    assert names(conn, 'पानी') == ['पानी']
+    assert names(conn, 'चीनी') == ['चीनी', 'चीनी मिट्टी']
+    assert search_codes(conn, 'मिट्टी') == ['4']
+
+def test_last_word_matches_as_prefix(conn):
+    assert names(conn, 'चीन') == ['चीनी', 'चीनी मिट्टी']
+    assert names(conn, 'mag') == ['Maggi masala noodles']
+
+def test_accents_are_folded(conn):
+    assert names(conn, 'creme') == names(conn, 'crème') == ['Crème fraîche']
+
+def test_database_indexed_with_another_tokenizer_is_stale(tmp_path):
+    source = tmp_path / 'products.csv'
+    source.write_text('')
+    db_path = str(tmp_path / 'products.db')
+    build_database(pd.DataFrame({'code': ['1'], 'product_name': ['पानी'], 'brands': ['b'],
+                                 'ingredients_text': ['water']}), db_path)
+    assert not database_is_stale(source, db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE name_search")
+    conn.execute("""
+        CREATE VIRTUAL TABLE name_search USING fts5(product_name, brands, content='products',
+                                                     tokenize='unicode61 remove_diacritics 2')
+    """)
+    conn.commit()
+    assert not search_index_is_current(conn)
+    conn.close()
+    assert database_is_stale(source, db_path)
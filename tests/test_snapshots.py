@@ -0,0 +1,39 @@
+"""
+Tests for the dataset history: trends replayed from deltas must match the
+reconstructed versions.
+"""
+
+import pandas as pd
+import pytest
+
+from src.snapshots import group_mean_trend, load_version, read_manifest, record_snapshot
+
+@pytest.fixture
+def history(tmp_path) -> str:
+    root = str(tmp_path / 'snapshots')
+    df = pd.DataFrame({
+        'code': [str(1000 + i) for i in range(8)],
+        'categories': ['Dairy', 'Snacks', 'Dairy', 'Biscuits', 'Snacks', 'Dairy', 'Biscuits', 'Snacks'],
+        'sugars_100g': [4.0, 12.5, 5.5, 30.0, 8.0, 3.0, 25.0, 10.0],
+    })
+    record_snapshot(df, root)
+    # A reformulation, then a new product and a removed one
+    df.loc[1, 'sugars_100g'] = 6.5
+    record_snapshot(df, root)
+    df = pd.concat([df.drop(index=3), pd.DataFrame({'code': ['2000'], 'categories': ['Dairy'],
+                                                    'sugars_100g': [9.0]})])
+    record_snapshot(df, root)
+    return root
+
+def expected_means(root: str, versions) -> pd.DataFrame:
+    means = {v: load_version(v, root=root).groupby('categories')['sugars_100g'].mean() for v in versions}
+    return pd.DataFrame(means).T.rename_axis('version').round(3)
+
+def test_history_is_a_base_and_deltas(history):
+    assert [v['kind'] for v in read_manifest(history)] == ['base', 'delta', 'delta']
+
+@pytest.mark.parametrize('first', [None, 1, 2, 3])
+def test_group_mean_trend(history, first):
+    versions = range(first or 1, 4)
+    result = group_mean_trend('sugars_100g', first=first, root=history)
+    pd.testing.assert_frame_equal(result, expected_means(history, versions), check_names=False)